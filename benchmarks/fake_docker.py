@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/benchmarks/fake_docker.py
+Minimal `docker` CLI for the benchmark fake host.
+
+Talks to the fake Engine API on $DOCKER_HOST (unix socket) and implements the
+subset of the CLI the DS01 hot paths use: ps, inspect, stats, exec, run,
+create, start, stop, rm (also under `docker container ...`), with --filter
+and Go-template --format support for the constructs found in this repo
+(.Field paths, index, json, range/end).
+
+Every invocation appends one line to $DS01_BENCH_CALL_LOG.
+
+Startup cost matters (it is part of every measured docker call), so this
+module imports only light standard library modules and runs with `python -S`.
+"""
+
+import json
+import os
+import re
+import socket
+import sys
+import urllib.parse
+
+# Options that take a value when not written as --opt=value
+VALUE_OPTS = {
+    "--name", "--label", "-l", "--gpus", "--cgroup-parent", "-e", "--env", "-v",
+    "--volume", "-m", "--memory", "--memory-swap", "--cpus", "--shm-size",
+    "--pids-limit", "-w", "--workdir", "-u", "--user", "--network", "--hostname",
+    "-h", "-p", "--publish", "--runtime", "--entrypoint", "--restart", "--ulimit",
+    "--ipc", "--device", "--mount", "--env-file", "--label-file", "--cpu-shares",
+    "--cpuset-cpus", "--security-opt", "--cap-add", "--cap-drop", "--group-add",
+    "--add-host", "--platform", "--pull", "--stop-timeout", "--log-driver",
+    "--log-opt", "--format", "-f", "--filter", "--time", "--tmpfs",
+}  # fmt: skip
+
+
+def api(method: str, path: str, query: dict | None = None, body=None):
+    """One Engine API request; returns (status, decoded JSON or None).
+
+    Plain socket HTTP/1.1 rather than http.client: importing http.client (and
+    the email package behind it) would double the shim's startup time.
+    """
+    socket_path = os.environ.get("DOCKER_HOST", "").removeprefix("unix://")
+    url = path + ("?" + urllib.parse.urlencode(query) if query else "")
+    payload = json.dumps(body).encode() if body is not None else b""
+    request = (
+        f"{method} {url} HTTP/1.1\r\nHost: docker\r\nConnection: close\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+    ).encode() + payload
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+            sock.sendall(request)
+            chunks = []
+            while chunk := sock.recv(65536):
+                chunks.append(chunk)
+    except OSError as e:
+        die(f"Cannot connect to the Docker daemon at {socket_path}: {e}")
+    head, _, data = b"".join(chunks).partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    return status, json.loads(data) if data else None
+
+
+def die(message: str, code: int = 1):
+    print(f"Error response from daemon: {message}", file=sys.stderr)
+    sys.exit(code)
+
+
+# =============================================================================
+# Go template subset
+# =============================================================================
+
+_ACTION = re.compile(r"\{\{-?\s*(.*?)\s*-?\}\}", re.S)
+
+
+def _go_str(value) -> str:
+    """Approximate Go's default %v formatting."""
+    if value is None:
+        return "<nil>"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, dict):
+        return "map[" + " ".join(f"{k}:{_go_str(value[k])}" for k in sorted(value)) + "]"
+    if isinstance(value, list):
+        return "[" + " ".join(_go_str(v) for v in value) + "]"
+    return str(value)
+
+
+def _lookup(dot, path: str):
+    value = dot
+    for part in path.split(".")[1:]:
+        if not part:
+            continue
+        if not isinstance(value, dict) or part not in value:
+            return "<no value>"
+        value = value[part]
+    return value
+
+
+def _eval(expr: str, dot):
+    args = re.findall(r'"[^"]*"|\S+', expr)
+    values = [a[1:-1] if a.startswith('"') else _lookup(dot, a) for a in args]
+    if args[0] == "index":
+        value = values[1]
+        for key in values[2:]:
+            value = value.get(key, "") if isinstance(value, dict) else ""
+        return value
+    if args[0] == "json":
+        return json.dumps(values[1], separators=(",", ":"))
+    return values[0]
+
+
+def _parse(tokens: list, pos: int = 0):
+    nodes = []
+    while pos < len(tokens):
+        kind, value = tokens[pos]
+        pos += 1
+        if kind == "action" and value == "end":
+            return nodes, pos
+        if kind == "action" and value.startswith("range "):
+            body, pos = _parse(tokens, pos)
+            nodes.append(("range", value[6:].strip(), body))
+        else:
+            nodes.append((kind, value))
+    return nodes, pos
+
+
+def _exec(nodes: list, dot) -> str:
+    out = []
+    for node in nodes:
+        if node[0] == "text":
+            out.append(node[1])
+        elif node[0] == "action":
+            out.append(_go_str(_eval(node[1], dot)))
+        else:
+            items = _eval(node[1], dot)
+            for item in items.values() if isinstance(items, dict) else items or []:
+                out.append(_exec(node[2], item))
+    return "".join(out)
+
+
+def render(template: str, dot) -> str:
+    tokens, last = [], 0
+    for m in _ACTION.finditer(template):
+        tokens.append(("text", template[last : m.start()]))
+        tokens.append(("action", m.group(1)))
+        last = m.end()
+    tokens.append(("text", template[last:]))
+    nodes, _ = _parse(tokens)
+    return _exec(nodes, dot)
+
+
+# =============================================================================
+# Commands
+# =============================================================================
+
+
+def split_opts(args: list[str]) -> tuple[dict[str, list[str]], list[str]]:
+    """Split CLI args into {option: [values]} and positionals (options anywhere)."""
+    opts: dict[str, list[str]] = {}
+    positionals = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg.startswith("-") and arg != "-":
+            name, eq, value = arg.partition("=")
+            if not eq and name in VALUE_OPTS and i + 1 < len(args):
+                i += 1
+                value = args[i]
+            opts.setdefault(name, []).append(value if (eq or name in VALUE_OPTS) else "")
+        else:
+            positionals.append(arg)
+        i += 1
+    return opts, positionals
+
+
+def leading_opts(args: list[str]) -> tuple[dict[str, list[str]], list[str]]:
+    """Parse options up to the first positional (image / container)."""
+    i = 0
+    while i < len(args) and args[i].startswith("-"):
+        name, eq, _ = args[i].partition("=")
+        i += 2 if (not eq and name in VALUE_OPTS) else 1
+    opts, _ = split_opts(args[:i])
+    return opts, args[i:]
+
+
+def _fmt(opts: dict) -> str | None:
+    values = opts.get("--format") or opts.get("-f")
+    return values[-1] if values else None
+
+
+def cmd_ps(args: list[str]) -> int:
+    opts, _ = split_opts(args)
+    filters: dict[str, list[str]] = {}
+    for spec in opts.get("--filter", []):
+        key, _, value = spec.partition("=")
+        filters.setdefault(key, []).append(value)
+    query = {"filters": json.dumps(filters)}
+    if "-a" in opts or "--all" in opts:
+        query["all"] = "1"
+    _, containers = api("GET", "/containers/json", query)
+    template = _fmt(opts)
+    for c in containers:
+        row = {
+            "ID": c["Id"][:12],
+            "Names": c["Names"][0].lstrip("/"),
+            "Image": c["Image"],
+            "Status": c["Status"],
+            "State": c["State"],
+            "Labels": ",".join(f"{k}={v}" for k, v in c["Labels"].items()),
+        }
+        if "-q" in opts or "--quiet" in opts:
+            print(row["ID"])
+        elif template:
+            print(render(template, row))
+        else:
+            print(f"{row['ID']}   {row['Image']}   {row['Status']}   {row['Names']}")
+    return 0
+
+
+def cmd_inspect(args: list[str]) -> int:
+    opts, names = split_opts(args)
+    template = _fmt(opts)
+    results, rc = [], 0
+    for name in names:
+        status, data = api("GET", f"/containers/{urllib.parse.quote(name)}/json")
+        if status != 200:
+            print(f"Error: No such object: {name}", file=sys.stderr)
+            rc = 1
+            continue
+        results.append(data)
+    if template:
+        for data in results:
+            print(render(template, data))
+    else:
+        print(json.dumps(results, indent=4))
+    return rc
+
+
+def _human_bytes(n: float) -> str:
+    for unit in ("B", "kB", "MB", "GB"):
+        if n < 1000 or unit == "GB":
+            return f"{n:.3g}{unit}"
+        n /= 1000
+    return f"{n}B"
+
+
+def cmd_stats(args: list[str]) -> int:
+    opts, names = split_opts(args)
+    template = _fmt(opts) or "{{.Name}}\t{{.CPUPerc}}\t{{.NetIO}}"
+    for name in names:
+        status, s = api("GET", f"/containers/{name}/stats", {"stream": "false"})
+        if status != 200:
+            die(f"No such container: {name}")
+        cpu_delta = (
+            s["cpu_stats"]["cpu_usage"]["total_usage"]
+            - (s["precpu_stats"]["cpu_usage"]["total_usage"])
+        )
+        sys_delta = s["cpu_stats"]["system_cpu_usage"] - s["precpu_stats"]["system_cpu_usage"]
+        cpu = cpu_delta / sys_delta * s["cpu_stats"]["online_cpus"] * 100 if sys_delta else 0
+        rx = sum(n["rx_bytes"] for n in s["networks"].values())
+        tx = sum(n["tx_bytes"] for n in s["networks"].values())
+        row = {
+            "Name": s["name"].lstrip("/"),
+            "ID": s["id"][:12],
+            "CPUPerc": f"{cpu:.2f}%",
+            "MemUsage": f"{_human_bytes(s['memory_stats']['usage'])} / "
+            f"{_human_bytes(s['memory_stats']['limit'])}",
+            "NetIO": f"{_human_bytes(rx)} / {_human_bytes(tx)}",
+        }
+        print(render(template, row))
+    return 0
+
+
+def cmd_exec(args: list[str]) -> int:
+    _, rest = leading_opts(args)
+    if not rest:
+        die("exec requires a container and a command")
+    status, created = api("POST", f"/containers/{rest[0]}/exec", body={"Cmd": rest[1:]})
+    if status != 201:
+        die(created["message"])
+    _, result = api("POST", f"/exec/{created['Id']}/start", body={"Detach": False})
+    sys.stdout.write(result["Output"])
+    return result["ExitCode"]
+
+
+def _device_ids(gpus: str) -> list[str]:
+    value = gpus.strip("'\"")
+    if value.startswith("device="):
+        return [d for d in value[len("device=") :].strip("'\"").split(",") if d]
+    return []
+
+
+def cmd_create(args: list[str], start: bool = False) -> int:
+    opts, rest = leading_opts(args)
+    if not rest:
+        die('"docker create" requires at least 1 argument')
+    labels = {}
+    for spec in opts.get("--label", []) + opts.get("-l", []):
+        key, _, value = spec.partition("=")
+        labels[key] = value
+    device_ids = [d for g in opts.get("--gpus", []) for d in _device_ids(g)]
+    body = {
+        "Image": rest[0],
+        "Cmd": rest[1:],
+        "Labels": labels,
+        "HostConfig": {
+            "CgroupParent": (opts.get("--cgroup-parent") or [""])[-1],
+            "DeviceRequests": [{"Driver": "nvidia", "DeviceIDs": device_ids}] if device_ids else [],
+        },
+    }
+    query = {"name": opts["--name"][-1]} if "--name" in opts else None
+    status, created = api("POST", "/containers/create", query, body)
+    if status != 201:
+        die(created["message"], 125)
+    if start:
+        api("POST", f"/containers/{created['Id']}/start")
+    print(created["Id"])
+    return 0
+
+
+def cmd_simple(action: str, args: list[str]) -> int:
+    if action == "stop" and "-t" in args:
+        i = args.index("-t")
+        args = args[:i] + args[i + 2 :]  # stop -t SECONDS (-t is --tty elsewhere)
+    force = "-f" in args or "--force" in args  # rm -f (-f is --format elsewhere)
+    names = [a for a in args if not a.startswith("-")]
+    rc = 0
+    for name in names:
+        if action == "rm":
+            status, data = api("DELETE", f"/containers/{name}", {"force": "1" if force else "0"})
+        else:
+            status, data = api("POST", f"/containers/{name}/{action}")
+        if status >= 300:
+            print(f"Error response from daemon: {data['message']}", file=sys.stderr)
+            rc = 1
+        else:
+            print(name)
+    return rc
+
+
+def main(argv: list[str]) -> int:
+    log = os.environ.get("DS01_BENCH_CALL_LOG")
+    if log:
+        with open(log, "a") as f:
+            f.write("docker " + " ".join(argv[:2]) + "\n")
+
+    if argv[:1] == ["container"]:
+        argv = argv[1:]
+        argv[:1] = {"ls": ["ps"], "list": ["ps"]}.get(argv[0], argv[:1]) if argv else []
+    if not argv:
+        print("Usage: docker [OPTIONS] COMMAND", file=sys.stderr)
+        return 1
+
+    command, args = argv[0], argv[1:]
+    if command == "ps":
+        return cmd_ps(args)
+    if command == "inspect":
+        return cmd_inspect(args)
+    if command == "stats":
+        return cmd_stats(args)
+    if command == "exec":
+        return cmd_exec(args)
+    if command in ("run", "create"):
+        return cmd_create(args, start=command == "run")
+    if command in ("start", "stop", "rm"):
+        return cmd_simple(command, args)
+    print(f"fake docker: unsupported command {command!r}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
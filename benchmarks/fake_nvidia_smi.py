@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/benchmarks/fake_nvidia_smi.py
+Minimal `nvidia-smi` for the benchmark fake host.
+
+Answers the invocations used by DS01 from the GPU layout in
+$DS01_BENCH_GPUS (written by fakehost.FakeHost):
+
+    nvidia-smi -L
+    nvidia-smi topo -m
+    nvidia-smi --query-gpu=FIELDS --format=csv,noheader[,nounits] [--id=UUID|INDEX]
+
+Sleeps $DS01_BENCH_NVIDIA_SMI_LATENCY_MS per call (real nvidia-smi takes tens
+of milliseconds to initialise NVML) and appends one line to
+$DS01_BENCH_CALL_LOG.
+"""
+
+import json
+import os
+import sys
+import time
+
+
+def list_devices(gpus: list[dict]) -> str:
+    lines = []
+    for gpu in gpus:
+        lines.append(f"GPU {gpu['index']}: {gpu['name']} (UUID: {gpu['uuid']})")
+        for mig in gpu["mig"]:
+            lines.append(
+                f"  MIG {mig['profile']:<11} Device {mig['device']:>2}: (UUID: {mig['uuid']})"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def topology_matrix(gpus: list[dict]) -> str:
+    """NVLink between GPU pairs (0-1, 2-3, ...), cross-socket otherwise."""
+    names = [f"GPU{g['index']}" for g in gpus]
+    lines = ["\t" + "\t".join(names) + "\tCPU Affinity\tNUMA Affinity"]
+    for a in gpus:
+        row = []
+        for b in gpus:
+            if a["index"] == b["index"]:
+                row.append(" X ")
+            elif a["index"] // 2 == b["index"] // 2:
+                row.append("NV12")
+            else:
+                row.append("SYS")
+        node = a["index"] * 2 // max(len(gpus), 1)
+        lines.append(f"GPU{a['index']}\t" + "\t".join(row) + f"\t0-63\t{node}")
+    return "\n".join(lines) + "\n"
+
+
+def gpu_field(gpu: dict, field: str, units: bool) -> str:
+    values = {
+        "index": str(gpu["index"]),
+        "uuid": gpu["uuid"],
+        "name": gpu["name"],
+        "mig.mode.current": "Enabled" if gpu["mig"] else "Disabled",
+        "utilization.gpu": "37 %" if units else "37",
+        "memory.used": "20480 MiB" if units else "20480",
+        "memory.total": "81920 MiB" if units else "81920",
+        "temperature.gpu": "45",
+    }
+    return values.get(field, "[N/A]")
+
+
+def main(argv: list[str]) -> int:
+    log = os.environ.get("DS01_BENCH_CALL_LOG")
+    if log:
+        with open(log, "a") as f:
+            f.write("nvidia-smi " + " ".join(argv[:1]) + "\n")
+    time.sleep(float(os.environ.get("DS01_BENCH_NVIDIA_SMI_LATENCY_MS") or 0) / 1000)
+
+    with open(os.environ["DS01_BENCH_GPUS"]) as f:
+        gpus = json.load(f)["gpus"]
+
+    if argv[:1] == ["-L"]:
+        sys.stdout.write(list_devices(gpus))
+        return 0
+    if argv[:2] == ["topo", "-m"]:
+        sys.stdout.write(topology_matrix(gpus))
+        return 0
+
+    opts = dict(a.split("=", 1) for a in argv if a.startswith("--") and "=" in a)
+    fields = opts.get("--query-gpu", "").split(",")
+    if not fields[0]:
+        print("fake nvidia-smi: unsupported invocation", " ".join(argv), file=sys.stderr)
+        return 2
+
+    selected = gpus
+    if "--id" in opts:
+        selected = [g for g in gpus if opts["--id"] in (g["uuid"], str(g["index"]))]
+        if not selected:
+            print("No devices were found", file=sys.stderr)
+            return 6  # Same exit code as nvidia-smi for MIG UUIDs / unknown ids
+
+    units = "nounits" not in opts.get("--format", "")
+    for gpu in selected:
+        print(", ".join(gpu_field(gpu, field.strip(), units) for field in fields))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
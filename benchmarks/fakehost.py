@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/benchmarks/fakehost.py
+Fake GPU host for offline benchmarks: Docker API socket + fake CLIs.
+
+Builds a synthetic DS01 host in a temp directory so the allocation and
+monitoring hot paths can be timed without Docker or GPUs:
+
+- A Docker Engine API subset served over a unix socket (DOCKER_HOST)
+- A bin/ directory placed first on PATH with `docker`, `nvidia-smi`, a
+  counting `python3` wrapper and a no-op `sudo`
+- A call log (one line per docker / nvidia-smi / python3 / sudo call) used to
+  count subprocesses per measured operation
+- A staged copy of the infra tree (scripts/, config/, monitoring/) in which
+  /usr/bin/docker, /usr/bin/nvidia-smi and /opt/ds01-infra point at the fakes
+  and the copy, so production paths stay hardcoded
+
+The fake state is regenerated per scenario: N containers spread over users,
+some holding GPU/MIG slots, on a GPU layout described by a short spec string.
+
+Design principles:
+- No test hooks in the code under test: fakes are reached through PATH,
+  DOCKER_HOST and the staged tree (plus DS01_GPU_TOPOLOGY_CACHE)
+- Deterministic state (same spec + container count -> same containers/UUIDs)
+- Latency is injected at the fake boundary (API request, nvidia-smi call)
+
+Usage:
+    from fakehost import FakeHost
+
+    with FakeHost(layout="mixed", docker_latency_ms=2) as host:
+        host.populate(100)
+        calls = host.call_counts()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+STAGED_DIRS = ("scripts", "config", "monitoring")
+
+# Layout presets: comma-separated physical GPUs, each "full" or "<profile>*<count>"
+LAYOUTS = {
+    "full": "full,full,full,full",
+    "mig": "1g.10gb*7,1g.10gb*7,1g.10gb*7,1g.10gb*7",
+    "mixed": "full,full,3g.40gb*2,1g.10gb*7",
+}
+GPU_NAME = "NVIDIA A100-SXM4-80GB"
+RESERVED_FREE_SLOTS = 3  # Kept free so allocate/run benchmarks can succeed
+USERS_PER_HOST = 20
+
+
+# =============================================================================
+# Fake state
+# =============================================================================
+
+
+def parse_layout(spec: str) -> list[dict]:
+    """Parse a layout preset or spec into one dict per physical GPU."""
+    spec = LAYOUTS.get(spec, spec)
+    gpus = []
+    for index, entry in enumerate(p.strip() for p in spec.split(",")):
+        gpu = {
+            "index": index,
+            "uuid": f"GPU-{index:08x}-d501-4000-8000-{0xB0 + index:012x}",
+            "name": GPU_NAME,
+            "mig": [],
+        }
+        if entry != "full":
+            profile, _, count = entry.partition("*")
+            if not profile or not count.isdigit():
+                raise ValueError(f"bad layout entry {entry!r} (want 'full' or 'PROFILE*COUNT')")
+            gpu["mig"] = [
+                {
+                    "device": d,
+                    "profile": profile,
+                    "uuid": f"MIG-{index:08x}-d501-4000-8000-{d:012x}",
+                }
+                for d in range(int(count))
+            ]
+        gpus.append(gpu)
+    return gpus
+
+
+def gpu_slots(gpus: list[dict]) -> list[tuple[str, str]]:
+    """(slot, uuid) for every allocatable unit: full GPUs and MIG instances."""
+    slots = []
+    for gpu in gpus:
+        if gpu["mig"]:
+            slots += [(f"{gpu['index']}.{m['device']}", m["uuid"]) for m in gpu["mig"]]
+        else:
+            slots.append((str(gpu["index"]), gpu["uuid"]))
+    return slots
+
+
+def _docker_time(dt: datetime) -> str:
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def make_container(
+    name: str,
+    user: str,
+    *,
+    image: str = "ds01/pytorch:latest",
+    labels: dict | None = None,
+    device_ids: list[str] | None = None,
+    cgroup_parent: str = "",
+    running: bool = True,
+    started: datetime | None = None,
+) -> dict:
+    """Build a `docker inspect`-shaped container record."""
+    started = started or datetime.now(timezone.utc) - timedelta(hours=2)
+    all_labels = {"ds01.user": user} if user else {}
+    all_labels.update(labels or {})
+    device_requests = None
+    if device_ids:
+        device_requests = [
+            {
+                "Driver": "nvidia",
+                "Count": 0,
+                "DeviceIDs": list(device_ids),
+                "Capabilities": [["gpu"]],
+                "Options": {},
+            }
+        ]
+    container_id = hashlib.sha256(name.encode()).hexdigest()
+    return {
+        "Id": container_id,
+        "Name": f"/{name}",
+        "Created": _docker_time(started - timedelta(seconds=5)),
+        "Path": "sleep",
+        "Args": ["infinity"],
+        "State": {
+            "Status": "running" if running else "exited",
+            "Running": running,
+            "ExitCode": 0,
+            "StartedAt": _docker_time(started),
+            "FinishedAt": "0001-01-01T00:00:00Z"
+            if running
+            else _docker_time(started + timedelta(minutes=30)),
+        },
+        "Image": "sha256:" + "ab" * 32,
+        "Config": {"Image": image, "Labels": all_labels},
+        "HostConfig": {"CgroupParent": cgroup_parent, "DeviceRequests": device_requests},
+        # Not part of the Engine API: drives /stats and /exec answers
+        "_fake": {"cpu_percent": 55.0, "rx_bytes": 4_000_000, "procs": 6},
+    }
+
+
+def build_containers(count: int, gpus: list[dict]) -> list[dict]:
+    """Deterministic container population for a host with `count` containers.
+
+    GPU-holding containers fill all but RESERVED_FREE_SLOTS slots; the rest are
+    CPU-only. Roughly one in ten is stopped, one in eight is a plain
+    `docker run` container without AIME naming.
+    """
+    slots = gpu_slots(gpus)
+    gpu_holders = max(0, min(count, len(slots) - RESERVED_FREE_SLOTS))
+    base = datetime.now(timezone.utc) - timedelta(hours=3)
+    containers = []
+    for i in range(count):
+        user = f"bench{i % USERS_PER_HOST:02d}"
+        uid = 20000 + i % USERS_PER_HOST
+        direct = i % 8 == 7
+        name = f"direct-{i:04d}" if direct else f"proj{i:04d}._.{uid}"
+        labels = {"ds01.interface": "docker" if direct else "atomic", "ds01.managed": "true"}
+        device_ids = None
+        if i < gpu_holders:
+            slot, uuid = slots[i]
+            device_ids = [uuid]
+            labels.update(
+                {
+                    "ds01.gpu.allocated": "true",
+                    "ds01.gpu.uuid": uuid,
+                    "ds01.gpu.slot": slot,
+                    "ds01.gpu.allocated_at": _docker_time(base),
+                }
+            )
+        containers.append(
+            make_container(
+                name,
+                user,
+                labels=labels,
+                device_ids=device_ids,
+                cgroup_parent=f"ds01-student-{user}.slice",
+                running=i % 10 != 9,
+                started=base + timedelta(seconds=i),
+            )
+        )
+    return containers
+
+
+# =============================================================================
+# Docker Engine API subset (unix socket)
+# =============================================================================
+
+
+def _matches(container: dict, filters: dict[str, list[str]]) -> bool:
+    """Apply `docker ps --filter` semantics for label/name/status/id."""
+    labels = container["Config"]["Labels"] or {}
+    for key, values in filters.items():
+        for value in values:
+            if key == "label":
+                k, sep, v = value.partition("=")
+                if k not in labels or (sep and labels[k] != v):
+                    return False
+            elif key == "name":
+                if value not in container["Name"].lstrip("/"):
+                    return False
+            elif key == "status":
+                if container["State"]["Status"] != value:
+                    return False
+            elif key == "id":
+                if not container["Id"].startswith(value):
+                    return False
+    return True
+
+
+def _summary(container: dict) -> dict:
+    """/containers/json entry for a container."""
+    state = container["State"]
+    return {
+        "Id": container["Id"],
+        "Names": [container["Name"]],
+        "Image": container["Config"]["Image"],
+        "Created": int(
+            datetime.fromisoformat(container["Created"][:19])
+            .replace(tzinfo=timezone.utc)
+            .timestamp()
+        ),
+        "State": state["Status"],
+        "Status": "Up 2 hours" if state["Running"] else "Exited (0) 1 hour ago",
+        "Labels": container["Config"]["Labels"] or {},
+    }
+
+
+class FakeDockerAPI:
+    """In-memory container store behind a threaded unix-socket HTTP server."""
+
+    def __init__(self, socket_path: Path, latency_ms: float = 0.0):
+        self.socket_path = socket_path
+        self.latency = latency_ms / 1000.0
+        self.containers: dict[str, dict] = {}  # name -> inspect record
+        self.requests = 0
+        self._execs: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status: int, body=None) -> None:
+                data = b"" if body is None else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> dict:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}")
+
+            def _route(self, method: str) -> None:
+                with api._lock:
+                    api.requests += 1
+                if api.latency:
+                    time.sleep(api.latency)
+                parsed = urllib.parse.urlparse(self.path)
+                query = {k: v[0] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+                parts = [p for p in parsed.path.split("/") if p]
+                if parts and parts[0].startswith("v1."):
+                    parts = parts[1:]  # Strip API version prefix
+                status, body = api.handle(method, parts, query, self._body)
+                self._reply(status, body)
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_DELETE(self):
+                self._route("DELETE")
+
+            def address_string(self):
+                return "fake-docker"
+
+            def log_message(self, *args):
+                pass
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+            def handle_error(self, request, client_address):
+                if not isinstance(sys.exc_info()[1], ConnectionError):
+                    super().handle_error(request, client_address)  # Clients may hang up early
+
+        self.server = Server(str(socket_path), Handler)
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _find(self, ref: str) -> dict | None:
+        ref = ref.lstrip("/")
+        if ref in self.containers:
+            return self.containers[ref]
+        for container in self.containers.values():
+            if container["Id"].startswith(ref):
+                return container
+        return None
+
+    def handle(self, method: str, parts: list[str], query: dict, body) -> tuple[int, object]:
+        """Dispatch one API request; returns (status, JSON body)."""
+        with self._lock:
+            if parts == ["_ping"]:
+                return 200, "OK"
+            if parts[:1] == ["containers"]:
+                return self._containers(method, parts[1:], query, body)
+            if parts[:1] == ["exec"] and len(parts) == 3 and parts[2] == "start":
+                return 200, self._run_exec(parts[1])
+        return 404, {"message": f"page not found: {'/'.join(parts)}"}
+
+    def _containers(self, method, parts, query, body) -> tuple[int, object]:
+        if method == "GET" and parts == ["json"]:
+            filters = json.loads(query.get("filters") or "{}")
+            show_all = query.get("all") in ("1", "true")
+            return 200, [
+                _summary(c)
+                for c in self.containers.values()
+                if (show_all or c["State"]["Running"]) and _matches(c, filters)
+            ]
+        if method == "POST" and parts == ["create"]:
+            spec = body()
+            name = query.get("name") or f"bench_{len(self.containers)}"
+            if name in self.containers:
+                return 409, {"message": f'Conflict. The container name "/{name}" is already in use'}
+            host = spec.get("HostConfig") or {}
+            requests = host.get("DeviceRequests") or []
+            record = make_container(
+                name,
+                "",
+                image=spec.get("Image", ""),
+                labels=spec.get("Labels") or {},
+                device_ids=[d for r in requests for d in r.get("DeviceIDs") or []],
+                cgroup_parent=host.get("CgroupParent", ""),
+                running=False,
+                started=datetime.now(timezone.utc),
+            )
+            self.containers[name] = record
+            return 201, {"Id": record["Id"], "Warnings": []}
+
+        container = self._find(parts[0]) if parts else None
+        if container is None:
+            ref = parts[0] if parts else ""
+            return 404, {"message": f"No such container: {ref}"}
+        action = parts[1] if len(parts) > 1 else ""
+        state = container["State"]
+        now = _docker_time(datetime.now(timezone.utc))
+
+        if method == "GET" and action == "json":
+            return 200, {k: v for k, v in container.items() if not k.startswith("_")}
+        if method == "GET" and action == "stats":
+            fake = container["_fake"]
+            return 200, {
+                "name": container["Name"],
+                "id": container["Id"],
+                "cpu_stats": {
+                    "cpu_usage": {"total_usage": int(fake["cpu_percent"] * 1e7)},
+                    "system_cpu_usage": int(2e9),
+                    "online_cpus": 1,
+                },
+                "precpu_stats": {
+                    "cpu_usage": {"total_usage": 0},
+                    "system_cpu_usage": int(1e9),
+                },
+                "memory_stats": {"usage": 512 * 2**20, "limit": 32 * 2**30},
+                "networks": {"eth0": {"rx_bytes": fake["rx_bytes"], "tx_bytes": 10_000}},
+            }
+        if method == "POST" and action == "start":
+            state.update(Status="running", Running=True, StartedAt=now)
+            return 204, None
+        if method == "POST" and action == "stop":
+            state.update(Status="exited", Running=False, FinishedAt=now)
+            return 204, None
+        if method == "DELETE" and not action:
+            if state["Running"] and query.get("force") not in ("1", "true"):
+                return 409, {"message": "cannot remove a running container"}
+            del self.containers[container["Name"].lstrip("/")]
+            return 204, None
+        if method == "POST" and action == "exec":
+            if not state["Running"]:
+                return 409, {"message": f"container {container['Id']} is not running"}
+            exec_id = f"{len(self._execs):064x}"
+            self._execs[exec_id] = [container["Name"].lstrip("/")] + body().get("Cmd", [])
+            return 201, {"Id": exec_id}
+        return 404, {"message": f"unsupported: {method} {'/'.join(parts)}"}
+
+    def _run_exec(self, exec_id: str) -> dict:
+        """Answer an exec synchronously (simplified: no stream multiplexing)."""
+        name, *cmd = self._execs.pop(exec_id, ["", "true"])
+        container = self.containers.get(name)
+        if cmd[:1] == ["ps"] and container:
+            rows = ["USER PID %CPU %MEM COMMAND", "root 1 0.0 0.0 sleep infinity"]
+            rows += [
+                f"user {100 + p} 90.0 1.0 python train.py"
+                for p in range(container["_fake"]["procs"])
+            ]
+            return {"ExitCode": 0, "Output": "\n".join(rows) + "\n"}
+        if cmd[:1] == ["test"]:
+            return {"ExitCode": 1, "Output": ""}
+        return {"ExitCode": 0, "Output": ""}
+
+
+# =============================================================================
+# Fake host: temp dir, bin/ shims, environment
+# =============================================================================
+
+
+class FakeHost:
+    """Temp-dir fake host wiring the API socket, GPU layout and shims together."""
+
+    def __init__(
+        self,
+        layout: str = "mixed",
+        docker_latency_ms: float = 0.0,
+        nvidia_smi_latency_ms: float = 0.0,
+    ):
+        self.gpus = parse_layout(layout)
+        self.root = Path(tempfile.mkdtemp(prefix="ds01-bench-"))
+        self.bin_dir = self.root / "bin"
+        self.infra = self.root / "infra"
+        self.call_log = self.root / "calls.log"
+        self.gpu_file = self.root / "gpus.json"
+        self.socket_path = self.root / "docker.sock"
+        self.nvidia_smi_latency_ms = nvidia_smi_latency_ms
+        self.api = FakeDockerAPI(self.socket_path, docker_latency_ms)
+        self._saved_env: dict[str, str | None] = {}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def __enter__(self) -> FakeHost:
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self.bin_dir.mkdir(parents=True)
+        self.call_log.touch()
+        self.gpu_file.write_text(json.dumps({"gpus": self.gpus}))
+        self._write_shims()
+        self._stage_infra()
+        self.api.start()
+        for key, value in self.environ().items():
+            self._saved_env[key] = os.environ.get(key)
+            os.environ[key] = value
+
+    def stop(self) -> None:
+        self.api.stop()
+        for key, value in self._saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def environ(self) -> dict[str, str]:
+        """Environment that routes the code under test to the fakes."""
+        return {
+            "PATH": f"{self.bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+            "DOCKER_HOST": f"unix://{self.socket_path}",
+            "DS01_GPU_TOPOLOGY_CACHE": str(self.root / "gpu-topology.json"),
+            "DS01_BENCH_GPUS": str(self.gpu_file),
+            "DS01_BENCH_CALL_LOG": str(self.call_log),
+            "DS01_BENCH_NVIDIA_SMI_LATENCY_MS": str(self.nvidia_smi_latency_ms),
+        }
+
+    def _write_shims(self) -> None:
+        python = sys.executable
+        shims = {
+            "docker": f'exec "{python}" -S "{BENCH_DIR / "fake_docker.py"}" "$@"',
+            "nvidia-smi": f'exec "{python}" -S "{BENCH_DIR / "fake_nvidia_smi.py"}" "$@"',
+            # Counting pass-through: real interpreter, one log line per spawn
+            "python3": f'echo python3 >>"$DS01_BENCH_CALL_LOG"\nexec "{python}" "$@"',
+            # Recorded, never executed: keeps docker-wrapper from touching host slices
+            "sudo": 'echo sudo >>"$DS01_BENCH_CALL_LOG"',
+        }
+        for name, body in shims.items():
+            path = self.bin_dir / name
+            path.write_text(f"#!/bin/sh\n{body}\n")
+            path.chmod(0o755)
+
+    def _stage_infra(self) -> None:
+        """Copy the infra tree with its hardcoded binary and root paths redirected."""
+        rewrites = [
+            (re.compile(r"/usr/bin/docker\b(?!-)"), str(self.bin_dir / "docker")),
+            (re.compile(r"/usr/bin/nvidia-smi\b"), str(self.bin_dir / "nvidia-smi")),
+            (re.compile(r"/opt/ds01-infra\b"), str(self.infra)),
+        ]
+        ignore = shutil.ignore_patterns("__pycache__", "*.pyc", ".git")
+        for name in STAGED_DIRS:
+            shutil.copytree(REPO_ROOT / name, self.infra / name, symlinks=True, ignore=ignore)
+        for path in self.infra.rglob("*"):
+            if path.is_symlink() or not path.is_file():
+                continue
+            try:
+                text = path.read_text()
+            except (UnicodeDecodeError, OSError):
+                continue
+            staged = text
+            for pattern, target in rewrites:
+                staged = pattern.sub(target, staged)
+            if staged != text:
+                path.write_text(staged)
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def populate(self, count: int) -> None:
+        """Replace the container set with a deterministic population."""
+        with self.api._lock:
+            self.api.containers = {
+                c["Name"].lstrip("/"): c for c in build_containers(count, self.gpus)
+            }
+
+    def remove(self, name: str) -> bool:
+        with self.api._lock:
+            return self.api.containers.pop(name, None) is not None
+
+    def container_names(self) -> set[str]:
+        with self.api._lock:
+            return set(self.api.containers)
+
+    def call_counts(self) -> dict[str, int]:
+        """Invocations so far, by command (docker, nvidia-smi, python3, sudo)."""
+        counts: dict[str, int] = {}
+        with open(self.call_log) as f:
+            for line in f:
+                cmd = line.split(" ", 1)[0].strip()
+                if cmd:
+                    counts[cmd] = counts.get(cmd, 0) + 1
+        return counts
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/benchmarks/run.py
+Offline performance benchmarks for DS01 allocation and monitoring hot paths.
+
+Runs each hot path against a fake host (fakehost.py: fake Docker API socket,
+fake nvidia-smi, counting python3 shim) at increasing container counts and
+reports latency plus subprocess counts, so O(containers) fan-out is visible
+without Docker or GPUs. Results can be compared against a stored baseline;
+any regression fails the run.
+
+Benchmarks:
+    get_all_allocations    GPUStateReader().get_all_allocations()
+    allocate_gpu           GPUAllocatorSmart().allocate_gpu()        (one CLI call)
+    allocate_multi_gpu     GPUAllocatorSmart().allocate_multi_gpu()  (2 slots)
+    collect_all_metrics    ds01_exporter.collect_all_metrics()       (warm scrape)
+    check_idle_containers  scripts/monitoring/check-idle-containers.sh (root only)
+    docker_wrapper_run     docker-wrapper.sh run --gpus 1            (as sudo user)
+
+Regression rules (against --baseline):
+- Subprocess counts are deterministic: any increase is a regression
+- Latency regresses when it exceeds baseline * (1 + --tolerance) and is more
+  than MIN_REGRESSION_MS slower (timings are machine-specific; use
+  --counts-only when the baseline was recorded on different hardware)
+
+The code under test writes its usual logs/state (/var/log/ds01, /var/lib/ds01),
+so run this in a dev container or CI job, never on the production host.
+
+Usage:
+    python3 benchmarks/run.py                                # compare to baseline
+    python3 benchmarks/run.py --containers 10,50,100 --layout mig
+    python3 benchmarks/run.py --only allocate_gpu --repeat 10
+    python3 benchmarks/run.py --update-baseline              # record new baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from fakehost import LAYOUTS, FakeHost
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+# Relative to the host's staged infra tree (FakeHost.infra)
+CONFIG_FILE = "config/runtime/resource-limits.yaml"
+DOCKER_DIR = "scripts/docker"
+
+DEFAULT_CONTAINERS = "5,10,20"
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.5
+MIN_REGRESSION_MS = 20.0  # Ignore slowdowns smaller than this (timer/scheduler noise)
+SHELL_TIMEOUT = 900
+
+BENCH_USER = "bench-alloc"
+WRAPPER_USER = "bench-wrap"
+
+
+# =============================================================================
+# Benchmarks
+# =============================================================================
+# Each benchmark is prepared once per container count and returns the timed
+# operation (a zero-argument callable). Preparation runs untimed.
+
+_modules: dict[str, object] = {}
+
+
+def _load(name: str, path: Path):
+    """Load a module from a file path once (after the fake env is in place)."""
+    if name not in _modules:
+        spec = importlib.util.spec_from_file_location(name, str(path))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[name] = module
+    return _modules[name]
+
+
+def prepare_get_all_allocations(host: FakeHost) -> Callable[[], None]:
+    state = _load("gpu_state_reader", host.infra / DOCKER_DIR / "gpu-state-reader.py")
+    return lambda: state.GPUStateReader().get_all_allocations()
+
+
+def _allocator(host: FakeHost):
+    module = _load("gpu_allocator_v2", host.infra / DOCKER_DIR / "gpu_allocator_v2.py")
+    return module.GPUAllocatorSmart(config_path=str(host.infra / CONFIG_FILE))
+
+
+def prepare_allocate_gpu(host: FakeHost) -> Callable[[], None]:
+    def op():
+        gpu, status = _allocator(host).allocate_gpu(BENCH_USER, f"bench._.{os.getpid()}")
+        if gpu is None:
+            raise RuntimeError(f"allocate_gpu failed: {status}")
+
+    return op
+
+
+def prepare_allocate_multi_gpu(host: FakeHost) -> Callable[[], None]:
+    def op():
+        slots, _, _, status = _allocator(host).allocate_multi_gpu(
+            BENCH_USER, "bench-multi", "docker", 2
+        )
+        if not slots:
+            raise RuntimeError(f"allocate_multi_gpu failed: {status}")
+
+    return op
+
+
+def prepare_collect_all_metrics(host: FakeHost) -> Callable[[], None]:
+    exporter = _load("ds01_exporter", host.infra / "monitoring/exporter/ds01_exporter.py")
+    # Long-running process: measure a warm scrape, as Prometheus sees it
+    exporter.collect_all_metrics()
+    return exporter.collect_all_metrics
+
+
+def _run_shell(args: list[str], env: dict | None = None) -> None:
+    result = subprocess.run(
+        args, capture_output=True, text=True, timeout=SHELL_TIMEOUT, env=env or os.environ
+    )
+    if result.returncode != 0:
+        tail = (result.stderr or result.stdout).strip().splitlines()[-3:]
+        raise RuntimeError(f"{Path(args[1]).name} exited {result.returncode}: {tail}")
+
+
+def prepare_check_idle_containers(host: FakeHost) -> Callable[[], None]:
+    if os.geteuid() != 0:
+        raise SkipBenchmark("requires root (script refuses to run otherwise)")
+    script = host.infra / "scripts/monitoring/check-idle-containers.sh"
+    return lambda: _run_shell(["bash", str(script)])
+
+
+def prepare_docker_wrapper_run(host: FakeHost) -> Callable[[], None]:
+    script = host.infra / DOCKER_DIR / "docker-wrapper.sh"
+    env = dict(os.environ, SUDO_USER=WRAPPER_USER)
+    counter = iter(range(1_000_000))
+
+    def op():
+        name = f"bench-wrap-{next(counter)}"
+        try:
+            _run_shell(
+                ["bash", str(script), "run", "-d", "--gpus", "1", "--name", name,
+                 "ds01/pytorch:latest", "sleep", "infinity"],
+                env,
+            )  # fmt: skip
+        finally:
+            host.remove(name)  # Keep the container count fixed across repeats
+
+    return op
+
+
+class SkipBenchmark(Exception):
+    """Benchmark cannot run in this environment (reported, not a failure)."""
+
+
+BENCHMARKS: dict[str, Callable[[FakeHost], Callable[[], None]]] = {
+    "get_all_allocations": prepare_get_all_allocations,
+    "allocate_gpu": prepare_allocate_gpu,
+    "allocate_multi_gpu": prepare_allocate_multi_gpu,
+    "collect_all_metrics": prepare_collect_all_metrics,
+    "check_idle_containers": prepare_check_idle_containers,
+    "docker_wrapper_run": prepare_docker_wrapper_run,
+}
+
+
+# =============================================================================
+# Measurement
+# =============================================================================
+
+
+def measure(host: FakeHost, op: Callable[[], None], repeat: int) -> dict:
+    """Time `op` `repeat` times; subprocess counts are taken from the last run."""
+    samples = []
+    calls: dict[str, int] = {}
+    for _ in range(repeat):
+        before = host.call_counts()
+        started = time.perf_counter()
+        op()
+        samples.append((time.perf_counter() - started) * 1000)
+        after = host.call_counts()
+        calls = {k: after[k] - before.get(k, 0) for k in after if after[k] != before.get(k, 0)}
+    return {
+        "ms": round(statistics.median(samples), 1),
+        "subprocesses": sum(calls.values()),
+        "calls": dict(sorted(calls.items())),
+    }
+
+
+def run_suite(args) -> dict:
+    counts = [int(c) for c in args.containers.split(",")]
+    names = args.only or list(BENCHMARKS)
+    results: dict[str, dict[str, dict]] = {name: {} for name in names}
+    skipped: dict[str, str] = {}
+    errors: dict[str, str] = {}
+
+    with FakeHost(args.layout, args.docker_latency_ms, args.nvidia_smi_latency_ms) as host:
+        for count in counts:
+            host.populate(count)
+            for name in names:
+                if name in skipped or name in errors:
+                    continue
+                try:
+                    op = BENCHMARKS[name](host)
+                    results[name][str(count)] = measure(host, op, args.repeat)
+                except SkipBenchmark as e:
+                    skipped[name] = str(e)
+                except Exception as e:
+                    errors[name] = f"{type(e).__name__}: {e}"
+                print_progress(name, count, results[name].get(str(count)), skipped, errors)
+
+    return {
+        "config": {
+            "layout": args.layout,
+            "containers": counts,
+            "docker_latency_ms": args.docker_latency_ms,
+            "nvidia_smi_latency_ms": args.nvidia_smi_latency_ms,
+            "repeat": args.repeat,
+        },
+        "results": {name: r for name, r in results.items() if r},
+        "skipped": skipped,
+        "errors": errors,
+    }
+
+
+def print_progress(name, count, result, skipped, errors) -> None:
+    if name in skipped:
+        print(f"  {name:<24} skipped: {skipped[name]}", file=sys.stderr)
+    elif name in errors:
+        print(f"  {name:<24} ERROR: {errors[name]}", file=sys.stderr)
+    elif result:
+        print(f"  {name:<24} n={count:<5} {result['ms']:>9.1f} ms", file=sys.stderr)
+
+
+def slope(points: list[tuple[float, float]]) -> float:
+    """Least-squares slope (growth per additional container)."""
+    if len(points) < 2:
+        return 0.0
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    denom = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / denom if denom else 0.0
+
+
+def print_report(report: dict) -> None:
+    config = report["config"]
+    print(
+        f"\nDS01 benchmarks  layout={config['layout']}  "
+        f"docker={config['docker_latency_ms']}ms  nvidia-smi={config['nvidia_smi_latency_ms']}ms  "
+        f"repeat={config['repeat']}\n"
+    )
+    print(f"{'benchmark':<24}{'containers':>11}{'median ms':>12}{'subprocs':>10}  calls")
+    for name, by_count in report["results"].items():
+        for count, r in by_count.items():
+            calls = " ".join(f"{k}={v}" for k, v in r["calls"].items())
+            print(f"{name:<24}{count:>11}{r['ms']:>12.1f}{r['subprocesses']:>10}  {calls}")
+
+    print("\nGrowth per additional container (least-squares slope):")
+    for name, by_count in report["results"].items():
+        ms = slope([(int(c), r["ms"]) for c, r in by_count.items()])
+        procs = slope([(int(c), r["subprocesses"]) for c, r in by_count.items()])
+        print(f"  {name:<24}{ms:>+9.2f} ms{procs:>+9.2f} subprocs")
+
+    for name, reason in report["skipped"].items():
+        print(f"\nSKIPPED {name}: {reason}")
+    for name, error in report["errors"].items():
+        print(f"\nERROR {name}: {error}")
+
+
+# =============================================================================
+# Baseline comparison
+# =============================================================================
+
+
+def compare(report: dict, baseline: dict, tolerance: float, counts_only: bool) -> list[str]:
+    """Return human-readable regressions of `report` against `baseline`."""
+    regressions = []
+    if baseline["config"]["layout"] != report["config"]["layout"]:
+        return [
+            f"baseline layout {baseline['config']['layout']!r} != "
+            f"{report['config']['layout']!r}; re-record with --update-baseline"
+        ]
+    same_latency = all(
+        baseline["config"][k] == report["config"][k]
+        for k in ("docker_latency_ms", "nvidia_smi_latency_ms")
+    )
+    for name, by_count in report["results"].items():
+        for count, r in by_count.items():
+            base = baseline["results"].get(name, {}).get(count)
+            if base is None:
+                continue
+            label = f"{name} @ {count} containers"
+            if r["subprocesses"] > base["subprocesses"]:
+                regressions.append(
+                    f"{label}: subprocesses {base['subprocesses']} -> {r['subprocesses']}"
+                )
+            if counts_only or not same_latency:
+                continue
+            limit = base["ms"] * (1 + tolerance)
+            if r["ms"] > limit and r["ms"] - base["ms"] > MIN_REGRESSION_MS:
+                regressions.append(
+                    f"{label}: {base['ms']:.1f} ms -> {r['ms']:.1f} ms "
+                    f"(limit {limit:.1f} ms at tolerance {tolerance:.0%})"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Offline DS01 hot-path benchmarks against a fake Docker/GPU host"
+    )
+    parser.add_argument(
+        "--containers",
+        default=DEFAULT_CONTAINERS,
+        help=f"Comma-separated container counts (default: {DEFAULT_CONTAINERS})",
+    )
+    parser.add_argument(
+        "--layout",
+        default="mixed",
+        help=f"GPU layout preset ({', '.join(LAYOUTS)}) or spec like 'full,1g.10gb*7'",
+    )
+    parser.add_argument("--docker-latency-ms", type=float, default=2.0)
+    parser.add_argument("--nvidia-smi-latency-ms", type=float, default=20.0)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), metavar="BENCHMARK")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--counts-only", action="store_true", help="Only subprocess counts can regress"
+    )
+    parser.add_argument("--json", type=Path, help="Also write the full report to this file")
+    parser.add_argument(
+        "--allow-host",
+        action="store_true",
+        help="Run even though a real Docker daemon or nvidia-smi is present",
+    )
+    args = parser.parse_args()
+
+    if not args.allow_host and (
+        Path("/var/run/docker.sock").exists() or Path("/usr/bin/nvidia-smi").exists()
+    ):
+        print(
+            "Error: real Docker/GPU host detected. The code under test writes to "
+            "/var/log/ds01 and /var/lib/ds01; run in a dev container or pass --allow-host.",
+            file=sys.stderr,
+        )
+        return 2
+
+    report = run_suite(args)
+    print_report(report)
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return 1 if report["errors"] else 0
+
+    if report["errors"]:
+        return 1
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline} (record one with --update-baseline)")
+        return 0
+
+    regressions = compare(
+        report, json.loads(args.baseline.read_text()), args.tolerance, args.counts_only
+    )
+    if regressions:
+        print("\nREGRESSIONS:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -108,6 +108,27 @@ chmod 711 /var/lib/ds01/bare-metal-grants
 mkdir -p /var/lib/ds01/rate-limits
 chmod 1777 /var/lib/ds01/rate-limits
 
+# gpu-queue: root-only writes (the allocator trusts its reservations); users
+# join/leave via sudo (sudoers.d/ds01-gpu-queue)
+touch /var/lib/ds01/gpu-queue.json /var/lib/ds01/gpu-queue.lock
+chown root:root /var/lib/ds01/gpu-queue.json /var/lib/ds01/gpu-queue.lock
+chmod 644 /var/lib/ds01/gpu-queue.json /var/lib/ds01/gpu-queue.lock
+
+# accounting: chargeback ledger; written only by root services (owner tracker,
+# collector), so users must not be able to create or rewrite it
+mkdir -p /var/lib/ds01/accounting
+chown root:root /var/lib/ds01/accounting
+chmod 755 /var/lib/ds01/accounting
+
+# self-metrics: allocator/wrapper/cron latency for ds01-exporter; the wrapper
+# appends as the calling user (docker group), so group-writable + setgid
+mkdir -p /var/lib/ds01/self-metrics
+chown root:docker /var/lib/ds01/self-metrics
+chmod 2775 /var/lib/ds01/self-metrics
+touch /var/lib/ds01/self-metrics/observations.log
+chown root:docker /var/lib/ds01/self-metrics/observations.log
+chmod 664 /var/lib/ds01/self-metrics/observations.log
+
 # =============================================================================
 # Log Directory (/var/log/ds01/)
 # =============================================================================
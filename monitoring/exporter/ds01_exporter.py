@@ -10,6 +10,7 @@ This exporter focuses on DS01-specific metrics that DCGM cannot provide:
 - User-level GPU slot counts
 - Event log counts
 - MIG slot mapping for DCGM metric joins
+- Per-container GPU utilization and waste (DCGM joined with allocations in-process)
 
 Metrics prefix: ds01_
 Port: 9101
@@ -28,6 +29,7 @@ import urllib.request
 from datetime import datetime, timezone
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from pathlib import Path
+from typing import NamedTuple
 
 # ============================================================================
 # Configuration
@@ -48,6 +50,13 @@ GROUPS_DIR = INFRA_ROOT / "config/runtime/groups"
 # Module paths for reuse
 GPU_STATE_READER = INFRA_ROOT / "scripts/docker/gpu-state-reader.py"
 USERNAME_UTILS = INFRA_ROOT / "scripts/lib/username_utils.py"
+SELF_METRICS_LIB = INFRA_ROOT / "scripts/lib/ds01_selfmetrics.py"
+
+# Findings published by validate-state.py (--watch keeps it current)
+STATE_VALIDATION_FILE = STATE_DIR / "state-validation.json"
+
+# Allocated slots below this utilization (percent) count as wasted
+GPU_WASTE_THRESHOLD = 5
 
 # ============================================================================
 # Module Loading (reuse existing DS01 code)
@@ -104,6 +113,24 @@ def _fmt_fraction(value: float) -> str:
 # ============================================================================
 
 
+# One allocation snapshot per scrape, shared by the allocation and
+# utilization collectors
+_allocations_cache: dict[str, dict] = {}
+_allocations_cache_timestamp: float = 0
+ALLOCATIONS_CACHE_TTL = 5
+
+
+def _allocation_snapshot(reader) -> dict[str, dict]:
+    """Return reader.get_all_allocations(), reusing it within ALLOCATIONS_CACHE_TTL."""
+    global _allocations_cache, _allocations_cache_timestamp
+
+    now = time.time()
+    if now - _allocations_cache_timestamp >= ALLOCATIONS_CACHE_TTL:
+        _allocations_cache = reader.get_all_allocations()
+        _allocations_cache_timestamp = now
+    return _allocations_cache
+
+
 def collect_allocation_metrics() -> list[str]:
     """Collect GPU allocation metrics from gpu-state-reader."""
     lines = []
@@ -113,7 +140,7 @@ def collect_allocation_metrics() -> list[str]:
         reader = state_mod.get_reader()
 
         # Get all allocations
-        allocations = reader.get_all_allocations()
+        allocations = _allocation_snapshot(reader)
 
         lines.append("# HELP ds01_gpu_allocated GPU/MIG slot allocation status (1=allocated)")
         lines.append("# TYPE ds01_gpu_allocated gauge")
@@ -456,6 +483,59 @@ def collect_unmanaged_metrics() -> list[str]:
     return lines
 
 
+STATE_VALIDATION_SEVERITIES = ("error", "warning", "info")
+
+
+def collect_state_validation_metrics() -> list[str]:
+    """Expose validate-state.py findings (allocation/label/user drift).
+
+    Reads the findings file rather than validating here, so a scrape never
+    runs nvidia-smi or docker for this. Severity totals are always emitted
+    (0 when clean) so alert rules and panels have a series to match.
+    """
+    lines = []
+
+    try:
+        result = json.loads(STATE_VALIDATION_FILE.read_text())
+        mtime = STATE_VALIDATION_FILE.stat().st_mtime
+    except FileNotFoundError:
+        return ["# State validation findings not available (validate-state.py not run yet)"]
+    except (OSError, json.JSONDecodeError) as e:
+        return [f"# Error collecting state validation metrics: {e}"]
+
+    issues = result.get("issues", [])
+
+    lines.append("# HELP ds01_state_validation_valid 1 if the last validation found no errors")
+    lines.append("# TYPE ds01_state_validation_valid gauge")
+    lines.append(f"ds01_state_validation_valid {1 if result.get('valid') else 0}")
+
+    lines.append(
+        "# HELP ds01_state_validation_timestamp_seconds When the findings were last published"
+    )
+    lines.append("# TYPE ds01_state_validation_timestamp_seconds gauge")
+    lines.append(f"ds01_state_validation_timestamp_seconds {mtime:.0f}")
+
+    lines.append("# HELP ds01_state_validation_issues State validation findings by severity")
+    lines.append("# TYPE ds01_state_validation_issues gauge")
+    for severity in STATE_VALIDATION_SEVERITIES:
+        count = sum(1 for i in issues if i.get("severity") == severity)
+        lines.append(f'ds01_state_validation_issues{{severity="{severity}"}} {count}')
+
+    lines.append("# HELP ds01_state_validation_issue Individual state validation finding")
+    lines.append("# TYPE ds01_state_validation_issue gauge")
+    for issue in issues:
+        subject = issue.get("container") or ",".join(issue.get("containers", []))
+        lines.append(
+            f"ds01_state_validation_issue{{"
+            f'check="{_safe_label(issue.get("check", "unknown"))}",'
+            f'severity="{_safe_label(issue.get("severity", "unknown"))}",'
+            f'container="{_safe_label(subject)}",'
+            f'gpu_slot="{_safe_label(str(issue.get("gpu_slot", "")))}"}} 1'
+        )
+
+    return lines
+
+
 # ============================================================================
 # MIG Slot Mapping (for joining with DCGM metrics)
 # ============================================================================
@@ -509,36 +589,7 @@ def _query_dcgm_gpu_i_ids() -> dict[int, list[int]]:
     Returns:
         Dict mapping GPU index to list of GPU_I_ID values (sorted)
     """
-    collected: dict[int, set[int]] = {}
-
-    try:
-        req = urllib.request.Request(DCGM_EXPORTER_URL, method="GET")
-        req.add_header("Accept", "text/plain")
-
-        with urllib.request.urlopen(req, timeout=5) as response:
-            content = response.read().decode("utf-8")
-
-            # Parse metrics to extract gpu and GPU_I_ID labels
-            # Example: DCGM_FI_DEV_SM_CLOCK{gpu="2",...,GPU_I_ID="3",...} 210
-            for line in content.split("\n"):
-                if 'GPU_I_ID="' not in line:
-                    continue
-
-                gpu_match = re.search(r'gpu="(\d+)"', line)
-                gpu_i_id_match = re.search(r'GPU_I_ID="(\d+)"', line)
-
-                if gpu_match and gpu_i_id_match:
-                    gpu_idx = int(gpu_match.group(1))
-                    gpu_i_id = int(gpu_i_id_match.group(1))
-
-                    if gpu_idx not in collected:
-                        collected[gpu_idx] = set()
-                    collected[gpu_idx].add(gpu_i_id)
-
-    except (urllib.error.URLError, OSError, TimeoutError):
-        pass
-
-    return {gpu: sorted(ids) for gpu, ids in collected.items()}
+    return _dcgm_snapshot().gpu_i_ids
 
 
 def _mig_enabled_on_any_gpu() -> bool:
@@ -716,6 +767,198 @@ def collect_mig_slot_mapping() -> list[str]:
     return lines
 
 
+# ============================================================================
+# Per-Container GPU Utilization (DCGM joined with allocations)
+# ============================================================================
+# Replaces the ds01:gpu_utilization_by_slot / ds01:user_gpu_utilization_avg /
+# ds01:gpu_waste_count recording rules, whose PromQL joins were re-evaluated
+# across every DCGM series. The DCGM payload is fetched once per scrape,
+# parsed line by line (only utilization series and MIG lines are decoded),
+# and joined with the allocation snapshot here.
+
+DCGM_FULL_GPU_UTIL = "DCGM_FI_DEV_GPU_UTIL"  # Percent, per physical GPU
+DCGM_MIG_UTIL = "DCGM_FI_PROF_GR_ENGINE_ACTIVE"  # Ratio 0-1, per MIG instance
+DCGM_SNAPSHOT_TTL = 5  # One fetch per scrape, shared with MIG slot mapping
+
+
+class DcgmSnapshot(NamedTuple):
+    ok: bool  # False when DCGM could not be scraped
+    util: dict[tuple[str, str], float]  # (gpu, GPU_I_ID or "") -> utilization percent
+    gpu_i_ids: dict[int, list[int]]  # gpu -> sorted GPU_I_ID values
+
+
+_dcgm_cache: DcgmSnapshot | None = None
+_dcgm_cache_timestamp: float = 0
+
+
+def _parse_labels(body: str) -> dict[str, str]:
+    """Parse the inside of a Prometheus label set: a="x",b="y \\"q\\""."""
+    labels: dict[str, str] = {}
+    i, n = 0, len(body)
+    while i < n:
+        eq = body.find("=", i)
+        if eq < 0 or eq + 1 >= n or body[eq + 1] != '"':
+            break
+        key = body[i:eq].strip(" ,")
+        j = eq + 2
+        end = body.find('"', j)
+        if end < 0:
+            break
+        if "\\" not in body[j:end]:
+            labels[key] = body[j:end]
+            i = end + 1
+            continue
+        # Slow path: escaped characters in the value
+        chars = []
+        while j < n and body[j] != '"':
+            if body[j] == "\\" and j + 1 < n:
+                j += 1
+                chars.append("\n" if body[j] == "n" else body[j])
+            else:
+                chars.append(body[j])
+            j += 1
+        labels[key] = "".join(chars)
+        i = j + 1
+    return labels
+
+
+def _parse_dcgm(lines) -> DcgmSnapshot:
+    """Build a DcgmSnapshot from DCGM exposition lines (str or bytes), in one pass.
+
+    Only utilization series are fully decoded; other series are decoded only
+    when they carry a GPU_I_ID label (needed for MIG slot mapping).
+    """
+    util: dict[tuple[str, str], float] = {}
+    gpu_i_ids: dict[int, set[int]] = {}
+
+    for raw in lines:
+        line = raw.decode("utf-8", errors="replace") if isinstance(raw, bytes) else raw
+        if not line or line[0] == "#":
+            continue
+        brace = line.find("{")
+        if brace < 0:
+            continue
+        name = line[:brace]
+        is_util = name in (DCGM_FULL_GPU_UTIL, DCGM_MIG_UTIL)
+        if not is_util and 'GPU_I_ID="' not in line:
+            continue
+
+        close = line.rfind("}")
+        labels = _parse_labels(line[brace + 1 : close])
+        gpu = labels.get("gpu", "")
+        gpu_i_id = labels.get("GPU_I_ID", "")
+        if gpu_i_id and gpu.isdigit() and gpu_i_id.isdigit():
+            gpu_i_ids.setdefault(int(gpu), set()).add(int(gpu_i_id))
+        if not is_util:
+            continue
+
+        # MIG series use the profiling metric; full GPUs the device metric
+        if (name == DCGM_MIG_UTIL) != bool(gpu_i_id):
+            continue
+        try:
+            value = float(line[close + 1 :].split()[0])
+        except (IndexError, ValueError):
+            continue
+        util[(gpu, gpu_i_id)] = value * 100 if name == DCGM_MIG_UTIL else value
+
+    return DcgmSnapshot(True, util, {gpu: sorted(ids) for gpu, ids in gpu_i_ids.items()})
+
+
+def _dcgm_snapshot() -> DcgmSnapshot:
+    """Fetch and parse the DCGM exporter payload, reusing it within DCGM_SNAPSHOT_TTL."""
+    global _dcgm_cache, _dcgm_cache_timestamp
+
+    now = time.time()
+    if _dcgm_cache is not None and now - _dcgm_cache_timestamp < DCGM_SNAPSHOT_TTL:
+        return _dcgm_cache
+
+    try:
+        req = urllib.request.Request(DCGM_EXPORTER_URL, method="GET")
+        req.add_header("Accept", "text/plain")
+
+        # Iterate the response stream; the payload is never held as one string
+        with urllib.request.urlopen(req, timeout=5) as response:
+            snapshot = _parse_dcgm(response)
+    except (urllib.error.URLError, OSError, TimeoutError):
+        snapshot = DcgmSnapshot(False, {}, {})
+
+    _dcgm_cache, _dcgm_cache_timestamp = snapshot, now
+    return snapshot
+
+
+def _slot_utilization(slot: str, snapshot: DcgmSnapshot) -> float | None:
+    """Utilization percent of an allocation slot ("1" or MIG "2.0"), or None if unknown."""
+    if "." not in slot:
+        return snapshot.util.get((slot, ""))
+    info = _mig_mapping_cache.get(slot)
+    if not info or not info["gpu_i_id"]:
+        return None
+    return snapshot.util.get((info["gpu"], info["gpu_i_id"]))
+
+
+def collect_container_gpu_utilization() -> list[str]:
+    """Export per-container GPU utilization and GPU waste gauges.
+
+    Exports:
+        ds01_container_gpu_utilization{user="alice",container="proj._.1001",slot="2.0"} 37
+        ds01_gpu_waste_count 1
+        ds01_gpu_waste_percent 50
+
+    Nothing is exported while DCGM is unreachable: a missing series is not
+    mistaken for 0% utilization (and therefore waste).
+    """
+    lines = []
+
+    try:
+        snapshot = _dcgm_snapshot()
+        if not snapshot.ok:
+            return ["# DCGM exporter unreachable; container GPU utilization not exported"]
+
+        allocations = _allocation_snapshot(get_gpu_state_module().get_reader())
+
+        lines.append(
+            "# HELP ds01_container_gpu_utilization GPU utilization of the slot allocated"
+            " to a container (percent; MIG from DCGM_FI_PROF_GR_ENGINE_ACTIVE)"
+        )
+        lines.append("# TYPE ds01_container_gpu_utilization gauge")
+
+        allocated = 0
+        wasted = 0
+        for slot, data in sorted(allocations.items()):
+            util = _slot_utilization(slot, snapshot)
+            if util is None:
+                continue  # No DCGM series for this slot (e.g. unmapped MIG instance)
+            users = data.get("users", {})
+            user = _safe_label(list(users.keys())[0] if users else "unknown")
+            for container in data.get("containers", []):
+                lines.append(
+                    f'ds01_container_gpu_utilization{{user="{user}",'
+                    f'container="{_safe_label(container)}",slot="{slot}"}} {util:g}'
+                )
+                allocated += 1
+                if util < GPU_WASTE_THRESHOLD:
+                    wasted += 1
+
+        lines.append("")
+        lines.append(
+            f"# HELP ds01_gpu_waste_count Allocated GPU slots below {GPU_WASTE_THRESHOLD}%"
+            " utilization"
+        )
+        lines.append("# TYPE ds01_gpu_waste_count gauge")
+        lines.append(f"ds01_gpu_waste_count {wasted}")
+        lines.append(
+            "# HELP ds01_gpu_waste_percent Share of allocated GPU slots that are wasted (0-100)"
+        )
+        lines.append("# TYPE ds01_gpu_waste_percent gauge")
+        percent = wasted / allocated * 100 if allocated else 0
+        lines.append(f"ds01_gpu_waste_percent {percent:g}")
+
+    except Exception as e:
+        lines.append(f"# Error collecting container GPU utilization: {e}")
+
+    return lines
+
+
 # ============================================================================
 # Group Membership & Per-User Resource Metrics
 # ============================================================================
@@ -904,6 +1147,34 @@ def collect_cgroup_per_user() -> list[str]:
     return lines
 
 
+_self_metrics_reader = None
+
+
+def collect_self_metrics(collector_durations: dict[str, float]) -> list[str]:
+    """DS01's own latency: this scrape's collector timings, plus allocator,
+    wrapper and cron job measurements recorded via scripts/lib/ds01_selfmetrics."""
+    global _self_metrics_reader
+    lines = [
+        "# HELP ds01_exporter_collector_duration_seconds Time spent in each collector this scrape",
+        "# TYPE ds01_exporter_collector_duration_seconds gauge",
+    ]
+    for name, seconds in collector_durations.items():
+        lines.append(
+            f'ds01_exporter_collector_duration_seconds{{collector="{name}"}} {seconds:.6f}'
+        )
+
+    try:
+        # One reader for the exporter's lifetime: it keeps the observation log offset
+        if _self_metrics_reader is None:
+            module = _load_module("ds01_selfmetrics", SELF_METRICS_LIB)
+            _self_metrics_reader = module.SelfMetricsReader(STATE_DIR / "self-metrics")
+        lines.extend(_self_metrics_reader.render())
+    except Exception as e:
+        lines.append(f"# Error collecting self metrics: {e}")
+
+    return lines
+
+
 def collect_all_metrics() -> str:
     """Collect all metrics and return as Prometheus text format."""
     lines = []
@@ -922,25 +1193,28 @@ def collect_all_metrics() -> str:
 
     # Collect DS01-specific metrics only (allocation, user, events, system)
     # GPU/MIG hardware metrics are now provided by DCGM Exporter
-    lines.extend(collect_allocation_metrics())
-    lines.append("")
-    lines.extend(collect_user_metrics())
-    lines.append("")
-    lines.extend(collect_event_counts())
-    lines.append("")
-    lines.extend(collect_lifecycle_metrics())
-    lines.append("")
-    lines.extend(collect_system_metrics())
-    lines.append("")
-    lines.extend(collect_mig_slot_mapping())
-    lines.append("")
-    lines.extend(collect_unmanaged_metrics())
-    lines.append("")
-    lines.extend(collect_ssh_metrics())
-    lines.append("")
-    lines.extend(collect_user_group_info())
-    lines.append("")
-    lines.extend(collect_cgroup_per_user())
+    collectors = (
+        collect_allocation_metrics,
+        collect_user_metrics,
+        collect_event_counts,
+        collect_lifecycle_metrics,
+        collect_system_metrics,
+        collect_mig_slot_mapping,
+        collect_container_gpu_utilization,  # After MIG mapping (slot -> GPU_I_ID)
+        collect_unmanaged_metrics,
+        collect_state_validation_metrics,
+        collect_ssh_metrics,
+        collect_user_group_info,
+        collect_cgroup_per_user,
+    )
+    durations: dict[str, float] = {}
+    for collector in collectors:
+        started = time.monotonic()
+        lines.extend(collector())
+        lines.append("")
+        durations[collector.__name__.removeprefix("collect_")] = time.monotonic() - started
+
+    lines.extend(collect_self_metrics(durations))
 
     return "\n".join(lines) + "\n"
 
@@ -1004,6 +1278,14 @@ def main():
     print(f"Metrics endpoint: http://{BIND_ADDRESS}:{EXPORTER_PORT}/metrics")
     print("Note: GPU hardware metrics provided by DCGM Exporter")
 
+    # Opt-in tracing (DS01_TRACE=1) of the subprocess calls made per scrape
+    try:
+        _load_module("ds01_trace", INFRA_ROOT / "scripts/lib/ds01_trace.py").install(
+            "ds01-exporter"
+        )
+    except (ImportError, OSError):
+        pass
+
     server = HTTPServer((BIND_ADDRESS, EXPORTER_PORT), MetricsHandler)
 
     try:
@@ -20,6 +20,7 @@ Output: /var/lib/ds01/opa/container-owners.json
 """
 
 import fcntl
+import importlib.util
 import json
 import os
 import pwd
@@ -37,6 +38,41 @@ OUTPUT_FILE = Path("/var/lib/ds01/opa/container-owners.json")
 LOCK_FILE = Path("/var/lib/ds01/opa/container-owners.lock")
 DOCKER_BIN = "/usr/bin/docker"
 LOG_PREFIX = "[container-owner-tracker]"
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+sys.path.insert(0, str(SCRIPT_DIR.parent / "lib"))
+
+# Usage accounting ledger (optional - tracking must work without it)
+try:
+    from ds01_accounting import open_intervals, record_close, record_open
+except ImportError:
+
+    def open_intervals(*args, **kwargs) -> dict:
+        return {}
+
+    def record_open(*args, **kwargs) -> bool:
+        return False
+
+    def record_close(*args, **kwargs) -> bool:
+        return False
+
+
+# Cached uid/username resolution (in-process LRU + on-disk snapshot)
+try:
+    from ds01_identity import name_to_uid, uid_to_name
+except ImportError:
+
+    def uid_to_name(uid) -> str | None:
+        try:
+            return pwd.getpwuid(int(uid)).pw_name
+        except (KeyError, ValueError):
+            return None
+
+    def name_to_uid(name) -> int | None:
+        try:
+            return pwd.getpwnam(name).pw_uid
+        except KeyError:
+            return None
 
 
 @contextmanager
@@ -80,6 +116,7 @@ class ContainerOwnerTracker:
     def __init__(self):
         self.owners: dict[str, Any] = self._load_existing()
         self._running = True
+        self._state_reader = None
 
     def _load_existing(self) -> dict[str, Any]:
         """Load existing ownership data from file."""
@@ -137,52 +174,11 @@ class ContainerOwnerTracker:
 
     def _resolve_uid_to_username(self, uid: int) -> str | None:
         """Resolve UID to username, handling domain users."""
-        # Try local passwd first
-        try:
-            pw = pwd.getpwuid(uid)
-            return pw.pw_name
-        except KeyError:
-            pass
-
-        # Try getent for LDAP/SSSD users
-        try:
-            result = subprocess.run(
-                ["getent", "passwd", str(uid)],
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-            if result.returncode == 0 and result.stdout:
-                return result.stdout.split(":")[0]
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError):
-            pass
-
-        return None
+        return uid_to_name(uid)
 
     def _resolve_username_to_uid(self, username: str) -> int | None:
         """Resolve username to UID, handling domain users."""
-        try:
-            pw = pwd.getpwnam(username)
-            return pw.pw_uid
-        except KeyError:
-            pass
-
-        # Try getent for LDAP/SSSD users
-        try:
-            result = subprocess.run(
-                ["getent", "passwd", username],
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-            if result.returncode == 0 and result.stdout:
-                parts = result.stdout.split(":")
-                if len(parts) >= 3:
-                    return int(parts[2])
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError, ValueError):
-            pass
-
-        return None
+        return name_to_uid(username)
 
     def _validate_path_ownership(self, path: str, claimed_uid: int) -> bool:
         """
@@ -372,6 +368,42 @@ class ContainerOwnerTracker:
 
         return "docker"
 
+    def _gpu_state_reader(self) -> Any:
+        """GPUStateReader from gpu-state-reader.py, loaded on first use (None if unavailable)."""
+        if self._state_reader is None:
+            try:
+                spec = importlib.util.spec_from_file_location(
+                    "gpu_state_reader", str(SCRIPT_DIR / "gpu-state-reader.py")
+                )
+                module = importlib.util.module_from_spec(spec)
+                spec.loader.exec_module(module)
+                self._state_reader = module.GPUStateReader()
+            except Exception as e:
+                log(f"gpu-state-reader unavailable, GPU usage not accounted: {e}", error=True)
+                self._state_reader = False
+        return self._state_reader or None
+
+    def _account_open(self, name: str, username: str | None, full_id: str) -> None:
+        """
+        Open a usage-ledger interval for a GPU container.
+
+        Covers containers allocated without a container name (allocate-external)
+        and binds the Docker ID to intervals the allocator already opened.
+        """
+        reader = self._gpu_state_reader()
+        if reader is None:
+            return
+        gpu = reader.get_container_gpu(name)
+        if not gpu:
+            return
+        profiles = gpu.get("gpu_profiles", [])
+        slots = {
+            slot: reader.get_slot_compute_fraction(slot, profiles[i] if i < len(profiles) else None)
+            for i, slot in enumerate(gpu.get("gpu_slots") or [gpu["gpu_slot"]])
+        }
+        owner = username or gpu.get("user") or "unknown"
+        record_open(name, owner, slots, container_id=full_id, source="docker_events")
+
     def handle_create(self, container_id: str) -> None:
         """Handle container create event."""
         container_data = self._inspect_container(container_id)
@@ -398,6 +430,8 @@ class ContainerOwnerTracker:
         # Flag unmanaged GPU containers (bypassed wrapper, has GPU but not ds01 managed)
         if has_gpu and not ds01_managed:
             self._flag_unmanaged_gpu_container(full_id, name, username, interface)
+        if has_gpu and name:
+            self._account_open(name, username, full_id)
 
         entry = {
             "owner": username,
@@ -427,6 +461,7 @@ class ContainerOwnerTracker:
 
     def handle_destroy(self, container_id: str, container_name: str = "") -> None:
         """Handle container destroy event."""
+        record_close(container_name, container_id=container_id)
         containers = self.owners.get("containers", {})
 
         # Find all keys to remove for this container
@@ -475,7 +510,7 @@ class ContainerOwnerTracker:
         log("Running startup catch-up scan...")
         try:
             result = subprocess.run(
-                [DOCKER_BIN, "ps", "-a", "--format", "{{.ID}}"],
+                [DOCKER_BIN, "ps", "-a", "--no-trunc", "--format", "{{.ID}}"],
                 capture_output=True,
                 text=True,
                 timeout=30,
@@ -487,13 +522,19 @@ class ContainerOwnerTracker:
             container_ids = [
                 cid.strip() for cid in result.stdout.strip().split("\n") if cid.strip()
             ]
-            existing_keys = set(self.owners.get("containers", {}).keys())
+            existing = self.owners.get("containers", {})
+            accounted = open_intervals()
 
             new_count = 0
             for container_id in container_ids:
                 short_id = container_id[:12]
                 # Skip if we already have this container
-                if short_id in existing_keys or container_id in existing_keys:
+                entry = existing.get(short_id) or existing.get(container_id)
+                if entry is not None:
+                    # Known GPU container missing from the usage ledger (e.g. opened
+                    # while accounting was unavailable): open it now
+                    if entry.get("has_gpu") and entry.get("name") not in accounted:
+                        self._account_open(entry["name"], entry.get("owner"), container_id)
                     continue
 
                 self.handle_create(container_id)
@@ -60,9 +60,19 @@ CONFIG_FILE="$INFRA_ROOT/config/runtime/resource-limits.yaml"
 RESOURCE_PARSER="$INFRA_ROOT/scripts/docker/get_resource_limits.py"
 GPU_ALLOCATOR="$INFRA_ROOT/scripts/docker/gpu_allocator_v2.py"
 CREATE_SLICE="$INFRA_ROOT/scripts/system/create-user-slice.sh"
+SLICE_STATE="/var/lib/ds01/slice-state"
 USERNAME_UTILS="$INFRA_ROOT/scripts/lib/username-utils.sh"
+SELFMETRICS_LIB="$INFRA_ROOT/scripts/lib/ds01_selfmetrics.sh"
 LOG_FILE="/var/log/ds01/docker-wrapper.log"
 
+# Self-observability: preflight duration (start -> exec) for create/run, fork-free
+if [ -f "$SELFMETRICS_LIB" ]; then
+    source "$SELFMETRICS_LIB"
+    ds01_timer_start _WRAPPER_T0
+else
+    ds01_observe() { :; }
+fi
+
 # GPU allocation settings
 GPU_ALLOCATION_TIMEOUT=180       # 3 minutes
 GPU_ALLOCATION_RETRY_INTERVAL=10 # seconds
@@ -520,10 +530,32 @@ get_user_group() {
     fi
 }
 
+# Succeeds if generate-user-slice-limits.py recorded the slice after the last
+# config change (state file newer than resource-limits.yaml and the members file)
+# and its unit file exists. Builtins only: no fork, no sudo.
+user_slice_is_current() {
+    local group="$1" slice="$2" name _rest
+    local members="$INFRA_ROOT/config/runtime/groups/${group}.members"
+
+    [ -f "/etc/systemd/system/$slice" ] && [ -r "$SLICE_STATE" ] || return 1
+    [[ $SLICE_STATE -nt $CONFIG_FILE ]] || return 1
+    [[ ! -e $members || $SLICE_STATE -nt $members ]] || return 1
+    while IFS=$'\t' read -r name _rest; do
+        [[ $name == "$slice" ]] && return 0
+    done <"$SLICE_STATE"
+    return 1
+}
+
 # Ensure user slice exists
 ensure_user_slice() {
     local group="$1"
     local user="$2"
+    local slice="ds01-${group}-$(sanitize_username_for_slice "$user").slice"
+
+    if user_slice_is_current "$group" "$slice"; then
+        log_debug "Slice $slice current in $SLICE_STATE, skipping create-user-slice.sh"
+        return 0
+    fi
 
     if [ -f "$CREATE_SLICE" ]; then
         # Try to create slice (requires sudo, will fail silently if not root)
@@ -1345,6 +1377,11 @@ main() {
                 gpu="${GPU_SLOT:-none}" || true
         fi
 
+        local gpu_label=no
+        [ "$GPU_REQUESTED" = true ] && gpu_label=yes
+        ds01_observe ds01_wrapper_preflight_duration_seconds "${_WRAPPER_T0:-}" \
+            "subcommand=$subcommand,gpu=$gpu_label"
+
         exec "$REAL_DOCKER" "$subcommand" "${INJECT_ARGS[@]}" "${FINAL_ARGS[@]}"
     else
         # Pass through unchanged
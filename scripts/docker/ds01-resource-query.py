@@ -3,6 +3,10 @@
 DS01 Resource Query - Unified Query Layer
 Central service for querying containers and GPU allocations.
 Single source of truth: Docker itself (via gpu-state-reader and gpu-availability-checker).
+
+Container queries push user/status filters into `docker ps` and inspect the
+survivors in batches; `containers --json-stream` prints one JSON object per
+line as each batch completes.
 """
 
 import argparse
@@ -30,6 +34,15 @@ spec.loader.exec_module(gpu_avail_module)
 GPUAvailabilityChecker = gpu_avail_module.GPUAvailabilityChecker
 
 
+# Containers per `docker inspect` call: bounds argv length and is the unit of
+# progress for --json-stream
+INSPECT_BATCH_SIZE = 50
+
+# Owner labels, in priority order
+# TODO: Remove aime.mlc.USER fallback when no legacy containers remain (Phase 7 migration)
+USER_LABELS = ("ds01.user", "aime.mlc.USER")
+
+
 class DS01ResourceQuery:
     def __init__(self):
         self.state_reader = GPUStateReader()
@@ -46,10 +59,31 @@ class DS01ResourceQuery:
         Returns:
             List of container dicts with GPU info
         """
-        containers = []
+        return list(self.iter_containers(user=user, status=status))
 
-        # Build docker ps filter
-        docker_cmd = ["docker", "ps"]
+    def iter_containers(self, user: str | None = None, status: str = "all"):
+        """
+        Yield container dicts (query_containers format) as each inspect batch completes.
+
+        User and status filters are applied by `docker ps`, so only matching
+        containers are inspected, INSPECT_BATCH_SIZE per `docker inspect` call.
+        """
+        for name, container_status, created_at, container_info in self._iter_inspected(
+            user, status
+        ):
+            if "._." not in name:  # DS01 naming convention
+                continue
+            container_dict = self._container_dict(
+                name, container_status, created_at, container_info
+            )
+            # Label filters match any owner label; the owner is the first one set
+            if user and container_dict["user"] != user:
+                continue
+            yield container_dict
+
+    def _list_containers(self, user: str | None, status: str) -> list[tuple[str, str, str, str]]:
+        """(id, name, status, created) for containers matching the filters, via `docker ps`."""
+        docker_cmd = ["docker", "ps", "--no-trunc"]
 
         if status == "all":
             docker_cmd.append("-a")
@@ -57,89 +91,107 @@ class DS01ResourceQuery:
             docker_cmd.extend(["-a", "--filter", "status=exited"])
         # else: running (default docker ps)
 
-        docker_cmd.extend(["--format", "{{.Names}}\t{{.Status}}\t{{.CreatedAt}}"])
+        docker_cmd.extend(["--format", "{{.ID}}\t{{.Names}}\t{{.Status}}\t{{.CreatedAt}}"])
 
-        try:
-            result = subprocess.run(
-                docker_cmd, capture_output=True, text=True, check=True, timeout=30
-            )
-        except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
-            return containers
-
-        for line in result.stdout.strip().split("\n"):
-            if not line or "._." not in line:  # DS01 naming convention
-                continue
-
-            parts = line.split("\t")
-            if len(parts) < 2:
-                continue
-
-            container_name = parts[0].strip()
-            container_status = parts[1].strip()
-            created_at = parts[2].strip() if len(parts) > 2 else ""
-
-            # Get container details
+        # Label filters are ANDed by docker, so each owner label needs its own call
+        label_filters = [["--filter", f"label={label}={user}"] for label in USER_LABELS]
+        listed = {}
+        for label_filter in label_filters if user else [[]]:
             try:
-                inspect_result = subprocess.run(
-                    ["docker", "inspect", container_name],
+                result = subprocess.run(
+                    docker_cmd + label_filter,
                     capture_output=True,
                     text=True,
-                    timeout=10,
+                    check=True,
+                    timeout=30,
                 )
-            except subprocess.TimeoutExpired:
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
                 continue
 
-            if inspect_result.returncode != 0:
-                continue
-
-            try:
-                container_info = json.loads(inspect_result.stdout)[0]
-            except (json.JSONDecodeError, IndexError):
-                continue
+            for line in result.stdout.strip().split("\n"):
+                parts = line.split("\t")
+                if len(parts) < 3:
+                    continue
+                container_id = parts[0].strip()
+                created_at = parts[3].strip() if len(parts) > 3 else ""
+                listed.setdefault(
+                    container_id,
+                    (container_id, parts[1].strip(), parts[2].strip(), created_at),
+                )
 
-            # Get labels
-            labels = container_info.get("Config", {}).get("Labels", {}) or {}
+        return list(listed.values())
 
-            # Filter by user if specified
-            # TODO: Remove aime.mlc.USER fallback when no legacy containers remain (Phase 7 migration)
-            container_user = labels.get("ds01.user") or labels.get("aime.mlc.USER", "")
-            if user and container_user != user:
-                continue
+    def _inspect_batch(self, container_ids: list[str]) -> dict[str, dict]:
+        """`docker inspect` several containers in one call, keyed by full ID."""
+        if not container_ids:
+            return {}
+        try:
+            result = subprocess.run(
+                ["docker", "inspect", *container_ids],
+                capture_output=True,
+                text=True,
+                timeout=30,
+            )
+        except subprocess.TimeoutExpired:
+            return {}
 
-            # Get GPU info
-            gpu_info = self.state_reader._extract_gpu_from_container(container_info)
+        # Containers removed since `docker ps` make inspect exit non-zero, but
+        # the others are still printed
+        try:
+            inspected = json.loads(result.stdout or "[]")
+        except json.JSONDecodeError:
+            return {}
+        return {info.get("Id", ""): info for info in inspected}
+
+    def _iter_inspected(self, user: str | None, status: str):
+        """Yield (name, status, created, inspect data) for listed containers, batch by batch."""
+        listed = self._list_containers(user, status)
+        for i in range(0, len(listed), INSPECT_BATCH_SIZE):
+            batch = listed[i : i + INSPECT_BATCH_SIZE]
+            inspected = self._inspect_batch([row[0] for row in batch])
+            for container_id, name, container_status, created_at in batch:
+                container_info = inspected.get(container_id)
+                if container_info is not None:
+                    yield name, container_status, created_at, container_info
+
+    def _container_dict(
+        self, container_name: str, container_status: str, created_at: str, container_info: dict
+    ) -> dict:
+        """Build the query_containers record from `docker ps` fields and inspect data."""
+        labels = container_info.get("Config", {}).get("Labels", {}) or {}
+        container_user = next((labels[label] for label in USER_LABELS if labels.get(label)), "")
 
-            # Build container dict
-            container_dict = {
-                "name": container_name,
-                "user": container_user,
-                "status": container_status,
-                "running": "Up" in container_status,
-                "created": created_at,
-                "ds01_managed": labels.get("ds01.managed") == "true",
-                "created_at": labels.get("ds01.created_at", ""),
-            }
+        # Get GPU info
+        gpu_info = self.state_reader._extract_gpu_from_container(container_info)
 
-            if gpu_info:
-                container_dict.update(
-                    {
-                        "gpu_allocated": gpu_info["gpu_slot"],
-                        "gpu_uuid": gpu_info["gpu_uuid"],
-                        "gpu_allocated_at": labels.get("ds01.gpu.allocated_at", ""),
-                        "gpu_priority": labels.get("ds01.gpu.priority", ""),
-                    }
-                )
-            else:
-                container_dict.update(
-                    {
-                        "gpu_allocated": None,
-                        "gpu_uuid": None,
-                    }
-                )
+        container_dict = {
+            "name": container_name,
+            "user": container_user,
+            "status": container_status,
+            "running": "Up" in container_status,
+            "created": created_at,
+            "ds01_managed": labels.get("ds01.managed") == "true",
+            "created_at": labels.get("ds01.created_at", ""),
+        }
 
-            containers.append(container_dict)
+        if gpu_info:
+            container_dict.update(
+                {
+                    "gpu_allocated": gpu_info["gpu_slot"],
+                    "gpu_uuid": gpu_info["gpu_uuid"],
+                    "gpu_allocated_at": labels.get("ds01.gpu.allocated_at", ""),
+                    "gpu_priority": labels.get("ds01.gpu.priority", ""),
+                }
+            )
+        else:
+            container_dict.update(
+                {
+                    "gpu_allocated": None,
+                    "gpu_uuid": None,
+                }
+            )
 
-        return containers
+        return container_dict
 
     def query_gpus_status(self) -> dict:
         """
@@ -233,8 +285,23 @@ class DS01ResourceQuery:
         Returns:
             Dict with user's container and GPU usage summary
         """
-        containers = self.query_containers(user=user)
-        gpu_allocs = self.state_reader.get_user_allocations(user)
+        # One filtered listing and batched inspects serve both the container
+        # list and the GPU allocations (owned containers of any naming scheme)
+        containers = []
+        gpu_allocs = []
+        for name, container_status, created_at, container_info in self._iter_inspected(user, "all"):
+            container_dict = self._container_dict(
+                name, container_status, created_at, container_info
+            )
+            if container_dict["user"] != user:
+                continue
+            if "._." in name:
+                containers.append(container_dict)
+            gpu_info = self.state_reader._extract_gpu_from_container(container_info)
+            if gpu_info and gpu_info["user"] == user:
+                gpu_allocs.append(
+                    self.state_reader._allocation_entry(name, container_info, gpu_info)
+                )
 
         running_containers = [c for c in containers if c["running"]]
         stopped_containers = [c for c in containers if not c["running"]]
@@ -269,6 +336,11 @@ def main():
         "--status", choices=["all", "running", "stopped"], default="all", help="Filter by status"
     )
     parser_containers.add_argument("--json", action="store_true", help="Output as JSON")
+    parser_containers.add_argument(
+        "--json-stream",
+        action="store_true",
+        help="Output one JSON object per line as results arrive",
+    )
 
     # gpus command
     parser_gpus = subparsers.add_parser("gpus", help="Query GPU allocations")
@@ -299,7 +371,11 @@ def main():
     query = DS01ResourceQuery()
 
     # Execute command
-    if args.command == "containers":
+    if args.command == "containers" and args.json_stream:
+        for c in query.iter_containers(user=args.user, status=args.status):
+            print(json.dumps(c), flush=True)
+
+    elif args.command == "containers":
         containers = query.query_containers(user=args.user, status=args.status)
 
         if args.json:
@@ -14,7 +14,7 @@ Design principle:
 Usage:
     event-logger.py log <event_type> [key=value ...]
     event-logger.py tail [N]
-    event-logger.py search <pattern>
+    event-logger.py search <pattern> [--since TIME] [--until TIME]
     event-logger.py user <username>
     event-logger.py container <name>
     event-logger.py types
@@ -23,6 +23,7 @@ Usage:
 import json
 import re
 import sys
+from datetime import datetime
 from pathlib import Path
 
 # Import shared event logging library
@@ -98,26 +99,49 @@ class EventReader:
 
         return events
 
-    def search(self, pattern: str, limit: int = 100) -> list[dict]:
-        """Search events matching regex pattern."""
+    def search(
+        self,
+        pattern: str,
+        limit: int = 100,
+        since: float | None = None,
+        until: float | None = None,
+    ) -> list[dict]:
+        """Search events matching regex pattern.
+
+        Without since, only the live log is searched. With since (unix time),
+        rotated and backed-up archives are included, decompressing only the
+        hourly frames that overlap [since, until].
+        """
+        if since is not None:
+            from ds01_event_index import iter_events
+
+            end = until if until is not None else datetime.now().timestamp()
+            return self._match(iter_events(since, end, events_file=self.log_file), pattern, limit)
+
         if not self.log_file.exists():
             return []
 
-        events = []
-        regex = re.compile(pattern, re.IGNORECASE)
-
         try:
             with open(self.log_file) as f:
-                for line in f:
-                    if regex.search(line):
-                        try:
-                            events.append(json.loads(line.strip()))
-                            if len(events) >= limit:
-                                break
-                        except json.JSONDecodeError:
-                            continue
+                return self._match(f, pattern, limit)
         except OSError:
-            pass
+            return []
+
+    @staticmethod
+    def _match(lines, pattern: str, limit: int) -> list[dict]:
+        """Parse up to limit lines matching the regex."""
+        events = []
+        regex = re.compile(pattern, re.IGNORECASE)
+
+        for line in lines:
+            if not regex.search(line):
+                continue
+            try:
+                events.append(json.loads(line.strip()))
+            except json.JSONDecodeError:
+                continue
+            if len(events) >= limit:
+                break
 
         return events
 
@@ -139,7 +163,8 @@ def main():
         print("\nCommands:")
         print("  log <event_type> [key=value ...]  - Log an event")
         print("  tail [N]                          - Show last N events (default: 20)")
-        print("  search <pattern>                  - Search events by regex")
+        print("  search <pattern> [--since T]      - Search events by regex (--since/--until")
+        print("                                      also search archived logs)")
         print("  user <username>                   - Show events for user")
         print("  container <name>                  - Show events for container")
         print("  types                             - List predefined event types")
@@ -210,7 +235,21 @@ def main():
             sys.exit(1)
 
         pattern = sys.argv[2]
-        events = reader.search(pattern)
+        # Optional window: --since/--until (ISO 8601) also searches archived logs
+        window = {}
+        args = sys.argv[3:]
+        for opt in ("--since", "--until"):
+            if opt in args and args.index(opt) + 1 < len(args):
+                value = args[args.index(opt) + 1]
+                try:
+                    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+                    window[opt[2:]] = ts.timestamp()
+                except ValueError:
+                    print(f"Error: Invalid {opt} time: {value}")
+                    sys.exit(1)
+        if "until" in window and "since" not in window:
+            window["since"] = 0.0
+        events = reader.search(pattern, **window)
 
         if not events:
             print(f"No events matching '{pattern}'")
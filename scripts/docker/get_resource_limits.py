@@ -13,6 +13,7 @@ import yaml
 script_dir = Path(__file__).resolve().parent
 lib_dir = script_dir.parent / "lib"
 sys.path.insert(0, str(lib_dir))
+import ds01_trace  # noqa: E402,F401  (opt-in DS01_TRACE=1 tracing)
 
 try:
     from username_utils import sanitize_username_for_slice
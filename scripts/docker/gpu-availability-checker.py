@@ -6,9 +6,12 @@ Uses gpu-state-reader.py as single source of truth for current allocations.
 """
 
 import importlib.util
+import json
+import os
 import re
 import subprocess
 import sys
+import tempfile
 from pathlib import Path
 
 # Dynamic import for gpu-state-reader.py (hyphenated filename)
@@ -19,18 +22,90 @@ spec = importlib.util.spec_from_file_location(
 gpu_state_module = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(gpu_state_module)
 GPUStateReader = gpu_state_module.GPUStateReader
+NVIDIA_SMI_BIN = gpu_state_module.NVIDIA_SMI_BIN
+
+# Slot placement policies (pack/spread/lexicographic)
+sys.path.insert(0, str(SCRIPT_DIR.parent / "lib"))
+import ds01_trace  # noqa: E402,F401  (opt-in DS01_TRACE=1 tracing)
+from ds01_placement import (  # noqa: E402
+    DEFAULT_POLICY,
+    parse_topology,
+    physical_gpu,
+    rank_slots,
+    select_slot_set,
+    set_cost,
+)
+
+# `nvidia-smi topo -m` only changes with hardware, so it is cached per boot
+TOPOLOGY_CACHE = Path(os.environ.get("DS01_GPU_TOPOLOGY_CACHE", "/var/lib/ds01/gpu-topology.json"))
+BOOT_ID_FILE = Path("/proc/sys/kernel/random/boot_id")
 
 
 class GPUAvailabilityChecker:
     def __init__(self):
         self.state_reader = GPUStateReader()
+        self._topology = None
+
+    def _get_placement_policy(self) -> str:
+        """gpu_allocation.placement_policy from resource-limits.yaml (see ds01_placement.py)."""
+        config = self.state_reader._load_config() or {}
+        return (config.get("gpu_allocation") or {}).get("placement_policy") or DEFAULT_POLICY
+
+    def _get_topology(self) -> dict[str, dict[str, str]]:
+        """
+        GPU interconnect matrix from `nvidia-smi topo -m` (see ds01_placement.parse_topology).
+
+        Cached in TOPOLOGY_CACHE keyed on the boot ID, so nvidia-smi topo runs
+        once per boot rather than once per allocation. Returns {} if unknown.
+        """
+        if self._topology is not None:
+            return self._topology
+        try:
+            boot_id = BOOT_ID_FILE.read_text().strip()
+        except OSError:
+            boot_id = ""
+
+        try:
+            cached = json.loads(TOPOLOGY_CACHE.read_text())
+            if boot_id and cached.get("boot_id") == boot_id:
+                self._topology = cached.get("topology") or {}
+                return self._topology
+        except (OSError, ValueError, AttributeError):
+            pass
+
+        try:
+            result = subprocess.run(
+                [NVIDIA_SMI_BIN, "topo", "-m"],
+                capture_output=True,
+                text=True,
+                check=True,
+                timeout=30,
+            )
+            self._topology = parse_topology(result.stdout)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+            self._topology = {}
+            return self._topology
+
+        if boot_id and self._topology:
+            # Best effort: callers without write access just re-run nvidia-smi topo
+            tmp = None
+            try:
+                fd, tmp = tempfile.mkstemp(dir=TOPOLOGY_CACHE.parent, prefix=".gpu-topology.")
+                with os.fdopen(fd, "w") as f:
+                    json.dump({"boot_id": boot_id, "topology": self._topology}, f)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, TOPOLOGY_CACHE)
+            except OSError:
+                if tmp:
+                    Path(tmp).unlink(missing_ok=True)
+        return self._topology
 
     def _get_mig_mode_gpus(self) -> set[str]:
         """Get set of GPU indices that have MIG mode enabled (via nvidia-smi query)."""
         try:
             result = subprocess.run(
                 [
-                    "/usr/bin/nvidia-smi",
+                    NVIDIA_SMI_BIN,
                     "--query-gpu=index,mig.mode.current",
                     "--format=csv,noheader",
                 ],
@@ -52,7 +127,7 @@ class GPUAvailabilityChecker:
         """Get nvidia-smi -L output. Device permissions are 0666 so all users can query."""
         try:
             result = subprocess.run(
-                ["/usr/bin/nvidia-smi", "-L"],
+                [NVIDIA_SMI_BIN, "-L"],
                 capture_output=True,
                 text=True,
                 check=True,
@@ -189,6 +264,12 @@ class GPUAvailabilityChecker:
 
             available = {}
 
+            # MIG instances per physical GPU (placement needs to know which GPUs are whole)
+            slots_per_gpu = {}
+            for mig_info in all_migs.values():
+                gpu_id = mig_info["physical_gpu"]
+                slots_per_gpu[gpu_id] = slots_per_gpu.get(gpu_id, 0) + 1
+
             # Available MIG instances
             for slot_id, mig_info in all_migs.items():
                 if slot_id not in allocations:
@@ -197,6 +278,7 @@ class GPUAvailabilityChecker:
                         "uuid": mig_info["uuid"],
                         "profile": mig_info["profile"],
                         "physical_gpu": mig_info["physical_gpu"],
+                        "gpu_slot_count": slots_per_gpu[mig_info["physical_gpu"]],
                         "status": "available",
                     }
 
@@ -219,6 +301,7 @@ class GPUAvailabilityChecker:
                         "uuid": gpu_info["uuid"],
                         "profile": "full-gpu",
                         "physical_gpu": gpu_id,
+                        "gpu_slot_count": 0,
                         "status": "available",
                     }
 
@@ -268,6 +351,32 @@ class GPUAvailabilityChecker:
         # MIG slots have decimal (e.g., "1.0", "1.2")
         return "." not in str(gpu_slot)
 
+    def _rank_candidates(
+        self, candidates: dict, availability: dict, prefer_full: bool, preferred: set
+    ) -> list[str]:
+        """
+        Rank candidate slots by the configured placement policy (ds01_placement.py).
+        Users permitted full GPUs get them first (vLLM, multi-process workloads);
+        everyone else gets MIG instances first (default for students).
+        """
+        gpu_sizes = {
+            info["physical_gpu"]: info.get("gpu_slot_count", 0) for info in candidates.values()
+        }
+        user_gpus = {
+            physical_gpu(slot)
+            for alloc in availability.get("user_allocations", [])
+            for slot in alloc.get("gpu_slots", [alloc.get("gpu_slot")])
+            if slot is not None
+        }
+        return rank_slots(
+            candidates,
+            gpu_sizes,
+            self._get_placement_policy(),
+            user_gpus=user_gpus,
+            prefer_full=prefer_full,
+            preferred=preferred,
+        )
+
     def suggest_gpu_for_user(
         self,
         username: str,
@@ -276,18 +385,22 @@ class GPUAvailabilityChecker:
         require_full_gpu: bool = False,
         allow_full_gpu: bool = False,
         exclude_slots: list = None,
+        prefer_slots: list = None,
     ) -> dict:
         """
         Suggest which GPU to allocate for a user.
-        Uses least-allocated strategy with full GPU access control.
+        Uses the configured placement policy (default: pack) with full GPU access control.
 
         Args:
             username: User requesting GPU
             max_gpus: User's max GPU limit
-            priority: User's allocation priority (not currently used)
+            priority: User's allocation priority (unused here: waiters are
+                ordered by priority in gpu-queue-manager.py, which reserves slots)
             require_full_gpu: If True, only suggest full GPUs (not MIG)
             allow_full_gpu: If False, filter out full GPUs from suggestions
-            exclude_slots: List of slot IDs to exclude (for multi-GPU allocation)
+            exclude_slots: List of slot IDs to exclude (multi-GPU allocation, and
+                slots the GPU queue has reserved for other users)
+            prefer_slots: Slot IDs to pick first if free (the user's own queue reservation)
 
         Returns:
             Dict with 'gpu_slot', 'gpu_uuid', or error if none available
@@ -296,6 +409,7 @@ class GPUAvailabilityChecker:
         try:
             if exclude_slots is None:
                 exclude_slots = []
+            preferred = set(prefer_slots or [])
 
             availability = self.get_user_available_gpus(username, max_gpus)
 
@@ -322,7 +436,12 @@ class GPUAvailabilityChecker:
                 if full_gpus:
                     # Prefer real full GPUs over virtual full GPUs
                     sorted_gpus = sorted(
-                        full_gpus.items(), key=lambda x: (0 if x[1]["type"] == "full" else 1, x[0])
+                        full_gpus.items(),
+                        key=lambda x: (
+                            x[0] not in preferred,
+                            0 if x[1]["type"] == "full" else 1,
+                            x[0],
+                        ),
                     )
                     gpu_id, gpu_info = sorted_gpus[0]
                     return {
@@ -379,19 +498,12 @@ class GPUAvailabilityChecker:
                         "user_current": availability["user_current_count"],
                     }
 
-            # Use least-allocated strategy with full GPU preference for permitted users
-            # Sort order depends on user's full GPU permission:
-            # - allow_full_gpu=True: Prefer full GPUs (better for vLLM, multi-process workloads)
-            # - allow_full_gpu=False: Prefer MIG instances (default for students)
-            def sort_key(slot):
-                is_mig = "." in slot
-                # Full GPUs first if user requires OR is permitted to use them
-                if require_full_gpu or allow_full_gpu:
-                    return (is_mig, slot)  # Full GPUs first (is_mig=False sorts before True)
-                else:
-                    return (not is_mig, slot)  # MIG instances first
-
-            sorted_slots = sorted(filtered_available.keys(), key=sort_key)
+            sorted_slots = self._rank_candidates(
+                filtered_available,
+                availability,
+                prefer_full=require_full_gpu or allow_full_gpu,
+                preferred=preferred,
+            )
             gpu_slot = sorted_slots[0]
             gpu_info = filtered_available[gpu_slot]
 
@@ -406,6 +518,78 @@ class GPUAvailabilityChecker:
             print(f"Error: GPU suggestion failed: {e}", file=sys.stderr)
             return {"success": False, "error": f"Internal error: {e}"}
 
+    def suggest_gpu_set_for_user(
+        self,
+        username: str,
+        count: int,
+        max_gpus: int = None,
+        allow_full_gpu: bool = False,
+        exclude_slots: list = None,
+        prefer_slots: list = None,
+    ) -> dict:
+        """
+        Suggest `count` GPU slots for a multi-GPU container, all or nothing.
+
+        Availability is read once and every candidate set is scored in one pass
+        (ds01_placement.select_slot_set): the best worst-case interconnect from
+        `nvidia-smi topo -m` wins (NVLink > same PCIe switch > same NUMA node),
+        then the placement policy's ranking.
+
+        Args:
+            username: User requesting GPUs
+            count: Number of slots wanted
+            max_gpus: User's max GPU limit
+            allow_full_gpu: If False, filter out full GPUs from suggestions
+            exclude_slots: Slot IDs the GPU queue has reserved for other users
+            prefer_slots: Slot IDs to pick first if free (the user's own queue reservation)
+
+        Returns:
+            Dict with 'gpu_slots', 'gpu_uuids' and 'link_cost' (worst pairwise
+            link, 0 = NVLink or same GPU), or error if fewer than `count` are free
+        """
+        try:
+            availability = self.get_user_available_gpus(username, max_gpus)
+
+            if not availability["can_allocate"]:
+                return {
+                    "success": False,
+                    "error": availability["reason"],
+                    "user_current": availability["user_current_count"],
+                    "user_max": max_gpus,
+                }
+
+            excluded = set(exclude_slots or [])
+            candidates = {
+                slot: info
+                for slot, info in availability["available_gpus"].items()
+                if slot not in excluded and (allow_full_gpu or not self._is_full_gpu(slot))
+            }
+
+            ranked = self._rank_candidates(
+                candidates,
+                availability,
+                prefer_full=allow_full_gpu,
+                preferred=set(prefer_slots or []),
+            )
+            topology = self._get_topology() if count > 1 else {}
+            slots = select_slot_set(ranked, count, topology)
+            if not slots:
+                return {
+                    "success": False,
+                    "error": f"No GPUs available ({len(candidates)} free, {count} requested)",
+                    "user_current": availability["user_current_count"],
+                }
+
+            return {
+                "success": True,
+                "gpu_slots": slots,
+                "gpu_uuids": [candidates[slot]["uuid"] for slot in slots],
+                "link_cost": set_cost(slots, topology)[0],
+            }
+        except Exception as e:
+            print(f"Error: GPU set suggestion failed: {e}", file=sys.stderr)
+            return {"success": False, "error": f"Internal error: {e}"}
+
     def get_allocation_summary(self) -> dict:
         """Get summary of GPU allocation status."""
         try:
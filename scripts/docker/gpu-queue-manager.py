@@ -3,108 +3,437 @@
 DS01 GPU Queue Manager
 /opt/ds01-infra/scripts/docker/gpu-queue-manager.py
 
-Manages a queue for users waiting for GPU availability.
-When GPU allocation fails, users can join the queue to be notified when GPUs become available.
+Priority-aware wait queue for users waiting for GPU availability.
+
+Waiters are ordered by effective priority: the group `priority` from
+resource-limits.yaml plus an aging bonus for every hour spent waiting (ties go
+to the earliest request). When GPUs are free, the scheduler reserves them for
+the head of the queue for `gpu_allocation.queue.reservation_ttl_m` minutes and
+notifies the user. GPUAllocatorSmart skips slots reserved for other users and
+prefers the caller's own reserved slots, so a freed GPU goes to the waiter it
+was handed to rather than to whoever retries first.
+
+The scheduler runs on Docker release events (`watch`, ds01-gpu-queue.service)
+and from cron as a fallback. A waiter that lets its reservation lapse goes to
+the back of its priority band; after `max_missed` lapses the entry is dropped.
+
+The queue file is root-owned and not group-writable, since the allocator acts
+on the reservations in it. Users join and leave through `sudo` (see
+config/deploy/sudoers.d/ds01-gpu-queue); `add`/`remove` re-exec themselves that
+way and then act only on the calling user's own entries.
 
 Usage:
     gpu-queue-manager.py add <user> <container> <max_gpus>    # Add to queue
     gpu-queue-manager.py remove <user> [container]           # Remove from queue
     gpu-queue-manager.py list                                # Show queue
     gpu-queue-manager.py position <user>                     # Show user's position
-    gpu-queue-manager.py process                             # Check queue and notify
+    gpu-queue-manager.py process                             # Reserve free GPUs for waiters
+    gpu-queue-manager.py watch [--interval SECONDS]          # Run scheduler on release events
     gpu-queue-manager.py clean                               # Remove old entries
 """
 
 import fcntl
 import json
+import logging
+import os
 import subprocess
 import sys
+import tempfile
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
 
 # Configuration
 STATE_DIR = Path("/var/lib/ds01")
 QUEUE_FILE = STATE_DIR / "gpu-queue.json"
+QUEUE_LOCK = STATE_DIR / "gpu-queue.lock"
 ALERTS_DIR = STATE_DIR / "alerts"
 INFRA_ROOT = Path("/opt/ds01-infra")
-EVENT_LOGGER = INFRA_ROOT / "scripts/docker/event-logger.py"
-GPU_AVAILABILITY_CHECKER = INFRA_ROOT / "scripts/docker/gpu-availability-checker.py"
-RESOURCE_PARSER = INFRA_ROOT / "scripts/docker/get_resource_limits.py"
+CONFIG_FILE = INFRA_ROOT / "config/runtime/resource-limits.yaml"
+SCRIPT_DIR = Path(__file__).parent
+DOCKER_BIN = "/usr/bin/docker"
+SELF_PATH = INFRA_ROOT / "scripts/docker/gpu-queue-manager.py"  # Path in the sudoers rule
 
 # Queue entry retention (hours)
 QUEUE_RETENTION_HOURS = 24
 
+# A scheduler pass waits this long for another pass to finish, so a release
+# seen while the lock is busy is still processed
+PASS_LOCK_TIMEOUT = 30
+LOCK_POLL_SECONDS = 0.1
+
+# Scheduler defaults (overridden by gpu_allocation.queue in resource-limits.yaml)
+DEFAULT_PRIORITY = 10
+QUEUE_DEFAULTS = {
+    "reservation_ttl_m": 10.0,  # How long a freed GPU is held for the waiter
+    "aging_per_hour": 5.0,  # Priority points gained per hour of waiting
+    "max_missed": 2,  # Lapsed reservations before the entry is dropped
+}
+
+# Import event logging (with safe fallback - the queue must work even if logging fails)
+sys.path.insert(0, str(SCRIPT_DIR.parent / "lib"))
+try:
+    from ds01_events import log_event as _log_event
+except ImportError:
+
+    def _log_event(*args, **kwargs) -> bool:
+        return False
+
+
+# Add NullHandler to avoid "No handlers found" warnings
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# ============================================================================
+# Queue file
+# ============================================================================
+
+
+def _now():
+    return datetime.now(tz=None)
+
+
+def _timestamp(dt=None):
+    """Queue timestamps: naive local time with a trailing "Z" (historical format)."""
+    return (dt or _now()).isoformat() + "Z"
+
+
+def _parse_timestamp(value):
+    """Parse a queue timestamp, or None if missing/unparseable."""
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "").replace("+00:00", ""))
+    except (TypeError, ValueError):
+        return None
+
 
 def load_queue():
-    """Load the queue file with locking."""
+    """Load the queue file (a JSON list of entries, in scheduling order)."""
     try:
         if not QUEUE_FILE.exists():
             return []
 
         with open(QUEUE_FILE) as f:
-            fcntl.flock(f.fileno(), fcntl.LOCK_SH)
             data = json.load(f)
-            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            return data
+        return data if isinstance(data, list) else []
     except PermissionError:
-        print("Note: Cannot read queue file (permission denied)", file=sys.stderr)
-        print("  The queue may be empty or requires admin access.", file=sys.stderr)
+        # Non-root callers (every allocation) may not be able to read it
+        logger.debug("Cannot read %s (permission denied); treating queue as empty", QUEUE_FILE)
         return []
     except (OSError, json.JSONDecodeError):
         return []
 
 
+def _trusted(st):
+    """Only root may be able to write the queue: the allocator honours its reservations."""
+    return st.st_uid == 0 and not st.st_mode & 0o022
+
+
+def load_reservations(settings=None, now=None):
+    """
+    Active reservations (slot -> user) for the allocator.
+
+    /var/lib/ds01 is group-writable, so a queue file that is not root-owned or
+    is writable by others may have been planted and is ignored, as is any
+    reservation running past one TTL from now.
+    """
+    settings = settings or QUEUE_DEFAULTS
+    try:
+        if not _trusted(QUEUE_FILE.stat()):
+            logger.debug("Ignoring reservations in untrusted %s", QUEUE_FILE)
+            return {}
+    except OSError:
+        return {}
+    return active_reservations(load_queue(), now, settings["reservation_ttl_m"])
+
+
 def save_queue(queue):
-    """Save the queue file with locking."""
+    """Atomically replace the queue file (check-limits reads it without locking)."""
     STATE_DIR.mkdir(parents=True, exist_ok=True)
 
-    with open(QUEUE_FILE, "w") as f:
-        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-        json.dump(queue, f, indent=2)
-        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    fd, tmp_path = tempfile.mkstemp(dir=STATE_DIR, prefix=".gpu-queue.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(queue, f, indent=2)
+        # World-readable for list/position; only root writes it
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, QUEUE_FILE)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
 
+@contextmanager
+def queue_lock(timeout=None):
+    """
+    Serialise read-modify-write cycles on the queue file.
 
-def log_event(event_type, user, message):
-    """Log event to centralized event logger."""
-    if EVENT_LOGGER.exists():
+    Yields True once the lock is held, or False if another process (normally a
+    running scheduler pass) still holds it after `timeout` seconds. Waits
+    indefinitely when timeout is None.
+    """
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(QUEUE_LOCK, "a") as f:
+        if timeout is None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        yield False
+                        return
+                    time.sleep(LOCK_POLL_SECONDS)
         try:
-            subprocess.run(
-                ["python3", str(EVENT_LOGGER), event_type, "--user", user, "--message", message],
-                capture_output=True,
-                timeout=10,
-            )
-        except Exception:
-            pass
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
 
 
-def add_to_queue(user, container, max_gpus):
-    """Add a user to the GPU queue."""
-    queue = load_queue()
+def log_event(event_type, user, **details):
+    """Log event to the centralized event log (best-effort)."""
+    _log_event(event_type, user=user, source="gpu-queue-manager", **details)
+
+
+# ============================================================================
+# Scheduling policy
+# ============================================================================
+
+
+def queue_settings(config):
+    """Scheduler settings from a parsed resource-limits.yaml (gpu_allocation.queue)."""
+    settings = dict(QUEUE_DEFAULTS)
+    try:
+        queue_config = (config.get("gpu_allocation") or {}).get("queue") or {}
+        for key, default in QUEUE_DEFAULTS.items():
+            if queue_config.get(key) is not None:
+                settings[key] = type(default)(queue_config[key])
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return settings
+
+
+def load_queue_config(config_path=CONFIG_FILE):
+    """Scheduler settings from gpu_allocation.queue, falling back to QUEUE_DEFAULTS."""
+    try:
+        import yaml
+
+        with open(config_path) as f:
+            config = yaml.safe_load(f) or {}
+    except Exception:
+        return dict(QUEUE_DEFAULTS)
+    return queue_settings(config)
+
+
+def get_user_priority(user):
+    """Group/user `priority` from resource-limits.yaml (DEFAULT_PRIORITY on any error)."""
+    try:
+        sys.path.insert(0, str(SCRIPT_DIR))
+        from get_resource_limits import ResourceLimitParser
+
+        limits = ResourceLimitParser(str(CONFIG_FILE)).get_user_limits(user)
+        return int(limits.get("priority", DEFAULT_PRIORITY))
+    except Exception:
+        return DEFAULT_PRIORITY
+
+
+def effective_priority(entry, now, aging_per_hour):
+    """Base priority plus the aging bonus for time spent waiting."""
+    base = float(entry.get("priority", DEFAULT_PRIORITY))
+    requested = _parse_timestamp(entry.get("requested_at"))
+    if requested is None:
+        return base
+    waited_hours = max(0.0, (now - requested).total_seconds() / 3600)
+    return base + aging_per_hour * waited_hours
+
+
+def order_queue(queue, now=None, aging_per_hour=QUEUE_DEFAULTS["aging_per_hour"]):
+    """
+    Sort entries into scheduling order: holders of a reservation first, then
+    by effective priority (highest first), then by request time.
+
+    Every waiter ages at the same rate, so the relative order of two waiters
+    never changes over time and the saved order stays valid between passes.
+    """
+    now = now or _now()
+
+    def sort_key(entry):
+        requested = _parse_timestamp(entry.get("requested_at")) or datetime.max
+        return (
+            not entry.get("reservation"),
+            -effective_priority(entry, now, aging_per_hour),
+            requested,
+        )
 
-    # Check if user already in queue for this container
+    return sorted(queue, key=sort_key)
+
+
+def _reservation_expiry(entry, now):
+    """Expiry of the entry's reservation, or None if it has no live reservation."""
+    reservation = entry.get("reservation") or {}
+    expires_at = _parse_timestamp(reservation.get("expires_at"))
+    return expires_at if expires_at is not None and expires_at > now else None
+
+
+def active_reservations(queue, now=None, ttl_minutes=None):
+    """
+    Map of GPU slot -> user for reservations that have not yet expired.
+
+    With ttl_minutes, a reservation expiring later than one TTL from now cannot
+    have been made by the scheduler and is ignored.
+    """
+    now = now or _now()
+    latest = now + timedelta(minutes=ttl_minutes) if ttl_minutes is not None else None
+    held = {}
     for entry in queue:
-        if entry["user"] == user and entry["container"] == container:
-            print(f"Already in queue for container '{container}'")
-            return False
-
-    # Add new entry
-    entry = {
-        "user": user,
-        "container": container,
-        "max_gpus": max_gpus,
-        "requested_at": datetime.now(tz=None).isoformat() + "Z",
-        "notified": False,
-        "notification_sent_at": None,
-    }
+        expires_at = _reservation_expiry(entry, now)
+        if expires_at is None or (latest is not None and expires_at > latest):
+            continue
+        for slot in entry["reservation"].get("slots", []):
+            held[str(slot)] = entry.get("user")
+    return held
+
+
+def _clear_reservation(entry):
+    entry["reservation"] = None
+    entry["notified"] = False
+    entry["notification_sent_at"] = None
+
+
+def settle_reservations(queue, allocations, now=None, max_missed=QUEUE_DEFAULTS["max_missed"]):
+    """
+    Resolve reservations against the current allocations (gpu-state-reader format).
+
+    - Fulfilled: the waiter now holds one of its reserved slots -> entry removed.
+    - Taken: a reserved slot went to someone else -> reservation dropped, no penalty.
+    - Lapsed: expired unused -> back of its priority band; dropped after max_missed.
+
+    Returns the new queue list.
+    """
+    now = now or _now()
+    kept = []
+    for entry in queue:
+        reservation = entry.get("reservation")
+        if not reservation:
+            kept.append(entry)
+            continue
+
+        user = entry["user"]
+        slots = [str(s) for s in reservation.get("slots", [])]
+        if any(user in allocations.get(slot, {}).get("users", {}) for slot in slots):
+            log_event("queue.fulfilled", user, container=entry["container"], gpu=",".join(slots))
+            continue
+
+        if any(slot in allocations for slot in slots):
+            _clear_reservation(entry)
+            kept.append(entry)
+            continue
+
+        if _reservation_expiry(entry, now) is not None:
+            kept.append(entry)
+            continue
+
+        entry["missed"] = entry.get("missed", 0) + 1
+        _clear_reservation(entry)
+        if entry["missed"] >= max_missed:
+            log_event("queue.dropped", user, container=entry["container"], missed=entry["missed"])
+            print(f"Dropped {user} from queue for '{entry['container']}' (reservation unused)")
+            continue
+
+        entry["requested_at"] = _timestamp(now)
+        log_event("queue.lapsed", user, container=entry["container"], missed=entry["missed"])
+        kept.append(entry)
+
+    return kept
+
+
+def _find_slots(allocator, entry, excluded):
+    """
+    Pick free slots for a waiter, skipping `excluded` (already reserved).
+
+    Returns (slots, blocked): slots is None if the waiter cannot be served now;
+    blocked is True when that is because the cluster is full, in which case no
+    lower-priority waiter should jump ahead of it.
+    """
+    user = entry["user"]
+    needed = max(1, int(entry.get("max_gpus", 1)))
+    checker = allocator.availability_checker
+
+    max_gpueq = allocator._get_user_max_gpu_equivalents(user)
+    if not checker.get_user_available_gpus(user, max_gpueq)["can_allocate"]:
+        # At quota: this waiter has to release something first
+        return None, False
+
+    allow_full = allocator._can_use_full_gpu(user)
+    if needed == 1:
+        suggestion = checker.suggest_gpu_for_user(
+            user,
+            max_gpueq,
+            entry.get("priority", DEFAULT_PRIORITY),
+            allow_full_gpu=allow_full,
+            exclude_slots=sorted(excluded),
+        )
+        return ([suggestion["gpu_slot"]], False) if suggestion.get("success") else (None, True)
 
-    queue.append(entry)
-    save_queue(queue)
+    # The same topology-aware set allocate_multi_gpu would pick, all or nothing
+    suggestion = checker.suggest_gpu_set_for_user(
+        user, needed, max_gpueq, allow_full_gpu=allow_full, exclude_slots=sorted(excluded)
+    )
+    return (suggestion["gpu_slots"], False) if suggestion.get("success") else (None, True)
+
+
+def _load_allocator():
+    sys.path.insert(0, str(SCRIPT_DIR))
+    from gpu_allocator_v2 import GPUAllocatorSmart
+
+    return GPUAllocatorSmart(str(CONFIG_FILE))
+
+
+# ============================================================================
+# Commands
+# ============================================================================
+
+
+def add_to_queue(user, container, max_gpus):
+    """Add a user to the GPU queue."""
+    with queue_lock():
+        queue = load_queue()
+
+        # Check if user already in queue for this container
+        for entry in queue:
+            if entry["user"] == user and entry["container"] == container:
+                print(f"Already in queue for container '{container}'")
+                return False
+
+        # Add new entry
+        entry = {
+            "user": user,
+            "container": container,
+            "max_gpus": max_gpus,
+            "priority": get_user_priority(user),
+            "requested_at": _timestamp(),
+            "notified": False,
+            "notification_sent_at": None,
+            "reservation": None,
+            "missed": 0,
+        }
+
+        queue.append(entry)
+        queue = order_queue(queue, aging_per_hour=load_queue_config()["aging_per_hour"])
+        save_queue(queue)
 
-    position = len(queue)
-    log_event("queue.joined", user, f"Joined GPU queue at position {position}")
+    position = queue.index(entry) + 1
+    log_event("queue.joined", user, container=container, position=position)
 
     print(f"Added to GPU queue at position {position}")
-    print("You'll be notified when a GPU becomes available.")
+    print("A GPU will be reserved for you and you'll be notified when it is free.")
     print(f"Check your position: gpu-queue-manager.py position {user}")
 
     return True
@@ -112,19 +441,21 @@ def add_to_queue(user, container, max_gpus):
 
 def remove_from_queue(user, container=None):
     """Remove a user from the queue."""
-    queue = load_queue()
-    original_len = len(queue)
+    with queue_lock():
+        queue = load_queue()
+        original_len = len(queue)
 
-    if container:
-        queue = [e for e in queue if not (e["user"] == user and e["container"] == container)]
-    else:
-        queue = [e for e in queue if e["user"] != user]
+        if container:
+            queue = [e for e in queue if not (e["user"] == user and e["container"] == container)]
+        else:
+            queue = [e for e in queue if e["user"] != user]
 
-    removed = original_len - len(queue)
+        removed = original_len - len(queue)
+        if removed > 0:
+            save_queue(queue)
 
     if removed > 0:
-        save_queue(queue)
-        log_event("queue.left", user, f"Left GPU queue ({removed} entries removed)")
+        log_event("queue.left", user, removed=removed)
         print(f"Removed {removed} queue entry/entries for {user}")
     else:
         print(f"No queue entries found for {user}")
@@ -132,56 +463,66 @@ def remove_from_queue(user, container=None):
     return removed > 0
 
 
+def _describe_status(entry, now):
+    expires_at = _reservation_expiry(entry, now)
+    if expires_at is None:
+        return ""
+    slots = ",".join(str(s) for s in entry["reservation"].get("slots", []))
+    return f" (GPU {slots} reserved until {expires_at:%H:%M})"
+
+
 def list_queue():
-    """List all queue entries."""
+    """List all queue entries in scheduling order."""
     queue = load_queue()
 
     if not queue:
         print("GPU queue is empty.")
         return
 
-    print("GPU Request Queue")
-    print("=" * 70)
-    print(f"{'Pos':<4} {'User':<15} {'Container':<20} {'GPUs':<5} {'Waiting Since':<20}")
-    print("-" * 70)
+    now = _now()
+    aging = load_queue_config()["aging_per_hour"]
 
-    for i, entry in enumerate(queue, 1):
-        requested = entry.get("requested_at", "unknown")
-        if requested != "unknown":
-            try:
-                dt = datetime.fromisoformat(requested.replace("Z", "+00:00").replace("+00:00", ""))
-                wait_time = datetime.now(tz=None) - dt.replace(tzinfo=None)
-                hours = int(wait_time.total_seconds() / 3600)
-                mins = int((wait_time.total_seconds() % 3600) / 60)
-                waiting = f"{hours}h {mins}m ago"
-            except Exception:
-                waiting = requested[:19]
+    print("GPU Request Queue")
+    print("=" * 78)
+    print(
+        f"{'Pos':<4} {'User':<15} {'Container':<20} {'GPUs':<5} {'Prio':<6} {'Waiting Since':<20}"
+    )
+    print("-" * 78)
+
+    for i, entry in enumerate(order_queue(queue, now, aging), 1):
+        requested = _parse_timestamp(entry.get("requested_at"))
+        if requested is not None:
+            wait_time = now - requested
+            hours = int(wait_time.total_seconds() / 3600)
+            mins = int((wait_time.total_seconds() % 3600) / 60)
+            waiting = f"{hours}h {mins}m ago"
         else:
             waiting = "unknown"
 
-        notified = " (notified)" if entry.get("notified") else ""
-
+        prio = f"{effective_priority(entry, now, aging):.0f}"
         print(
-            f"{i:<4} {entry['user']:<15} {entry['container']:<20} {entry.get('max_gpus', 1):<5} {waiting}{notified}"
+            f"{i:<4} {entry['user']:<15} {entry['container']:<20} {entry.get('max_gpus', 1):<5} "
+            f"{prio:<6} {waiting}{_describe_status(entry, now)}"
         )
 
-    print("-" * 70)
+    print("-" * 78)
     print(f"Total: {len(queue)} user(s) waiting")
 
 
 def get_position(user):
     """Get user's position in queue."""
     queue = load_queue()
+    now = _now()
 
     positions = []
-    for i, entry in enumerate(queue, 1):
+    for i, entry in enumerate(order_queue(queue, now, load_queue_config()["aging_per_hour"]), 1):
         if entry["user"] == user:
             positions.append(
                 {
                     "position": i,
                     "container": entry["container"],
                     "max_gpus": entry.get("max_gpus", 1),
-                    "notified": entry.get("notified", False),
+                    "status": _describe_status(entry, now),
                 }
             )
 
@@ -191,44 +532,26 @@ def get_position(user):
 
     print(f"Queue positions for {user}:")
     for p in positions:
-        status = " (notified - GPU available!)" if p["notified"] else ""
-        print(f"  Position {p['position']}: {p['container']} ({p['max_gpus']} GPU(s)){status}")
+        print(f"  Position {p['position']}: {p['container']} ({p['max_gpus']} GPU(s)){p['status']}")
 
     return positions
 
 
-def check_gpu_available(user, max_gpus):
-    """Check if a GPU is available for this user."""
-    if not GPU_AVAILABILITY_CHECKER.exists():
-        return False
-
-    try:
-        result = subprocess.run(
-            ["python3", str(GPU_AVAILABILITY_CHECKER), user, "--count"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-
-        if result.returncode == 0:
-            available = int(result.stdout.strip())
-            return available >= max_gpus
-    except Exception:
-        pass
-
-    return False
-
-
-def create_notification(user, container, position):
+def create_notification(user, container, position, slots, expires_at):
     """Create a notification for the user."""
     ALERTS_DIR.mkdir(parents=True, exist_ok=True)
     alerts_file = ALERTS_DIR / f"{user}.json"
 
+    until = _parse_timestamp(expires_at)
+    until = f"{until:%H:%M}" if until else "soon"
     alert = {
         "type": "gpu_available",
-        "message": f"GPU now available! You were #{position} in queue for '{container}'. Run: container-deploy {container}",
-        "created_at": datetime.now(tz=None).isoformat() + "Z",
-        "updated_at": datetime.now(tz=None).isoformat() + "Z",
+        "message": (
+            f"GPU {','.join(slots)} reserved for you until {until}. You were #{position} in "
+            f"queue for '{container}'. Run: container-deploy {container}"
+        ),
+        "created_at": _timestamp(),
+        "updated_at": _timestamp(),
     }
 
     # Load existing alerts
@@ -240,15 +563,13 @@ def create_notification(user, container, position):
         except (OSError, json.JSONDecodeError):
             alerts = []
 
-    # Check if similar alert already exists
-    for a in alerts:
-        if a["type"] == "gpu_available" and container in a.get("message", ""):
-            # Update existing alert
-            a["updated_at"] = datetime.now(tz=None).isoformat() + "Z"
-            break
-    else:
-        # Add new alert
-        alerts.append(alert)
+    # Replace an earlier alert for the same container (its reservation has changed)
+    alerts = [
+        a
+        for a in alerts
+        if not (a.get("type") == "gpu_available" and f"'{container}'" in a.get("message", ""))
+    ]
+    alerts.append(alert)
 
     with open(alerts_file, "w") as f:
         json.dump(alerts, f, indent=2)
@@ -256,81 +577,197 @@ def create_notification(user, container, position):
     alerts_file.chmod(0o644)
 
 
-def process_queue():
-    """Process the queue and notify users when GPUs become available."""
-    queue = load_queue()
-
-    if not queue:
-        print("Queue is empty.")
-        return
-
-    modified = False
-    notified_count = 0
-
-    for i, entry in enumerate(queue):
-        if entry.get("notified"):
-            continue
-
-        user = entry["user"]
-        container = entry["container"]
-        max_gpus = entry.get("max_gpus", 1)
-
-        # Check if GPU is available for this user
-        if check_gpu_available(user, max_gpus):
+def process_queue(allocator=None):
+    """
+    One scheduler pass: settle existing reservations, then reserve free GPUs
+    for waiters in priority order until the head of the queue cannot be served.
+
+    Returns the number of reservations made.
+    """
+    # Wait for a running pass rather than skip: it may have read the queue
+    # before the release that triggered this one
+    with queue_lock(timeout=PASS_LOCK_TIMEOUT) as locked:
+        if not locked:
+            print("Scheduler pass still running; giving up.", file=sys.stderr)
+            return 0
+
+        queue = load_queue()
+        if not queue:
+            print("Queue is empty.")
+            return 0
+
+        before = json.dumps(queue, sort_keys=True)
+        settings = load_queue_config()
+        now = _now()
+        if allocator is None:
+            allocator = _load_allocator()
+
+        for entry in queue:
+            # Always from the config: entries from when the queue was group-writable
+            # (or without a priority at all) must not set their own
+            entry["priority"] = allocator._get_user_priority(entry["user"])
+
+        if any(entry.get("reservation") for entry in queue):
+            allocations = allocator.state_reader.get_all_allocations()
+            queue = settle_reservations(queue, allocations, now, settings["max_missed"])
+
+        queue = order_queue(queue, now, settings["aging_per_hour"])
+        excluded = set(active_reservations(queue, now, settings["reservation_ttl_m"]))
+        expires_at = _timestamp(now + timedelta(minutes=settings["reservation_ttl_m"]))
+        reserved_count = 0
+
+        for position, entry in enumerate(queue, 1):
+            if entry.get("reservation"):
+                continue
+
+            slots, blocked = _find_slots(allocator, entry, excluded)
+            if blocked:
+                break
+            if not slots:
+                continue
+
+            entry["reservation"] = {"slots": slots, "expires_at": expires_at}
             entry["notified"] = True
-            entry["notification_sent_at"] = datetime.now(tz=None).isoformat() + "Z"
-            modified = True
-            notified_count += 1
-
-            # Create notification for user
-            create_notification(user, container, i + 1)
-            log_event("queue.notified", user, f"GPU available for {container}")
+            entry["notification_sent_at"] = _timestamp(now)
+            excluded.update(slots)
+            reserved_count += 1
+
+            user, container = entry["user"], entry["container"]
+            create_notification(user, container, position, slots, expires_at)
+            log_event(
+                "queue.reserved",
+                user,
+                container=container,
+                gpu=",".join(slots),
+                expires_at=expires_at,
+            )
+            print(f"Reserved GPU {','.join(slots)} for {user} ('{container}') until {expires_at}")
+
+        if json.dumps(queue, sort_keys=True) != before:
+            save_queue(queue)
+
+    print(f"Processed queue: {reserved_count} reservation(s) made")
+    return reserved_count
+
+
+def watch_queue(interval=60):
+    """
+    Run a scheduler pass whenever a container is destroyed (its GPU is freed)
+    or started (a reservation may have been used), and every `interval`
+    seconds so lapsed reservations are passed on.
+    """
+    import select
+
+    cmd = [
+        DOCKER_BIN,
+        "events",
+        "--format",
+        "{{json .}}",
+        "--filter",
+        "type=container",
+        "--filter",
+        "event=destroy",
+        "--filter",
+        "event=start",
+    ]
+
+    def run_pass():
+        try:
+            process_queue()
+        except Exception as e:
+            print(f"Error: scheduler pass failed: {e}", file=sys.stderr)
 
-            print(f"Notified {user} - GPU available for '{container}'")
+    print(f"Watching Docker events (interval {interval}s)")
+    while True:
+        try:
+            events = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+            )
+        except OSError as e:
+            print(f"Error: cannot start docker events: {e}", file=sys.stderr)
+            time.sleep(5)
+            continue
 
-    if modified:
-        save_queue(queue)
+        try:
+            run_pass()
+            while events.poll() is None:
+                ready, _, _ = select.select([events.stdout], [], [], interval)
+                if ready:
+                    if not events.stdout.readline():
+                        break
+                    # Coalesce bursts (compose down, cleanup sweeps) into one pass
+                    while select.select([events.stdout], [], [], 1.0)[0]:
+                        if not events.stdout.readline():
+                            break
+                run_pass()
+        finally:
+            events.terminate()
+            try:
+                events.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                events.kill()
 
-    print(f"Processed queue: {notified_count} user(s) notified")
+        print("Docker events stream ended, reconnecting...", file=sys.stderr)
+        time.sleep(2)
 
 
 def clean_queue():
     """Remove old queue entries."""
-    queue = load_queue()
-    original_len = len(queue)
-    cutoff = datetime.now(tz=None) - timedelta(hours=QUEUE_RETENTION_HOURS)
+    with queue_lock():
+        queue = load_queue()
+        original_len = len(queue)
+        now = _now()
+        cutoff = now - timedelta(hours=QUEUE_RETENTION_HOURS)
+
+        new_queue = []
+        for entry in queue:
+            # Keep if not notified, still holding a reservation, or notified recently
+            if not entry.get("notified") or _reservation_expiry(entry, now):
+                new_queue.append(entry)
+                continue
+            notified_at = _parse_timestamp(entry.get("notification_sent_at"))
+            if notified_at is not None and notified_at > cutoff:
+                new_queue.append(entry)
+
+        removed = original_len - len(new_queue)
+        if removed > 0:
+            save_queue(new_queue)
 
-    new_queue = []
-    for entry in queue:
-        # Keep if not notified OR notified recently
-        if not entry.get("notified"):
-            new_queue.append(entry)
-        else:
-            notified_at = entry.get("notification_sent_at", "")
-            if notified_at:
-                try:
-                    dt = datetime.fromisoformat(
-                        notified_at.replace("Z", "+00:00").replace("+00:00", "")
-                    )
-                    if dt.replace(tzinfo=None) > cutoff:
-                        new_queue.append(entry)
-                except Exception:
-                    pass
-
-    removed = original_len - len(new_queue)
     if removed > 0:
-        save_queue(new_queue)
         print(f"Cleaned {removed} old queue entries")
     else:
         print("No old entries to clean")
 
 
+def _as_root(argv):
+    """
+    Make sure add/remove run as root, on behalf of the calling user only.
+
+    Non-root callers re-exec through `sudo -n` (the ds01-gpu-queue sudoers rule);
+    under sudo the requested user must be the caller. Root itself may act for
+    anyone.
+    """
+    if os.geteuid() != 0:
+        try:
+            os.execvp("sudo", ["sudo", "-n", str(SELF_PATH), *argv[1:]])
+        except OSError as e:
+            print(f"Error: cannot run gpu-queue through sudo: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    caller = os.environ.get("SUDO_USER")
+    if caller and caller != "root" and argv[2] != caller:
+        print(f"Error: you can only manage your own queue entries ({caller})", file=sys.stderr)
+        sys.exit(1)
+
+
 def main():
     if len(sys.argv) < 2:
         print(__doc__)
         sys.exit(1)
 
     command = sys.argv[1]
+    if command in ("add", "remove") and len(sys.argv) >= 3:
+        _as_root(sys.argv)
 
     if command == "add":
         if len(sys.argv) < 5:
@@ -357,6 +794,12 @@ def main():
     elif command == "process":
         process_queue()
 
+    elif command == "watch":
+        interval = 60
+        if "--interval" in sys.argv:
+            interval = int(sys.argv[sys.argv.index("--interval") + 1])
+        watch_queue(interval)
+
     elif command == "clean":
         clean_queue()
 
@@ -11,6 +11,7 @@ Updated for DS01 Layered Architecture:
 """
 
 import json
+import os
 import pwd
 import re
 import subprocess
@@ -22,6 +23,20 @@ from collections import defaultdict
 # the GPU state reader to miss allocations from other users, leading to
 # incorrect "available" GPU status and double-allocations.
 DOCKER_BIN = "/usr/bin/docker"
+NVIDIA_SMI_BIN = "/usr/bin/nvidia-smi"
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "lib"))
+import ds01_trace  # noqa: E402,F401  (opt-in DS01_TRACE=1 tracing)
+
+try:
+    from ds01_identity import uid_to_name
+except ImportError:
+
+    def uid_to_name(uid) -> str | None:
+        try:
+            return pwd.getpwuid(int(uid)).pw_name
+        except (KeyError, ValueError):
+            return None
 
 
 # Interface detection constants
@@ -144,7 +159,7 @@ class GPUStateReader:
         # Device permissions are 0666 so all users can query nvidia-smi directly
         try:
             result = subprocess.run(
-                ["/usr/bin/nvidia-smi", "-L"],
+                [NVIDIA_SMI_BIN, "-L"],
                 capture_output=True,
                 text=True,
                 check=True,
@@ -275,7 +290,7 @@ class GPUStateReader:
         """Resolve username from AIME container name convention (name._.uid).
 
         Extracts the UID from the container name and resolves it to a username
-        via pwd/getent. This handles containers with missing or incorrect labels.
+        via the shared identity cache. This handles containers with missing or incorrect labels.
         """
         if "._." not in container_name:
             return None
@@ -286,26 +301,7 @@ class GPUStateReader:
         except (ValueError, IndexError):
             return None
 
-        # Try local passwd first
-        try:
-            return pwd.getpwuid(uid).pw_name
-        except KeyError:
-            pass
-
-        # Try getent for LDAP/SSSD users
-        try:
-            result = subprocess.run(
-                ["getent", "passwd", str(uid)],
-                capture_output=True,
-                text=True,
-                timeout=5,
-            )
-            if result.returncode == 0 and result.stdout:
-                return result.stdout.split(":")[0]
-        except (subprocess.TimeoutExpired, subprocess.SubprocessError):
-            pass
-
-        return None
+        return uid_to_name(uid)
 
     def _extract_user_from_cgroup(self, cgroup_parent: str) -> str | None:
         """
@@ -691,27 +687,30 @@ class GPUStateReader:
 
                 # Check if container is in ds01 slice hierarchy
                 container_data = self._get_container_inspect(name)
-                if container_data:
-                    cgroup_parent = container_data.get("HostConfig", {}).get("CgroupParent", "")
-
-                    # Include if:
-                    # 1. In ds01.slice hierarchy
-                    # 2. Has ds01.* labels
-                    # 3. Has AIME naming convention (legacy support)
-                    labels = container_data.get("Config", {}).get("Labels", {}) or {}
-
-                    in_ds01_slice = cgroup_parent.startswith("ds01")
-                    has_ds01_labels = any(k.startswith("ds01.") for k in labels.keys())
-                    has_aime_naming = "._." in name
-
-                    if in_ds01_slice or has_ds01_labels or has_aime_naming:
-                        container_names.append(name)
+                if container_data and self._is_ds01_container(name, container_data):
+                    container_names.append(name)
 
         except (subprocess.CalledProcessError, subprocess.TimeoutExpired):
             pass
 
         return container_names
 
+    @staticmethod
+    def _is_ds01_container(name: str, container_data: dict) -> bool:
+        """
+        Whether an inspected container is tracked by DS01. Include if:
+        1. In ds01.slice hierarchy
+        2. Has ds01.* labels
+        3. Has AIME naming convention (legacy support)
+        """
+        cgroup_parent = container_data.get("HostConfig", {}).get("CgroupParent", "") or ""
+        labels = container_data.get("Config", {}).get("Labels", {}) or {}
+
+        in_ds01_slice = cgroup_parent.startswith("ds01")
+        has_ds01_labels = any(k.startswith("ds01.") for k in labels.keys())
+        has_aime_naming = "._." in name
+        return in_ds01_slice or has_ds01_labels or has_aime_naming
+
     def get_all_containers_by_interface(self) -> dict[str, list[dict]]:
         """
         Get all containers grouped by interface.
@@ -805,28 +804,28 @@ class GPUStateReader:
             if container_user != username:
                 continue
 
-            # Get status
-            state = container_data.get("State", {})
-            is_running = state.get("Running", False)
-            status = state.get("Status", "unknown")
-            interface = gpu_info.get("interface", INTERFACE_DOCKER)
-
             user_allocations.append(
-                {
-                    "container": container_name,
-                    "gpu_slot": gpu_info["gpu_slot"],  # Primary slot (backward compat)
-                    "gpu_uuid": gpu_info["gpu_uuid"],  # Primary UUID (backward compat)
-                    "gpu_slots": gpu_info.get("gpu_slots", [gpu_info["gpu_slot"]]),  # All slots
-                    "gpu_uuids": gpu_info.get("gpu_uuids", [gpu_info["gpu_uuid"]]),  # All UUIDs
-                    "mig_equiv": gpu_info.get("mig_equiv", 1),  # MIG-equivalents
-                    "status": status,
-                    "running": is_running,
-                    "interface": interface,
-                }
+                self._allocation_entry(container_name, container_data, gpu_info)
             )
 
         return user_allocations
 
+    @staticmethod
+    def _allocation_entry(container_name: str, container_data: dict, gpu_info: dict) -> dict:
+        """Allocation record (get_user_allocations format) for an inspected container."""
+        state = container_data.get("State", {})
+        return {
+            "container": container_name,
+            "gpu_slot": gpu_info["gpu_slot"],  # Primary slot (backward compat)
+            "gpu_uuid": gpu_info["gpu_uuid"],  # Primary UUID (backward compat)
+            "gpu_slots": gpu_info.get("gpu_slots", [gpu_info["gpu_slot"]]),  # All slots
+            "gpu_uuids": gpu_info.get("gpu_uuids", [gpu_info["gpu_uuid"]]),  # All UUIDs
+            "mig_equiv": gpu_info.get("mig_equiv", 1),  # MIG-equivalents
+            "status": state.get("Status", "unknown"),
+            "running": state.get("Running", False),
+            "interface": gpu_info.get("interface", INTERFACE_DOCKER),
+        }
+
     def get_user_mig_total(self, username: str) -> int:
         """
         Get total MIG-equivalents allocated to a user across all containers.
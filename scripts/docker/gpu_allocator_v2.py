@@ -17,6 +17,7 @@ import json
 import signal
 import subprocess
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 
@@ -59,6 +60,36 @@ except ImportError:
         return False
 
 
+# Opt-in tracing (DS01_TRACE=1) - no-op otherwise, and optional like event logging
+try:
+    from ds01_trace import install as trace_install
+    from ds01_trace import record as trace_record
+    from ds01_trace import span as trace_span
+
+    trace_install("gpu-allocator")
+except ImportError:
+    from contextlib import nullcontext
+
+    def trace_span(*args, **kwargs):
+        return nullcontext()
+
+    def trace_record(*args, **kwargs) -> None:
+        pass
+
+
+# Self-observability metrics, read by ds01_exporter.py (optional, never blocks allocation)
+try:
+    from ds01_selfmetrics import observe as observe_metric
+    from ds01_selfmetrics import outcome_label
+except ImportError:
+
+    def observe_metric(*args, **kwargs) -> bool:
+        return False
+
+    def outcome_label(reason) -> str:
+        return "OTHER"
+
+
 # Dynamic import for gpu-state-reader.py
 spec = importlib.util.spec_from_file_location(
     "gpu_state_reader", str(SCRIPT_DIR / "gpu-state-reader.py")
@@ -66,6 +97,7 @@ spec = importlib.util.spec_from_file_location(
 gpu_state_module = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(gpu_state_module)
 GPUStateReader = gpu_state_module.GPUStateReader
+NVIDIA_SMI_BIN = gpu_state_module.NVIDIA_SMI_BIN
 
 # Dynamic import for gpu-availability-checker.py
 spec = importlib.util.spec_from_file_location(
@@ -75,6 +107,13 @@ gpu_avail_module = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(gpu_avail_module)
 GPUAvailabilityChecker = gpu_avail_module.GPUAvailabilityChecker
 
+# Dynamic import for gpu-queue-manager.py (reservations handed to queued users)
+spec = importlib.util.spec_from_file_location(
+    "gpu_queue_manager", str(SCRIPT_DIR / "gpu-queue-manager.py")
+)
+gpu_queue_module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(gpu_queue_module)
+
 
 class GPUAllocatorSmart:
     # Safe defaults for fail-open when config loading fails
@@ -124,14 +163,27 @@ class GPUAllocatorSmart:
         # Set up timeout signal handler
         signal.signal(signal.SIGALRM, self._timeout_handler)
         signal.alarm(timeout)
+        wait_start = time.monotonic()
 
         try:
-            self._lock_fd = open(self.lock_file, "w")
-            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            with trace_span("lock.wait", lock=str(self.lock_file)):
+                self._lock_fd = open(self.lock_file, "w")
+                fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
             signal.alarm(0)  # Cancel alarm on success
+            self._lock_acquired_at = time.monotonic()
+            observe_metric(
+                "ds01_allocator_lock_wait_seconds",
+                self._lock_acquired_at - wait_start,
+                outcome="acquired",
+            )
             return True
         except TimeoutError:
             signal.alarm(0)  # Cancel alarm
+            observe_metric(
+                "ds01_allocator_lock_wait_seconds",
+                time.monotonic() - wait_start,
+                outcome="timeout",
+            )
             # Fail-open: log error but continue without lock
             log_event(
                 "gpu.allocation.lock_timeout",
@@ -152,6 +204,9 @@ class GPUAllocatorSmart:
             fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
             self._lock_fd.close()
             self._lock_fd = None
+            held = time.monotonic() - self._lock_acquired_at
+            trace_record("lock.hold", held, lock=str(self.lock_file))
+            observe_metric("ds01_allocator_lock_hold_seconds", held)
 
     def _load_config(self) -> dict:
         """Load YAML configuration and merge external group membership files."""
@@ -253,6 +308,23 @@ class GPUAllocatorSmart:
         limits = self._get_user_limits(username)
         return limits.get("priority", 10)
 
+    def _get_queue_reservations(self, username: str) -> tuple[list, list]:
+        """
+        Slots the GPU queue currently holds for other users, and for this user.
+
+        gpu-queue-manager.py reserves freed GPUs for the head of the queue; the
+        first list is excluded from allocation, the second is preferred. An
+        unreadable or untrusted queue means no reservations (fail-open).
+        """
+        try:
+            settings = gpu_queue_module.queue_settings(self.config)
+            held = gpu_queue_module.load_reservations(settings)
+        except Exception:
+            return [], []
+        others = sorted(slot for slot, user in held.items() if user != username)
+        own = sorted(slot for slot, user in held.items() if user == username)
+        return others, own
+
     def _check_aggregate_gpu_quota(
         self, username: str, requested_gpueq: float
     ) -> tuple[bool, str | None]:
@@ -506,12 +578,15 @@ class GPUAllocatorSmart:
             # Find available GPU
             # Pass allow_full_gpu to availability checker so it can filter appropriately
             allow_full = self._can_use_full_gpu(username)
+            reserved_for_others, own_reserved = self._get_queue_reservations(username)
             suggestion = self.availability_checker.suggest_gpu_for_user(
                 username,
                 max_gpueq,
                 self._get_user_priority(username),
                 require_full_gpu=require_full_gpu,
                 allow_full_gpu=allow_full,
+                exclude_slots=reserved_for_others,
+                prefer_slots=own_reserved,
             )
 
             if not suggestion["success"]:
@@ -558,6 +633,7 @@ class GPUAllocatorSmart:
                 source="gpu_allocator",
                 container=container,
                 gpu_uuid=gpu_slot,
+                mig_profile=suggestion.get("profile"),
                 reason=reason,
             )
 
@@ -635,29 +711,21 @@ class GPUAllocatorSmart:
                 self._log_event("REJECTED", username, container, reason=err)
                 return [], 0, 0.0, err
 
-            # Allocate slots one at a time (each slot is a full GPU today).
-            can_use_full = self._can_use_full_gpu(username)
-            allocated_slots = []
-            for _ in range(num_gpus):
-                suggestion = self.availability_checker.suggest_gpu_for_user(
-                    username,
-                    max_per_container,
-                    self._get_user_priority(username),
-                    require_full_gpu=False,
-                    allow_full_gpu=can_use_full,
-                    exclude_slots=allocated_slots,
-                )
-                if suggestion["success"]:
-                    allocated_slots.append(suggestion["gpu_slot"])
-                else:
-                    reason = suggestion.get("error", "NO_GPU_AVAILABLE")
-                    self._log_event("REJECTED", username, container, reason=reason)
-                    return [], 0, 0.0, reason
-
-            if not allocated_slots:
-                reason = "NO_GPU_AVAILABLE"
+            # Pick the whole set at once: best interconnect first, all or nothing.
+            reserved_for_others, own_reserved = self._get_queue_reservations(username)
+            suggestion = self.availability_checker.suggest_gpu_set_for_user(
+                username,
+                num_gpus,
+                max_per_container,
+                allow_full_gpu=self._can_use_full_gpu(username),
+                exclude_slots=reserved_for_others,
+                prefer_slots=own_reserved,
+            )
+            if not suggestion["success"]:
+                reason = suggestion.get("error", "NO_GPU_AVAILABLE")
                 self._log_event("REJECTED", username, container, reason=reason)
                 return [], 0, 0.0, reason
+            allocated_slots = suggestion["gpu_slots"]
 
             # Log allocation
             slots_str = ",".join(allocated_slots)
@@ -682,7 +750,7 @@ class GPUAllocatorSmart:
         # Device permissions are 0666 so all users can query nvidia-smi directly
         try:
             result = subprocess.run(
-                ["/usr/bin/nvidia-smi", "-L"],
+                [NVIDIA_SMI_BIN, "-L"],
                 capture_output=True,
                 text=True,
                 check=True,
@@ -897,12 +965,15 @@ class GPUAllocatorSmart:
 
             # Find available GPU using availability checker
             allow_full = self._can_use_full_gpu(username)
+            reserved_for_others, own_reserved = self._get_queue_reservations(username)
             suggestion = self.availability_checker.suggest_gpu_for_user(
                 username,
                 max_allowed,
                 self._get_user_priority(username),
                 require_full_gpu=False,
                 allow_full_gpu=allow_full,
+                exclude_slots=reserved_for_others,
+                prefer_slots=own_reserved,
             )
 
             if not suggestion["success"]:
@@ -1119,6 +1190,16 @@ class GPUAllocatorSmart:
         return removed
 
 
+def _observe_allocation(operation: str, started: float, reason: str) -> None:
+    """Record CLI allocation latency for ds01_allocation_duration_seconds."""
+    observe_metric(
+        "ds01_allocation_duration_seconds",
+        time.monotonic() - started,
+        operation=operation,
+        outcome=outcome_label(reason),
+    )
+
+
 def main():
     """CLI interface"""
     import argparse
@@ -1182,10 +1263,12 @@ def main():
         parser.print_help()
         sys.exit(1)
 
+    started = time.monotonic()  # Latency includes config load and state read
     allocator = GPUAllocatorSmart()
 
     if args.command == "allocate":
         gpu_id, reason = allocator.allocate_gpu(args.user, args.container, args.max_gpus)
+        _observe_allocation("allocate", started, reason)
 
         if gpu_id and reason not in ["ALREADY_ALLOCATED"]:
             docker_id = allocator.get_docker_id(gpu_id)
@@ -1201,6 +1284,7 @@ def main():
 
     elif args.command == "release":
         gpu_id, reason = allocator.release_gpu(args.container)
+        _observe_allocation("release", started, reason)
         if gpu_id:
             print(f"✓ Released GPU/MIG {gpu_id} from {args.container}")
         else:
@@ -1242,6 +1326,7 @@ def main():
             args.num_gpus,
             prefer_full_gpu=args.prefer_full,
         )
+        _observe_allocation("allocate_multi", started, reason)
 
         if gpu_slots and reason == "SUCCESS":
             # Get Docker IDs for all slots
@@ -1269,6 +1354,7 @@ def main():
     elif args.command == "allocate-external":
         # For docker-wrapper.sh - external containers (devcontainer, compose, docker run)
         docker_id, reason = allocator.allocate_external(args.user, args.container_type)
+        _observe_allocation("allocate_external", started, reason)
 
         if docker_id and reason == "SUCCESS":
             # Output format expected by docker-wrapper.sh
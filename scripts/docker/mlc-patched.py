@@ -19,6 +19,10 @@
 #      - Adds ds01.managed label
 #      - Adds ds01.custom_image label when custom image used
 #
+#   3. Startup caches (ml_images.repo catalog, host GPU architecture)
+#      - Catalog parsed once into an index, reused until the repo file changes
+#      - `apt list --installed` only re-run when dpkg's status file changes
+#
 # COMPATIBILITY:
 #   - 100% backward compatible with original mlc.py
 #   - All AIME commands (mlc open, etc.) work unchanged
@@ -579,27 +583,12 @@ def extract_from_ml_images(filename, filter_architecture=None):
     if filter_architecture is None:
         _, filter_architecture, _ = get_host_gpu_architecture()
 
-    frameworks_dict = {}
-    headers = ["framework", "version", "architecture", "docker image"]
-    separator = ";"
-    with open(filename, mode="r") as file:
-        reader = csv.DictReader(file, fieldnames=headers)
-        for row in reader:
-            stripped_row = {
-                key: value.strip() if isinstance(value, str) else value
-                for key, value in row.items()
-            }
-            framework = stripped_row["framework"]
-            version = stripped_row["version"]
-            architecture = stripped_row["architecture"].strip("[]").split(separator)
-            docker_image = stripped_row["docker image"]
-            if filter_architecture in architecture:
-                if framework not in frameworks_dict:
-                    frameworks_dict[framework] = []
-                    frameworks_dict[framework].append((version, docker_image))
-                else:
-                    frameworks_dict[framework].append((version, docker_image))
-    return frameworks_dict
+    # DS01 PATCH: Served from the precompiled catalog index (see load_ml_images_catalog)
+    by_architecture = load_ml_images_catalog(filename)["by_architecture"]
+    return {
+        framework: [tuple(entry) for entry in entries]
+        for framework, entries in by_architecture.get(filter_architecture, {}).items()
+    }
 
 
 def existing_user_containers(user_name, mlc_command):
@@ -713,22 +702,8 @@ def get_gpu_architectures(filename):
         list: provides a list of the available gpu architectures.
     """
 
-    # Creating a set to keep only unique items
-    unique_architectures = set()
-
-    headers = ["framework", "version", "architecture", "docker image"]
-    separator = ";"
-    with open(filename, mode="r") as file:
-        reader = csv.DictReader(file, fieldnames=headers)
-        for row in reader:
-            stripped_row = {
-                key: value.strip() if isinstance(value, str) else value
-                for key, value in row.items()
-            }
-            architecture = stripped_row["architecture"].strip("[]").split(separator)
-            unique_architectures.update(architecture)
-
-    available_architectures = list(unique_architectures)
+    # DS01 PATCH: Served from the precompiled catalog index (see load_ml_images_catalog)
+    available_architectures = list(load_ml_images_catalog(filename)["architectures"])
     if not available_architectures:
         print(f"{ERROR}No gpu architectures found.{RESET}")
         exit(1)
@@ -846,7 +821,135 @@ def get_docker_image(version, images):
     raise ValueError("No version available")
 
 
+# ========== DS01 PATCH: Startup caches ==========
+# `apt list --installed` takes seconds and the catalog CSV was re-parsed on every
+# call, so each interactive `mlc create` paid for both. Results are kept in a
+# small JSON cache: the architecture keyed on the dpkg status file's mtime (it
+# only changes when packages are installed/removed), the catalog keyed on the
+# repo file's mtime and size. The system cache is written by root (deploy/sudo);
+# other users fall back to a per-uid file. Only caches owned by root or the
+# caller are trusted, since they decide which image gets pulled.
+DPKG_STATUS_FILE = pathlib.Path("/var/lib/dpkg/status")
+MLC_CACHE_FILES = (
+    pathlib.Path("/var/lib/ds01/mlc-cache.json"),
+    pathlib.Path(f"/tmp/ds01-mlc-cache-{os.getuid()}.json"),
+)
+_mlc_caches = None
+
+
+def _file_key(path):
+    try:
+        stat = pathlib.Path(path).stat()
+    except OSError:
+        return None
+    return [str(path), stat.st_mtime_ns, stat.st_size]
+
+
+def _load_mlc_caches():
+    """Trusted cache files, as {path: contents}, in MLC_CACHE_FILES order."""
+    global _mlc_caches
+    if _mlc_caches is None:
+        _mlc_caches = {}
+        for path in MLC_CACHE_FILES:
+            try:
+                if path.stat().st_uid in (0, os.getuid()):
+                    _mlc_caches[path] = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+    return _mlc_caches
+
+
+def _cached(name, key):
+    """Value stored under `name` in any cache file, if it was stored for `key`."""
+    if not key:
+        return None
+    for cache in _load_mlc_caches().values():
+        entry = cache.get(name)
+        if isinstance(entry, dict) and entry.get("key") == key:
+            return entry
+    return None
+
+
+def _save_mlc_cache(name, entry):
+    """Store an entry in the first writable cache file (never raises)."""
+    caches = _load_mlc_caches()
+    for path in MLC_CACHE_FILES:
+        cache = {**caches.get(path, {}), name: entry}
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(cache))
+            os.replace(tmp, path)
+            caches[path] = cache
+            return
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+
+
+def load_ml_images_catalog(filename):
+    """Parse ml_images.repo once into an index, cached until the file changes.
+
+    Args:
+        filename (str): path of the ml_images.repo file.
+
+    Returns:
+        dict: "architectures" (sorted list) and "by_architecture"
+            ({architecture: {framework: [[version, docker image], ...]}}, file order).
+    """
+    repo_key = _file_key(filename)
+    cached = _cached("catalog", repo_key)
+    if cached:
+        return cached
+
+    by_architecture = {}
+    headers = ["framework", "version", "architecture", "docker image"]
+    separator = ";"
+    with open(filename) as file:
+        reader = csv.DictReader(file, fieldnames=headers)
+        for row in reader:
+            stripped_row = {
+                key: value.strip() if isinstance(value, str) else value
+                for key, value in row.items()
+            }
+            framework = stripped_row["framework"]
+            version = stripped_row["version"]
+            docker_image = stripped_row["docker image"]
+            for architecture in stripped_row["architecture"].strip("[]").split(separator):
+                frameworks = by_architecture.setdefault(architecture, {})
+                frameworks.setdefault(framework, []).append([version, docker_image])
+
+    catalog = {
+        "key": repo_key,
+        "architectures": sorted(by_architecture),
+        "by_architecture": by_architecture,
+    }
+    _save_mlc_cache("catalog", catalog)
+    return catalog
+
+
 def get_host_gpu_architecture():
+    """Host GPU architecture, cached until /var/lib/dpkg/status changes.
+
+    Returns:
+        tuple: see detect_host_gpu_architecture().
+    """
+    key = _file_key(DPKG_STATUS_FILE)
+    cached = _cached("host_architecture", key)
+    if cached:
+        return tuple(cached["value"])
+
+    detected = detect_host_gpu_architecture()
+    if key:
+        _save_mlc_cache("host_architecture", {"key": key, "value": list(detected)})
+    return detected
+
+
+# ========== END DS01 PATCH ==========
+
+
+def detect_host_gpu_architecture():
     """Detects the GPU architecture (CUDA or ROCm) installed on the host system.
 
     This function uses the `apt list --installed` command to inspect installed packages
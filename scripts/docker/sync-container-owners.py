@@ -35,6 +35,14 @@ RESOURCE_LIMITS = Path("/opt/ds01-infra/config/runtime/resource-limits.yaml")
 WATCH_INTERVAL = 5  # seconds between updates in watch mode
 DOCKER_BIN = "/usr/bin/docker"
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+
+# Cached group membership (in-process LRU + on-disk snapshot)
+try:
+    from ds01_identity import group_members
+except ImportError:
+    group_members = None
+
 
 @contextmanager
 def file_lock(lock_path: Path, timeout: float = 10.0) -> Generator[None, None, None]:
@@ -119,6 +127,9 @@ def get_admin_users() -> list:
             print(f"Warning: Could not read resource-limits.yaml: {e}", file=sys.stderr)
 
     # Source 2: Linux group ds01-admin
+    if group_members is not None:
+        admins.update(group_members("ds01-admin"))
+        return sorted(list(admins))
     try:
         result = subprocess.run(
             ["getent", "group", "ds01-admin"], capture_output=True, text=True, timeout=10
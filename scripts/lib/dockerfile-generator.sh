@@ -7,6 +7,30 @@
 #
 # This library provides a single source of truth for Dockerfile generation,
 # used by both project-init and image-create.
+#
+# Layers are ordered for cache reuse across users: instructions identical for
+# everyone on a base image (FROM, base apt packages, default pip packages)
+# come first, per-project packages next, per-user values (LABEL, ARG) last.
+# apt and pip run with BuildKit cache mounts shared by all builds on the host,
+# and ds01-warm-images pre-builds the shared prefix for each framework.
+
+# System packages every DS01 image gets (one shared layer per base image)
+DS01_BASE_SYSTEM_PACKAGES="git curl wget vim htop"
+
+# Default package sets offered by image-create (pre-built by ds01-warm-images)
+DS01_JUPYTER_PACKAGES="jupyter jupyterlab ipykernel ipywidgets notebook"
+DS01_DATA_SCIENCE_PACKAGES="pandas scipy scikit-learn matplotlib seaborn"
+
+# BuildKit cache mounts shared by every build on the host
+DS01_PIP_CACHE_MOUNT="--mount=type=cache,id=ds01-pip,target=/root/.cache/pip"
+DS01_APT_CACHE_MOUNT="--mount=type=cache,id=ds01-apt-cache,target=/var/cache/apt,sharing=locked"
+DS01_APT_LISTS_MOUNT="--mount=type=cache,id=ds01-apt-lists,target=/var/lib/apt/lists,sharing=locked"
+
+# Matches generated pip lines with or without cache mounts (older files use --no-cache-dir)
+DS01_PIP_RUN_REGEX='^RUN ([[:space:]]*--mount=[^[:space:]]+)*[[:space:]]*pip install'
+
+# Tag prefix for the pre-built shared layers (see ds01-warm-images)
+DS01_WARM_IMAGE_PREFIX="ds01-warm"
 
 # Read packages from requirements.txt file
 # Args: $1 = file path
@@ -150,44 +174,23 @@ generate_dockerfile() {
 # Author: $username
 #
 # Build with: image-update $project
-# Or: docker build -t ds01-${user_id}/${project}:latest .
+# Or: DOCKER_BUILDKIT=1 docker build -t ds01-${user_id}/${project}:latest .
 
 FROM $base_image
 
-# DS01 metadata labels
-LABEL maintainer="$username"
-LABEL maintainer.id="$user_id"
-LABEL ds01.project="$project"
-LABEL ds01.framework="$framework"
-LABEL ds01.created="$(date -Iseconds)"
-LABEL ds01.managed="true"
-
-# Build arguments (set automatically by DS01)
-ARG DS01_USER_ID=${user_id}
-ARG DS01_GROUP_ID=${user_id}
-ARG DS01_USERNAME=${username}
-
 EOF
 
     # === SYSTEM PACKAGES ===
     if [ "$skip_system" != true ] && [ "$minimal" != true ]; then
-        cat >>"$output" <<'EOF'
-# System packages
-RUN apt-get update && apt-get install -y --no-install-recommends \
-    git \
-    curl \
-    wget \
-    vim \
-    htop \
-EOF
-        # Add custom system packages
+        echo "# System packages" >>"$output"
+        _write_apt_install "$output" "$DS01_BASE_SYSTEM_PACKAGES"
+        echo "" >>"$output"
+        # Own layer, so the base packages layer above stays shared
         if [ -n "$system_packages" ]; then
-            for pkg in $system_packages; do
-                echo "    $pkg \\" >>"$output"
-            done
+            echo "# Additional system packages" >>"$output"
+            _write_apt_install "$output" "$system_packages"
+            echo "" >>"$output"
         fi
-        echo "    && rm -rf /var/lib/apt/lists/*" >>"$output"
-        echo "" >>"$output"
     fi
 
     # === PYTHON PACKAGES ===
@@ -234,6 +237,11 @@ RUN jupyter lab --generate-config 2>/dev/null || true && \\
 EOF
     fi
 
+    # === METADATA ===
+    # Last: the timestamp changes on every build and would otherwise
+    # invalidate every layer after it
+    _write_metadata "$output" "$username" "$user_id" "$project" "$framework"
+
     # === FOOTER ===
     cat >>"$output" <<'EOF'
 # Working directory (mapped to ~/workspace/<project>)
@@ -246,7 +254,94 @@ EOF
     echo "$output"
 }
 
-# Helper: Write pip install block with proper line continuation
+# Generate the Dockerfile for a framework's warm image: the shared prefix of
+# user Dockerfiles (base apt packages, default Jupyter and data science
+# packages). Instructions must stay byte-identical to what generate_dockerfile
+# and image-create write, otherwise user builds miss the cached layers.
+# Usage: generate_warm_dockerfile <output> <base_image>
+generate_warm_dockerfile() {
+    local output="$1"
+    local base_image="$2"
+
+    mkdir -p "$(dirname "$output")"
+    {
+        echo "# DS01 warm image for $base_image (built by ds01-warm-images)"
+        echo ""
+        echo "FROM $base_image"
+        echo ""
+        echo "# System packages"
+    } >"$output"
+    _write_apt_install "$output" "$DS01_BASE_SYSTEM_PACKAGES"
+    echo "" >>"$output"
+    echo "# Jupyter & Interactive" >>"$output"
+    _write_pip_install "$output" "$DS01_JUPYTER_PACKAGES"
+    echo "" >>"$output"
+    echo "# Core Data Science" >>"$output"
+    _write_pip_install "$output" "$DS01_DATA_SCIENCE_PACKAGES"
+    echo "" >>"$output"
+    echo "LABEL ds01.warm=\"$base_image\"" >>"$output"
+
+    echo "$output"
+}
+
+# Helper: Write DS01 metadata labels and build arguments
+# Usage: _write_metadata <file> <username> <user_id> <project> <framework>
+_write_metadata() {
+    local file="$1"
+    local username="$2"
+    local user_id="$3"
+    local project="$4"
+    local framework="$5"
+
+    cat >>"$file" <<EOF
+# DS01 metadata labels
+LABEL maintainer="$username"
+LABEL maintainer.id="$user_id"
+LABEL ds01.project="$project"
+LABEL ds01.framework="$framework"
+LABEL ds01.created="$(date -Iseconds)"
+LABEL ds01.managed="true"
+
+# Build arguments (set automatically by DS01)
+ARG DS01_USER_ID=${user_id}
+ARG DS01_GROUP_ID=${user_id}
+ARG DS01_USERNAME=${username}
+
+EOF
+}
+
+# Helper: Write apt-get install block using the shared apt cache mounts
+# (docker-clean is removed so downloaded .debs survive in the cache)
+# Usage: _write_apt_install <file> "pkg1 pkg2 pkg3"
+_write_apt_install() {
+    local file="$1"
+    local packages="$2"
+
+    if [ -z "$packages" ]; then
+        return
+    fi
+
+    {
+        echo "RUN $DS01_APT_CACHE_MOUNT \\"
+        echo "    $DS01_APT_LISTS_MOUNT \\"
+        echo "    rm -f /etc/apt/apt.conf.d/docker-clean && \\"
+        echo "    apt-get update && apt-get install -y --no-install-recommends \\"
+        read -ra pkg_array <<<"$packages"
+        local pkg_count=${#pkg_array[@]}
+        local i=0
+
+        for pkg in "${pkg_array[@]}"; do
+            i=$((i + 1))
+            if [ $i -lt $pkg_count ]; then
+                echo "    $pkg \\"
+            else
+                echo "    $pkg"
+            fi
+        done
+    } >>"$file"
+}
+
+# Helper: Write pip install block (shared pip cache mount) with proper line continuation
 # Usage: _write_pip_install <file> "pkg1 pkg2 pkg3"
 _write_pip_install() {
     local file="$1"
@@ -256,14 +351,14 @@ _write_pip_install() {
         return
     fi
 
-    echo 'RUN pip install --no-cache-dir \' >>"$file"
+    echo "RUN $DS01_PIP_CACHE_MOUNT pip install \\" >>"$file"
 
     read -ra pkg_array <<<"$packages"
     local pkg_count=${#pkg_array[@]}
     local i=0
 
     for pkg in "${pkg_array[@]}"; do
-        ((i++))
+        i=$((i + 1))
         if [ $i -lt $pkg_count ]; then
             echo "    $pkg \\" >>"$file"
         else
@@ -289,7 +384,7 @@ add_to_custom_section() {
     local next_line=$((custom_line + 1))
     local next_content=$(sed -n "${next_line}p" "$dockerfile")
 
-    if [[ $next_content =~ ^RUN\ pip\ install ]]; then
+    if [[ $next_content =~ $DS01_PIP_RUN_REGEX ]]; then
         # Append to existing RUN block
         # Find last line of RUN block, add backslash, insert packages
         :
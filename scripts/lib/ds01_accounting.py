@@ -0,0 +1,532 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_accounting.py
+Append-only usage ledger: gpueq-seconds, CPU-seconds and GPU energy per container.
+
+Allocation intervals are opened and closed by container-owner-tracker.py
+(docker create / destroy events, which covers every allocation path). Each
+collector host pass (collect-metrics.py, every 5 minutes) integrates the open
+intervals since the previous pass and appends one usage entry per container:
+
+    gpueq_s    allocated GPU-equivalents x seconds (exact open/close times)
+    cpu_s      delta of the container cgroup's cpu.stat usage_usec
+    energy_j   GPU power draw x slot share (gpueq weight) x seconds
+
+Layout (/var/lib/ds01/accounting, root:root 755 - the chargeback ledger is
+written only by those two root services, never by the allocator, which runs
+as the calling user):
+    ledger/YYYY-MM-DD.jsonl   append-only open/usage/close entries (local day)
+    daily/YYYY-MM-DD.json     compacted per-user and per-container totals
+    open.json                 open intervals and last power samples (flock)
+
+Compaction sums one day's ledger into daily/DAY.json. A day compacted after
+its midnight is final and never re-read, so a month of chargeback totals is
+~30 small JSON reads instead of a Prometheus range query over every sample.
+
+Design principles:
+- Recording is best-effort: record_* never raises and returns False on
+  failure, so allocation and the event daemon never block on accounting
+- Usage spanning midnight is split between the two days
+- CPU time is counted from the first pass that sees the container's cgroup,
+  and CPU/energy after the last pass before close are attributed to within
+  one collector interval
+
+Usage (Python):
+    from ds01_accounting import record_open, record_close, usage_totals
+
+    record_open("proj._.1001", "alice", {"0": 1.0}, source="docker_events")
+    record_close("proj._.1001")
+    totals = usage_totals("2026-03-01", "2026-03-31")
+    totals["users"]["alice"]["gpueq_s"]
+
+Usage (CLI):
+    python3 ds01_accounting.py open                       # Open intervals
+    python3 ds01_accounting.py compact [DAY...]           # Default: yesterday and today
+    python3 ds01_accounting.py report --since 2026-03-01 [--until DAY] [--by container] [--json]
+"""
+
+from __future__ import annotations
+
+import fcntl
+import json
+import logging
+import os
+import sys
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+# Configuration
+ACCOUNTING_DIR = Path(os.environ.get("DS01_ACCOUNTING_DIR", "/var/lib/ds01/accounting"))
+POWER_MAX_AGE = 900  # Seconds a GPU power sample stays usable (collector samples every 300)
+LOCK_TIMEOUT = 5.0
+FIELDS = ("gpueq_s", "cpu_s", "energy_j")
+
+# Add NullHandler to avoid "No handlers found" warnings
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# ============================================================================
+# Helpers
+# ============================================================================
+
+
+def _day(ts: float) -> str:
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+
+
+def _next_midnight(ts: float) -> float:
+    tomorrow = datetime.fromtimestamp(ts).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+
+def _split_days(start: float, end: float) -> Iterator[tuple[float, float]]:
+    """(start, end) pieces of an interval, cut at local midnights."""
+    while start < end:
+        cut = min(end, _next_midnight(start))
+        yield start, cut
+        start = cut
+
+
+def _gpu_key(slot: str) -> str:
+    """Physical GPU a slot draws power from: "1.2" (MIG) -> "1"; UUIDs are kept as-is."""
+    return slot.split(".", 1)[0] if slot[:1].isdigit() else slot
+
+
+def _cpu_usec(cgroup: Path | None) -> int | None:
+    if cgroup is None:
+        return None
+    try:
+        with open(cgroup / "cpu.stat") as f:
+            for line in f:
+                if line.startswith("usage_usec "):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    tmp.chmod(0o644)
+    os.replace(tmp, path)
+
+
+def _empty() -> dict[str, float]:
+    return dict.fromkeys(FIELDS, 0.0)
+
+
+# ============================================================================
+# Ledger and open-interval state
+# ============================================================================
+
+
+def _append(entries: list[dict], accounting_dir: Path) -> None:
+    """Append entries to their day's ledger file (one write per file)."""
+    by_day: dict[str, list[str]] = {}
+    for entry in entries:
+        day = _day(entry.get("start", entry.get("ts")))
+        by_day.setdefault(day, []).append(json.dumps(entry, separators=(",", ":")) + "\n")
+    ledger_dir = accounting_dir / "ledger"
+    ledger_dir.mkdir(parents=True, exist_ok=True)
+    for day, lines in by_day.items():
+        fd = os.open(ledger_dir / f"{day}.jsonl", os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, "".join(lines).encode())
+        finally:
+            os.close(fd)
+
+
+@contextmanager
+def _locked_state(accounting_dir: Path) -> Iterator[dict[str, Any]]:
+    """open.json under an exclusive lock; saved on clean exit."""
+    accounting_dir.mkdir(parents=True, exist_ok=True)
+    fd = os.open(accounting_dir / "open.lock", os.O_CREAT | os.O_RDWR, 0o644)
+    try:
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Could not lock {accounting_dir / 'open.lock'}")
+                time.sleep(0.05)
+        path = accounting_dir / "open.json"
+        try:
+            state = json.loads(path.read_text())
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("intervals", {})
+        state.setdefault("power", {})
+        yield state
+        _write_json(path, state)
+    finally:
+        os.close(fd)
+
+
+def _find(intervals: dict[str, dict], container: str, container_id: str | None) -> str | None:
+    if container in intervals:
+        return container
+    if container_id:
+        for name, interval in intervals.items():
+            cid = interval.get("container_id") or ""
+            if cid and (cid.startswith(container_id) or container_id.startswith(cid)):
+                return name
+    return None
+
+
+def _usage(
+    name: str,
+    interval: dict,
+    now: float,
+    cgroup: Path | None,
+    power: dict[str, list[float]],
+) -> list[dict]:
+    """Usage entries for an open interval since its last pass; advances the interval."""
+    start = interval["last_ts"]
+    if now <= start:
+        return []
+    seconds = now - start
+
+    cpu_s = None
+    usage = _cpu_usec(cgroup)
+    if usage is not None:
+        before = interval.get("cpu_usec")
+        if before is not None:
+            # A restarted container gets a fresh cgroup: count from zero
+            cpu_s = (usage - before if usage >= before else usage) / 1e6
+        interval["cpu_usec"] = usage
+
+    watts = None
+    for slot, weight in interval["slots"].items():
+        sample = power.get(_gpu_key(slot))
+        if sample and now - sample[1] <= POWER_MAX_AGE:
+            watts = (watts or 0.0) + sample[0] * weight
+
+    interval["last_ts"] = now
+    entries = []
+    for piece_start, piece_end in _split_days(start, now):
+        share = (piece_end - piece_start) / seconds
+        entry = {
+            "type": "usage",
+            "start": piece_start,
+            "end": piece_end,
+            "container": name,
+            "user": interval["user"],
+            "gpueq_s": round(interval["gpueq"] * (piece_end - piece_start), 3),
+        }
+        if cpu_s is not None:
+            entry["cpu_s"] = round(cpu_s * share, 3)
+        if watts is not None:
+            entry["energy_j"] = round(watts * (piece_end - piece_start), 1)
+        entries.append(entry)
+    return entries
+
+
+# ============================================================================
+# Recording API
+# ============================================================================
+
+
+def record_open(
+    container: str,
+    user: str,
+    slots: dict[str, float],
+    container_id: str | None = None,
+    ts: float | None = None,
+    source: str | None = None,
+    accounting_dir: Path | None = None,
+) -> bool:
+    """
+    Open an allocation interval for a container.
+
+    Args:
+        container: Container name (full tag)
+        user: Owner charged for the interval
+        slots: GPU/MIG slot -> gpueq weight (1.0 for a full GPU)
+        container_id: Docker ID, used to find the container's cgroup
+        ts: Open time (default now)
+        source: Who reported it (docker_events)
+
+    An interval that is already open only picks up a missing container_id,
+    so a replayed create event does not open it twice.
+
+    Returns:
+        True if recorded, False on any failure
+    """
+    if not container:
+        return False
+    accounting_dir = accounting_dir or ACCOUNTING_DIR
+    ts = time.time() if ts is None else ts
+    try:
+        with _locked_state(accounting_dir) as state:
+            intervals = state["intervals"]
+            name = _find(intervals, container, container_id)
+            if name is not None:
+                if container_id and not intervals[name].get("container_id"):
+                    intervals[name]["container_id"] = container_id
+                return True
+            gpueq = round(sum(slots.values()), 6)
+            intervals[container] = {
+                "user": user,
+                "slots": slots,
+                "gpueq": gpueq,
+                "container_id": container_id,
+                "opened": ts,
+                "last_ts": ts,
+                "cpu_usec": None,
+            }
+            entry = {
+                "type": "open",
+                "ts": ts,
+                "container": container,
+                "user": user,
+                "slots": slots,
+                "gpueq": gpueq,
+            }
+            if source:
+                entry["source"] = source
+            _append([entry], accounting_dir)
+        return True
+    except (OSError, TimeoutError, TypeError, ValueError) as e:
+        logger.warning("Could not open accounting interval for %s: %s", container, e)
+        return False
+
+
+def record_close(
+    container: str,
+    container_id: str | None = None,
+    ts: float | None = None,
+    cgroups: dict[str, Path] | None = None,
+    accounting_dir: Path | None = None,
+) -> bool:
+    """
+    Close a container's interval, booking usage since the last pass.
+
+    Closing an unknown container is a no-op that returns True, so a replayed
+    destroy event is harmless.
+    """
+    accounting_dir = accounting_dir or ACCOUNTING_DIR
+    ts = time.time() if ts is None else ts
+    try:
+        with _locked_state(accounting_dir) as state:
+            intervals = state["intervals"]
+            name = _find(intervals, container, container_id)
+            if name is None:
+                return True
+            interval = intervals.pop(name)
+            cgroup = (cgroups or {}).get(interval.get("container_id") or "")
+            entries = _usage(name, interval, ts, cgroup, state["power"])
+            entries.append(
+                {
+                    "type": "close",
+                    "ts": ts,
+                    "container": name,
+                    "user": interval["user"],
+                    "seconds": round(ts - interval["opened"], 3),
+                }
+            )
+            _append(entries, accounting_dir)
+        return True
+    except (OSError, TimeoutError, KeyError, TypeError, ValueError) as e:
+        logger.warning("Could not close accounting interval for %s: %s", container, e)
+        return False
+
+
+def tick(
+    now: float | None = None,
+    cgroups: dict[str, Path] | None = None,
+    power: dict[str, float] | None = None,
+    accounting_dir: Path | None = None,
+) -> int:
+    """
+    Integrate every open interval up to now.
+
+    Args:
+        cgroups: Full container ID -> cgroup v2 directory
+        power: GPU index and/or UUID -> power draw in watts at now
+
+    Returns:
+        Number of usage entries appended (0 on failure)
+    """
+    accounting_dir = accounting_dir or ACCOUNTING_DIR
+    now = time.time() if now is None else now
+    cgroups = cgroups or {}
+    try:
+        with _locked_state(accounting_dir) as state:
+            for key, watts in (power or {}).items():
+                if watts is not None:
+                    state["power"][key] = [watts, now]
+            entries = []
+            for name, interval in state["intervals"].items():
+                cgroup = cgroups.get(interval.get("container_id") or "")
+                entries += _usage(name, interval, now, cgroup, state["power"])
+            if entries:
+                _append(entries, accounting_dir)
+        return len(entries)
+    except (OSError, TimeoutError, KeyError, TypeError, ValueError) as e:
+        logger.warning("Accounting pass failed: %s", e)
+        return 0
+
+
+def open_intervals(accounting_dir: Path | None = None) -> dict[str, dict]:
+    """Currently open intervals by container name (read without locking)."""
+    try:
+        state = json.loads(((accounting_dir or ACCOUNTING_DIR) / "open.json").read_text())
+    except (OSError, ValueError):
+        return {}
+    return state.get("intervals", {})
+
+
+# ============================================================================
+# Compaction and queries
+# ============================================================================
+
+
+def compact(
+    day: str, accounting_dir: Path | None = None, now: float | None = None
+) -> dict[str, Any]:
+    """
+    Sum one day's ledger into daily/DAY.json and return the totals.
+
+    A saved day built after its midnight is final and returned as-is.
+    """
+    accounting_dir = accounting_dir or ACCOUNTING_DIR
+    path = accounting_dir / "daily" / f"{day}.json"
+    try:
+        saved = json.loads(path.read_text())
+        if saved.get("final"):
+            return saved
+    except (OSError, ValueError):
+        pass
+
+    now = time.time() if now is None else now
+    users: dict[str, dict[str, float]] = {}
+    containers: dict[str, dict[str, Any]] = {}
+    try:
+        with open(accounting_dir / "ledger" / f"{day}.jsonl") as f:
+            lines = f.readlines()
+    except OSError:
+        lines = []
+    for line in lines:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            continue  # Torn tail of a crashed append
+        if entry.get("type") != "usage":
+            continue
+        user = entry.get("user") or "unknown"
+        totals = users.setdefault(user, _empty())
+        row = containers.setdefault(entry["container"], {"user": user, **_empty()})
+        for field in FIELDS:
+            value = entry.get(field)
+            if value:
+                totals[field] += value
+                row[field] += value
+
+    midnight = datetime.combine(date.fromisoformat(day) + timedelta(days=1), datetime.min.time())
+    result = {
+        "day": day,
+        "built_at": now,
+        "final": now >= midnight.timestamp(),
+        "users": users,
+        "containers": containers,
+    }
+    if lines:
+        _write_json(path, result)
+    return result
+
+
+def usage_totals(
+    start_day: str, end_day: str, accounting_dir: Path | None = None
+) -> dict[str, Any]:
+    """
+    Totals per user and per container over an inclusive range of days.
+
+    Returns:
+        {"days": [days with data], "users": {user: {field: value}},
+         "containers": {container: {"user": ..., field: value}}}
+    """
+    accounting_dir = accounting_dir or ACCOUNTING_DIR
+    users: dict[str, dict[str, float]] = {}
+    containers: dict[str, dict[str, Any]] = {}
+    days = []
+    current, last = date.fromisoformat(start_day), date.fromisoformat(end_day)
+    while current <= last:
+        day = current.isoformat()
+        current += timedelta(days=1)
+        daily = compact(day, accounting_dir)
+        if not daily["users"]:
+            continue
+        days.append(day)
+        for user, values in daily["users"].items():
+            totals = users.setdefault(user, _empty())
+            for field in FIELDS:
+                totals[field] += values.get(field, 0.0)
+        for name, values in daily["containers"].items():
+            row = containers.setdefault(name, {"user": values.get("user"), **_empty()})
+            for field in FIELDS:
+                row[field] += values.get(field, 0.0)
+    return {"days": days, "users": users, "containers": containers}
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DS01 usage accounting ledger")
+    parser.add_argument("--dir", type=Path, default=None, help="Accounting directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("open", help="List open intervals")
+    p_compact = sub.add_parser("compact", help="Compact days into daily totals")
+    p_compact.add_argument("days", nargs="*", help="YYYY-MM-DD (default: yesterday and today)")
+    p_report = sub.add_parser("report", help="Totals over a range of days")
+    p_report.add_argument("--since", required=True, help="First day (YYYY-MM-DD)")
+    p_report.add_argument("--until", help="Last day (default: today)")
+    p_report.add_argument("--by", choices=("user", "container"), default="user")
+    p_report.add_argument("--json", action="store_true", help="Print JSON")
+    args = parser.parse_args()
+
+    if args.command == "open":
+        for name, iv in sorted(open_intervals(args.dir).items()):
+            opened = datetime.fromtimestamp(iv["opened"]).strftime("%Y-%m-%d %H:%M")
+            print(f"{name:40} {iv['user']:20} {iv['gpueq']:6.3f} gpueq  since {opened}")
+        return 0
+
+    if args.command == "compact":
+        today = date.today()
+        days = args.days or [(today - timedelta(days=1)).isoformat(), today.isoformat()]
+        for day in days:
+            result = compact(day, args.dir)
+            state = "final" if result["final"] else "partial"
+            print(f"{day}: {len(result['containers'])} containers ({state})")
+        return 0
+
+    totals = usage_totals(args.since, args.until or date.today().isoformat(), args.dir)
+    if args.json:
+        print(json.dumps(totals, indent=2))
+        return 0
+    rows = totals["users"] if args.by == "user" else totals["containers"]
+    print(f"{args.by.upper():40} {'GPUEQ-H':>10} {'CPU-H':>10} {'KWH':>10}")
+    for key, values in sorted(rows.items(), key=lambda kv: -kv[1]["gpueq_s"]):
+        print(
+            f"{key:40} {values['gpueq_s'] / 3600:10.2f} {values['cpu_s'] / 3600:10.2f} "
+            f"{values['energy_j'] / 3.6e6:10.3f}"
+        )
+    print(f"({len(totals['days'])} days with data)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
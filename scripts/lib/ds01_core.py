@@ -31,6 +31,8 @@ import re
 import subprocess
 from typing import Any
 
+from ds01_identity import uid_to_name
+
 
 class Colors:
     """ANSI color codes for terminal output."""
@@ -210,17 +212,7 @@ def get_container_owner(container_name: str) -> str | None:
     if "._." not in container_name:
         return None
 
-    try:
-        uid = container_name.split("._.")[-1]
-        result = subprocess.run(
-            ["getent", "passwd", uid], capture_output=True, text=True, timeout=5
-        )
-        if result.returncode == 0 and result.stdout:
-            return result.stdout.split(":")[0]
-    except (subprocess.TimeoutExpired, Exception):
-        pass
-
-    return None
+    return uid_to_name(container_name.split("._.")[-1])
 
 
 def get_container_gpu(container_name: str) -> str | None:
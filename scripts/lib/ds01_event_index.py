@@ -0,0 +1,776 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_event_index.py
+Seekable archives and index-accelerated scanning of the DS01 event log.
+
+logrotate rotates /var/log/ds01/events.jsonl daily (events.jsonl-YYYYMMDD,
+compressed one rotation later) and backup-logs.sh moves archives older than
+the log retention to /var/lib/ds01/log-archives/events. Archives are written
+by this module as one gzip member per UTC hour ("frames"); concatenated
+members are still a plain .gz file, so zcat/jq keep working, but each hour
+can be decompressed on its own. Every archive has a sidecar index:
+
+    events.jsonl-20260301.gz.idx.json
+    {
+        "version": 2,
+        "size": 48213, "mtime": 1772409600.0,    # validates the sidecar
+        "first_ts": "2026-02-28T00:00:03Z",       # time range covered
+        "last_ts": "2026-03-01T00:00:01Z",
+        "counts": {"container.create": 12, ...},  # per-type event counts
+        "frames": [                               # gzip members (null if uncompressed)
+            {"offset": 0, "length": 2107, "first_ts": ..., "last_ts": ...,
+             "counts": {...}},
+            ...
+        ]
+    }
+
+and uses it to:
+- Skip archives and frames whose time range or event types cannot match
+- Answer count-only queries for frames fully inside the window without
+  reading them at all
+- Seek to and decompress only the remaining frames, in a process pool, with a
+  substring pre-filter on the event type before full JSON decoding and string
+  comparison of UTC timestamps instead of per-line datetime parsing
+
+Archives compressed as a single gzip member (before this format) index as one
+frame and are scanned whole; `pack` rewrites them.
+
+The live events.jsonl is mutable and never indexed; it is always scanned.
+Missing or stale sidecars are rebuilt as a by-product of the next scan.
+
+Usage (Python):
+    from ds01_event_index import iter_events, scan_events
+
+    counts = scan_events(start_ts, end_ts, {"gpu.allocate", "gpu.release"},
+                         collect={"gpu.allocate": []})
+    for line in iter_events(start_ts, end_ts, type_prefix="gpu."):
+        ...
+
+Usage (CLI):
+    python3 ds01_event_index.py build [/var/log/ds01]     # logrotate lastaction
+    python3 ds01_event_index.py compress < in > out.gz    # logrotate compresscmd
+    python3 ds01_event_index.py pack ARCHIVE...           # backup-logs.sh
+    python3 ds01_event_index.py cat --since TS [--until TS] [--type PREFIX]
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import sys
+import zlib
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO
+
+# Configuration
+EVENTS_FILE = Path("/var/log/ds01/events.jsonl")
+ARCHIVE_DIR = Path("/var/lib/ds01/log-archives/events")
+INDEX_SUFFIX = ".idx.json"
+INDEX_VERSION = 2
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+FRAME_MAX_BYTES = 4 * 1024 * 1024  # Uncompressed; busy hours are split further
+COMPRESS_LEVEL = 6
+
+_ISO_PREFIX = len("YYYY-MM-DDTHH:MM:SS")
+_HOUR_PREFIX = len("YYYY-MM-DDTHH")
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+_READ_CHUNK = 1024 * 1024
+
+
+# ============================================================================
+# Timestamp helpers
+# ============================================================================
+
+
+def _iso_key(ts: float) -> str:
+    """UTC 'YYYY-MM-DDTHH:MM:SS' key; sorts the same as the timestamps it encodes."""
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def _parse_ts(ts_str: str) -> float | None:
+    try:
+        return datetime.fromisoformat(ts_str.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def _is_utc(ts_str: str) -> bool:
+    return ts_str.endswith("Z") or ts_str.endswith("+00:00")
+
+
+def _ts_key(ts_str: str) -> str | None:
+    """Sortable UTC key of a timestamp, or None if it does not parse."""
+    if _is_utc(ts_str):
+        return ts_str[:_ISO_PREFIX]
+    ts = _parse_ts(ts_str)
+    return _iso_key(ts) if ts is not None else None
+
+
+def _in_window(ts_str: str, start_ts: float, end_ts: float, start_key: str, end_key: str) -> bool:
+    """Fast path: compare UTC ISO strings; exact parse only at the boundaries."""
+    if _is_utc(ts_str):
+        key = ts_str[:_ISO_PREFIX]
+        if key < start_key or key > end_key:
+            return False
+        if key != start_key and key != end_key:
+            return True
+    ts = _parse_ts(ts_str)
+    return ts is not None and start_ts <= ts <= end_ts
+
+
+def _line_fields(line: str | bytes) -> tuple[str, str] | None:
+    """(event_type, timestamp) of one JSONL line (dual schema), or None if not an event."""
+    try:
+        event = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(event, dict):
+        return None
+    etype = event.get("event_type") or event.get("event") or ""
+    return etype, event.get("timestamp") or event.get("ts") or ""
+
+
+# ============================================================================
+# Archive discovery and sidecar index
+# ============================================================================
+
+
+def _archive_dir(events_file: Path, archive_dir: Path | None) -> Path | None:
+    """Backup archive directory; defaults to ARCHIVE_DIR for the system event log only."""
+    if archive_dir is None and events_file == EVENTS_FILE:
+        return ARCHIVE_DIR
+    return archive_dir
+
+
+def rotated_archives(
+    events_file: Path = EVENTS_FILE, archive_dir: Path | None = None
+) -> list[Path]:
+    """Rotated archives of events_file, oldest location first.
+
+    Backed-up archives (archive_dir) come first, then gzipped and
+    uncompressed archives next to events_file.
+    """
+    name = events_file.name
+    files: list[Path] = []
+    backup_dir = _archive_dir(events_file, archive_dir)
+    if backup_dir is not None:
+        files += sorted(backup_dir.glob(f"{name}-*.gz"))
+    files += sorted(events_file.parent.glob(f"{name}-*.gz"))
+    files += sorted(events_file.parent.glob(f"{name}-*[0-9]"))
+    return files
+
+
+def index_path(archive: Path) -> Path:
+    return archive.with_name(archive.name + INDEX_SUFFIX)
+
+
+def _iter_ranges(fh: BinaryIO, ranges: list[tuple[int, int]]) -> Iterator[str]:
+    for offset, length in ranges:
+        fh.seek(offset)
+        data = zlib.decompress(fh.read(length), _GZIP_WBITS)
+        for line in data.split(b"\n"):
+            if line:
+                yield line.decode("utf-8", errors="replace") + "\n"
+
+
+@contextmanager
+def _open_ranges(path: Path, ranges: list[tuple[int, int]]):
+    with open(path, "rb") as fh:
+        yield _iter_ranges(fh, ranges)
+
+
+def _open_events(path: Path, ranges: list[tuple[int, int]] | None = None):
+    """Open an event file for line iteration; with ranges, only those gzip members."""
+    if ranges is not None:
+        return _open_ranges(path, ranges)
+    return gzip.open(path, "rt") if path.suffix == ".gz" else open(path)
+
+
+def load_index(archive: Path) -> dict | None:
+    """Return the sidecar index for archive, or None if missing or stale."""
+    try:
+        st = archive.stat()
+        idx = json.loads(index_path(archive).read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+    if (
+        idx.get("version") != INDEX_VERSION
+        or idx.get("size") != st.st_size
+        or idx.get("mtime") != st.st_mtime
+    ):
+        return None
+    return idx
+
+
+def write_index(archive: Path, idx: dict) -> bool:
+    """Atomically write a sidecar index. Never raises."""
+    target = index_path(archive)
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text(json.dumps(idx, sort_keys=True))
+        os.replace(tmp, target)
+        return True
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        return False
+
+
+def _new_frame(offset: int = 0) -> dict:
+    return {"offset": offset, "length": 0, "first_ts": None, "last_ts": None, "counts": {}}
+
+
+def _new_index(archive: Path) -> dict:
+    st = archive.stat()
+    return {
+        "version": INDEX_VERSION,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "first_ts": None,
+        "last_ts": None,
+        "counts": {},
+        "frames": None,
+    }
+
+
+def _index_observe(idx: dict, etype: str, ts_str: str) -> None:
+    """Fold one event into an index or frame (events without a parseable timestamp never
+    match a window, so they are left out of the counts and range)."""
+    key = _ts_key(ts_str) if ts_str else None
+    if key is None:
+        return
+    idx["counts"][etype] = idx["counts"].get(etype, 0) + 1
+    if idx["first_ts"] is None or key < idx["first_ts"]:
+        idx["first_ts"] = key
+    if idx["last_ts"] is None or key > idx["last_ts"]:
+        idx["last_ts"] = key
+
+
+def _observe_line(idx: dict, line: bytes) -> None:
+    fields = _line_fields(line)
+    if fields is not None:
+        _index_observe(idx, *fields)
+
+
+def _add_frame(idx: dict, frame: dict) -> None:
+    """Append a finished frame to an archive index and fold in its range and counts."""
+    idx["frames"].append(frame)
+    for etype, n in frame["counts"].items():
+        idx["counts"][etype] = idx["counts"].get(etype, 0) + n
+    if frame["first_ts"] is not None:
+        if idx["first_ts"] is None or frame["first_ts"] < idx["first_ts"]:
+            idx["first_ts"] = frame["first_ts"]
+        if idx["last_ts"] is None or frame["last_ts"] > idx["last_ts"]:
+            idx["last_ts"] = frame["last_ts"]
+
+
+def _index_members(archive: Path, idx: dict) -> None:
+    """Index a gzip archive member by member (streaming; one frame per member)."""
+    idx["frames"] = []
+    offset = 0
+    pending = b""
+    decomp = None
+    with open(archive, "rb") as fh:
+        while True:
+            buf = pending or fh.read(_READ_CHUNK)
+            pending = b""
+            if not buf:
+                break
+            if decomp is None:
+                decomp = zlib.decompressobj(_GZIP_WBITS)
+                frame, consumed, tail = _new_frame(offset), 0, b""
+            lines = (tail + decomp.decompress(buf)).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                _observe_line(frame, line)
+            if not decomp.eof:
+                consumed += len(buf)
+                continue
+            pending = decomp.unused_data
+            consumed += len(buf) - len(pending)
+            if tail:
+                _observe_line(frame, tail)
+            frame["length"] = consumed
+            _add_frame(idx, frame)
+            offset += consumed
+            decomp = None
+    if decomp is not None:
+        raise EOFError(f"{archive}: truncated gzip member")
+
+
+def _index_archive(archive: Path) -> dict | None:
+    """Build the index for one archive without writing it. None on read errors."""
+    try:
+        idx = _new_index(archive)
+        if archive.suffix == ".gz":
+            _index_members(archive, idx)
+        else:
+            with open(archive, "rb") as fh:
+                for line in fh:
+                    _observe_line(idx, line)
+    except (OSError, EOFError, zlib.error):
+        return None
+    return idx
+
+
+def build_index(archive: Path) -> dict | None:
+    """Build (or rebuild) the sidecar index for one archive."""
+    idx = _index_archive(archive)
+    if idx is not None:
+        write_index(archive, idx)
+    return idx
+
+
+def build_all(
+    events_file: Path = EVENTS_FILE, force: bool = False, archive_dir: Path | None = None
+) -> int:
+    """Index every rotated archive lacking a valid sidecar. Returns count built.
+
+    Also removes orphaned sidecars (e.g. for an uncompressed archive that
+    logrotate has since compressed or expired).
+    """
+    built = 0
+    archives = rotated_archives(events_file, archive_dir)
+    for archive in archives:
+        if force or load_index(archive) is None:
+            if build_index(archive) is not None:
+                built += 1
+
+    live = {index_path(a) for a in archives}
+    dirs = {events_file.parent, _archive_dir(events_file, archive_dir)} - {None}
+    for directory in dirs:
+        for sidecar in directory.glob(f"{events_file.name}-*{INDEX_SUFFIX}"):
+            if sidecar not in live:
+                sidecar.unlink(missing_ok=True)
+    return built
+
+
+# ============================================================================
+# Framed archive writer
+# ============================================================================
+
+
+class FramedWriter:
+    """Write JSONL events as gzip members, one per UTC hour.
+
+    Frames are also cut at FRAME_MAX_BYTES of uncompressed data. Lines
+    without a timestamp stay in the current frame. close() returns the frame
+    list for the sidecar index.
+    """
+
+    def __init__(self, fh: BinaryIO, level: int = COMPRESS_LEVEL):
+        self._fh = fh
+        self._level = level
+        self._offset = 0
+        self._lines: list[bytes] = []
+        self._size = 0
+        self._hour: str | None = None
+        self._frame = _new_frame()
+        self.frames: list[dict] = []
+
+    def write(self, line: bytes) -> None:
+        if not line.endswith(b"\n"):
+            line += b"\n"
+        fields = _line_fields(line)
+        key = _ts_key(fields[1]) if fields and fields[1] else None
+        hour = key[:_HOUR_PREFIX] if key else None
+        if self._lines and ((hour and hour != self._hour) or self._size >= FRAME_MAX_BYTES):
+            self._flush()
+        if hour:
+            self._hour = hour
+        self._lines.append(line)
+        self._size += len(line)
+        if fields is not None:
+            _index_observe(self._frame, *fields)
+
+    def _flush(self) -> None:
+        member = gzip.compress(b"".join(self._lines), compresslevel=self._level, mtime=0)
+        self._fh.write(member)
+        self._frame["length"] = len(member)
+        self.frames.append(self._frame)
+        self._offset += len(member)
+        self._frame = _new_frame(self._offset)
+        self._lines, self._size = [], 0
+
+    def close(self) -> list[dict]:
+        if self._lines:
+            self._flush()
+        return self.frames
+
+
+def compress_stream(src: BinaryIO, dst: BinaryIO) -> list[dict]:
+    """Compress a JSONL stream into hourly gzip members (logrotate compresscmd)."""
+    writer = FramedWriter(dst)
+    for line in src:
+        writer.write(line)
+    return writer.close()
+
+
+def _is_framed(idx: dict | None) -> bool:
+    if not idx or idx.get("frames") is None:
+        return False
+    return all(
+        f["first_ts"] is None or f["first_ts"][:_HOUR_PREFIX] == f["last_ts"][:_HOUR_PREFIX]
+        for f in idx["frames"]
+    )
+
+
+def pack_archive(archive: Path) -> Path | None:
+    """Rewrite a rotated archive as hourly gzip members and write its index.
+
+    Uncompressed archives become <name>.gz and the original is removed;
+    already-framed archives are left alone. The archive mtime is preserved
+    so age-based retention is unaffected. Returns the packed path, or None
+    on error.
+    """
+    if archive.suffix == ".gz" and _is_framed(load_index(archive) or build_index(archive)):
+        return archive
+
+    target = archive if archive.suffix == ".gz" else archive.with_name(archive.name + ".gz")
+    tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        st = archive.stat()
+        opener = gzip.open if archive.suffix == ".gz" else open
+        with opener(archive, "rb") as src, open(tmp, "wb") as dst:
+            frames = compress_stream(src, dst)
+        os.utime(tmp, (st.st_atime, st.st_mtime))
+        os.replace(tmp, target)
+    except (OSError, EOFError, zlib.error):
+        tmp.unlink(missing_ok=True)
+        return None
+
+    idx = _new_index(target)
+    idx["frames"] = []
+    for frame in frames:
+        _add_frame(idx, frame)
+    write_index(target, idx)
+    if target != archive:
+        archive.unlink(missing_ok=True)
+        index_path(archive).unlink(missing_ok=True)
+    return target
+
+
+# ============================================================================
+# Scanning
+# ============================================================================
+
+
+def _window_overlaps(idx: dict, start_key: str, end_key: str) -> bool:
+    first, last = idx.get("first_ts"), idx.get("last_ts")
+    if first is None or last is None:
+        return False  # No timestamped events at all
+    return first <= end_key and last >= start_key
+
+
+def _window_contains(idx: dict, start_key: str, end_key: str) -> bool:
+    """True when every event lies strictly inside the window (no boundary ambiguity)."""
+    return start_key < idx["first_ts"] and idx["last_ts"] < end_key
+
+
+def _plan_archive(
+    idx: dict,
+    start_key: str,
+    end_key: str,
+    match_types: frozenset[str],
+    collect_types: frozenset[str],
+) -> tuple[dict[str, int], list[tuple[int, int]] | None]:
+    """Split an indexed archive into counts served by the index and frames to scan.
+
+    Returns (counts, ranges): ranges is a list of (offset, length) gzip
+    members to decompress ([] when nothing needs reading), or None when an
+    uncompressed archive must be scanned whole.
+    """
+    counts: dict[str, int] = {}
+    frames = idx.get("frames")
+    ranges: list[tuple[int, int]] = []
+    for unit in frames if frames is not None else [idx]:
+        present = match_types & unit["counts"].keys()
+        if not present or not _window_overlaps(unit, start_key, end_key):
+            continue
+        if not (present & collect_types) and _window_contains(unit, start_key, end_key):
+            for etype in present:
+                counts[etype] = counts.get(etype, 0) + unit["counts"][etype]
+            continue
+        ranges.append((unit.get("offset", 0), unit.get("length", 0)))
+    if frames is None and ranges:
+        return counts, None
+    return counts, ranges
+
+
+def _scan_file(
+    path: str,
+    start_ts: float,
+    end_ts: float,
+    match_types: frozenset[str],
+    collect_types: frozenset[str],
+    build: bool,
+    ranges: list[tuple[int, int]] | None = None,
+) -> tuple[dict[str, int], dict[str, list[dict]], dict | None]:
+    """Scan one file, or the given gzip members of it (runs in a worker process).
+
+    Returns (counts, collected events by type, freshly built index or None).
+    An unindexed archive is indexed first and then planned like any other.
+    Lines that cannot contain a wanted event type are skipped before json.loads.
+    """
+    archive = Path(path)
+    start_key, end_key = _iso_key(start_ts), _iso_key(end_ts)
+    needles = tuple(f'"{t}"' for t in match_types)
+    collected: dict[str, list[dict]] = {t: [] for t in collect_types}
+    counts: dict[str, int] = {}
+    idx = None
+
+    if build:
+        idx = _index_archive(archive)
+        if idx is None:
+            return {}, collected, None
+        counts, ranges = _plan_archive(idx, start_key, end_key, match_types, collect_types)
+        if ranges == []:
+            return counts, collected, idx
+
+    try:
+        with _open_events(archive, ranges) as fh:
+            for line in fh:
+                if not any(n in line for n in needles):
+                    continue
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                etype = event.get("event_type") or event.get("event") or ""
+                ts_str = event.get("timestamp") or event.get("ts") or ""
+                if etype not in match_types or not ts_str:
+                    continue
+                if not _in_window(ts_str, start_ts, end_ts, start_key, end_key):
+                    continue
+
+                counts[etype] = counts.get(etype, 0) + 1
+                if etype in collect_types:
+                    entry = {"user": event.get("user", "unknown"), "ts": _parse_ts(ts_str)}
+                    entry.update(event.get("details", {}))
+                    collected[etype].append(entry)
+    except (OSError, EOFError, zlib.error):
+        return {}, {t: [] for t in collect_types}, None
+
+    return counts, collected, idx
+
+
+def scan_events(
+    start_ts: float,
+    end_ts: float,
+    match_types: set[str],
+    collect: dict[str, list[dict]] | None = None,
+    events_file: Path = EVENTS_FILE,
+    workers: int = DEFAULT_WORKERS,
+    archive_dir: Path | None = None,
+) -> dict[str, int]:
+    """Count events by type within [start_ts, end_ts] across the log and its archives.
+
+    Args:
+        start_ts, end_ts: Inclusive unix-time window
+        match_types: Event types to count
+        collect: Optional {event_type: list}; matching events are appended as
+            {"user", "ts", **details} dicts (in file order)
+        events_file: Live event log; rotated archives are found next to it
+        workers: Process pool size for scanning (1 = scan in-process)
+        archive_dir: Backed-up archives (default: ARCHIVE_DIR for the system log)
+
+    Returns:
+        Dict of event_type -> count for types with at least one match
+    """
+    collect_types = frozenset(collect) if collect else frozenset()
+    match = frozenset(match_types)
+    start_key, end_key = _iso_key(start_ts), _iso_key(end_ts)
+
+    counts: dict[str, int] = {}
+    jobs: list[tuple[Path, bool, list | None]] = []  # (file, build_index, ranges)
+
+    for archive in rotated_archives(events_file, archive_dir):
+        idx = load_index(archive)
+        if idx is None:
+            jobs.append((archive, True, None))
+            continue
+        idx_counts, ranges = _plan_archive(idx, start_key, end_key, match, collect_types)
+        for etype, n in idx_counts.items():
+            counts[etype] = counts.get(etype, 0) + n
+        if ranges != []:
+            jobs.append((archive, False, ranges))
+
+    if events_file.exists():
+        jobs.append((events_file, False, None))
+
+    args = [(str(f), start_ts, end_ts, match, collect_types, b, r) for f, b, r in jobs]
+    if workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(args))) as pool:
+            results = list(pool.map(_scan_file, *zip(*args)))
+    else:
+        results = [_scan_file(*a) for a in args]
+
+    for (archive, build, _), (file_counts, file_collected, idx) in zip(jobs, results):
+        for etype, n in file_counts.items():
+            counts[etype] = counts.get(etype, 0) + n
+        for etype, entries in file_collected.items():
+            collect[etype].extend(entries)
+        if build and idx is not None:
+            write_index(archive, idx)
+
+    return counts
+
+
+def iter_events(
+    start_ts: float,
+    end_ts: float,
+    type_prefix: str | None = None,
+    events_file: Path = EVENTS_FILE,
+    archive_dir: Path | None = None,
+) -> Iterator[str]:
+    """Yield raw JSONL lines of events within [start_ts, end_ts], oldest archive first.
+
+    Only frames whose time range overlaps the window and which contain an
+    event type starting with type_prefix are decompressed. Lines are
+    yielded unchanged (newline-terminated) for jq or regex consumers.
+    """
+    start_key, end_key = _iso_key(start_ts), _iso_key(end_ts)
+
+    def wanted(unit: dict) -> bool:
+        if not _window_overlaps(unit, start_key, end_key):
+            return False
+        return type_prefix is None or any(t.startswith(type_prefix) for t in unit["counts"])
+
+    sources: list[tuple[Path, list | None]] = []
+    for archive in rotated_archives(events_file, archive_dir):
+        idx = load_index(archive) or build_index(archive)
+        if idx is None or not wanted(idx):
+            continue
+        frames = idx.get("frames")
+        ranges = (
+            None if frames is None else [(f["offset"], f["length"]) for f in frames if wanted(f)]
+        )
+        sources.append((archive, ranges))
+    if events_file.exists():
+        sources.append((events_file, None))
+
+    needle = f'"{type_prefix}' if type_prefix else ""
+    for path, ranges in sources:
+        try:
+            with _open_events(path, ranges) as fh:
+                for line in fh:
+                    if needle not in line:
+                        continue
+                    fields = _line_fields(line)
+                    if fields is None or not fields[1]:
+                        continue
+                    if type_prefix and not fields[0].startswith(type_prefix):
+                        continue
+                    if _in_window(fields[1], start_ts, end_ts, start_key, end_key):
+                        yield line if line.endswith("\n") else line + "\n"
+        except (OSError, EOFError, zlib.error):
+            continue
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def _option(args: list[str], name: str) -> str | None:
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            return args[i + 1]
+    return None
+
+
+def _cli_time(value: str) -> float:
+    """Unix time or ISO 8601 (naive values are local time)."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def main() -> int:
+    """
+    CLI interface for archive and index maintenance.
+
+    Usage:
+        python3 ds01_event_index.py build [LOG_DIR] [--force]
+        python3 ds01_event_index.py show ARCHIVE
+        python3 ds01_event_index.py compress < FILE > FILE.gz
+        python3 ds01_event_index.py pack ARCHIVE...
+        python3 ds01_event_index.py cat --since TIME [--until TIME] [--type PREFIX] [--log-dir DIR]
+
+    Returns:
+        0 on success, 1 on error
+    """
+    commands = ("build", "show", "compress", "pack", "cat")
+    if len(sys.argv) < 2 or sys.argv[1] not in commands:
+        print("Usage: ds01_event_index.py build [LOG_DIR] [--force]", file=sys.stderr)
+        print("       ds01_event_index.py show ARCHIVE", file=sys.stderr)
+        print("       ds01_event_index.py compress < FILE > FILE.gz", file=sys.stderr)
+        print("       ds01_event_index.py pack ARCHIVE...", file=sys.stderr)
+        print(
+            "       ds01_event_index.py cat --since TIME [--until TIME] [--type PREFIX] [--log-dir DIR]",
+            file=sys.stderr,
+        )
+        return 1
+
+    command = sys.argv[1]
+    argv = sys.argv[2:]
+    args = [a for a in argv if not a.startswith("--")]
+
+    if command == "build":
+        log_dir = Path(args[0]) if args else EVENTS_FILE.parent
+        built = build_all(log_dir / EVENTS_FILE.name, force="--force" in argv)
+        print(f"Indexed {built} event archive(s) in {log_dir}")
+        return 0
+
+    if command == "compress":
+        compress_stream(sys.stdin.buffer, sys.stdout.buffer)
+        return 0
+
+    if command == "cat":
+        since = _option(argv, "--since")
+        if since is None:
+            print("Error: --since required", file=sys.stderr)
+            return 1
+        until = _option(argv, "--until")
+        end_ts = _cli_time(until) if until else datetime.now().timestamp()
+        log_dir = Path(_option(argv, "--log-dir") or EVENTS_FILE.parent)
+        events_file = log_dir / EVENTS_FILE.name
+        try:
+            for line in iter_events(_cli_time(since), end_ts, _option(argv, "--type"), events_file):
+                sys.stdout.write(line)
+        except BrokenPipeError:
+            pass
+        return 0
+
+    if not args:
+        print("Error: ARCHIVE required", file=sys.stderr)
+        return 1
+
+    if command == "pack":
+        failed = 0
+        for name in args:
+            packed = pack_archive(Path(name))
+            if packed is None:
+                print(f"Failed to pack {name}", file=sys.stderr)
+                failed += 1
+            else:
+                print(packed)
+        return 1 if failed else 0
+
+    idx = load_index(Path(args[0]))
+    if idx is None:
+        print(f"No valid index for {args[0]}", file=sys.stderr)
+        return 1
+    print(json.dumps(idx, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
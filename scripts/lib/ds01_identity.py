@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_identity.py
+Cached uid/username/group resolution shared by DS01 tools.
+
+With SSSD/LDAP every NSS miss is a network round trip, and the same few
+hundred users are resolved over and over by the monitors, the owner tracker
+and the docker wrapper. Lookups go through three layers:
+
+    1. In-process LRU      positive entries for POSITIVE_TTL, misses for NEGATIVE_TTL
+    2. On-disk snapshot    /var/lib/ds01/identity.tsv, written by `refresh` (root,
+                           ds01-identity-cache.timer and after group-membership
+                           changes); ignored once older than SNAPSHOT_MAX_AGE,
+                           or unless root-owned and not group/world writable
+    3. NSS                 pwd/grp, then `getent` for SSSD/LDAP users
+
+in_group() is an authorization check and always asks NSS directly; the cache
+and snapshot serve names and display only.
+
+Snapshot format (tab-separated, also read by ds01_identity.sh without forking):
+
+    # ds01-identity <generated epoch>
+    user    <name>   <uid>   <gid>   <group>,<group>,...
+    group   <name>   <gid>   <member>,<member>,...
+
+Usage (Python):
+    from ds01_identity import in_group, name_to_uid, uid_to_name
+
+    uid_to_name(1722830498)           # 'h.baker@hertie-school.lan' or None
+    name_to_uid("alice")              # 1001 or None
+    in_group("alice", "ds01-admin")   # bool
+
+Usage (CLI):
+    python3 ds01_identity.py uid 1001
+    python3 ds01_identity.py name alice
+    python3 ds01_identity.py groups alice
+    python3 ds01_identity.py members ds01-admin
+    python3 ds01_identity.py in-group alice ds01-admin   # exit 0 / 1
+    sudo python3 ds01_identity.py refresh
+"""
+
+from __future__ import annotations
+
+import grp
+import os
+import pwd
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# Configuration
+SNAPSHOT_FILE = Path("/var/lib/ds01/identity.tsv")
+SNAPSHOT_MAX_AGE = 3600  # Seconds; the timer refreshes every 15 minutes
+POSITIVE_TTL = 600
+NEGATIVE_TTL = 60  # Short, so a newly created user is picked up quickly
+CACHE_SIZE = 4096
+GETENT_TIMEOUT = 5  # Local NSS lookup policy (see ds01_core.py)
+MIN_UID = 1000
+
+INFRA_ROOT = Path(__file__).resolve().parent.parent.parent
+GROUPS_DIR = INFRA_ROOT / "config" / "runtime" / "groups"
+HOME_DIR = Path("/home")
+TRACKED_GROUPS = ("docker", "video")  # Plus every ds01-* group
+
+_MISS = object()
+
+
+# ============================================================================
+# In-process cache
+# ============================================================================
+
+
+class _LRU:
+    """LRU with separate lifetimes for hits and misses (None values)."""
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+
+    def get(self, key: tuple):
+        item = self._data.get(key)
+        if item is None:
+            return _MISS
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            return _MISS
+        self._data.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value) -> None:
+        ttl = NEGATIVE_TTL if value is None else POSITIVE_TTL
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_cache = _LRU()
+_snapshot: dict = {"key": None}
+
+
+def clear_cache() -> None:
+    """Drop in-process entries and the loaded snapshot."""
+    _cache.clear()
+    _snapshot.clear()
+    _snapshot["key"] = None
+
+
+def _cached(key: tuple, resolve):
+    value = _cache.get(key)
+    if value is _MISS:
+        value = resolve()
+        _cache.put(key, value)
+    return value
+
+
+# ============================================================================
+# Snapshot
+# ============================================================================
+
+
+def _parse_snapshot(path: Path) -> dict | None:
+    users: dict[str, tuple[int, int, tuple[str, ...]]] = {}
+    uids: dict[int, str] = {}
+    groups: dict[str, tuple[str, ...]] = {}
+    with open(path) as f:
+        header = f.readline().split()
+        if len(header) != 3 or header[:2] != ["#", "ds01-identity"]:
+            return None
+        generated = float(header[2])
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            if fields[0] == "user" and len(fields) == 5:
+                name, uid, gid = fields[1], int(fields[2]), int(fields[3])
+                users[name] = (uid, gid, tuple(g for g in fields[4].split(",") if g))
+                uids.setdefault(uid, name)
+            elif fields[0] == "group" and len(fields) == 4:
+                groups[fields[1]] = tuple(m for m in fields[3].split(",") if m)
+    return {"generated": generated, "users": users, "uids": uids, "groups": groups}
+
+
+def _trusted(st: os.stat_result) -> bool:
+    """Root-owned and not group/world-writable: anyone who can write the file
+    could claim any identity in it."""
+    return st.st_uid == 0 and not st.st_mode & 0o022
+
+
+def _load_snapshot() -> dict | None:
+    """The current snapshot, re-read only when the file changes; None if absent or stale."""
+    try:
+        st = SNAPSHOT_FILE.stat()
+    except OSError:
+        return None
+    if not _trusted(st):
+        return None
+    key = (str(SNAPSHOT_FILE), st.st_mtime_ns, st.st_size)
+    if _snapshot.get("key") != key:
+        try:
+            data = _parse_snapshot(SNAPSHOT_FILE)
+        except (OSError, ValueError):
+            data = None
+        _snapshot.clear()
+        _snapshot.update(key=key, data=data)
+    data = _snapshot.get("data")
+    if data is None or time.time() - data["generated"] > SNAPSHOT_MAX_AGE:
+        return None
+    return data
+
+
+# ============================================================================
+# NSS
+# ============================================================================
+
+
+def _getent(database: str, key: str) -> list[str] | None:
+    """Fields of a `getent` entry (SSSD/LDAP users that pwd/grp did not return)."""
+    try:
+        result = subprocess.run(
+            ["getent", database, key], capture_output=True, text=True, timeout=GETENT_TIMEOUT
+        )
+        if result.returncode == 0 and result.stdout:
+            return result.stdout.splitlines()[0].split(":")
+    except (subprocess.TimeoutExpired, subprocess.SubprocessError, OSError):
+        pass
+    return None
+
+
+def _nss_user(name: str) -> tuple[int, int] | None:
+    try:
+        pw = pwd.getpwnam(name)
+        return pw.pw_uid, pw.pw_gid
+    except KeyError:
+        pass
+    fields = _getent("passwd", name)
+    try:
+        return (int(fields[2]), int(fields[3])) if fields and len(fields) >= 4 else None
+    except ValueError:
+        return None
+
+
+def _nss_uid(uid: int) -> str | None:
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        pass
+    fields = _getent("passwd", str(uid))
+    return fields[0] if fields else None
+
+
+def _nss_groups(name: str, gid: int) -> tuple[str, ...]:
+    names = []
+    try:
+        gids = os.getgrouplist(name, gid)
+    except OSError:
+        gids = [gid]
+    for g in gids:
+        try:
+            names.append(grp.getgrgid(g).gr_name)
+        except KeyError:
+            continue
+    return tuple(dict.fromkeys(names))
+
+
+def _nss_group(group: str) -> tuple[int, tuple[str, ...]] | None:
+    """(gid, explicit members) of a group."""
+    try:
+        gr = grp.getgrnam(group)
+        return gr.gr_gid, tuple(gr.gr_mem)
+    except KeyError:
+        pass
+    fields = _getent("group", group)
+    try:
+        if fields and len(fields) >= 4:
+            return int(fields[2]), tuple(m for m in fields[3].split(",") if m)
+    except ValueError:
+        pass
+    return None
+
+
+# ============================================================================
+# Lookups
+# ============================================================================
+
+
+def _user(name: str) -> tuple[int, int] | None:
+    def resolve():
+        snap = _load_snapshot()
+        if snap and name in snap["users"]:
+            return snap["users"][name][:2]
+        return _nss_user(name)
+
+    return _cached(("user", name), resolve) if name else None
+
+
+def uid_to_name(uid: int | str) -> str | None:
+    """Username for a UID, or None if it does not resolve."""
+    try:
+        uid = int(uid)
+    except (TypeError, ValueError):
+        return None
+
+    def resolve():
+        snap = _load_snapshot()
+        if snap and uid in snap["uids"]:
+            return snap["uids"][uid]
+        return _nss_uid(uid)
+
+    return _cached(("uid", uid), resolve)
+
+
+def name_to_uid(name: str) -> int | None:
+    """UID for a username, or None if it does not resolve."""
+    user = _user(name)
+    return user[0] if user else None
+
+
+def user_groups(name: str) -> list[str]:
+    """Names of every group the user is in, primary group included (like `id -nG`)."""
+
+    def resolve():
+        snap = _load_snapshot()
+        if snap and name in snap["users"]:
+            return snap["users"][name][2]
+        user = _user(name)
+        return _nss_groups(name, user[1]) if user else None
+
+    return list(_cached(("groups", name), resolve) or ()) if name else []
+
+
+def group_members(group: str) -> list[str]:
+    """Explicit members of a group (the member field of `getent group`)."""
+
+    def resolve():
+        snap = _load_snapshot()
+        if snap and group in snap["groups"]:
+            return snap["groups"][group]
+        entry = _nss_group(group)
+        return entry[1] if entry else None
+
+    return list(_cached(("members", group), resolve) or ())
+
+
+def in_group(name: str, group: str) -> bool:
+    """Live NSS membership check (bypasses cache and snapshot; use for authorization)."""
+    user = _nss_user(name) if name else None
+    return user is not None and group in _nss_groups(name, user[1])
+
+
+# ============================================================================
+# Snapshot refresh
+# ============================================================================
+
+
+def _known_users() -> set[str]:
+    """Users worth keeping in the snapshot."""
+    names = {pw.pw_name for pw in pwd.getpwall() if MIN_UID <= pw.pw_uid < 65534}
+    for member_file in GROUPS_DIR.glob("*.members"):
+        try:
+            for line in member_file.read_text().splitlines():
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    names.add(line)
+        except OSError:
+            continue
+    # Home directories cover SSSD users that NSS does not enumerate
+    try:
+        for home in HOME_DIR.iterdir():
+            try:
+                uid = home.stat().st_uid
+            except OSError:
+                continue
+            if uid >= MIN_UID:
+                name = _nss_uid(uid)
+                if name:
+                    names.add(name)
+    except OSError:
+        pass
+    return names
+
+
+def _tracked_groups() -> set[str]:
+    groups = set(TRACKED_GROUPS)
+    try:
+        groups.update(g.gr_name for g in grp.getgrall() if g.gr_name.startswith("ds01-"))
+    except OSError:
+        pass
+    return groups
+
+
+def refresh_snapshot(path: Path | None = None, users: set[str] | None = None) -> int:
+    """
+    Resolve known users and DS01 groups through NSS and write the snapshot atomically.
+
+    Returns the number of users written.
+    """
+    path = Path(path or SNAPSHOT_FILE)
+    names = set(users) if users is not None else _known_users()
+    _load_snapshot()
+    previous = _snapshot.get("data") or {}
+    names.update(previous.get("users", {}))  # Keep users resolved by earlier refreshes
+
+    lines = [f"# ds01-identity {int(time.time())}\n"]
+    written = 0
+    for name in sorted(names):
+        user = _nss_user(name)
+        if user is None or "\t" in name:
+            continue
+        groups = ",".join(_nss_groups(name, user[1]))
+        lines.append(f"user\t{name}\t{user[0]}\t{user[1]}\t{groups}\n")
+        written += 1
+    for group in sorted(_tracked_groups()):
+        entry = _nss_group(group)
+        if entry is not None:
+            lines.append(f"group\t{group}\t{entry[0]}\t{','.join(entry[1])}\n")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".identity.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.writelines(lines)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except OSError:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+    clear_cache()
+    return written
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DS01 cached uid/username/group resolution")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("uid", help="Username for a UID").add_argument("uid")
+    sub.add_parser("name", help="UID for a username").add_argument("name")
+    sub.add_parser("groups", help="Groups of a user").add_argument("name")
+    sub.add_parser("members", help="Members of a group").add_argument("group")
+    p_in = sub.add_parser("in-group", help="Exit 0 if the user is in the group")
+    p_in.add_argument("name")
+    p_in.add_argument("group")
+    p_refresh = sub.add_parser("refresh", help="Rewrite the on-disk snapshot (root)")
+    p_refresh.add_argument("--path", type=Path, default=None)
+    args = parser.parse_args()
+
+    if args.command == "refresh":
+        try:
+            count = refresh_snapshot(args.path)
+        except OSError as e:
+            print(f"Error writing snapshot: {e}", file=sys.stderr)
+            return 1
+        print(f"Wrote {count} users to {args.path or SNAPSHOT_FILE}")
+        return 0
+    if args.command == "in-group":
+        return 0 if in_group(args.name, args.group) else 1
+
+    if args.command == "uid":
+        value = uid_to_name(args.uid)
+    elif args.command == "name":
+        value = name_to_uid(args.name)
+    elif args.command == "groups":
+        value = " ".join(user_groups(args.name)) or None
+    else:
+        value = ",".join(group_members(args.group)) or None
+    if value is None:
+        return 1
+    print(value)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
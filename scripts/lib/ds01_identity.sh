@@ -0,0 +1,125 @@
+#!/bin/bash
+# /opt/ds01-infra/scripts/lib/ds01_identity.sh
+# Cached uid/username/group lookups for bash (see ds01_identity.py)
+#
+# Reads the snapshot written by `ds01_identity.py refresh` with bash builtins
+# (after one `stat` for the ownership check), so a hit costs no SSSD/LDAP
+# round trip. Results (misses included) are remembered for the life of the
+# calling script. When the
+# snapshot is missing, stale, or not root-owned and write-protected, falls
+# back to getent / id.
+#
+# The snapshot is for names and display only. ds01_user_in_group always asks
+# NSS, so wrappers running as the calling user can use it for authorization:
+# the path is fixed (environment overrides are ignored) and a revoked group
+# membership takes effect immediately.
+#
+# Usage:
+#   source /opt/ds01-infra/scripts/lib/ds01_identity.sh
+#
+#   name=$(ds01_uid_to_name 1001)
+#   uid=$(ds01_name_to_uid alice)
+#   ds01_user_in_group "$USER" ds01-admin && echo admin
+#
+# The functions return 1 when the user does not resolve; under `set -e`, call
+# them in a condition or with `|| true`.
+
+DS01_IDENTITY_SNAPSHOT="/var/lib/ds01/identity.tsv"
+DS01_IDENTITY_MAX_AGE=3600
+DS01_IDENTITY_OWNER=0
+
+declare -gA _DS01_ID_CACHE=()
+_DS01_ID_FRESH=""
+
+# Succeeds if the snapshot exists, is owned by DS01_IDENTITY_OWNER (root) and
+# not group/world writable, and is younger than DS01_IDENTITY_MAX_AGE (checked
+# once per script)
+_ds01_identity_fresh() {
+    if [[ -z $_DS01_ID_FRESH ]]; then
+        _DS01_ID_FRESH=0
+        local owner mode tag kind generated now
+        if [[ -r $DS01_IDENTITY_SNAPSHOT ]] &&
+            read -r owner mode < <(stat -L -c '%u %a' "$DS01_IDENTITY_SNAPSHOT" 2>/dev/null) &&
+            [[ $owner == "$DS01_IDENTITY_OWNER" ]] && ((!(8#$mode & 8#022))) &&
+            read -r tag kind generated <"$DS01_IDENTITY_SNAPSHOT" &&
+            [[ $tag == "#" && $kind == ds01-identity && $generated =~ ^[0-9]+$ ]]; then
+            printf -v now '%(%s)T' -1
+            ((now - generated <= DS01_IDENTITY_MAX_AGE)) && _DS01_ID_FRESH=1
+        fi
+    fi
+    [[ $_DS01_ID_FRESH == 1 ]]
+}
+
+# Find a user record by name or uid; sets _DS01_ID_REC=(name uid gid groups)
+_ds01_identity_user() {
+    local by="$1" value="$2" kind name uid gid groups
+    _ds01_identity_fresh || return 1
+    while IFS=$'\t' read -r kind name uid gid groups; do
+        [[ $kind == user ]] || continue
+        if [[ $by == name && $name == "$value" ]] || [[ $by == uid && $uid == "$value" ]]; then
+            _DS01_ID_REC=("$name" "$uid" "$gid" "$groups")
+            return 0
+        fi
+    done <"$DS01_IDENTITY_SNAPSHOT"
+    return 1
+}
+
+# Print the username for a UID
+ds01_uid_to_name() {
+    local uid="$1" name
+    [[ -n $uid ]] || return 1
+    if [[ -z ${_DS01_ID_CACHE["uid:$uid"]+set} ]]; then
+        if _ds01_identity_user uid "$uid"; then
+            name="${_DS01_ID_REC[0]}"
+        else
+            name=$(getent passwd "$uid" 2>/dev/null | cut -d: -f1) || true
+        fi
+        _DS01_ID_CACHE["uid:$uid"]="$name"
+    fi
+    name="${_DS01_ID_CACHE["uid:$uid"]}"
+    [[ -n $name ]] || return 1
+    echo "$name"
+}
+
+# Print the UID for a username
+ds01_name_to_uid() {
+    local user="$1" uid
+    [[ -n $user ]] || return 1
+    if [[ -z ${_DS01_ID_CACHE["name:$user"]+set} ]]; then
+        if _ds01_identity_user name "$user"; then
+            uid="${_DS01_ID_REC[1]}"
+        else
+            uid=$(id -u "$user" 2>/dev/null) || true
+        fi
+        _DS01_ID_CACHE["name:$user"]="$uid"
+    fi
+    uid="${_DS01_ID_CACHE["name:$user"]}"
+    [[ -n $uid ]] || return 1
+    echo "$uid"
+}
+
+# Print a user's groups, space-separated (like `id -nG`)
+ds01_user_groups() {
+    local user="$1" groups
+    [[ -n $user ]] || return 1
+    if [[ -z ${_DS01_ID_CACHE["groups:$user"]+set} ]]; then
+        if _ds01_identity_user name "$user"; then
+            groups="${_DS01_ID_REC[3]//,/ }"
+        else
+            groups=$(id -nG "$user" 2>/dev/null) || true
+        fi
+        _DS01_ID_CACHE["groups:$user"]="$groups"
+    fi
+    groups="${_DS01_ID_CACHE["groups:$user"]}"
+    [[ -n $groups ]] || return 1
+    echo "$groups"
+}
+
+# Succeed if the user is a member of the group. Always a live NSS lookup,
+# never the snapshot or cache: safe for authorization decisions.
+ds01_user_in_group() {
+    local user="$1" group="$2" groups
+    [[ -n $user && -n $group ]] || return 1
+    groups=$(id -nG "$user" 2>/dev/null) || return 1
+    [[ " $groups " == *" $group "* ]]
+}
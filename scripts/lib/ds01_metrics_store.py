@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_metrics_store.py
+Typed, length-prefixed record files for host metrics, plus the reader API reports use.
+
+collect-metrics.py samples GPUs, CPU, memory, disks, containers and user
+slices in one pass and appends one batch of records per pass to a per-day
+file:
+
+    /var/log/ds01-infra/metrics/YYYY-MM-DD.dsm       (gzipped after a day,
+                                                      deleted after 90 days)
+
+File layout:
+    magic   b"DS01MET1"
+    frames  <u32 payload length><payload> ...
+
+Every payload starts with <f64 timestamp><u16 kind id>. Kind 0 is the schema
+frame (JSON: kind name -> [id, [[field, type], ...]]) written once at the
+start of each file, so files stay readable after fields are added. Data
+frames follow the header with a null bitmap, the fixed-width numeric fields
+(type "i" = int64, "f" = float64) and then the strings ("s", u16 length +
+UTF-8). If the schema in code changes mid-day, the writer starts a new
+segment (YYYY-MM-DD.1.dsm) instead of mixing schemas in one file.
+
+Design principles:
+- One write() per batch under flock; a failed write is truncated away, so a
+  reader never sees a torn frame in the middle of a file
+- Readers skip unwanted kinds by id without decoding them
+- Sizes are bytes, percentages 0-100, timestamps epoch seconds
+
+Usage (Python):
+    from ds01_metrics_store import MetricsWriter, read_day
+
+    MetricsWriter().append([("gpu", {"index": "0", "util": 93.0, ...})], ts=time.time())
+    for rec in read_day("2026-03-02", kinds={"gpu"}):
+        print(rec.ts, rec.data["util"])
+
+Usage (CLI):
+    python3 ds01_metrics_store.py dump 2026-03-02 [--kind gpu]   # kind|ts|field|...
+    python3 ds01_metrics_store.py schema
+"""
+
+from __future__ import annotations
+
+import fcntl
+import gzip
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import time
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from pathlib import Path
+from typing import Any, NamedTuple
+
+# Configuration
+METRICS_DIR = Path(os.environ.get("DS01_METRICS_DIR", "/var/log/ds01-infra/metrics"))
+SUFFIX = ".dsm"
+MAGIC = b"DS01MET1"
+COMPRESS_AFTER_SECONDS = 86400
+RETENTION_DAYS = 90  # Matches the maxage of the collect-*.sh logs this replaced
+
+# Add NullHandler to avoid "No handlers found" warnings
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+# kind -> (id, fields). Ids are never reused; append fields at the end.
+SCHEMA: dict[str, tuple[int, tuple[tuple[str, str], ...]]] = {
+    "sample": (1, (("groups", "s"), ("duration_ms", "f"))),
+    "gpu": (
+        2,
+        (
+            ("index", "s"),
+            ("uuid", "s"),
+            ("name", "s"),
+            ("util", "f"),
+            ("mem_used", "i"),
+            ("mem_total", "i"),
+            ("temp", "f"),
+            ("power_draw", "f"),
+            ("power_limit", "f"),
+        ),
+    ),
+    "gpu_process": (
+        3,
+        (
+            ("pid", "i"),
+            ("user", "s"),
+            ("gpu_uuid", "s"),
+            ("mem_used", "i"),
+            ("process", "s"),
+            ("command", "s"),
+            ("container", "s"),
+        ),
+    ),
+    "cpu": (
+        4,
+        (("util", "f"), ("load1", "f"), ("load5", "f"), ("load15", "f"), ("cores", "i")),
+    ),
+    "cpu_core": (5, (("core", "i"), ("util", "f"))),
+    "memory": (
+        6,
+        (
+            ("total", "i"),
+            ("used", "i"),
+            ("free", "i"),
+            ("buff_cache", "i"),
+            ("available", "i"),
+            ("swap_total", "i"),
+            ("swap_used", "i"),
+        ),
+    ),
+    "user": (7, (("user", "s"), ("cpu_pct", "f"), ("rss", "i"), ("procs", "i"))),
+    "process": (
+        8,
+        (
+            ("rank_by", "s"),
+            ("pid", "i"),
+            ("user", "s"),
+            ("cpu_pct", "f"),
+            ("rss", "i"),
+            ("command", "s"),
+        ),
+    ),
+    "disk": (
+        9,
+        (
+            ("mount", "s"),
+            ("device", "s"),
+            ("size", "i"),
+            ("used", "i"),
+            ("avail", "i"),
+            ("inodes", "i"),
+            ("inodes_used", "i"),
+        ),
+    ),
+    "disk_io": (
+        10,
+        (
+            ("device", "s"),
+            ("reads", "i"),
+            ("writes", "i"),
+            ("read_bytes", "i"),
+            ("write_bytes", "i"),
+            ("io_ms", "i"),
+        ),
+    ),
+    "net": (11, (("iface", "s"), ("rx_bytes", "i"), ("tx_bytes", "i"))),
+    "container": (
+        12,
+        (
+            ("id", "s"),
+            ("name", "s"),
+            ("image", "s"),
+            ("state", "s"),
+            ("user", "s"),
+            ("created", "s"),
+            ("cpu_pct", "f"),
+            ("mem_used", "i"),
+            ("pids", "i"),
+            ("io_read", "i"),
+            ("io_write", "i"),
+        ),
+    ),
+    "slice": (
+        13,
+        (
+            ("user", "s"),
+            ("group", "s"),
+            ("mem_current", "i"),
+            ("mem_max", "i"),
+            ("pids_current", "i"),
+            ("pids_max", "i"),
+            ("psi_mem_some", "f"),
+            ("psi_mem_full", "f"),
+            ("psi_cpu_some", "f"),
+            ("psi_cpu_full", "f"),
+            ("oom", "i"),
+            ("oom_kill", "i"),
+        ),
+    ),
+}
+
+_SCHEMA_KIND = 0
+_LEN = struct.Struct("<I")
+_HEAD = struct.Struct("<dH")
+_STRLEN = struct.Struct("<H")
+_SEGMENT_RE = re.compile(r"^(\d{4}-\d{2}-\d{2})(?:\.(\d+))?\.dsm(\.gz)?$")
+
+
+class Record(NamedTuple):
+    ts: float
+    kind: str
+    data: dict[str, Any]
+
+
+# ============================================================================
+# Codec
+# ============================================================================
+
+
+class _Codec:
+    """Encoder/decoder for one kind's field list."""
+
+    def __init__(self, kind: str, kind_id: int, fields: Iterable[Iterable[str]]):
+        self.kind = kind
+        self.kind_id = kind_id
+        self.fields = [tuple(f) for f in fields]
+        self.numeric = [(i, name) for i, (name, t) in enumerate(self.fields) if t != "s"]
+        self.strings = [(i, name) for i, (name, t) in enumerate(self.fields) if t == "s"]
+        fmt = "".join("q" if self.fields[i][1] == "i" else "d" for i, _ in self.numeric)
+        self.fixed = struct.Struct("<" + fmt)
+        self.bitmap_len = (len(self.fields) + 7) // 8
+
+    def encode(self, ts: float, data: dict[str, Any]) -> bytes:
+        bitmap = bytearray(self.bitmap_len)
+        numbers = []
+        for i, name in self.numeric:
+            value = data.get(name)
+            if value is None:
+                bitmap[i >> 3] |= 1 << (i & 7)
+                value = 0
+            numbers.append(int(value) if self.fields[i][1] == "i" else float(value))
+        parts = [_HEAD.pack(ts, self.kind_id), bytes(bitmap), self.fixed.pack(*numbers)]
+        for i, name in self.strings:
+            value = data.get(name)
+            if value is None:
+                bitmap[i >> 3] |= 1 << (i & 7)
+                raw = b""
+            else:
+                raw = str(value).encode("utf-8", "replace")[:0xFFFF]
+            parts.append(_STRLEN.pack(len(raw)) + raw)
+        parts[1] = bytes(bitmap)
+        return b"".join(parts)
+
+    def decode(self, payload: bytes) -> dict[str, Any]:
+        offset = _HEAD.size
+        bitmap = payload[offset : offset + self.bitmap_len]
+        offset += self.bitmap_len
+        numbers = self.fixed.unpack_from(payload, offset)
+        offset += self.fixed.size
+        data: dict[str, Any] = {}
+        for (i, name), value in zip(self.numeric, numbers):
+            data[name] = None if bitmap[i >> 3] & (1 << (i & 7)) else value
+        for i, name in self.strings:
+            (length,) = _STRLEN.unpack_from(payload, offset)
+            offset += _STRLEN.size
+            raw = payload[offset : offset + length]
+            offset += length
+            data[name] = None if bitmap[i >> 3] & (1 << (i & 7)) else raw.decode("utf-8")
+        return {name: data[name] for name, _ in self.fields}
+
+
+def _codecs(schema: dict[str, Any]) -> dict[str, _Codec]:
+    return {kind: _Codec(kind, kind_id, fields) for kind, (kind_id, fields) in schema.items()}
+
+
+def _schema_json(schema: dict[str, Any]) -> bytes:
+    return json.dumps(
+        {kind: [kind_id, [list(f) for f in fields]] for kind, (kind_id, fields) in schema.items()},
+        sort_keys=True,
+        separators=(",", ":"),
+    ).encode()
+
+
+def _frame(payload: bytes) -> bytes:
+    return _LEN.pack(len(payload)) + payload
+
+
+# ============================================================================
+# Files
+# ============================================================================
+
+
+def day_files(day: str, metrics_dir: Path | None = None) -> list[Path]:
+    """All segments of one day ('YYYY-MM-DD'), in write order, compressed or not."""
+    metrics_dir = metrics_dir or METRICS_DIR
+    segments: dict[int, Path] = {}
+    try:
+        names = os.listdir(metrics_dir)
+    except OSError:
+        return []
+    for name in names:
+        match = _SEGMENT_RE.match(name)
+        if match and match.group(1) == day:
+            seq = int(match.group(2) or 0)
+            # A plain file wins over a .gz left behind by an interrupted compress
+            if seq not in segments or not match.group(3):
+                segments[seq] = metrics_dir / name
+    return [segments[seq] for seq in sorted(segments)]
+
+
+def compress_old(metrics_dir: Path | None = None, now: float | None = None) -> int:
+    """
+    Gzip closed day files older than COMPRESS_AFTER_SECONDS and delete segments
+    whose day is more than RETENTION_DAYS old. Returns files compressed.
+    """
+    metrics_dir = metrics_dir or METRICS_DIR
+    now = time.time() if now is None else now
+    cutoff = datetime.fromtimestamp(now - RETENTION_DAYS * 86400).strftime("%Y-%m-%d")
+    compressed = 0
+    try:
+        names = os.listdir(metrics_dir)
+    except OSError:
+        return 0
+    for name in names:
+        path = metrics_dir / name
+        match = _SEGMENT_RE.match(name)
+        # By the day in the name: compressing resets the mtime
+        if match and match.group(1) < cutoff:
+            try:
+                path.unlink()
+            except OSError as e:
+                logger.warning("Could not remove %s: %s", path, e)
+            continue
+        if not name.endswith(SUFFIX):
+            continue
+        try:
+            if now - path.stat().st_mtime < COMPRESS_AFTER_SECONDS:
+                continue
+            tmp = path.with_name(name + ".gz.tmp")
+            with open(path, "rb") as src, gzip.open(tmp, "wb") as dst:
+                while chunk := src.read(1 << 20):
+                    dst.write(chunk)
+            os.replace(tmp, path.with_name(name + ".gz"))
+            path.unlink()
+            compressed += 1
+        except OSError as e:
+            logger.warning("Could not compress %s: %s", path, e)
+    return compressed
+
+
+# ============================================================================
+# Writer
+# ============================================================================
+
+
+class MetricsWriter:
+    """Appends record batches to the current day's segment."""
+
+    def __init__(self, metrics_dir: Path | None = None, schema: dict[str, Any] | None = None):
+        self.metrics_dir = metrics_dir or METRICS_DIR
+        self.schema = schema or SCHEMA
+        self.codecs = _codecs(self.schema)
+        self._schema_bytes = _schema_json(self.schema)
+
+    def path_for(self, ts: float) -> Path:
+        """Segment to append to: the day's last one, or a new one if its schema differs."""
+        day = datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
+        existing = [p for p in day_files(day, self.metrics_dir) if p.suffix == SUFFIX]
+        if not existing:
+            return self.metrics_dir / f"{day}{SUFFIX}"
+        last = existing[-1]
+        if _read_schema_frame(last) in (None, self._schema_bytes):
+            return last
+        match = _SEGMENT_RE.match(last.name)
+        seq = int(match.group(2) or 0) + 1 if match else 1
+        return self.metrics_dir / f"{day}.{seq}{SUFFIX}"
+
+    def append(self, records: Iterable[tuple[str, dict[str, Any]]], ts: float) -> int:
+        """Write one batch of (kind, data) records stamped with ts. Returns bytes written."""
+        body = b"".join(_frame(self.codecs[kind].encode(ts, data)) for kind, data in records)
+        self.metrics_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(ts)
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            if size == 0:
+                body = MAGIC + _frame(_HEAD.pack(ts, _SCHEMA_KIND) + self._schema_bytes) + body
+            try:
+                written = os.write(fd, body)
+                if written != len(body):
+                    raise OSError(f"short write ({written}/{len(body)} bytes)")
+            except OSError:
+                os.ftruncate(fd, size)
+                raise
+            return written
+        finally:
+            os.close(fd)
+
+
+def _read_schema_frame(path: Path) -> bytes | None:
+    """Raw schema JSON of an uncompressed segment, or None if it has none yet."""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            head = f.read(_LEN.size)
+            if len(head) < _LEN.size:
+                return None
+            payload = f.read(_LEN.unpack(head)[0])
+    except OSError:
+        return None
+    if len(payload) < _HEAD.size or _HEAD.unpack_from(payload)[1] != _SCHEMA_KIND:
+        return None
+    return payload[_HEAD.size :]
+
+
+# ============================================================================
+# Reader
+# ============================================================================
+
+
+def iter_file(path: Path, kinds: set[str] | None = None) -> Iterator[Record]:
+    """Yield records from one segment, decoding only the requested kinds."""
+    opener = gzip.open if path.name.endswith(".gz") else open
+    try:
+        with opener(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                logger.warning("%s is not a metrics file", path)
+                return
+            by_id: dict[int, _Codec] = {}
+            while head := f.read(_LEN.size):
+                length = _LEN.unpack(head)[0] if len(head) == _LEN.size else 0
+                payload = f.read(length)
+                if len(payload) != length or length < _HEAD.size:
+                    logger.warning("Truncated frame at end of %s", path)
+                    return
+                ts, kind_id = _HEAD.unpack_from(payload)
+                if kind_id == _SCHEMA_KIND:
+                    schema = json.loads(payload[_HEAD.size :])
+                    by_id = {c.kind_id: c for c in _codecs(schema).values()}
+                    continue
+                codec = by_id.get(kind_id)
+                if codec is None or (kinds is not None and codec.kind not in kinds):
+                    continue
+                yield Record(ts, codec.kind, codec.decode(payload))
+    except (OSError, EOFError, struct.error, ValueError) as e:
+        logger.warning("Could not read %s: %s", path, e)
+
+
+def read_day(
+    day: str, kinds: set[str] | None = None, metrics_dir: Path | None = None
+) -> Iterator[Record]:
+    """Yield one day's records in write order."""
+    for path in day_files(day, metrics_dir):
+        yield from iter_file(path, kinds)
+
+
+def read_columns(day: str, kind: str, metrics_dir: Path | None = None) -> dict[str, list[Any]]:
+    """One kind for one day as columns: {"ts": [...], field: [...], ...}."""
+    columns: dict[str, list[Any]] = {"ts": []}
+    for rec in read_day(day, {kind}, metrics_dir):
+        columns["ts"].append(rec.ts)
+        for name, value in rec.data.items():
+            columns.setdefault(name, []).append(value)
+    return columns
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def _format(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value).replace("|", "/").replace("\n", " ")
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DS01 metrics record files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_dump = sub.add_parser("dump", help="Print one day as kind|ts|field|... lines")
+    p_dump.add_argument("day", help="YYYY-MM-DD")
+    p_dump.add_argument("--kind", action="append", help="Only this kind (repeatable)")
+    p_dump.add_argument("--dir", type=Path, default=None, help="Metrics directory")
+    sub.add_parser("schema", help="Print the record schema")
+    args = parser.parse_args()
+
+    if args.command == "schema":
+        for kind, (kind_id, fields) in SCHEMA.items():
+            print(f"{kind_id:3} {kind}: " + ", ".join(f"{n}:{t}" for n, t in fields))
+        return 0
+
+    kinds = set(args.kind) if args.kind else None
+    out = sys.stdout
+    try:
+        for rec in read_day(args.day, kinds, args.dir):
+            out.write(
+                "|".join([rec.kind, f"{rec.ts:.0f}", *map(_format, rec.data.values())]) + "\n"
+            )
+    except BrokenPipeError:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_mig_planner.py
+Demand-driven MIG layout planner.
+
+ds01-mig-partition applies whatever `gpu_allocation.mig_gpus` says, and that
+layout is chosen by hand. This planner reads the last few weeks of
+gpu.allocate/gpu.release/gpu.reject events, models concurrent demand per
+profile (1g.10gb, 3g.40gb, ..., full) for every hour of the week, and
+recommends the per-GPU layout that leaves the fewest requests unserved. The
+output is a dry-run diff against the current layout from `nvidia-smi -L`,
+plus the `mig_gpus` YAML that ds01-mig-partition applies.
+
+Demand model:
+- Each hour-of-week bucket (Mon 00:00 ... Sun 23:00, local time) takes the
+  peak number of concurrent allocations per profile in that clock hour, plus
+  the distinct containers rejected for lack of capacity ("No ... available")
+  in it; the bucket's demand is a quantile of that across the weeks
+- A request needs a slot of its profile or a larger MIG profile; full-GPU
+  requests need an unpartitioned GPU
+- Expected rejections per week = unmet demand summed over all 168 buckets
+
+Design principles:
+- Read-only: never calls `nvidia-smi mig`; applying stays with
+  ds01-mig-partition during a low-demand window (also reported)
+- Layouts are homogeneous per GPU (N x one profile, or full), the shape
+  ds01-mig-partition can apply; GPUs are assumed identical
+- Ties prefer the fewest GPUs to repartition, then more full GPUs
+
+Usage (Python):
+    from ds01_mig_planner import build_demand, load_events, plan_layout
+
+    history, rejects = load_events(start_ts, end_ts)
+    demand = build_demand(history, rejects, slot_profiles, start_ts, end_ts)
+    plan = plan_layout(demand, current_layout, ["1g.10gb", "3g.40gb"])
+
+Usage (CLI):
+    python3 ds01_mig_planner.py plan --weeks 4
+    python3 ds01_mig_planner.py plan --weeks 8 --quantile 0.95 --yaml
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import math
+import re
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from ds01_placement import event_slots
+
+# Configuration
+NVIDIA_SMI_BIN = "/usr/bin/nvidia-smi"
+FULL = "full"
+SLICES_PER_GPU = 7  # Compute slices per A100/H100 (see gpu-state-reader.py)
+HOURS_PER_WEEK = 168
+DEFAULT_WEEKS = 4
+DEFAULT_QUANTILE = 0.9
+DEFAULT_WINDOW_HOURS = 3
+# gpu-availability-checker.py capacity errors all start with "No ... available"
+CAPACITY_REJECT = re.compile(r"^No .*available")
+RELEASES = ("gpu.release", "container.remove", "container.removed")
+DAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# Add NullHandler to avoid "No handlers found" warnings
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# ============================================================================
+# Profiles and current layout
+# ============================================================================
+
+
+def profile_slices(profile: str) -> int:
+    """Compute slices of a profile ("3g.40gb" -> 3, full -> 7)."""
+    match = re.match(r"(\d+)g\.", profile or "")
+    return int(match.group(1)) if match else SLICES_PER_GPU
+
+
+def max_instances(profile: str) -> int:
+    """Instances of one profile that fit on a GPU (1 for full)."""
+    return 1 if profile == FULL else SLICES_PER_GPU // profile_slices(profile)
+
+
+def is_mig_profile(profile: str | None) -> bool:
+    return bool(re.match(r"\d+g\.", profile or ""))
+
+
+def parse_mig_layout(output: str) -> dict[str, list[str]]:
+    """
+    Parse `nvidia-smi -L` into {gpu_index: [MIG profile, ...]} ([] = full GPU).
+    """
+    layout: dict[str, list[str]] = {}
+    gpu = None
+    for line in output.splitlines():
+        gpu_match = re.match(r"GPU (\d+):", line)
+        if gpu_match:
+            gpu = gpu_match.group(1)
+            layout[gpu] = []
+            continue
+        mig_match = re.match(r"\s+MIG\s+(\S+)\s+Device\s+\d+:", line)
+        if mig_match and gpu is not None:
+            layout[gpu].append(mig_match.group(1))
+    return layout
+
+
+def read_mig_layout() -> dict[str, list[str]]:
+    """Current layout from `nvidia-smi -L` ({} if nvidia-smi is unavailable)."""
+    try:
+        result = subprocess.run(
+            [NVIDIA_SMI_BIN, "-L"], capture_output=True, text=True, check=True, timeout=30
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, FileNotFoundError):
+        return {}
+    return parse_mig_layout(result.stdout)
+
+
+def gpu_config(profiles: list[str]) -> str | None:
+    """The homogeneous option a GPU currently matches (FULL, a profile) or None."""
+    if not profiles:
+        return FULL
+    if len(set(profiles)) == 1 and len(profiles) == max_instances(profiles[0]):
+        return profiles[0]
+    return None
+
+
+def describe(profiles: list[str] | str) -> str:
+    """Human-readable GPU layout ("full", "7x 1g.10gb", "1g.10gb+3g.40gb")."""
+    if isinstance(profiles, str):
+        return FULL if profiles == FULL else f"{max_instances(profiles)}x {profiles}"
+    if not profiles:
+        return FULL
+    counts = Counter(profiles)
+    return "+".join(f"{n}x {p}" if n > 1 else p for p, n in sorted(counts.items()))
+
+
+def slot_profiles(layout: dict[str, list[str]]) -> dict[str, str]:
+    """Slot ID -> profile for the current layout ("1.3" -> "1g.10gb", "0" -> full)."""
+    profiles = {}
+    for gpu, migs in layout.items():
+        if not migs:
+            profiles[gpu] = FULL
+        for i, profile in enumerate(migs):
+            profiles[f"{gpu}.{i}"] = profile
+    return profiles
+
+
+# ============================================================================
+# Demand model
+# ============================================================================
+
+
+def load_events(
+    start_ts: float, end_ts: float, events_file: Path | None = None
+) -> tuple[list[dict], list[dict]]:
+    """
+    (allocate/release history oldest first, capacity rejections) in the window.
+
+    Container removals count as releases: GPUs are freed with the container,
+    and not every removal path logs gpu.release.
+    """
+    from ds01_event_index import EVENTS_FILE, scan_events
+
+    collect: dict[str, list[dict]] = {t: [] for t in ("gpu.allocate", "gpu.reject", *RELEASES)}
+    scan_events(start_ts, end_ts, set(collect), collect, events_file or EVENTS_FILE)
+    history = [dict(e, kind="allocate") for e in collect["gpu.allocate"]]
+    for etype in RELEASES:
+        history += [dict(e, kind="release") for e in collect[etype]]
+    history.sort(key=lambda e: e["ts"] or 0)
+    rejects = [e for e in collect["gpu.reject"] if CAPACITY_REJECT.match(e.get("reason") or "")]
+    return history, rejects
+
+
+def hour_of_week(ts: float) -> int:
+    """0 = Monday 00:00-01:00 local time, 167 = Sunday 23:00-24:00."""
+    t = time.localtime(ts)
+    return t.tm_wday * 24 + t.tm_hour
+
+
+def _event_profiles(event: dict, profiles: dict[str, str], fallback_mig: str) -> list[str]:
+    """Profile of each slot of an allocation event."""
+    logged = event.get("mig_profile")
+    result = []
+    for slot in event_slots(event):
+        if "." not in slot:
+            result.append(FULL)
+        elif is_mig_profile(logged):
+            result.append(logged)
+        else:
+            result.append(profiles.get(slot, fallback_mig))
+    return result
+
+
+def _reject_profile(event: dict, usual: dict[str, str], fallback_mig: str) -> str:
+    """Profile a capacity-rejected request most likely wanted."""
+    reason = event.get("reason") or ""
+    if reason.startswith("No full GPU"):
+        return FULL
+    user_profile = usual.get(event.get("user") or "")
+    if "MIG" in reason:
+        return user_profile if is_mig_profile(user_profile) else fallback_mig
+    return user_profile or fallback_mig
+
+
+def _quantile(values: list[int], q: float) -> int:
+    """Nearest-rank quantile (values non-empty)."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def build_demand(
+    history: list[dict],
+    rejects: list[dict],
+    profiles: dict[str, str],
+    start_ts: float,
+    end_ts: float,
+    quantile: float = DEFAULT_QUANTILE,
+) -> dict[int, Counter]:
+    """
+    Demand per hour-of-week: {0..167: Counter(profile -> concurrent requests)}.
+
+    Args:
+        history: gpu.allocate/gpu.release events oldest first (see load_events)
+        rejects: Capacity gpu.reject events
+        profiles: Slot ID -> profile for slots whose events carry no mig_profile
+        start_ts, end_ts: Window the events were read from
+        quantile: Quantile across weeks for each hour-of-week bucket
+    """
+    mig_profiles = [p for p in profiles.values() if is_mig_profile(p)]
+    fallback_mig = min(mig_profiles, key=profile_slices) if mig_profiles else FULL
+
+    first_hour, last_hour = int(start_ts // 3600), int(end_ts // 3600)
+    peaks: dict[int, Counter] = defaultdict(Counter)  # absolute hour -> profile -> peak
+    active: dict[str, list[str]] = {}  # container -> profiles
+    usage: dict[str, Counter] = defaultdict(Counter)  # user -> profile -> allocations
+    running: Counter = Counter()
+    hour = first_hour
+
+    def record(at: int) -> None:
+        for profile, n in running.items():
+            peaks[at][profile] = max(peaks[at][profile], n)
+
+    for event in history:
+        event_hour = min(max(int((event.get("ts") or start_ts) // 3600), first_hour), last_hour)
+        # Allocations still running carry over into the hours without events
+        while hour < event_hour:
+            hour += 1
+            record(hour)
+        container = event.get("container") or ""
+        if event["kind"] == "release":
+            running.subtract(active.pop(container, []))
+            running += Counter()  # drop zero counts
+            continue
+        if not container or container in active:
+            continue
+        taken = _event_profiles(event, profiles, fallback_mig)
+        active[container] = taken
+        running.update(taken)
+        usage[event.get("user") or ""].update(taken)
+        record(hour)
+    while hour < last_hour:
+        hour += 1
+        record(hour)
+
+    usual = {user: counts.most_common(1)[0][0] for user, counts in usage.items()}
+    unmet: dict[int, set] = defaultdict(set)
+    for event in rejects:
+        at = int((event.get("ts") or start_ts) // 3600)
+        key = (event.get("user"), event.get("container"))
+        unmet[at].add((key, _reject_profile(event, usual, fallback_mig)))
+    for at, wanted in unmet.items():
+        peaks[at].update(profile for _, profile in wanted)
+
+    samples: dict[int, list[Counter]] = defaultdict(list)
+    for at in range(first_hour, last_hour + 1):
+        samples[hour_of_week(at * 3600)].append(peaks.get(at, Counter()))
+
+    demand: dict[int, Counter] = {}
+    for how in range(HOURS_PER_WEEK):
+        weeks = samples.get(how) or [Counter()]
+        seen = set().union(*weeks)
+        demand[how] = Counter(
+            {p: q for p in seen if (q := _quantile([w[p] for w in weeks], quantile))}
+        )
+    return demand
+
+
+# ============================================================================
+# Planning
+# ============================================================================
+
+
+def unmet_demand(demand: Counter, supply: Counter) -> int:
+    """
+    Requests left unserved when `supply` (profile -> slots) meets `demand`.
+
+    Full-GPU requests need full GPUs. MIG requests take the smallest free MIG
+    profile at least as large as theirs, largest requests first.
+    """
+    unmet = max(0, demand.get(FULL, 0) - supply.get(FULL, 0))
+    free = Counter({p: n for p, n in supply.items() if p != FULL})
+    sizes = sorted(free, key=profile_slices)
+    for profile in sorted((p for p in demand if p != FULL), key=profile_slices, reverse=True):
+        need = demand[profile]
+        for candidate in sizes:
+            if need == 0:
+                break
+            if profile_slices(candidate) < profile_slices(profile):
+                continue
+            take = min(need, free[candidate])
+            free[candidate] -= take
+            need -= take
+        unmet += need
+    return unmet
+
+
+def layout_supply(options) -> Counter:
+    """Slots per profile for a set of per-GPU options (FULL or a MIG profile)."""
+    supply: Counter = Counter()
+    for option in options:
+        supply[option] += max_instances(option)
+    return supply
+
+
+def expected_rejections(demand: dict[int, Counter], supply: Counter) -> int:
+    """Unmet requests summed over the week's hour buckets."""
+    return sum(unmet_demand(d, supply) for d in demand.values())
+
+
+def current_supply(layout: dict[str, list[str]]) -> Counter:
+    supply: Counter = Counter()
+    for migs in layout.values():
+        if migs:
+            supply.update(migs)
+        else:
+            supply[FULL] += 1
+    return supply
+
+
+def _assign(options, current: dict[str, list[str]]) -> dict[str, str]:
+    """Map chosen options onto GPUs, keeping GPUs that already match one."""
+    remaining = Counter(options)
+    assignment: dict[str, str] = {}
+    gpus = sorted(current, key=int)
+    for gpu in gpus:
+        config = gpu_config(current[gpu])
+        if config is not None and remaining[config] > 0:
+            assignment[gpu] = config
+            remaining[config] -= 1
+    leftover = sorted(remaining.elements(), key=lambda p: (p != FULL, profile_slices(p), p))
+    for gpu in gpus:
+        if gpu not in assignment:
+            assignment[gpu] = leftover.pop(0)
+    return assignment
+
+
+def plan_layout(
+    demand: dict[int, Counter], current: dict[str, list[str]], profiles: list[str]
+) -> dict:
+    """
+    Recommend a homogeneous per-GPU layout for `current`'s GPUs.
+
+    Args:
+        demand: Output of build_demand
+        current: Current layout (see parse_mig_layout)
+        profiles: MIG profiles to consider besides full GPUs
+
+    Returns:
+        Dict with layout (gpu -> FULL or profile), changes (GPUs to
+        repartition), current_rejections and expected_rejections per week
+    """
+    options = [FULL, *sorted(set(profiles) - {FULL}, key=profile_slices)]
+    best_key, best = None, None
+    for combo in itertools.combinations_with_replacement(options, len(current)):
+        assignment = _assign(combo, current)
+        changes = sum(1 for gpu, option in assignment.items() if gpu_config(current[gpu]) != option)
+        key = (expected_rejections(demand, layout_supply(combo)), changes, -combo.count(FULL))
+        if best_key is None or key < best_key:
+            best_key, best = key, assignment
+
+    best = best or {}
+    return {
+        "layout": best,
+        "changes": sorted(
+            (gpu for gpu, option in best.items() if gpu_config(current[gpu]) != option), key=int
+        ),
+        "current_rejections": expected_rejections(demand, current_supply(current)),
+        "expected_rejections": best_key[0] if best_key else 0,
+    }
+
+
+def quietest_window(demand: dict[int, Counter], hours: int = DEFAULT_WINDOW_HOURS) -> int:
+    """Start hour-of-week of the `hours`-long window with the least demand."""
+    totals = [sum(demand.get(h, Counter()).values()) for h in range(HOURS_PER_WEEK)]
+    return min(
+        range(HOURS_PER_WEEK),
+        key=lambda s: (sum(totals[(s + i) % HOURS_PER_WEEK] for i in range(hours)), s),
+    )
+
+
+def format_hour(how: int) -> str:
+    return f"{DAY_NAMES[how // 24 % 7]} {how % 24:02d}:00"
+
+
+def mig_gpus_yaml(layout: dict[str, str]) -> str:
+    """`gpu_allocation.mig_gpus` block for resource-limits.yaml (ds01-mig-partition)."""
+    lines = ["  mig_gpus:"]
+    for gpu in sorted(layout, key=int):
+        option = layout[gpu]
+        if option == FULL:
+            lines.append(f"    {gpu}: {{enable: false}}")
+        else:
+            lines.append(
+                f"    {gpu}: {{enable: true, profile: {option}, instances: {max_instances(option)}}}"
+            )
+    return "\n".join(lines)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DS01 demand-driven MIG layout planner")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_plan = sub.add_parser("plan", help="Recommend a MIG layout (dry run, changes nothing)")
+    p_plan.add_argument("--weeks", type=float, default=DEFAULT_WEEKS, help="History (default: 4)")
+    p_plan.add_argument(
+        "--quantile", type=float, default=DEFAULT_QUANTILE, help="Across weeks (default: 0.9)"
+    )
+    p_plan.add_argument(
+        "--events", type=Path, help="Event log (default: /var/log/ds01/events.jsonl)"
+    )
+    p_plan.add_argument("--profiles", help="Extra MIG profiles to consider, e.g. 2g.20gb,3g.40gb")
+    p_plan.add_argument(
+        "--window", type=int, default=DEFAULT_WINDOW_HOURS, help="Apply window hours (default: 3)"
+    )
+    p_plan.add_argument("--yaml", action="store_true", help="Print only the mig_gpus YAML")
+    p_plan.add_argument("--json", action="store_true", help="Output JSON")
+    args = parser.parse_args()
+
+    current = read_mig_layout()
+    if not current:
+        print("Error: could not read the GPU layout from nvidia-smi -L", file=sys.stderr)
+        return 1
+
+    end_ts = time.time()
+    start_ts = end_ts - args.weeks * 7 * 86400
+    history, rejects = load_events(start_ts, end_ts, args.events)
+    profiles_by_slot = slot_profiles(current)
+    demand = build_demand(history, rejects, profiles_by_slot, start_ts, end_ts, args.quantile)
+
+    candidates = {p for migs in current.values() for p in migs}
+    candidates |= {e["mig_profile"] for e in history if is_mig_profile(e.get("mig_profile"))}
+    if args.profiles:
+        candidates |= {p.strip() for p in args.profiles.split(",") if is_mig_profile(p.strip())}
+    plan = plan_layout(demand, current, sorted(candidates))
+    window = quietest_window(demand, args.window)
+    weeks = max(args.weeks, 1e-9)
+
+    if args.yaml:
+        print(mig_gpus_yaml(plan["layout"]))
+        return 0
+    if args.json:
+        peak = Counter()
+        for counts in demand.values():
+            peak |= counts
+        print(
+            json.dumps(
+                {
+                    "current": current,
+                    "recommended": plan["layout"],
+                    "changes": plan["changes"],
+                    "peak_demand": dict(peak),
+                    "observed_capacity_rejections_per_week": len(rejects) / weeks,
+                    "current_rejections_per_week": plan["current_rejections"],
+                    "expected_rejections_per_week": plan["expected_rejections"],
+                    "apply_window": {"start": format_hour(window), "hours": args.window},
+                },
+                indent=2,
+            )
+        )
+        return 0
+
+    print(f"Demand: last {args.weeks:g} week(s), p{args.quantile * 100:g} per hour of week")
+    print(f"Observed capacity rejections: {len(rejects) / weeks:.1f}/week")
+    print()
+    print(f"{'GPU':<5} {'Current':<22} {'Recommended':<22}")
+    for gpu in sorted(current, key=int):
+        change = "repartition" if gpu in plan["changes"] else "unchanged"
+        print(f"{gpu:<5} {describe(current[gpu]):<22} {describe(plan['layout'][gpu]):<22} {change}")
+    print()
+    saved = plan["current_rejections"] - plan["expected_rejections"]
+    print(
+        f"Expected rejections/week: {plan['current_rejections']} -> "
+        f"{plan['expected_rejections']} ({-saved:+d})"
+    )
+    if not plan["changes"]:
+        print("Current layout is already the best fit; nothing to do.")
+        return 0
+    print(f"Lowest-demand window: {format_hour(window)} for {args.window}h")
+    print()
+    print("To apply: set gpu_allocation.mig_gpus in resource-limits.yaml to")
+    print(mig_gpus_yaml(plan["layout"]))
+    print("then run `sudo ds01-mig-partition --dry-run` and `sudo ds01-mig-partition`.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,8 @@
 #   source /opt/ds01-infra/scripts/lib/ds01_notify.sh
 #
 # Public functions:
+#   ds01_notify_queue     <username> <container_name> <severity> <key> <message> [cooldown_s] [episode]
+#   ds01_notify_due       <username> <container_name> <key> [cooldown_s] [episode]
 #   ds01_notify           <username> <container_name> <message>
 #   ds01_notify_container <container_name> <message>
 #   ds01_format_message   <severity> <title> <body> <username>
@@ -34,6 +36,84 @@ _ds01_notify_log() {
     echo "[ds01_notify] $*" >&2
 }
 
+# ── ds01_notify_queue ─────────────────────────────────────────────────────────
+# Queue a notification for the ds01-notify service (ds01_notify_queue.py),
+# which coalesces each user's notifications into one delivery, drops
+# duplicates and keys the shared index suppresses, and writes the container
+# fallback through the workspace host mount. Delivers directly when the queue
+# is not deployed or not writable: through `ds01_notify_queue.py send` (which
+# still honours the index) if a cooldown or episode is given, otherwise with
+# ds01_notify.
+#
+# Usage: ds01_notify_queue <username> <container_name> <severity> <key> <message> [cooldown_s] [episode]
+#   key         Dedupe key, e.g. "idle.warning": the newest message per
+#               (container, key) wins within a delivery
+#   cooldown_s  Skip if the same (user, container, key) was delivered this
+#               recently (default 0: always deliver)
+#   episode     Skip if the same (user, container, key) was already delivered
+#               for this episode, e.g. the idle period's last-activity time
+DS01_NOTIFY_QUEUE_DIR="${DS01_NOTIFY_QUEUE_DIR:-/var/lib/ds01/notify-queue}"
+DS01_NOTIFY_INDEX="${DS01_NOTIFY_INDEX:-/var/lib/ds01/notify-index.tsv}"
+
+ds01_notify_queue() {
+    local username="$1"
+    local container_name="$2"
+    local severity="$3"
+    local key="$4"
+    local message="$5"
+    local cooldown="${6//[^0-9]/}"
+    local episode="${7:-}"
+    cooldown="${cooldown:-0}"
+    local queue="$DS01_NOTIFY_QUEUE_DIR"
+
+    if [ -d "$queue/new" ] && [ -w "$queue/tmp" ]; then
+        local name="${EPOCHREALTIME/[.,]/}-$$-${RANDOM}"
+        # Header values are single-line; the message follows a blank line
+        if printf 'user=%s\ncontainer=%s\nseverity=%s\nkey=%s\ncooldown=%s\nepisode=%s\nqueued=%s\n\n%s\n' \
+            "${username//$'\n'/}" "${container_name//$'\n'/}" "${severity//$'\n'/}" \
+            "${key//$'\n'/}" "$cooldown" "${episode//$'\n'/}" \
+            "${EPOCHSECONDS:-$(date +%s)}" "$message" \
+            >"$queue/tmp/$name" 2>/dev/null &&
+            mv -f "$queue/tmp/$name" "$queue/new/$name" 2>/dev/null; then
+            return 0
+        fi
+        rm -f "$queue/tmp/$name" 2>/dev/null
+    fi
+
+    if [ -n "$key" ] && { [ -n "$episode" ] || [ "$cooldown" -gt 0 ]; }; then
+        python3 "${_DS01_NOTIFY_DIR}/ds01_notify_queue.py" send \
+            --container "$container_name" --severity "$severity" --key "$key" \
+            --cooldown "$cooldown" --episode "$episode" -- "$username" "$message" \
+            2>/dev/null && return 0
+    fi
+    ds01_notify "$username" "$container_name" "$message"
+}
+
+# ── ds01_notify_due ───────────────────────────────────────────────────────────
+# Succeeds unless the shared notification index (written by ds01-notify) says
+# the same (user, container, key) was delivered within cooldown_s or already
+# for this episode. Producers call it before building a message, the way they
+# used to test their own WARNED flags; the service still makes the final
+# decision. Reads the index with bash builtins only.
+#
+# Usage: ds01_notify_due <username> <container_name> <key> [cooldown_s] [episode]
+ds01_notify_due() {
+    local id="$1|$2|$3"
+    local cooldown="${4//[^0-9]/}"
+    local episode="${5:-}"
+    local entry at last_episode now
+
+    [ -r "$DS01_NOTIFY_INDEX" ] || return 0
+    while IFS=$'\t' read -r entry at last_episode; do
+        [[ $entry == "$id" && $at =~ ^[0-9]+$ ]] || continue
+        [[ -n $episode && $last_episode == "$episode" ]] && return 1
+        printf -v now '%(%s)T' -1
+        ((${cooldown:-0} > 0 && now - at < cooldown)) && return 1
+        return 0
+    done <"$DS01_NOTIFY_INDEX"
+    return 0
+}
+
 # ── ds01_notify ───────────────────────────────────────────────────────────────
 # Send message to a specific user's active terminal(s).
 # Falls back to container-file write if no terminals and container is known.
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_notify_queue.py
+Queued delivery of user notifications (idle, runtime and quota warnings).
+
+Producers (check-idle-containers.sh, enforce-max-runtime.sh,
+resource-alert-checker.sh) enqueue a notification instead of delivering it
+themselves; the ds01-notify service delivers the queue. Per flush it:
+
+- Coalesces each user's pending notifications into one write per terminal
+- Drops duplicates: the newest message per (container, key) wins, and a key
+  is skipped while it is in cooldown or was already delivered for the same
+  episode (one index for all producers, see below)
+- Resolves terminals from a single read of utmp, not `who | awk` per message
+- Falls back to /workspace/.ds01-alerts through the container's host mount
+  (one batched `docker inspect` per flush), not `docker exec` per message -
+  this also reaches containers that have just been stopped
+
+Files (under /var/lib/ds01):
+    notify-queue/tmp/, notify-queue/new/
+                        Spool. One file per notification, written to tmp/ and
+                        renamed into new/ so the service never sees a partial
+                        file. Header lines "key=value", a blank line, then the
+                        message.
+    notify-index.tsv    Last delivery per "user|container|key": time and
+                        episode, one tab-separated line each.
+
+Repeat suppression lives in the index, not in the producers:
+- cooldown (seconds): skip if the key was delivered this recently; quota
+  alerts re-notify every 4h while they persist
+- episode (opaque string): skip if the key was already delivered for this
+  episode; idle warnings pass the last-activity time and runtime warnings
+  the container start time, so each warning goes out once per idle period
+  or container run
+Producers check the index first (ds01_notify_due) so they do not build
+messages that would be dropped; the service makes the final decision.
+
+Design principles:
+- Enqueueing never fails the caller: if the queue is missing (service not
+  deployed) or unwritable, ds01_notify.sh delivers directly as before
+  (through `send` when the call has a cooldown or episode, so the index is
+  still honoured)
+- A user waits at most COALESCE_SECONDS after their last enqueue (and never
+  more than MAX_DELAY_SECONDS) so one cron tick produces one delivery
+- Workspace files are appended with the workspace owner's uid, so a user
+  cannot redirect the root daemon's write with a symlink
+
+Usage (Python):
+    from ds01_notify_queue import enqueue
+
+    enqueue("alice", message, container="proj._.1001", severity="WARNING", key="idle.warning")
+
+Usage (Bash):
+    source /opt/ds01-infra/scripts/lib/ds01_notify.sh
+    ds01_notify_queue "$username" "$container" WARNING idle.warning "$msg" 0 "$LAST_ACTIVITY"
+
+Usage (CLI):
+    python3 ds01_notify_queue.py run      # Service loop (ds01-notify.service)
+    python3 ds01_notify_queue.py flush    # Deliver everything pending now
+    python3 ds01_notify_queue.py send USER MESSAGE [--key K --episode E ...]
+                                          # Deliver one now (queue not deployed)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+# Configuration
+NOTIFY_QUEUE_DIR = Path(os.environ.get("DS01_NOTIFY_QUEUE_DIR", "/var/lib/ds01/notify-queue"))
+NOTIFY_INDEX_FILE = Path("/var/lib/ds01/notify-index.tsv")
+UTMP_FILE = Path("/var/run/utmp")
+DOCKER_BIN = "/usr/bin/docker"
+ALERT_FILE_NAME = ".ds01-alerts"
+
+POLL_SECONDS = 2  # Service loop interval
+COALESCE_SECONDS = 10  # Quiet period after a user's last enqueue before delivery
+MAX_DELAY_SECONDS = 60  # Deliver regardless once the oldest entry is this old
+MAX_AGE_SECONDS = 6 * 3600  # Entries older than this (service was down) are dropped
+INDEX_RETENTION_SECONDS = 7 * 86400
+
+# struct utmp on Linux (glibc, 64-bit): type, pid, line, id, user, host,
+# exit status, session, tv_sec, tv_usec, addr_v6, reserved
+_UTMP_RECORD = struct.Struct("hi32s4s32s256shhiii4i20s")
+_USER_PROCESS = 7
+_TTY_RE = re.compile(r"^(pts/\d+|tty\w+)$")
+_HEADER_KEYS = ("user", "container", "severity", "key", "cooldown", "episode", "queued")
+
+# Add NullHandler to avoid "No handlers found" warnings
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# ============================================================================
+# Producers
+# ============================================================================
+
+
+def enqueue(
+    user: str,
+    message: str,
+    container: str = "",
+    severity: str = "NOTICE",
+    key: str = "",
+    cooldown: int = 0,
+    episode: str = "",
+    queue_dir: Path | None = None,
+) -> bool:
+    """Add a notification to the spool (atomic rename). Never raises."""
+    queue_dir = queue_dir or NOTIFY_QUEUE_DIR
+    now = time.time()
+    header = {
+        "user": user,
+        "container": container,
+        "severity": severity,
+        "key": key,
+        "cooldown": int(cooldown),
+        "episode": episode,
+        "queued": int(now),
+    }
+    text = "".join(f"{k}={str(v).replace(chr(10), ' ')}\n" for k, v in header.items())
+    name = f"{time.time_ns()}-{os.getpid()}"
+    tmp = queue_dir / "tmp" / name
+    try:
+        tmp.write_text(f"{text}\n{message}\n")
+        os.replace(tmp, queue_dir / "new" / name)
+        return True
+    except OSError as e:
+        logger.debug("enqueue for %s failed: %s", user, e)
+        try:
+            tmp.unlink(missing_ok=True)
+        except OSError:
+            pass
+        return False
+
+
+def parse_entry(text: str) -> dict | None:
+    """Parse a spool file; None if it is malformed."""
+    head, sep, message = text.partition("\n\n")
+    if not sep:
+        return None
+    entry = {}
+    for line in head.splitlines():
+        key, _, value = line.partition("=")
+        if key in _HEADER_KEYS:
+            entry[key] = value
+    if not entry.get("user"):
+        return None
+    try:
+        entry["cooldown"] = int(entry.get("cooldown") or 0)
+        entry["queued"] = float(entry.get("queued") or 0)
+    except ValueError:
+        return None
+    entry.setdefault("container", "")
+    entry.setdefault("key", "")
+    entry.setdefault("episode", "")
+    entry.setdefault("severity", "NOTICE")
+    entry["message"] = message.rstrip("\n")
+    return entry
+
+
+# ============================================================================
+# Delivery primitives
+# ============================================================================
+
+
+def read_utmp(path: Path = UTMP_FILE) -> dict[str, list[str]]:
+    """User -> terminal lines (e.g. "pts/3") of logged-in sessions, in one read."""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return {}
+    ttys: dict[str, list[str]] = defaultdict(list)
+    size = _UTMP_RECORD.size
+    for offset in range(0, len(data) - size + 1, size):
+        fields = _UTMP_RECORD.unpack_from(data, offset)
+        if fields[0] != _USER_PROCESS:
+            continue
+        line = fields[2].split(b"\0", 1)[0].decode(errors="replace")
+        user = fields[4].split(b"\0", 1)[0].decode(errors="replace")
+        if user and _TTY_RE.match(line) and line not in ttys[user]:
+            ttys[user].append(line)
+    return dict(ttys)
+
+
+def write_tty(line: str, text: str) -> bool:
+    """Write to /dev/<line> without blocking or acquiring it as a controlling tty."""
+    if not _TTY_RE.match(line):
+        return False
+    try:
+        fd = os.open(f"/dev/{line}", os.O_WRONLY | os.O_NOCTTY | os.O_NONBLOCK)
+    except OSError:
+        return False
+    try:
+        os.write(fd, text.encode())
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def resolve_workspaces(containers) -> dict[str, Path]:
+    """Container name -> host path mounted at /workspace, from one `docker inspect`."""
+    names = sorted(set(containers))
+    if not names:
+        return {}
+    template = (
+        '{{.Name}}\t{{range .Mounts}}{{if eq .Destination "/workspace"}}{{.Source}}{{end}}{{end}}'
+    )
+    try:
+        # Exits non-zero if any container is gone; the others are still printed
+        result = subprocess.run(
+            [DOCKER_BIN, "inspect", "--format", template, *names],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+    except (subprocess.TimeoutExpired, OSError):
+        return {}
+    workspaces = {}
+    for line in result.stdout.splitlines():
+        name, _, source = line.partition("\t")
+        if source:
+            workspaces[name.lstrip("/")] = Path(source)
+    return workspaces
+
+
+def append_alert_file(workspace: Path, text: str) -> bool:
+    """Append to <workspace>/.ds01-alerts as the workspace owner."""
+    try:
+        st = os.stat(workspace)
+    except OSError:
+        return False
+
+    def _append() -> None:
+        fd = os.open(
+            workspace / ALERT_FILE_NAME,
+            os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_NOFOLLOW,
+            0o644,
+        )
+        try:
+            os.write(fd, text.encode())
+        finally:
+            os.close(fd)
+
+    if st.st_uid == os.geteuid():
+        try:
+            _append()
+            return True
+        except OSError:
+            return False
+
+    # Drop to the owner in a child: the write cannot reach anything the
+    # owner could not already write
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            os.setgroups([])
+            os.setgid(st.st_gid)
+            os.setuid(st.st_uid)
+            _append()
+            code = 0
+        except BaseException:
+            pass
+        finally:
+            os._exit(code)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status) == 0
+
+
+# ============================================================================
+# Index and service
+# ============================================================================
+
+
+class NotifyIndex:
+    """Last delivery (time, episode) per (user, container, key), shared by all producers.
+
+    Stored as "user|container|key<TAB>epoch<TAB>episode" lines so producers can
+    check it with bash builtins (ds01_notify_due) before building a message.
+    """
+
+    def __init__(self, path: Path | None = None):
+        self.path = path or NOTIFY_INDEX_FILE
+        self.entries: dict[str, dict] = {}
+        try:
+            lines = self.path.read_text().splitlines()
+        except OSError:
+            lines = []
+        for line in lines:
+            fields = line.split("\t")
+            if len(fields) == 3 and fields[1].isdigit():
+                self.entries[fields[0]] = {"at": int(fields[1]), "episode": fields[2]}
+        self.dirty = False
+
+    @staticmethod
+    def _key(entry: dict) -> str:
+        return f"{entry['user']}|{entry['container']}|{entry['key']}"
+
+    def suppressed(self, entry: dict, now: float) -> bool:
+        """True if the key is in cooldown or was already delivered for this episode."""
+        if not entry["key"]:
+            return False
+        last = self.entries.get(self._key(entry))
+        if last is None:
+            return False
+        if entry["episode"] and last["episode"] == entry["episode"]:
+            return True
+        return entry["cooldown"] > 0 and now - last["at"] < entry["cooldown"]
+
+    def record(self, entry: dict, now: float) -> None:
+        if entry["key"]:
+            key = self._key(entry).replace("\t", " ")
+            self.entries[key] = {"at": int(now), "episode": entry["episode"].replace("\t", " ")}
+            self.dirty = True
+
+    def save(self, now: float) -> None:
+        if not self.dirty:
+            return
+        cutoff = now - INDEX_RETENTION_SECONDS
+        self.entries = {k: v for k, v in self.entries.items() if v["at"] >= cutoff}
+        text = "".join(f"{k}\t{v['at']}\t{v['episode']}\n" for k, v in sorted(self.entries.items()))
+        tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(text)
+            os.replace(tmp, self.path)
+            self.dirty = False
+        except OSError as e:
+            logger.warning("Could not save %s: %s", self.path, e)
+            tmp.unlink(missing_ok=True)
+
+
+def _container_text(messages: list[str], timestamp: str) -> str:
+    return "".join(f"--- Alert: {timestamp} ---\n{message}\n\n" for message in messages)
+
+
+class NotificationService:
+    """Delivers the spool: coalesced per user, deduplicated, index-aware."""
+
+    def __init__(self, queue_dir: Path | None = None, index: NotifyIndex | None = None):
+        self.queue_dir = queue_dir or NOTIFY_QUEUE_DIR
+        self.index = index or NotifyIndex()
+
+    def ensure_queue(self) -> None:
+        for sub in ("tmp", "new"):
+            (self.queue_dir / sub).mkdir(parents=True, exist_ok=True, mode=0o700)
+
+    def _pending(self) -> dict[str, list[tuple[Path, dict]]]:
+        by_user: dict[str, list[tuple[Path, dict]]] = defaultdict(list)
+        try:
+            paths = sorted((self.queue_dir / "new").iterdir())
+        except OSError:
+            return {}
+        for path in paths:
+            try:
+                entry = parse_entry(path.read_text())
+            except (OSError, UnicodeDecodeError):
+                entry = None
+            if entry is None:
+                logger.warning("Dropping malformed notification %s", path.name)
+                path.unlink(missing_ok=True)
+                continue
+            by_user[entry["user"]].append((path, entry))
+        return by_user
+
+    def flush(self, now: float | None = None, force: bool = False) -> int:
+        """Deliver every user whose queue is ready; returns notifications delivered."""
+        now = now if now is not None else time.time()
+        ready = {}
+        for user, items in self._pending().items():
+            queued = [entry["queued"] for _, entry in items]
+            if (
+                force
+                or now - max(queued) >= COALESCE_SECONDS
+                or now - min(queued) >= MAX_DELAY_SECONDS
+            ):
+                ready[user] = items
+        if not ready:
+            return 0
+
+        ttys = read_utmp()
+        fallback: dict[str, list[str]] = defaultdict(list)
+        delivered = 0
+        for user, items in ready.items():
+            due = self._due(items, now)
+            if due:
+                text = "\n".join(entry["message"] for entry in due) + "\n"
+                on_tty = [line for line in ttys.get(user, []) if write_tty(line, text)]
+                for entry in due:
+                    if on_tty:
+                        delivered += 1
+                    elif entry["container"]:
+                        fallback[entry["container"]].append(entry["message"])
+                    else:
+                        logger.info("User %s has no active terminals - not delivered", user)
+                    self.index.record(entry, now)
+            for path, _ in items:
+                path.unlink(missing_ok=True)
+
+        if fallback:
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+            workspaces = resolve_workspaces(fallback)
+            for container, messages in fallback.items():
+                workspace = workspaces.get(container)
+                if workspace and append_alert_file(workspace, _container_text(messages, timestamp)):
+                    delivered += len(messages)
+        self.index.save(now)
+        return delivered
+
+    def _due(self, items: list[tuple[Path, dict]], now: float) -> list[dict]:
+        """Newest entry per (container, key), minus stale ones and keys the index suppresses."""
+        latest: dict[tuple[str, str], dict] = {}
+        for _, entry in sorted(items, key=lambda item: item[1]["queued"]):
+            if now - entry["queued"] > MAX_AGE_SECONDS:
+                continue
+            dedupe = entry["key"] or entry["message"]
+            latest.pop((entry["container"], dedupe), None)
+            latest[(entry["container"], dedupe)] = entry
+        return [entry for entry in latest.values() if not self.index.suppressed(entry, now)]
+
+    def run(self, poll: float = POLL_SECONDS) -> None:
+        self.ensure_queue()
+        logger.info("Delivering notifications from %s", self.queue_dir)
+        while True:
+            try:
+                self.flush()
+            except Exception as e:  # keep the service alive; next poll retries
+                logger.error("Flush failed: %s", e)
+            time.sleep(poll)
+
+
+def send(
+    user: str,
+    message: str,
+    container: str = "",
+    severity: str = "NOTICE",
+    key: str = "",
+    cooldown: int = 0,
+    episode: str = "",
+    index: NotifyIndex | None = None,
+) -> int:
+    """Deliver one notification now, for producers when the queue is not deployed.
+
+    Goes through a private spool and the shared index, so cooldowns and
+    episodes hold without the service. Returns notifications delivered.
+    """
+    with tempfile.TemporaryDirectory(prefix="ds01-notify-") as tmp:
+        service = NotificationService(Path(tmp), index)
+        service.ensure_queue()
+        if not enqueue(user, message, container, severity, key, cooldown, episode, Path(tmp)):
+            return 0
+        return service.flush(force=True)
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DS01 notification queue")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("run", help="Deliver the queue continuously (service mode)")
+    sub.add_parser("flush", help="Deliver everything pending now")
+    p_enqueue = sub.add_parser("enqueue", help="Queue one notification")
+    p_send = sub.add_parser("send", help="Deliver one notification now, honouring the index")
+    for p in (p_enqueue, p_send):
+        p.add_argument("user")
+        p.add_argument("message")
+        p.add_argument("--container", default="")
+        p.add_argument("--severity", default="NOTICE")
+        p.add_argument("--key", default="")
+        p.add_argument("--cooldown", type=int, default=0)
+        p.add_argument("--episode", default="")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    fields = (args.container, args.severity, args.key, args.cooldown, args.episode)
+    if args.command == "enqueue":
+        return 0 if enqueue(args.user, args.message, *fields) else 1
+    if args.command == "send":
+        send(args.user, args.message, *fields)
+        return 0
+
+    service = NotificationService()
+    if args.command == "flush":
+        service.ensure_queue()
+        print(f"Delivered {service.flush(force=True)} notification(s)")
+        return 0
+    service.run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
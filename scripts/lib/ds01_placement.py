@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_placement.py
+GPU slot placement policies, and an event-replay simulator to compare them.
+
+A "virtual full GPU" is only available while every MIG slot on its physical
+GPU is free, so the order in which single MIG slots are handed out decides
+how many whole GPUs survive. The allocator used to take free slots in slot-ID
+order, which spreads small requests across physical GPUs. Policies rank the
+free candidate slots instead; GPUAvailabilityChecker.suggest_gpu_for_user
+takes the first one.
+
+Policies (gpu_allocation.placement_policy in resource-limits.yaml):
+    pack           Best fit by physical GPU (default). Fill the partly used GPU
+                   with the fewest free slots first and break into a fully free
+                   GPU last, so whole GPUs stay available for full-GPU users.
+    spread         Least allocated: the physical GPU with the most free slots.
+    lexicographic  Slot-ID order (the previous behaviour).
+
+In every policy a user's own reserved slots come first, the full-GPU/MIG
+preference of the user is kept, and `pack`/`spread` break ties with
+anti-affinity: a GPU the user is not already using wins.
+
+Multi-GPU requests pick a whole set at once (select_slot_set): the set whose
+worst GPU-to-GPU link in `nvidia-smi topo -m` is best (NVLink > same PCIe
+switch > same NUMA node > cross-socket), then the lowest total link cost,
+then the best placement rank.
+
+Design principles:
+- Pure functions over a snapshot of free slots; no Docker or nvidia-smi calls
+- Unknown policy names fall back to the default instead of failing allocation
+- The simulator replays gpu.allocate/gpu.release from events.jsonl (and its
+  rotated archives) against a modelled GPU layout, one policy at a time
+
+Usage (Python):
+    from ds01_placement import rank_slots
+
+    order = rank_slots(free, gpu_sizes, policy="pack", user_gpus={"1"})
+    slots = select_slot_set(order, 4, parse_topology(topo_m_output))
+
+Usage (CLI):
+    python3 ds01_placement.py simulate --days 30
+    python3 ds01_placement.py simulate --layout 0:0,1:7,2:7,3:3 --json
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import logging
+import re
+import sys
+import time
+from pathlib import Path
+
+# Configuration
+DEFAULT_POLICY = "pack"
+POLICIES = ("pack", "spread", "lexicographic")
+MAX_SET_COMBINATIONS = 5000  # Above this, multi-GPU sets are built greedily
+
+# `nvidia-smi topo -m` link types, best first. NV<n> (NVLink) is handled separately.
+LINK_COST = {"X": 0, "PIX": 1, "PXB": 2, "PHB": 3, "NODE": 4, "SYS": 5}
+UNKNOWN_LINK_COST = 5
+
+# Add NullHandler to avoid "No handlers found" warnings
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# ============================================================================
+# Ranking
+# ============================================================================
+
+
+def physical_gpu(slot: str) -> str:
+    """Physical GPU index of a slot ("1.3" -> "1", "0" -> "0")."""
+    return str(slot).split(".", 1)[0]
+
+
+def _slot_order(slot: str) -> tuple:
+    """Numeric slot order, so "10.0" sorts after "2.0"."""
+    return tuple(int(p) if p.isdigit() else p for p in str(slot).split("."))
+
+
+def rank_slots(
+    free: dict[str, dict],
+    gpu_sizes: dict[str, int],
+    policy: str = DEFAULT_POLICY,
+    user_gpus: set[str] | frozenset[str] = frozenset(),
+    prefer_full: bool = False,
+    preferred: set[str] | frozenset[str] = frozenset(),
+) -> list[str]:
+    """
+    Order candidate slots, best first.
+
+    Args:
+        free: Free candidate slots (slot -> info with optional "physical_gpu")
+        gpu_sizes: Number of MIG slots per physical GPU (0 or 1 = unpartitioned)
+        policy: One of POLICIES (unknown names use DEFAULT_POLICY)
+        user_gpus: Physical GPUs the user already has allocations on
+        prefer_full: Put full GPUs before MIG slots (users allowed full GPUs)
+        preferred: Slots to put first regardless of policy (queue reservation)
+
+    Returns:
+        Candidate slot IDs in placement order
+    """
+    if policy not in POLICIES:
+        logger.warning("Unknown placement policy %r, using %s", policy, DEFAULT_POLICY)
+        policy = DEFAULT_POLICY
+
+    free_per_gpu: dict[str, int] = {}
+    for slot, info in free.items():
+        gpu = str((info or {}).get("physical_gpu", physical_gpu(slot)))
+        free_per_gpu[gpu] = free_per_gpu.get(gpu, 0) + 1
+
+    def key(slot: str) -> tuple:
+        is_mig = "." in str(slot)
+        gpu = str((free[slot] or {}).get("physical_gpu", physical_gpu(slot)))
+        head = (slot not in preferred, is_mig if prefer_full else not is_mig)
+        if policy == "lexicographic":
+            return (*head, str(slot))
+
+        gpu_free = free_per_gpu[gpu]
+        if policy == "pack":
+            # Taking a slot from a GPU whose slots are all free loses a whole GPU
+            breaks_whole = gpu_free >= max(1, gpu_sizes.get(gpu, 1))
+            fit = (breaks_whole, gpu_free)
+        else:
+            fit = (-gpu_free,)
+        return (*head, *fit, gpu in user_gpus, _slot_order(slot))
+
+    return sorted(free, key=key)
+
+
+def whole_gpus_free(free_slots, gpu_sizes: dict[str, int]) -> int:
+    """Number of physical GPUs with every slot free (real or virtual full GPUs)."""
+    free_per_gpu: dict[str, int] = {}
+    for slot in free_slots:
+        gpu = physical_gpu(slot)
+        free_per_gpu[gpu] = free_per_gpu.get(gpu, 0) + 1
+    return sum(1 for gpu, size in gpu_sizes.items() if free_per_gpu.get(gpu, 0) >= max(1, size))
+
+
+# ============================================================================
+# Interconnect topology
+# ============================================================================
+
+
+def parse_topology(output: str) -> dict[str, dict[str, str]]:
+    """
+    Parse `nvidia-smi topo -m` into {gpu_index: {gpu_index: link}}.
+
+    Only GPU-to-GPU columns are kept (NIC and affinity columns are dropped);
+    the legend and anything unparseable are ignored.
+    """
+    columns: list[str] = []
+    links: dict[str, dict[str, str]] = {}
+    # Recent drivers underline the header row with ANSI escapes
+    for line in re.sub(r"\x1b\[[0-9;]*m", "", output).splitlines():
+        tokens = line.split()
+        if not tokens:
+            continue
+        if not columns and re.fullmatch(r"GPU\d+", tokens[0]) and line[:1].isspace():
+            columns = [t[3:] for t in itertools.takewhile(lambda t: t.startswith("GPU"), tokens)]
+            continue
+        if columns and re.fullmatch(r"GPU\d+", tokens[0]):
+            values = tokens[1 : 1 + len(columns)]
+            if len(values) == len(columns):
+                links[tokens[0][3:]] = dict(zip(columns, values))
+    return links
+
+
+def link_cost(link: str | None) -> int:
+    """Cost of one GPU-to-GPU link (0 = same GPU or NVLink, 5 = across sockets)."""
+    if not link:
+        return UNKNOWN_LINK_COST
+    if link.startswith("NV"):
+        return 0
+    return LINK_COST.get(link, UNKNOWN_LINK_COST)
+
+
+def set_cost(slots, topology: dict[str, dict[str, str]]) -> tuple[int, int]:
+    """(worst pairwise link cost, total pairwise link cost) of a slot set."""
+    worst = total = 0
+    for a, b in itertools.combinations([physical_gpu(s) for s in slots], 2):
+        cost = 0 if a == b else link_cost(topology.get(a, {}).get(b))
+        worst = max(worst, cost)
+        total += cost
+    return worst, total
+
+
+def select_slot_set(
+    ranked: list[str], count: int, topology: dict[str, dict[str, str]]
+) -> list[str] | None:
+    """
+    Choose `count` slots from placement-ranked candidates in one pass.
+
+    Sets are compared by set_cost, then by the sum of the slots' positions in
+    `ranked` (so without topology this is simply the first `count` slots).
+    Small candidate pools are searched exhaustively; large ones greedily from
+    each starting slot.
+
+    Returns:
+        Slots in rank order, or None if fewer than `count` candidates
+    """
+    if count <= 0 or len(ranked) < count:
+        return None
+    if count == 1 or not topology:
+        return list(ranked[:count])
+
+    position = {slot: i for i, slot in enumerate(ranked)}
+
+    def score(slots) -> tuple:
+        return (*set_cost(slots, topology), sum(position[s] for s in slots))
+
+    n_sets = 1
+    for i in range(count):
+        n_sets = n_sets * (len(ranked) - i) // (i + 1)
+
+    if n_sets <= MAX_SET_COMBINATIONS:
+        best = min(itertools.combinations(ranked, count), key=score)
+    else:
+        candidates = []
+        for seed in ranked:
+            chosen = [seed]
+            while len(chosen) < count:
+                rest = [s for s in ranked if s not in chosen]
+                chosen.append(min(rest, key=lambda s, c=chosen: score([*c, s])))
+            candidates.append(chosen)
+        best = min(candidates, key=score)
+
+    return sorted(best, key=position.__getitem__)
+
+
+# ============================================================================
+# Simulator
+# ============================================================================
+
+
+class SimulatedCluster:
+    """A GPU layout with slot ownership, for replaying allocation history."""
+
+    def __init__(self, layout: dict[str, int]):
+        self.gpu_sizes = dict(layout)
+        self.slots = []
+        for gpu, size in sorted(layout.items(), key=lambda item: _slot_order(item[0])):
+            self.slots += [f"{gpu}.{i}" for i in range(size)] if size else [gpu]
+        self.owner: dict[str, str] = {}  # slot -> user
+        self.containers: dict[str, list[str]] = {}  # container -> slots
+
+    def free(self) -> dict[str, dict]:
+        return {s: {"physical_gpu": physical_gpu(s)} for s in self.slots if s not in self.owner}
+
+    def whole_gpus_free(self) -> int:
+        return whole_gpus_free(self.free(), self.gpu_sizes)
+
+    def allocate(self, user: str, container: str, want_full: bool, policy: str) -> bool:
+        """Place one request; False if it would have been rejected."""
+        free = self.free()
+        if want_full:
+            # A whole physical GPU: unpartitioned first, then all-free MIG GPUs
+            whole = [
+                g
+                for g in self.gpu_sizes
+                if all(s in free for s in self.slots if physical_gpu(s) == g)
+            ]
+            if not whole:
+                return False
+            gpu = min(whole, key=lambda g: (self.gpu_sizes[g] > 0, _slot_order(g)))
+            taken = [s for s in self.slots if physical_gpu(s) == gpu]
+        else:
+            candidates = {s: info for s, info in free.items() if "." in s}
+            if not candidates:
+                return False
+            user_gpus = {physical_gpu(s) for s, u in self.owner.items() if u == user}
+            taken = rank_slots(candidates, self.gpu_sizes, policy, user_gpus)[:1]
+
+        for slot in taken:
+            self.owner[slot] = user
+        self.containers[container] = taken
+        return True
+
+    def release(self, container: str) -> None:
+        for slot in self.containers.pop(container, []):
+            self.owner.pop(slot, None)
+
+
+def event_slots(event: dict) -> list[str]:
+    value = event.get("gpu_uuid") or event.get("gpu") or event.get("gpu_slot") or ""
+    return [s.strip() for s in str(value).split(",") if s.strip()]
+
+
+def load_history(start_ts: float, end_ts: float, events_file: Path | None = None) -> list[dict]:
+    """gpu.allocate/gpu.release events in the window, oldest first."""
+    from ds01_event_index import EVENTS_FILE, scan_events
+
+    collect: dict[str, list[dict]] = {"gpu.allocate": [], "gpu.release": []}
+    scan_events(start_ts, end_ts, set(collect), collect, events_file or EVENTS_FILE)
+    history = [dict(e, kind="allocate") for e in collect["gpu.allocate"]]
+    history += [dict(e, kind="release") for e in collect["gpu.release"]]
+    history.sort(key=lambda e: e["ts"] or 0)
+    return history
+
+
+def infer_layout(history: list[dict]) -> dict[str, int]:
+    """GPU layout implied by the slots seen in history (gpu -> MIG slot count)."""
+    layout: dict[str, int] = {}
+    for event in history:
+        for slot in event_slots(event):
+            gpu = physical_gpu(slot)
+            if "." in slot and slot.split(".", 1)[1].isdigit():
+                layout[gpu] = max(layout.get(gpu, 0), int(slot.split(".", 1)[1]) + 1)
+            else:
+                layout.setdefault(gpu, 0)
+    return layout
+
+
+def parse_layout(spec: str) -> dict[str, int]:
+    """Parse "0:0,1:7" (GPU index : MIG slot count, 0 = unpartitioned)."""
+    layout = {}
+    for part in spec.split(","):
+        gpu, _, size = part.strip().partition(":")
+        layout[gpu] = int(size or 0)
+    return layout
+
+
+def simulate(history: list[dict], layout: dict[str, int], policy: str) -> dict:
+    """
+    Replay history under one policy.
+
+    Each historical allocation is replayed as the same kind of request (a
+    whole GPU if it got a full GPU, else one MIG slot). Requests the policy
+    cannot place count as rejections, and their releases are ignored.
+
+    Returns:
+        Dict with requests, rejected, rejected_full, reject_rate,
+        avg_whole_gpus_free (time-weighted) and min_whole_gpus_free
+    """
+    cluster = SimulatedCluster(layout)
+    requests = rejected = rejected_full = 0
+    weighted = 0.0
+    minimum = cluster.whole_gpus_free()
+    first_ts = last_ts = None
+
+    for event in history:
+        ts = event.get("ts")
+        if ts is not None:
+            if last_ts is not None and ts > last_ts:
+                weighted += cluster.whole_gpus_free() * (ts - last_ts)
+            if first_ts is None:
+                first_ts = ts
+            last_ts = ts if last_ts is None else max(last_ts, ts)
+
+        container = event.get("container") or ""
+        if event["kind"] == "release":
+            cluster.release(container)
+            continue
+        if not container or container in cluster.containers:
+            continue
+
+        slots = event_slots(event)
+        want_full = bool(slots) and "." not in slots[0]
+        requests += 1
+        if not cluster.allocate(event.get("user", "unknown"), container, want_full, policy):
+            rejected += 1
+            rejected_full += want_full
+        minimum = min(minimum, cluster.whole_gpus_free())
+
+    span = (last_ts - first_ts) if first_ts is not None and last_ts != first_ts else 0
+    return {
+        "policy": policy,
+        "requests": requests,
+        "rejected": rejected,
+        "rejected_full": rejected_full,
+        "reject_rate": rejected / requests if requests else 0.0,
+        "avg_whole_gpus_free": weighted / span if span else float(cluster.whole_gpus_free()),
+        "min_whole_gpus_free": minimum,
+    }
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DS01 GPU placement policies")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_sim = sub.add_parser("simulate", help="Replay allocation history under each policy")
+    p_sim.add_argument("--days", type=float, default=30, help="History window (default: 30)")
+    p_sim.add_argument(
+        "--events", type=Path, help="Event log (default: /var/log/ds01/events.jsonl)"
+    )
+    p_sim.add_argument("--layout", help="GPU layout, e.g. 0:0,1:7 (default: inferred)")
+    p_sim.add_argument("--policy", default=",".join(POLICIES), help="Comma-separated policies")
+    p_sim.add_argument("--json", action="store_true", help="Output JSON")
+    args = parser.parse_args()
+
+    end_ts = time.time()
+    history = load_history(end_ts - args.days * 86400, end_ts, args.events)
+    layout = parse_layout(args.layout) if args.layout else infer_layout(history)
+    if not layout:
+        print("Error: no GPU layout (no history found; pass --layout)", file=sys.stderr)
+        return 1
+
+    results = [simulate(history, layout, p.strip()) for p in args.policy.split(",") if p.strip()]
+    if args.json:
+        print(json.dumps({"layout": layout, "results": results}, indent=2))
+        return 0
+
+    gpus = ", ".join(f"GPU {g}: {n or 'full'}" for g, n in sorted(layout.items()))
+    print(f"Layout: {gpus}")
+    print(
+        f"{'Policy':<14} {'Requests':>8} {'Rejected':>9} {'Reject%':>8} {'Full rej':>9} "
+        f"{'Whole GPUs free (avg/min)':>27}"
+    )
+    for r in results:
+        print(
+            f"{r['policy']:<14} {r['requests']:>8} {r['rejected']:>9} "
+            f"{r['reject_rate'] * 100:>7.1f}% {r['rejected_full']:>9} "
+            f"{r['avg_whole_gpus_free']:>21.2f} / {r['min_whole_gpus_free']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_prom.py
+Prometheus query planner for DS01 reporting scripts.
+
+Batch reports (ds01-monthly-report) issue dozens of instant and range queries.
+Sent one at a time, every request waits out its own round trip and the large
+month-long range queries dominate total runtime. This module provides:
+
+- Request deduplication (same endpoint + expr + time/range/step)
+- Concurrent execution of pending requests on a bounded thread pool
+- An on-disk result cache keyed by (expr, range, step)
+- A recording mode so callers can collect every query up front, run them as
+  one batch, then replay the same code path against the warm results
+
+Design principles:
+- Never raises on Prometheus errors (returns [] like a failed query)
+- Failed requests are never cached
+- Results for windows that closed more than SETTLE_SECONDS ago are immutable
+  and cached indefinitely; anything touching "now" expires after LIVE_TTL
+
+Usage:
+    from ds01_prom import PromRequest, QueryPlanner
+
+    planner = QueryPlanner("http://localhost:9090", cache_dir=DEFAULT_CACHE_DIR)
+
+    with planner.recording():
+        build_report()        # queries return [] and are only recorded
+    planner.execute()         # run recorded queries concurrently
+    build_report()            # every query now served from memory
+
+    planner.fetch(PromRequest.instant("up"))
+    planner.fetch(PromRequest.range("up", "2026-03-01T00:00:00Z", "2026-03-31T23:59:59Z", "1h"))
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+
+# Configuration
+INSTANT_PATH = "/api/v1/query"
+RANGE_PATH = "/api/v1/query_range"
+DEFAULT_CACHE_DIR = Path(os.environ.get("DS01_PROM_CACHE_DIR", "/var/lib/ds01/prom-cache"))
+DEFAULT_WORKERS = 4  # Keep low: each range query is heavy on the Prometheus side
+LIVE_TTL = 600  # Seconds a result touching "now" stays valid
+SETTLE_SECONDS = 3600  # Grace for late scrapes/rule evaluation before a window is final
+INSTANT_TIMEOUT = 30
+RANGE_TIMEOUT = 60
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+def _parse_prom_time(value: str) -> float | None:
+    """Parse a Prometheus time parameter (RFC 3339 or unix seconds)."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class PromRequest:
+    """A single Prometheus API request; hashable so identical requests dedupe."""
+
+    path: str
+    expr: str
+    time: str | None = None
+    start: str | None = None
+    end: str | None = None
+    step: str | None = None
+
+    @classmethod
+    def instant(cls, expr: str, time: str | None = None) -> PromRequest:
+        return cls(INSTANT_PATH, expr, time=time)
+
+    @classmethod
+    def range(cls, expr: str, start: str, end: str, step: str = "1h") -> PromRequest:
+        return cls(RANGE_PATH, expr, start=start, end=end, step=step)
+
+    @property
+    def is_range(self) -> bool:
+        return self.path == RANGE_PATH
+
+    @property
+    def timeout(self) -> int:
+        return RANGE_TIMEOUT if self.is_range else INSTANT_TIMEOUT
+
+    def query_string(self) -> str:
+        params = [("query", self.expr)]
+        if self.is_range:
+            params += [("start", self.start), ("end", self.end), ("step", self.step)]
+        elif self.time:
+            params.append(("time", self.time))
+        return urllib.parse.urlencode(params, quote_via=urllib.parse.quote)
+
+    def cache_key(self) -> str:
+        raw = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def window_end(self) -> float | None:
+        """Unix time the evaluated window closes, or None when evaluated at "now"."""
+        ts = self.end if self.is_range else self.time
+        return _parse_prom_time(ts) if ts else None
+
+
+class QueryPlanner:
+    """Deduplicating, concurrent, disk-cached executor for Prometheus queries."""
+
+    def __init__(
+        self,
+        base_url: str,
+        cache_dir: Path | None = None,
+        max_workers: int = DEFAULT_WORKERS,
+        live_ttl: int = LIVE_TTL,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.cache_dir = cache_dir
+        self.max_workers = max(1, max_workers)
+        self.live_ttl = live_ttl
+        self.stats = {"http": 0, "cached": 0, "deduped": 0, "failed": 0}
+
+        self._results: dict[PromRequest, list[dict]] = {}
+        self._pending: dict[PromRequest, None] = {}  # insertion-ordered set
+        self._lock = threading.Lock()
+        self._recording = False
+        self._warn_seen: set[str] = set()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def recording(self) -> Iterator[QueryPlanner]:
+        """Record requests instead of executing them (fetch returns [])."""
+        self._recording = True
+        try:
+            yield self
+        finally:
+            self._recording = False
+
+    def submit(self, request: PromRequest) -> None:
+        """Queue a request for the next execute() unless already known."""
+        with self._lock:
+            if request in self._results or request in self._pending:
+                self.stats["deduped"] += 1
+                return
+            self._pending[request] = None
+
+    def execute(self) -> None:
+        """Resolve all pending requests concurrently on the bounded pool."""
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+        if not batch:
+            return
+
+        workers = min(self.max_workers, len(batch))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prom") as pool:
+            for request, result in zip(batch, pool.map(self._resolve, batch)):
+                with self._lock:
+                    self._results[request] = result
+
+    def fetch(self, request: PromRequest) -> list[dict]:
+        """Return the result vector/matrix for a request.
+
+        Served from memory when already resolved; recorded and answered with []
+        while recording; otherwise resolved synchronously (cache, then HTTP).
+        """
+        with self._lock:
+            if request in self._results:
+                return self._results[request]
+        if self._recording:
+            self.submit(request)
+            return []
+
+        result = self._resolve(request)
+        with self._lock:
+            self._results[request] = result
+        return result
+
+    def query(self, expr: str, time: str | None = None) -> list[dict]:
+        return self.fetch(PromRequest.instant(expr, time))
+
+    def query_range(self, expr: str, start: str, end: str, step: str = "1h") -> list[dict]:
+        return self.fetch(PromRequest.range(expr, start, end, step))
+
+    # ------------------------------------------------------------------
+    # Resolution: disk cache, then HTTP
+    # ------------------------------------------------------------------
+
+    def _resolve(self, request: PromRequest) -> list[dict]:
+        cached = self._cache_read(request)
+        if cached is not None:
+            with self._lock:
+                self.stats["cached"] += 1
+            return cached
+
+        result = self._http_get(request)
+        if result is None:
+            with self._lock:
+                self.stats["failed"] += 1
+            return []
+        self._cache_write(request, result)
+        return result
+
+    def _http_get(self, request: PromRequest) -> list[dict] | None:
+        url = f"{self.base_url}{request.path}?{request.query_string()}"
+        with self._lock:
+            self.stats["http"] += 1
+        try:
+            with urllib.request.urlopen(url, timeout=request.timeout) as resp:
+                data = json.loads(resp.read())
+            if data.get("status") == "success":
+                return data["data"]["result"]
+        except (urllib.error.URLError, json.JSONDecodeError, KeyError, OSError) as e:
+            self._warn_once(type(e).__name__, f"Prometheus query failed: {e}")
+        return None
+
+    def _cache_path(self, request: PromRequest) -> Path | None:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / f"{request.cache_key()}.json"
+
+    def _cache_read(self, request: PromRequest) -> list[dict] | None:
+        path = self._cache_path(request)
+        if path is None:
+            return None
+        try:
+            entry = json.loads(path.read_text())
+            fetched_at = float(entry["fetched_at"])
+            result = entry["result"]
+        except (OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return None
+
+        window_end = request.window_end()
+        if window_end is not None and window_end + SETTLE_SECONDS <= fetched_at:
+            return result  # Window was final when fetched: immutable
+        if time.time() - fetched_at < self.live_ttl:
+            return result
+        return None
+
+    def _cache_write(self, request: PromRequest, result: list[dict]) -> None:
+        path = self._cache_path(request)
+        if path is None:
+            return
+        entry = {"request": asdict(request), "fetched_at": time.time(), "result": result}
+        tmp = path.parent / f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(entry))
+            os.replace(tmp, path)
+        except OSError as e:
+            tmp.unlink(missing_ok=True)
+            self._warn_once("cache", f"Prometheus cache write failed: {e}")
+
+    def _warn_once(self, key: str, message: str) -> None:
+        with self._lock:
+            if key in self._warn_seen:
+                return
+            self._warn_seen.add(key)
+        logger.warning(message)
+        print(f"  [warn] {message} (suppressing further)", file=sys.stderr)
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_selfmetrics.py
+Self-observability metrics for DS01's own latency (allocator, wrapper, cron jobs).
+
+Short-lived writers (gpu_allocator_v2.py, docker-wrapper.sh, cron scripts)
+record measurements into cheap files under /var/lib/ds01/self-metrics/;
+ds01_exporter.py folds them into Prometheus histograms and gauges at scrape
+time. Writing costs one O_APPEND write, so it is safe on the allocation path.
+
+Files:
+    observations.log   One line per measurement: "<metric> <seconds> [k=v,k=v]".
+                       Appended by Python (observe) and bash (ds01_observe).
+                       Read incrementally by the exporter, rotated at 4 MB.
+    job-<name>.state   Last run of a periodic job, rewritten atomically:
+                       duration=<s> items=<n> status=<ok|error> timestamp=<epoch>
+
+Design principles:
+- Never blocks or fails the caller (returns False on failure, never raises)
+- Only known metrics and label keys are exported; the directory is
+  group-writable, so everything read back is validated
+- Histogram buckets live here, not in the writers
+
+Usage (Python):
+    from ds01_selfmetrics import observe, write_job
+
+    observe("ds01_allocation_duration_seconds", 0.42, operation="allocate", outcome="SUCCESS")
+    write_job("check-idle-containers", 12.5, items=40)
+
+Usage (Bash):
+    source /opt/ds01-infra/scripts/lib/ds01_selfmetrics.sh
+    ds01_timer_start T0
+    ...
+    ds01_observe ds01_wrapper_preflight_duration_seconds "$T0" gpu=yes
+
+Usage (CLI):
+    python3 scripts/lib/ds01_selfmetrics.py show     # Render as the exporter would
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+import time
+from pathlib import Path
+
+# Configuration
+SELF_METRICS_DIR = Path(os.environ.get("DS01_SELF_METRICS_DIR", "/var/lib/ds01/self-metrics"))
+OBSERVATIONS_FILE = "observations.log"
+ROTATE_BYTES = 4 * 1024 * 1024
+MAX_LINE = 512  # Well under PIPE_BUF, so appends from concurrent writers never interleave
+MAX_SERIES = 200  # Cap on histogram label sets (label values come from writable files)
+
+# Add NullHandler to avoid "No handlers found" warnings
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_LOCK_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+# metric -> (help, buckets, allowed label keys)
+HISTOGRAMS: dict[str, tuple[str, tuple[float, ...], tuple[str, ...]]] = {
+    "ds01_allocation_duration_seconds": (
+        "GPU allocator call latency by operation and outcome",
+        _LATENCY_BUCKETS,
+        ("operation", "outcome"),
+    ),
+    "ds01_allocator_lock_wait_seconds": (
+        "Time waiting for the GPU allocator lock",
+        _LOCK_BUCKETS,
+        ("outcome",),
+    ),
+    "ds01_allocator_lock_hold_seconds": (
+        "Time the GPU allocator lock was held",
+        _LOCK_BUCKETS,
+        (),
+    ),
+    "ds01_wrapper_preflight_duration_seconds": (
+        "docker-wrapper.sh time from start to exec of the real docker (create/run)",
+        _LATENCY_BUCKETS,
+        ("subcommand", "gpu"),
+    ),
+}
+
+# job state gauges: key -> (metric, help)
+JOB_GAUGES = {
+    "duration": ("ds01_job_last_duration_seconds", "Duration of the last run of a DS01 job"),
+    "items": ("ds01_job_last_items", "Containers processed by the last run of a DS01 job"),
+    "per_item": (
+        "ds01_job_last_seconds_per_item",
+        "Duration of the last run divided by containers processed",
+    ),
+    "timestamp": ("ds01_job_last_run_timestamp_seconds", "Unix time the last run finished"),
+    "success": ("ds01_job_last_success", "1 if the last run of a DS01 job succeeded"),
+}
+
+_NAME_RE = re.compile(r"^[a-z0-9][a-z0-9_.-]{0,63}$")
+_VALUE_RE = re.compile(r"^[A-Za-z0-9_.:-]{1,48}$")
+
+# Allocator reasons start with a code ("QUOTA_EXCEEDED:2/1"); the availability
+# checker's errors are passed through as prose, so map those by prefix
+_CODE_RE = re.compile(r"[A-Z][A-Z0-9_]*(?![a-z])")
+_MESSAGE_OUTCOMES = (
+    ("No GPUs available", "NO_GPU_AVAILABLE"),
+    ("No full GPUs available", "NO_GPU_AVAILABLE"),
+    ("No MIG instances available", "NO_GPU_AVAILABLE"),
+    ("User already has", "USER_AT_LIMIT"),
+    ("Internal error", "INTERNAL_ERROR"),
+)
+
+
+# ============================================================================
+# Writers
+# ============================================================================
+
+
+def outcome_label(reason: str | None) -> str:
+    """Reduce an allocator reason to a bounded label ("QUOTA_EXCEEDED:2/1" -> "QUOTA_EXCEEDED")."""
+    reason = reason or ""
+    for prefix, label in _MESSAGE_OUTCOMES:
+        if reason.startswith(prefix):
+            return label
+    match = _CODE_RE.match(reason)
+    return match.group(0) if match else "OTHER"
+
+
+def observe(metric: str, seconds: float, **labels: str) -> bool:
+    """Append one measurement for the exporter. Never raises."""
+    try:
+        label_str = ",".join(f"{k}={v}" for k, v in labels.items() if v is not None)
+        line = f"{metric} {seconds:.6f} {label_str}".rstrip() + "\n"
+        if len(line) > MAX_LINE:
+            return False
+        fd = os.open(
+            SELF_METRICS_DIR / OBSERVATIONS_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o664
+        )
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+        return True
+    except (OSError, ValueError, TypeError) as e:
+        logger.debug("observe %s failed: %s", metric, e)
+        return False
+
+
+def write_job(job: str, seconds: float, items: int = 0, status: str = "ok") -> bool:
+    """Record the last run of a periodic job (atomic replace). Never raises."""
+    if not _NAME_RE.match(job):
+        return False
+    path = SELF_METRICS_DIR / f"job-{job}.state"
+    tmp = path.with_name(f".{path.name}.{os.getpid()}")
+    try:
+        tmp.write_text(
+            f"duration={seconds:.6f}\nitems={int(items)}\nstatus={status}\n"
+            f"timestamp={int(time.time())}\n"
+        )
+        os.replace(tmp, path)
+        return True
+    except (OSError, ValueError) as e:
+        logger.debug("write_job %s failed: %s", job, e)
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        return False
+
+
+# ============================================================================
+# Reader (used by ds01_exporter.py)
+# ============================================================================
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class SelfMetricsReader:
+    """Folds observations.log into cumulative histograms across scrapes.
+
+    Keeps the file offset between calls so each line is read once; when the
+    file passes ROTATE_BYTES it is renamed to observations.log.1 after being
+    read to the end. Histograms reset when the exporter restarts, which
+    Prometheus treats as a normal counter reset.
+    """
+
+    def __init__(self, directory: Path | None = None):
+        self.directory = Path(directory) if directory else SELF_METRICS_DIR
+        self.histograms: dict[tuple[str, tuple[tuple[str, str], ...]], _Histogram] = {}
+        self._inode: int | None = None
+        self._offset = 0
+        self.rejected = 0
+
+    def _fold_line(self, line: str) -> None:
+        parts = line.split()
+        if len(parts) not in (2, 3) or parts[0] not in HISTOGRAMS:
+            self.rejected += 1
+            return
+        metric = parts[0]
+        _, buckets, allowed = HISTOGRAMS[metric]
+        try:
+            value = float(parts[1])
+        except ValueError:
+            self.rejected += 1
+            return
+        if not 0 <= value < 86400:
+            self.rejected += 1
+            return
+        labels = {}
+        for pair in parts[2].split(",") if len(parts) == 3 else ():
+            key, _, val = pair.partition("=")
+            if key not in allowed or not _VALUE_RE.match(val):
+                self.rejected += 1
+                return
+            labels[key] = val
+        key = (metric, tuple(sorted(labels.items())))
+        hist = self.histograms.get(key)
+        if hist is None:
+            if len(self.histograms) >= MAX_SERIES:
+                self.rejected += 1
+                return
+            hist = self.histograms[key] = _Histogram(len(buckets))
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                hist.counts[i] += 1
+        hist.sum += value
+        hist.count += 1
+
+    def refresh(self) -> None:
+        """Read any new observations. Never raises."""
+        path = self.directory / OBSERVATIONS_FILE
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                if st.st_ino != self._inode or st.st_size < self._offset:
+                    self._inode, self._offset = st.st_ino, 0
+                f.seek(self._offset)
+                data = f.read()
+        except OSError:
+            return
+        # Only consume complete lines; a partial tail is picked up next time
+        end = data.rfind(b"\n") + 1
+        self._offset += end
+        for raw in data[:end].splitlines():
+            self._fold_line(raw.decode("utf-8", "replace"))
+        if self._offset >= ROTATE_BYTES:
+            try:
+                os.replace(path, path.with_name(OBSERVATIONS_FILE + ".1"))
+            except OSError as e:
+                logger.debug("observation log rotation failed: %s", e)
+
+    def read_jobs(self) -> dict[str, dict[str, float]]:
+        """Parse job-*.state files into {job: {duration, items, per_item, timestamp, success}}."""
+        jobs = {}
+        try:
+            paths = sorted(self.directory.glob("job-*.state"))
+        except OSError:
+            return jobs
+        for path in paths:
+            job = path.name[len("job-") : -len(".state")]
+            if not _NAME_RE.match(job):
+                continue
+            try:
+                fields = dict(
+                    line.split("=", 1) for line in path.read_text().splitlines() if "=" in line
+                )
+                duration = float(fields["duration"])
+                items = int(fields.get("items", 0))
+                jobs[job] = {
+                    "duration": duration,
+                    "items": items,
+                    "per_item": duration / items if items else 0.0,
+                    "timestamp": float(fields.get("timestamp", 0)),
+                    "success": 1.0 if fields.get("status", "ok") == "ok" else 0.0,
+                }
+            except (OSError, KeyError, ValueError):
+                continue
+        return jobs
+
+    def render(self) -> list[str]:
+        """Refresh and return Prometheus text lines for histograms and job gauges."""
+        self.refresh()
+        lines: list[str] = []
+        for metric, (help_text, buckets, _) in HISTOGRAMS.items():
+            series = sorted((k[1], h) for k, h in self.histograms.items() if k[0] == metric)
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, hist in series:
+                base = ",".join(f'{k}="{v}"' for k, v in labels)
+                sep = "," if base else ""
+                for bound, count in zip(buckets, hist.counts):
+                    lines.append(f'{metric}_bucket{{{base}{sep}le="{bound:g}"}} {count}')
+                lines.append(f'{metric}_bucket{{{base}{sep}le="+Inf"}} {hist.count}')
+                braces = f"{{{base}}}" if base else ""
+                lines.append(f"{metric}_sum{braces} {hist.sum:.6f}")
+                lines.append(f"{metric}_count{braces} {hist.count}")
+
+        jobs = self.read_jobs()
+        for key, (metric, help_text) in JOB_GAUGES.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            for job, values in sorted(jobs.items()):
+                value = f"{values[key]:.6f}".rstrip("0").rstrip(".")
+                lines.append(f'{metric}{{job="{job}"}} {value}')
+        return lines
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DS01 self-observability metrics")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_observe = sub.add_parser("observe", help="Record one measurement")
+    p_observe.add_argument("metric")
+    p_observe.add_argument("seconds", type=float)
+    p_observe.add_argument("labels", nargs="*", help="key=value")
+    p_job = sub.add_parser("job", help="Record the last run of a periodic job")
+    p_job.add_argument("job")
+    p_job.add_argument("seconds", type=float)
+    p_job.add_argument("items", type=int, nargs="?", default=0)
+    p_job.add_argument("--status", default="ok")
+    sub.add_parser("show", help="Render current metrics as the exporter would")
+    args = parser.parse_args()
+
+    if args.command == "observe":
+        labels = dict(pair.split("=", 1) for pair in args.labels if "=" in pair)
+        return 0 if observe(args.metric, args.seconds, **labels) else 1
+    if args.command == "job":
+        return 0 if write_job(args.job, args.seconds, args.items, args.status) else 1
+    print("\n".join(SelfMetricsReader().render()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
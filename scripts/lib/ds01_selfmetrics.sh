@@ -0,0 +1,86 @@
+#!/bin/bash
+# /opt/ds01-infra/scripts/lib/ds01_selfmetrics.sh
+# Bash writers for DS01 self-observability metrics (see ds01_selfmetrics.py)
+#
+# Writes the same files as the Python library, without forking: timings use
+# $EPOCHREALTIME and values are appended with a single redirection.
+# ds01_exporter.py turns them into histograms and job gauges.
+#
+# Usage:
+#   source /opt/ds01-infra/scripts/lib/ds01_selfmetrics.sh
+#
+#   ds01_timer_start T0                                  # T0=<epoch microseconds>
+#   ds01_observe ds01_wrapper_preflight_duration_seconds "$T0" subcommand=run,gpu=yes
+#
+#   ds01_timer_start JOB_T0
+#   ...
+#   ds01_job_metrics check-idle-containers "$JOB_T0" "$container_count" [ok|error]
+#
+# The functions never cause the calling script to exit on failure.
+
+DS01_SELF_METRICS_DIR="${DS01_SELF_METRICS_DIR:-/var/lib/ds01/self-metrics}"
+
+# Store the current time in microseconds in the named variable
+ds01_timer_start() {
+    local now="${EPOCHREALTIME:-}"
+    if [ -n "$now" ]; then
+        now="${now/[.,]/}"
+    else
+        now="$(date +%s%6N)"
+    fi
+    printf -v "$1" '%s' "$now"
+}
+
+# Store seconds (6 decimals) elapsed since a ds01_timer_start value in $2
+_ds01_elapsed() {
+    local _start="$1" _now
+    ds01_timer_start _now
+    local _delta=$((10#$_now - 10#$_start))
+    ((_delta < 0)) && _delta=0
+    printf -v "$2" '%d.%06d' $((_delta / 1000000)) $((_delta % 1000000))
+}
+
+# ds01_observe <metric> <start_us> [k=v,k=v]
+ds01_observe() {
+    local metric="$1" start="$2" labels="${3:-}"
+    [ -n "$start" ] || return 0
+    local seconds
+    _ds01_elapsed "$start" seconds
+    {
+        printf '%s %s %s\n' "$metric" "$seconds" "$labels" >>"$DS01_SELF_METRICS_DIR/observations.log"
+    } 2>/dev/null || true
+    return 0
+}
+
+# ds01_job_metrics <job> <start_us> <items> [status]
+ds01_job_metrics() {
+    local job="$1" start="$2" items="${3:-0}" status="${4:-ok}"
+    [ -n "$start" ] || return 0
+    local seconds
+    _ds01_elapsed "$start" seconds
+    local path="$DS01_SELF_METRICS_DIR/job-${job}.state"
+    {
+        printf 'duration=%s\nitems=%d\nstatus=%s\ntimestamp=%(%s)T\n' \
+            "$seconds" "$items" "$status" -1 >"$path.$$" &&
+            mv -f "$path.$$" "$path"
+    } 2>/dev/null || rm -f "$path.$$" 2>/dev/null || true
+    return 0
+}
+
+# ds01_job_track <job>
+# Time the rest of the calling script and record it via ds01_job_metrics on exit
+# (status "error" on a non-zero exit). The script counts processed containers
+# in DS01_JOB_ITEMS. Installs an EXIT trap, so call it once, from scripts
+# without their own EXIT trap.
+ds01_job_track() {
+    DS01_JOB_NAME="$1"
+    DS01_JOB_ITEMS=0
+    ds01_timer_start DS01_JOB_T0
+    trap '_ds01_job_exit $?' EXIT
+}
+
+_ds01_job_exit() {
+    local status=ok
+    [ "$1" -eq 0 ] || status=error
+    ds01_job_metrics "$DS01_JOB_NAME" "$DS01_JOB_T0" "${DS01_JOB_ITEMS:-0}" "$status"
+}
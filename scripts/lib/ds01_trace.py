@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_trace.py
+Opt-in subprocess and latency tracing for DS01 Python tools.
+
+Set DS01_TRACE=1 to profile a slow allocation, scrape or monitor run without
+code changes. When enabled, install() wraps subprocess.run (and therefore
+check_output, which calls it) and yaml.safe_load, and callers can add their
+own spans (lock wait/hold, whole operations). subprocess.call/check_call and
+direct Popen use are not traced. Every span becomes one JSON line in
+the trace file, and each process appends a summary line at exit with count
+and total time per command.
+
+Design principles:
+- Zero cost when disabled: install() returns immediately, span() yields a no-op
+- Never raises into the caller; trace write failures are dropped silently
+- Child processes inherit DS01_TRACE_ID, so one `container deploy` groups into
+  a single trace across bash -> python -> docker calls
+- Buffered writes (flushed every 5s, every 256 spans and at exit)
+
+Usage (Python):
+    import ds01_trace  # noqa: F401       # entry points: installs on import, named after argv[0]
+
+    from ds01_trace import install, record, span
+
+    install("gpu-allocator")               # no-op unless DS01_TRACE=1; names the source
+    with span("lock.wait", lock="/var/log/ds01/gpu-allocator.lock"):
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    record("lock.hold", held_seconds, lock="...")
+
+Usage (operators):
+    DS01_TRACE=1 container deploy my-project
+    python3 scripts/lib/ds01_trace.py summary            # last invocations
+    python3 scripts/lib/ds01_trace.py top --trace <id>   # slowest commands
+
+Environment:
+    DS01_TRACE=1        Enable tracing
+    DS01_TRACE_FILE     Trace file (default /var/log/ds01/trace.jsonl, falling
+                        back to /tmp/ds01-trace-<uid>.jsonl when not writable)
+    DS01_TRACE_ID       Set automatically by the first traced process
+
+Span schema:
+    {"ts": "2026-01-30T14:30:00.123Z", "trace": "8123-1769783400", "pid": 8123,
+     "source": "gpu-allocator", "kind": "exec", "name": "docker inspect",
+     "ms": 41.7, "rc": 0, "args": ["docker", "inspect", "alice-proj"]}
+
+    kind is "exec" (subprocess), "yaml" (config load), "span" (caller-defined)
+    or "summary" (one per process, with "commands" and "spans" totals).
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+# Configuration
+TRACE_ENV = "DS01_TRACE"
+TRACE_FILE = Path(os.environ.get("DS01_TRACE_FILE", "/var/log/ds01/trace.jsonl"))
+FLUSH_INTERVAL = 5.0  # seconds
+FLUSH_SPANS = 256
+MAX_ARGS = 8  # argv entries kept per exec span
+MAX_ARG_LEN = 80
+
+# Add NullHandler to avoid "No handlers found" warnings
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
+
+# ============================================================================
+# Tracer state
+# ============================================================================
+
+
+class _Tracer:
+    """Process-wide span buffer and per-command totals."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.named = False
+        self.pid = os.getpid()
+        self.started = time.monotonic()
+        self.trace_id = os.environ.get("DS01_TRACE_ID") or f"{self.pid}-{int(time.time())}"
+        # Propagate to children (bash wrappers, nested python tools)
+        os.environ["DS01_TRACE_ID"] = self.trace_id
+        self.path = _writable_trace_file()
+        self.buffer: list[str] = []
+        self.last_flush = self.started
+        self.commands: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+        self.spans: dict[str, list[float]] = defaultdict(lambda: [0, 0.0])
+        self.lock = threading.Lock()
+
+    def emit(self, kind: str, name: str, seconds: float, **fields: Any) -> None:
+        ms = round(seconds * 1000, 3)
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds")[:-6] + "Z",
+            "trace": self.trace_id,
+            "pid": self.pid,
+            "source": self.source,
+            "kind": kind,
+            "name": name,
+            "ms": ms,
+        }
+        entry.update({k: v for k, v in fields.items() if v is not None})
+        try:
+            line = json.dumps(entry, default=str)
+        except (TypeError, ValueError):
+            return
+        with self.lock:
+            totals = self.commands if kind == "exec" else self.spans
+            totals[name][0] += 1
+            totals[name][1] += ms
+            self.buffer.append(line)
+            now = time.monotonic()
+            if len(self.buffer) >= FLUSH_SPANS or now - self.last_flush >= FLUSH_INTERVAL:
+                self._flush_locked(now)
+
+    def _flush_locked(self, now: float) -> None:
+        self.last_flush = now
+        if not self.buffer or self.path is None:
+            self.buffer.clear()
+            return
+        data = ("\n".join(self.buffer) + "\n").encode()
+        self.buffer.clear()
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            logger.debug("trace write failed: %s", e)
+
+    def summary(self) -> dict[str, Any]:
+        with self.lock:
+            commands = {
+                k: {"count": int(c), "ms": round(t, 3)} for k, (c, t) in self.commands.items()
+            }
+            spans = {k: {"count": int(c), "ms": round(t, 3)} for k, (c, t) in self.spans.items()}
+        return {
+            "wall_ms": round((time.monotonic() - self.started) * 1000, 3),
+            "exec_ms": round(sum(v["ms"] for v in commands.values()), 3),
+            "commands": dict(sorted(commands.items(), key=lambda kv: -kv[1]["ms"])),
+            "spans": dict(sorted(spans.items(), key=lambda kv: -kv[1]["ms"])),
+        }
+
+    def finish(self) -> None:
+        s = self.summary()
+        wall = s.pop("wall_ms") / 1000
+        self.emit("summary", self.source, wall, argv=[_short(a) for a in sys.argv[:4]], **s)
+        with self.lock:
+            self._flush_locked(time.monotonic())
+
+
+_tracer: _Tracer | None = None
+
+
+def _writable_trace_file() -> Path | None:
+    """Return TRACE_FILE, or a per-uid /tmp file for unprivileged callers."""
+    for candidate in (TRACE_FILE, Path(f"/tmp/ds01-trace-{os.getuid()}.jsonl")):
+        try:
+            candidate.parent.mkdir(parents=True, exist_ok=True)
+            with open(candidate, "a"):
+                pass
+            return candidate
+        except OSError:
+            continue
+    return None
+
+
+def _short(value: Any) -> str:
+    text = str(value)
+    return text if len(text) <= MAX_ARG_LEN else text[: MAX_ARG_LEN - 3] + "..."
+
+
+def _command_name(args: Any) -> str:
+    """Group key for a command: binary basename plus its subcommand/first flag.
+
+    ["/usr/bin/docker", "inspect", "x"]          -> "docker inspect"
+    ["nvidia-smi", "--query-gpu=uuid", ...]      -> "nvidia-smi --query-gpu"
+    ["python3", "/opt/.../event-logger.py", ...] -> "python3 event-logger.py"
+    "docker ps -a" (shell=True)                  -> "docker ps"
+    """
+    if isinstance(args, (str, bytes)):
+        args = (args.decode() if isinstance(args, bytes) else args).split()
+    else:
+        args = [os.fsdecode(a) if isinstance(a, bytes) else str(a) for a in args]
+    if not args:
+        return "?"
+    name = os.path.basename(args[0])
+    if len(args) > 1:
+        name += " " + os.path.basename(args[1].split("=", 1)[0])
+    return name
+
+
+# ============================================================================
+# Public API
+# ============================================================================
+
+
+def enabled() -> bool:
+    """True when DS01_TRACE is set to a non-empty, non-zero value."""
+    return os.environ.get(TRACE_ENV, "") not in ("", "0", "false", "no")
+
+
+def _default_source() -> str:
+    stem = Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else ""
+    return stem if stem and stem != "-c" else "python"
+
+
+def install(source: str | None = None) -> bool:
+    """Start tracing this process if DS01_TRACE is enabled.
+
+    Wraps subprocess.run and yaml.safe_load, and registers the exit summary.
+    Idempotent; a later call only replaces a source name defaulted from
+    argv[0]. Returns True when tracing is active.
+    """
+    global _tracer
+    if _tracer is not None:
+        if source and not _tracer.named:
+            _tracer.source, _tracer.named = source, True
+        return True
+    if not enabled():
+        return False
+    try:
+        _tracer = _Tracer(source or _default_source())
+        _tracer.named = bool(source)
+        _wrap_subprocess()
+        _wrap_yaml()
+        atexit.register(_tracer.finish)
+    except Exception as e:  # Tracing must never break the tool it observes
+        logger.debug("trace install failed: %s", e)
+        _tracer = None
+        return False
+    return True
+
+
+@contextmanager
+def span(name: str, **attrs: Any):
+    """Time a block as a caller-defined span (no-op when tracing is off)."""
+    if _tracer is None:
+        yield
+        return
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _tracer.emit("span", name, time.perf_counter() - start, error=error, **attrs)
+
+
+def record(name: str, seconds: float, **attrs: Any) -> None:
+    """Record an already-measured duration (e.g. lock hold time)."""
+    if _tracer is not None:
+        _tracer.emit("span", name, seconds, **attrs)
+
+
+def summary() -> dict[str, Any] | None:
+    """Current per-command totals for this process, or None when disabled."""
+    return _tracer.summary() if _tracer is not None else None
+
+
+# ============================================================================
+# Wrappers
+# ============================================================================
+
+
+def _wrap_subprocess() -> None:
+    import subprocess
+
+    original = subprocess.run
+    if getattr(original, "_ds01_traced", False):
+        return
+
+    def traced_run(*popenargs, **kwargs):
+        args = popenargs[0] if popenargs else kwargs.get("args", ())
+        start = time.perf_counter()
+        rc = error = None
+        try:
+            result = original(*popenargs, **kwargs)
+            rc = result.returncode
+            return result
+        except subprocess.CalledProcessError as e:
+            rc = e.returncode
+            raise
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            if _tracer is not None:
+                try:
+                    argv = args.split() if isinstance(args, str) else list(args)
+                    _tracer.emit(
+                        "exec",
+                        _command_name(args),
+                        time.perf_counter() - start,
+                        rc=rc,
+                        error=error,
+                        args=[_short(a) for a in argv[:MAX_ARGS]],
+                    )
+                except Exception:
+                    pass
+
+    traced_run._ds01_traced = True
+    subprocess.run = traced_run
+
+
+def _wrap_yaml() -> None:
+    try:
+        import yaml
+    except ImportError:
+        return
+
+    original = yaml.safe_load
+    if getattr(original, "_ds01_traced", False):
+        return
+
+    def traced_safe_load(stream):
+        start = time.perf_counter()
+        try:
+            return original(stream)
+        finally:
+            if _tracer is not None:
+                path = getattr(stream, "name", None)
+                _tracer.emit(
+                    "yaml",
+                    os.path.basename(path) if isinstance(path, str) else "<string>",
+                    time.perf_counter() - start,
+                    path=path if isinstance(path, str) else None,
+                )
+
+    traced_safe_load._ds01_traced = True
+    yaml.safe_load = traced_safe_load
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def _read_trace(path: Path, trace_id: str | None = None) -> list[dict]:
+    entries = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if trace_id is None or entry.get("trace") == trace_id:
+                    entries.append(entry)
+    except OSError as e:
+        print(f"Error: cannot read {path}: {e}", file=sys.stderr)
+    return entries
+
+
+def _cmd_summary(entries: list[dict], last: int) -> None:
+    summaries = [e for e in entries if e.get("kind") == "summary"][-last:]
+    if not summaries:
+        print("No trace summaries found.")
+        return
+    for s in summaries:
+        print(
+            f"{s['ts']}  trace={s['trace']}  pid={s['pid']}  {s['source']}"
+            f"  wall={s['ms']:.0f}ms  exec={s.get('exec_ms', 0):.0f}ms"
+        )
+        for name, t in list(s.get("commands", {}).items())[:8]:
+            print(f"    {name:<32} x{t['count']:<4} {t['ms']:>9.1f} ms")
+        for name, t in list(s.get("spans", {}).items())[:8]:
+            print(f"    [{name}]{'':<{max(0, 30 - len(name))}} x{t['count']:<4} {t['ms']:>9.1f} ms")
+
+
+def _cmd_top(entries: list[dict], limit: int) -> None:
+    totals: dict[str, list[float]] = defaultdict(lambda: [0, 0.0, 0.0])
+    for e in entries:
+        if e.get("kind") in ("exec", "yaml", "span"):
+            t = totals[f"{e['kind']}:{e['name']}"]
+            t[0] += 1
+            t[1] += e.get("ms", 0)
+            t[2] = max(t[2], e.get("ms", 0))
+    if not totals:
+        print("No spans found.")
+        return
+    print(f"{'SPAN':<40} {'COUNT':>6} {'TOTAL ms':>10} {'AVG ms':>8} {'MAX ms':>8}")
+    for name, (count, total, peak) in sorted(totals.items(), key=lambda kv: -kv[1][1])[:limit]:
+        print(f"{name:<40} {int(count):>6} {total:>10.1f} {total / count:>8.1f} {peak:>8.1f}")
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect DS01 trace files (DS01_TRACE=1)")
+    parser.add_argument("--file", type=Path, default=TRACE_FILE, help="Trace file")
+    parser.add_argument("--trace", help="Only this trace id")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_summary = sub.add_parser("summary", help="Per-invocation summaries")
+    p_summary.add_argument("--last", type=int, default=10)
+    p_top = sub.add_parser("top", help="Slowest spans aggregated across invocations")
+    p_top.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    entries = _read_trace(args.file, args.trace)
+    if args.command == "summary":
+        _cmd_summary(entries, args.last)
+    else:
+        _cmd_top(entries, args.limit)
+    return 0
+
+
+# Importing the module is the whole hookup for an entry point (one cheap
+# environment lookup when tracing is off)
+if __name__ != "__main__":
+    install()
+
+if __name__ == "__main__":
+    sys.exit(main())
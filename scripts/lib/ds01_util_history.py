@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+/opt/ds01-infra/scripts/lib/ds01_util_history.py
+Columnar analysis of GPU/MIG utilization history: waste ratios, idle streaks, percentiles.
+
+gpu-utilization-monitor.py and mig-utilization-monitor.py --record append one
+JSON snapshot per run (every 5 minutes from cron) to:
+
+    /var/log/ds01/gpu-utilization.jsonl   {"timestamp", "gpus": [...], "allocations": [{"gpu_slot"}]}
+    /var/log/ds01/mig-utilization.jsonl   {"timestamp", "mig_instances": [...], "allocations": [{"mig_slot"}]}
+
+load_window() reads only the requested time window (binary search on the
+chronological log for its first line, instead of parsing the whole file) and
+lays it out as columns:
+
+    timestamps   array of sample times (epoch seconds)
+    columns      slot -> array of utilization %, NaN where the slot was not sampled
+    intervals    (container, user, slot, first_row, last_row) runs of consecutive
+                 samples in which a container held a slot
+
+Per-container statistics then work on one column slice per interval, so the
+cost is O(samples x slots) to build and O(samples) per container to analyse,
+with no per-snapshot search of the instance list.
+
+Usage (Python):
+    from ds01_util_history import analyze, load_window
+
+    window = load_window(GPU_LOG, since=time.time() - 1800, kind="gpu")
+    for stats in analyze(window, threshold=5).values():
+        print(stats.container, stats.waste_ratio, stats.idle_streak_s, stats.p90)
+
+Usage (CLI):
+    python3 ds01_util_history.py waste [--kind gpu|mig] [--minutes 30] [--threshold 5] [--json]
+    python3 ds01_util_history.py recent [--minutes 15]   # container<TAB>max util (idle job)
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import sys
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import NamedTuple
+
+# Configuration
+LOG_DIR = Path("/var/log/ds01")
+LOGS = {
+    "gpu": LOG_DIR / "gpu-utilization.jsonl",
+    "mig": LOG_DIR / "mig-utilization.jsonl",
+}
+SEEK_SLACK = 64 * 1024  # Bytes scanned linearly after the binary search
+NAN = float("nan")
+
+
+# ============================================================================
+# Loading
+# ============================================================================
+
+
+def _parse_ts(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _line_ts(line: bytes) -> float | None:
+    """Timestamp of a snapshot line without decoding the whole object."""
+    start = line.find(b'"timestamp": "')
+    if start < 0:
+        return None
+    start += 14
+    end = line.find(b'"', start)
+    try:
+        return _parse_ts(line[start:end].decode())
+    except ValueError:
+        return None
+
+
+def _seek_since(f, since: float) -> None:
+    """
+    Position f at a line start at or before the first line with timestamp >= since.
+
+    Binary search on byte offsets (the log is chronological) down to SEEK_SLACK
+    bytes; the caller skips the few older lines left before the window.
+    """
+    lo, hi = 0, os.fstat(f.fileno()).st_size
+    while hi - lo > SEEK_SLACK:
+        mid = (lo + hi) // 2
+        f.seek(mid)
+        f.readline()  # Skip to the next line start
+        start = f.tell()
+        ts = _line_ts(f.readline())
+        if ts is not None and ts < since:
+            lo = start  # Every line up to here is older than the window
+        else:
+            hi = mid
+    f.seek(lo)
+
+
+def _rows(entry: dict, kind: str) -> tuple[dict[str, float], list[tuple[str, str, str, str]]]:
+    """(column -> util, [(container, user, slot, column)]) for one snapshot."""
+    if kind == "mig":
+        util = {
+            str(m.get("slot")): float(m.get("gpu_util_percent") or 0)
+            for m in entry.get("mig_instances", [])
+        }
+        slot_key = "mig_slot"
+    else:
+        util = {
+            str(g.get("index", i)): float(g.get("gpu_util_percent") or 0)
+            for i, g in enumerate(entry.get("gpus", []))
+        }
+        slot_key = "gpu_slot"
+    allocs = []
+    for alloc in entry.get("allocations", []):
+        container = alloc.get("container", "")
+        slot = str(alloc.get(slot_key, ""))
+        if not container or not slot:
+            continue
+        # Full-GPU history: a MIG slot ("1.2") reads its parent GPU's column
+        column = slot.split(".", 1)[0] if kind == "gpu" else slot
+        allocs.append((container, alloc.get("user", "unknown"), slot, column))
+    return util, allocs
+
+
+class Interval(NamedTuple):
+    container: str
+    user: str
+    slot: str
+    column: str
+    first: int  # Row indexes, inclusive
+    last: int
+
+
+class Window:
+    """A time window of utilization snapshots in columnar form."""
+
+    def __init__(self):
+        self.timestamps = array("d")
+        self.columns: dict[str, array] = {}
+        self.intervals: list[Interval] = []
+        self._runs: dict[tuple[str, str], int] = {}  # (container, slot) -> latest interval
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def add(self, ts: float, util: dict[str, float], allocs: list) -> None:
+        row = len(self.timestamps)
+        self.timestamps.append(ts)
+        for column, value in util.items():
+            col = self.columns.get(column)
+            if col is None:
+                col = self.columns[column] = array("d", [NAN]) * row
+            col.append(value)
+        for col in self.columns.values():
+            if len(col) == row:
+                col.append(NAN)
+        for container, user, slot, column in allocs:
+            self._extend(container, user, slot, column, row)
+
+    def _extend(self, container: str, user: str, slot: str, column: str, row: int) -> None:
+        idx = self._runs.get((container, slot))
+        if idx is not None and self.intervals[idx].last == row - 1:
+            self.intervals[idx] = self.intervals[idx]._replace(last=row)
+        else:
+            self._runs[(container, slot)] = len(self.intervals)
+            self.intervals.append(Interval(container, user, slot, column, row, row))
+
+
+def load_window(path: Path, since: float, kind: str = "gpu", until: float | None = None) -> Window:
+    """Snapshots in [since, until] from a utilization log as a Window."""
+    window = Window()
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return window
+    with f:
+        _seek_since(f, since)
+        for line in f:
+            try:
+                entry = json.loads(line)
+                ts = _parse_ts(entry["timestamp"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            if ts < since:
+                continue
+            if until is not None and ts > until:
+                break
+            window.add(ts, *_rows(entry, kind))
+    return window
+
+
+# ============================================================================
+# Analysis
+# ============================================================================
+
+
+class ContainerStats(NamedTuple):
+    container: str
+    user: str
+    slot: str
+    samples: int
+    low_samples: int
+    waste_ratio: float
+    idle_streak_s: float  # Trailing run of samples below threshold, up to the last sample
+    longest_idle_s: float
+    p50: float
+    p90: float
+    max_util: float
+    last_util: float
+    last_ts: float
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Linear-interpolated percentile (0-100) of an ascending list."""
+    if not sorted_values:
+        return NAN
+    pos = (len(sorted_values) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def _streak_seconds(ts: list[float], start: int, end: int) -> float:
+    """Duration covered by rows start..end-1 of a run (one sample counts as zero)."""
+    return ts[end - 1] - ts[start] if end > start else 0.0
+
+
+def analyze(window: Window, threshold: float = 5) -> dict[str, ContainerStats]:
+    """Per-container waste statistics over the window (slots of one container are combined)."""
+    per_container: dict[str, list[Interval]] = {}
+    for interval in window.intervals:
+        per_container.setdefault(interval.container, []).append(interval)
+
+    results = {}
+    for container, intervals in per_container.items():
+        times: list[float] = []
+        values: list[float] = []
+        for iv in sorted(intervals, key=lambda iv: iv.first):
+            col = window.columns.get(iv.column)
+            if col is None:
+                continue
+            segment = col[iv.first : iv.last + 1]
+            stamps = window.timestamps[iv.first : iv.last + 1]
+            for t, v in zip(stamps, segment):
+                if v == v:  # Not NaN: slot was sampled
+                    times.append(t)
+                    values.append(v)
+        if not values:
+            continue
+
+        low = [v < threshold for v in values]
+        longest = streak = 0.0
+        run_start = None
+        for i, is_low in enumerate(low):
+            if is_low:
+                if run_start is None:
+                    run_start = i
+                streak = _streak_seconds(times, run_start, i + 1)
+                longest = max(longest, streak)
+            else:
+                run_start, streak = None, 0.0
+
+        ordered = sorted(values)
+        first = intervals[0]
+        results[container] = ContainerStats(
+            container=container,
+            user=first.user,
+            slot=",".join(dict.fromkeys(iv.slot for iv in intervals)),
+            samples=len(values),
+            low_samples=sum(low),
+            waste_ratio=sum(low) / len(values),
+            idle_streak_s=streak if low[-1] else 0.0,
+            longest_idle_s=longest,
+            p50=percentile(ordered, 50),
+            p90=percentile(ordered, 90),
+            max_util=ordered[-1],
+            last_util=values[-1],
+            last_ts=times[-1],
+        )
+    return results
+
+
+def wasted(
+    stats: dict[str, ContainerStats], min_samples: int = 3, min_ratio: float = 0.8
+) -> list[ContainerStats]:
+    """Containers with enough samples and more than min_ratio of them below threshold."""
+    return [s for s in stats.values() if s.samples >= min_samples and s.waste_ratio > min_ratio]
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def main() -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="DS01 GPU/MIG utilization history analysis")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_waste = sub.add_parser("waste", help="Per-container waste over a window")
+    p_waste.add_argument("--kind", choices=tuple(LOGS), default="gpu")
+    p_waste.add_argument("--minutes", type=float, default=30)
+    p_waste.add_argument("--threshold", type=float, default=5)
+    p_waste.add_argument("--all", action="store_true", help="Every container, not just wasted")
+    p_waste.add_argument("--json", action="store_true")
+    p_recent = sub.add_parser("recent", help="container<TAB>max utilization over the window")
+    p_recent.add_argument("--minutes", type=float, default=15)
+    args = parser.parse_args()
+
+    since = time.time() - args.minutes * 60
+
+    if args.command == "recent":
+        # MIG history is per instance, so it wins over the parent-GPU reading
+        latest: dict[str, float] = {}
+        for kind in ("gpu", "mig"):
+            for s in analyze(load_window(LOGS[kind], since, kind)).values():
+                latest[s.container] = s.max_util
+        for container, util in sorted(latest.items()):
+            print(f"{container}\t{util:g}")
+        return 0
+
+    stats = analyze(load_window(LOGS[args.kind], since, args.kind), args.threshold)
+    rows = sorted(stats.values()) if args.all else wasted(stats)
+    if args.json:
+        print(json.dumps([s._asdict() for s in rows], indent=2))
+        return 0
+    for s in rows:
+        print(
+            f"{s.container:40} {s.user:16} {s.slot:8} waste={s.waste_ratio * 100:3.0f}% "
+            f"idle={s.idle_streak_s / 60:.0f}m p50={s.p50:.0f}% p90={s.p90:.0f}% n={s.samples}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,6 +4,11 @@
 #
 # Archives old logs and manages retention.
 #
+# Event log archives (events.jsonl-*) are not tarred: each is packed as hourly
+# gzip members with a sidecar index (ds01_event_index.py) and moved to
+# $ARCHIVE_DIR/events, where ds01-events, event-logger.py search and
+# ds01-monthly-report read only the hours they need.
+#
 # Usage:
 #   backup-logs.sh                    # Archive logs older than 30 days
 #   backup-logs.sh --clean            # Remove archives older than 1 year
@@ -15,6 +20,8 @@ set -e
 # Configuration
 LOG_DIR="/var/log/ds01"
 ARCHIVE_DIR="/var/lib/ds01/log-archives"
+EVENTS_ARCHIVE_DIR="$ARCHIVE_DIR/events"
+EVENT_INDEX="/opt/ds01-infra/scripts/lib/ds01_event_index.py"
 RETENTION_DAYS=${DS01_LOG_RETENTION_DAYS:-30}
 ARCHIVE_RETENTION_DAYS=${DS01_ARCHIVE_RETENTION_DAYS:-365}
 
@@ -34,16 +41,40 @@ log_error() { echo -e "${RED}[ERROR]${NC} $1"; }
 mkdir -p "$ARCHIVE_DIR"
 mkdir -p "$LOG_DIR"
 
+# Move old event archives to $EVENTS_ARCHIVE_DIR as seekable, indexed files
+archive_events() {
+    local moved_count=0
+    local old_events=$(find "$LOG_DIR" -maxdepth 1 -name "events.jsonl-*" ! -name "*.idx.json" -mtime +${RETENTION_DAYS} 2>/dev/null || true)
+
+    [ -z "$old_events" ] && return 0
+    mkdir -p "$EVENTS_ARCHIVE_DIR"
+
+    while IFS= read -r file; do
+        local packed
+        # Repacks legacy single-member archives; already-framed ones are only indexed
+        if packed=$(python3 "$EVENT_INDEX" pack "$file") && gzip -t "$packed" 2>/dev/null; then
+            mv -f "$packed" "$packed.idx.json" "$EVENTS_ARCHIVE_DIR/"
+            moved_count=$((moved_count + 1))
+        else
+            log_error "Failed to pack event archive: $file (left in place)"
+        fi
+    done <<<"$old_events"
+
+    log_success "Moved $moved_count event archive(s) to $EVENTS_ARCHIVE_DIR"
+}
+
 # Archive old logs
 archive_logs() {
     log "Starting log archive (retention: ${RETENTION_DAYS} days)"
 
+    archive_events
+
     local archived_count=0
     local archive_date=$(date +%Y%m%d)
     local archive_file="$ARCHIVE_DIR/ds01-logs-${archive_date}.tar.gz"
 
-    # Find logs older than retention period
-    local old_logs=$(find "$LOG_DIR" -name "*.log.*" -o -name "*.jsonl.*" -mtime +${RETENTION_DAYS} 2>/dev/null || true)
+    # Find logs older than retention period (event archives handled above)
+    local old_logs=$(find "$LOG_DIR" \( -name "*.log.*" -o -name "*.jsonl.*" \) ! -name "events.jsonl-*" -mtime +${RETENTION_DAYS} 2>/dev/null || true)
 
     if [ -z "$old_logs" ]; then
         log "No logs older than ${RETENTION_DAYS} days to archive"
@@ -83,7 +114,7 @@ clean_archives() {
     log "Cleaning archives older than ${ARCHIVE_RETENTION_DAYS} days"
 
     local removed_count=0
-    local old_archives=$(find "$ARCHIVE_DIR" -name "ds01-logs-*.tar.gz" -mtime +${ARCHIVE_RETENTION_DAYS} 2>/dev/null || true)
+    local old_archives=$(find "$ARCHIVE_DIR" \( -name "ds01-logs-*.tar.gz" -o -name "events.jsonl-*.gz" \) -mtime +${ARCHIVE_RETENTION_DAYS} 2>/dev/null || true)
 
     if [ -z "$old_archives" ]; then
         log "No archives older than ${ARCHIVE_RETENTION_DAYS} days"
@@ -91,9 +122,9 @@ clean_archives() {
     fi
 
     while IFS= read -r archive; do
-        if rm -f "$archive"; then
+        if rm -f "$archive" "$archive.idx.json"; then
             log "Removed old archive: $archive"
-            ((removed_count++))
+            removed_count=$((removed_count + 1))
         fi
     done <<<"$old_archives"
 
@@ -110,14 +141,27 @@ verify_archives() {
 
     for archive in "$ARCHIVE_DIR"/ds01-logs-*.tar.gz; do
         [ -f "$archive" ] || continue
-        ((total++))
+        total=$((total + 1))
 
         if tar -tzf "$archive" >/dev/null 2>&1; then
             log_success "$(basename "$archive") - OK"
-            ((valid++))
+            valid=$((valid + 1))
         else
             log_error "$(basename "$archive") - CORRUPTED"
-            ((invalid++))
+            invalid=$((invalid + 1))
+        fi
+    done
+
+    for archive in "$EVENTS_ARCHIVE_DIR"/events.jsonl-*.gz; do
+        [ -f "$archive" ] || continue
+        total=$((total + 1))
+
+        if gzip -t "$archive" 2>/dev/null; then
+            log_success "events/$(basename "$archive") - OK"
+            valid=$((valid + 1))
+        else
+            log_error "events/$(basename "$archive") - CORRUPTED"
+            invalid=$((invalid + 1))
         fi
     done
 
@@ -153,7 +197,9 @@ show_status() {
         local archive_size=$(du -sh "$ARCHIVE_DIR" 2>/dev/null | cut -f1)
         local archive_count=$(find "$ARCHIVE_DIR" -name "*.tar.gz" 2>/dev/null | wc -l)
         echo "  Size: $archive_size"
+        local events_count=$(find "$EVENTS_ARCHIVE_DIR" -name "events.jsonl-*.gz" 2>/dev/null | wc -l)
         echo "  Archives: $archive_count"
+        echo "  Event archives (seekable): $events_count"
 
         if [ $archive_count -gt 0 ]; then
             echo ""
@@ -185,7 +231,7 @@ case "${1:-}" in
         echo "Usage: $0 [--clean|--verify|--status]"
         echo ""
         echo "Options:"
-        echo "  (no args)  Archive logs older than ${RETENTION_DAYS} days"
+        echo "  (no args)  Archive logs older than ${RETENTION_DAYS} days (event logs to events/)"
         echo "  --clean    Remove archives older than ${ARCHIVE_RETENTION_DAYS} days"
         echo "  --verify   Verify archive integrity"
         echo "  --status   Show archive status"
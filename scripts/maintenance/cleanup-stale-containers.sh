@@ -19,12 +19,23 @@ LOG_FILE="$LOG_DIR/cleanup-stale-containers.log"
 # Source shared library for colors and utilities
 source "$INFRA_ROOT/scripts/lib/init.sh"
 
+# Cached uid -> username lookups (snapshot, no SSSD round trip per container)
+source "$INFRA_ROOT/scripts/lib/ds01_identity.sh"
+
 # Source event logging library
 EVENTS_LIB="$INFRA_ROOT/scripts/lib/ds01_events.sh"
 if [ -f "$EVENTS_LIB" ]; then
     source "$EVENTS_LIB"
 fi
 
+# Source self-observability metrics library (run duration, per-container cost)
+SELFMETRICS_LIB="$INFRA_ROOT/scripts/lib/ds01_selfmetrics.sh"
+if [ -f "$SELFMETRICS_LIB" ]; then
+    source "$SELFMETRICS_LIB"
+else
+    ds01_job_track() { :; }
+fi
+
 # Ensure log directory exists
 mkdir -p "$LOG_DIR"
 
@@ -79,7 +90,7 @@ get_container_owner() {
     local name=$(docker inspect "$container" --format '{{.Name}}' 2>/dev/null | tr -d '/')
     if [[ $name == *._\.* ]]; then
         local uid=$(echo "$name" | rev | cut -d'.' -f1 | rev)
-        getent passwd "$uid" 2>/dev/null | cut -d: -f1
+        ds01_uid_to_name "$uid" || true
         return
     fi
 
@@ -285,6 +296,7 @@ while [[ $# -gt 0 ]]; do
     esac
 done
 
+ds01_job_track cleanup-stale-containers
 log "Starting stale container cleanup (Docker-native)..."
 
 if [ -n "$NAME_FILTER" ]; then
@@ -312,6 +324,7 @@ ERROR_COUNT=0
 
 while IFS= read -r container_tag; do
     [ -z "$container_tag" ] && continue
+    ((DS01_JOB_ITEMS += 1))
 
     # Skip infrastructure containers
     is_monitoring=$(docker inspect "$container_tag" --format '{{index .Config.Labels "ds01.monitoring"}}' 2>/dev/null)
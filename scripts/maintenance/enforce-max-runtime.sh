@@ -19,6 +19,9 @@ LOG_FILE="/var/log/ds01/runtime-enforcement.log"
 # Source shared library for colors and utilities
 source "$INFRA_ROOT/scripts/lib/init.sh"
 
+# Cached uid -> username lookups (snapshot, no SSSD round trip per container)
+source "$INFRA_ROOT/scripts/lib/ds01_identity.sh"
+
 # Source notification library
 source "$INFRA_ROOT/scripts/lib/ds01_notify.sh"
 
@@ -28,6 +31,14 @@ if [ -f "$EVENTS_LIB" ]; then
     source "$EVENTS_LIB"
 fi
 
+# Source self-observability metrics library (run duration, per-container cost)
+SELFMETRICS_LIB="$INFRA_ROOT/scripts/lib/ds01_selfmetrics.sh"
+if [ -f "$SELFMETRICS_LIB" ]; then
+    source "$SELFMETRICS_LIB"
+else
+    ds01_job_track() { :; }
+fi
+
 # Create state and log directories
 mkdir -p "$STATE_DIR"
 mkdir -p "$(dirname "$LOG_FILE")"
@@ -149,7 +160,7 @@ get_container_owner() {
     local name=$(docker inspect "$container" --format '{{.Name}}' 2>/dev/null | tr -d '/')
     if [[ $name == *._\.* ]]; then
         local uid=$(echo "$name" | rev | cut -d'.' -f1 | rev)
-        getent passwd "$uid" 2>/dev/null | cut -d: -f1
+        ds01_uid_to_name "$uid" || true
         return
     fi
 
@@ -187,6 +198,7 @@ send_warning() {
     local username="$1"
     local container="$2"
     local hours_until_stop="$3"
+    local episode="$4"
 
     local body="Container: $container
 Status: Will auto-stop in ~${hours_until_stop} hours
@@ -203,9 +215,9 @@ To check your limits: check-limits"
 
     local msg
     msg=$(ds01_format_message "WARNING" "MAX RUNTIME WARNING" "$body" "$username")
-    ds01_notify "$username" "$container" "$msg"
+    ds01_notify_queue "$username" "$container" WARNING runtime.warning "$msg" 0 "$episode"
 
-    log_color "Runtime warning sent to $username for container $container" "$YELLOW"
+    log_color "Runtime warning queued for $username for container $container" "$YELLOW"
 }
 
 # Send final runtime warning (at 90% of limit) — more urgent
@@ -213,6 +225,7 @@ send_final_warning() {
     local username="$1"
     local container="$2"
     local hours_until_stop="$3"
+    local episode="$4"
 
     local body="Container: $container
 Status: Will auto-stop in ~${hours_until_stop} hours
@@ -230,9 +243,9 @@ To check your limits: check-limits"
 
     local msg
     msg=$(ds01_format_message "WARNING" "FINAL RUNTIME WARNING — STOPPING SOON" "$body" "$username")
-    ds01_notify "$username" "$container" "$msg"
+    ds01_notify_queue "$username" "$container" WARNING runtime.final "$msg" 0 "$episode"
 
-    log_color "Final runtime warning sent to $username for container $container" "$YELLOW"
+    log_color "Final runtime warning queued for $username for container $container" "$YELLOW"
 }
 
 # Stop container that exceeded runtime
@@ -300,13 +313,13 @@ To restart: container-run $container_name"
 
         local msg
         msg=$(ds01_format_message "STOPPED" "CONTAINER STOPPED — RUNTIME LIMIT" "$body" "$username")
-        ds01_notify "$username" "$container" "$msg"
+        ds01_notify_queue "$username" "$container" STOPPED runtime.stopped "$msg"
     else
         log_color "Failed to stop container: $container" "$RED"
         return 1
     fi
 
-    # Clean up runtime state file
+    # Clean up the runtime state file (warning flags from older versions)
     rm -f "$STATE_DIR/${container}.state"
 }
 
@@ -328,6 +341,7 @@ monitor_containers() {
     local skipped_no_gpu=0
 
     for container in $containers; do
+        ((DS01_JOB_ITEMS += 1))
         # Verify container still exists (race condition protection)
         if ! docker ps --format "{{.Names}}" | grep -q "^${container}$"; then
             log "Container $container no longer exists, skipping"
@@ -429,35 +443,29 @@ process_container_runtime_universal() {
     local runtime_seconds_actual=$((now - start_time))
     local runtime_hours=$((runtime_seconds_actual / 3600))
 
-    # State file for tracking warnings
-    local state_file="$STATE_DIR/${container}.state"
-    if [ ! -f "$state_file" ]; then
-        echo "WARNED=false" >"$state_file"
-        echo "WARNED_FINAL=false" >>"$state_file"
-    fi
-
-    source "$state_file"
-
     log "Container $container (user: $username, type: $container_type): runtime ${runtime_hours}h / limit ${runtime_str}h"
 
     # Calculate warning thresholds: first at 75%, final at 90%
     local warning_seconds=$((runtime_seconds * 75 / 100))
     local final_warning_seconds=$((runtime_seconds * 90 / 100))
 
+    # Each warning goes out once per container run: the notification index
+    # keys it on the start time
+
     # First warning at 75% of limit
-    if [ "$runtime_seconds_actual" -ge "$warning_seconds" ] && [ "$WARNED" != "true" ]; then
+    if [ "$runtime_seconds_actual" -ge "$warning_seconds" ] &&
+        ds01_notify_due "$username" "$container" runtime.warning 0 "$start_time"; then
         local hours_until_stop=$(((runtime_seconds - runtime_seconds_actual) / 3600))
         [ "$hours_until_stop" -lt 1 ] && hours_until_stop=1
-        send_warning "$username" "$container" "$hours_until_stop"
-        sed -i "s/^WARNED=.*/WARNED=true/" "$state_file"
+        send_warning "$username" "$container" "$hours_until_stop" "$start_time"
     fi
 
     # Final warning at 90% of limit
-    if [ "$runtime_seconds_actual" -ge "$final_warning_seconds" ] && [ "${WARNED_FINAL:-false}" != "true" ]; then
+    if [ "$runtime_seconds_actual" -ge "$final_warning_seconds" ] &&
+        ds01_notify_due "$username" "$container" runtime.final 0 "$start_time"; then
         local hours_until_stop=$(((runtime_seconds - runtime_seconds_actual) / 3600))
         [ "$hours_until_stop" -lt 1 ] && hours_until_stop=1
-        send_final_warning "$username" "$container" "$hours_until_stop"
-        grep -q "^WARNED_FINAL=" "$state_file" && sed -i "s/^WARNED_FINAL=.*/WARNED_FINAL=true/" "$state_file" || echo "WARNED_FINAL=true" >>"$state_file"
+        send_final_warning "$username" "$container" "$hours_until_stop" "$start_time"
     fi
 
     # Check if we should stop
@@ -471,5 +479,6 @@ process_container_runtime_universal() {
 
 # Run monitoring (only when executed directly, not sourced)
 if [[ ${BASH_SOURCE[0]} == "${0}" ]]; then
+    ds01_job_track enforce-max-runtime
     monitor_containers
 fi
@@ -24,6 +24,9 @@ LOG_FILE="/var/log/ds01/idle-cleanup.log"
 # Source shared library for colors and utilities
 source "$INFRA_ROOT/scripts/lib/init.sh"
 
+# Cached uid -> username lookups (snapshot, no SSSD round trip per container)
+source "$INFRA_ROOT/scripts/lib/ds01_identity.sh"
+
 # Source notification library
 source "$INFRA_ROOT/scripts/lib/ds01_notify.sh"
 
@@ -33,6 +36,14 @@ if [ -f "$EVENTS_LIB" ]; then
     source "$EVENTS_LIB"
 fi
 
+# Source self-observability metrics library (run duration, per-container cost)
+SELFMETRICS_LIB="$INFRA_ROOT/scripts/lib/ds01_selfmetrics.sh"
+if [ -f "$SELFMETRICS_LIB" ]; then
+    source "$SELFMETRICS_LIB"
+else
+    ds01_job_track() { :; }
+fi
+
 # Create state directory
 mkdir -p "$STATE_DIR"
 mkdir -p "$(dirname "$LOG_FILE")"
@@ -217,7 +228,7 @@ get_container_owner() {
     if [[ $name == *._\.* ]]; then
         local uid
         uid=$(echo "$name" | rev | cut -d'.' -f1 | rev)
-        getent passwd "$uid" 2>/dev/null | cut -d: -f1
+        ds01_uid_to_name "$uid" || true
         return
     fi
 
@@ -241,11 +252,36 @@ timeout_to_seconds() {
     fi
 }
 
+# Recent GPU/MIG utilization per container from the monitors' history logs
+# (max over the last UTIL_HISTORY_MINUTES), loaded once per run by
+# load_gpu_history. Covers MIG instances, which nvidia-smi --id cannot query.
+UTIL_HISTORY_MINUTES=15
+declare -A GPU_HISTORY_UTIL=()
+
+load_gpu_history() {
+    local container util
+    while IFS=$'\t' read -r container util; do
+        [ -n "$container" ] && GPU_HISTORY_UTIL["$container"]="$util"
+    done < <(python3 "$INFRA_ROOT/scripts/lib/ds01_util_history.py" recent \
+        --minutes "$UTIL_HISTORY_MINUTES" 2>/dev/null || true)
+}
+
 # Check GPU idle status (primary idle signal)
 check_gpu_idle() {
     local container="$1"
     local threshold="${2:-5}"
 
+    # Recorded history first: idle only if every recent sample was below threshold
+    local history_util="${GPU_HISTORY_UTIL[$container]:-}"
+    if [ -n "$history_util" ]; then
+        if (($(echo "$history_util < $threshold" | bc -l))); then
+            echo "idle"
+        else
+            echo "active"
+        fi
+        return
+    fi
+
     # Try to get GPU UUID from ds01.gpu.uuid label
     local gpu_uuid
     gpu_uuid=$(docker inspect "$container" --format '{{index .Config.Labels "ds01.gpu.uuid"}}' 2>/dev/null)
@@ -348,8 +384,6 @@ get_last_activity() {
         {
             echo "LAST_ACTIVITY=$start_epoch"
             echo "LAST_CPU=0.0"
-            echo "WARNED=false"
-            echo "WARNED_FINAL=false"
             echo "IDLE_STREAK=0"
         } >"$state_file"
         echo "$start_epoch"
@@ -369,10 +403,8 @@ update_activity() {
     source "$state_file"
 
     if [ "$is_active" = "true" ]; then
-        # Reset activity timestamp and idle streak
+        # Reset activity timestamp (starts a new warning episode) and idle streak
         sed -i "s/^LAST_ACTIVITY=.*/LAST_ACTIVITY=$(date +%s)/" "$state_file"
-        sed -i "s/^WARNED=.*/WARNED=false/" "$state_file"
-        grep -q "^WARNED_FINAL=" "$state_file" && sed -i "s/^WARNED_FINAL=.*/WARNED_FINAL=false/" "$state_file" || echo "WARNED_FINAL=false" >>"$state_file"
         sed -i "s/^IDLE_STREAK=.*/IDLE_STREAK=0/" "$state_file"
     fi
 }
@@ -382,6 +414,7 @@ send_informational_warning() {
     local username="$1"
     local container="$2"
     local reason="$3"
+    local episode="$4"
 
     local body="Container: $container
 Status: IDLE (no activity detected)
@@ -392,7 +425,7 @@ This is an informational notice only."
 
     local msg
     msg=$(ds01_format_message "NOTICE" "IDLE CONTAINER NOTICE (FYI only — you are exempt)" "$body" "$username")
-    ds01_notify "$username" "$container" "$msg"
+    ds01_notify_queue "$username" "$container" NOTICE idle.notice "$msg" 0 "$episode"
 }
 
 # Send first idle warning (at 80% of timeout)
@@ -400,6 +433,7 @@ send_warning() {
     local username="$1"
     local container="$2"
     local minutes_until_stop="$3"
+    local episode="$4"
 
     local high_demand_notice=""
     if [ "$HIGH_DEMAND_MODE" = "true" ]; then
@@ -432,9 +466,9 @@ Questions? Run 'check-limits' or contact admin."
 
     local msg
     msg=$(ds01_format_message "WARNING" "IDLE CONTAINER WARNING" "$body" "$username")
-    ds01_notify "$username" "$container" "$msg"
+    ds01_notify_queue "$username" "$container" WARNING idle.warning "$msg" 0 "$episode"
 
-    log_color "Warning sent to $username about container $container" "$YELLOW"
+    log_color "Warning queued for $username about container $container" "$YELLOW"
 }
 
 # Send final idle warning (at 95% of timeout) — more urgent
@@ -442,6 +476,7 @@ send_final_warning() {
     local username="$1"
     local container="$2"
     local minutes_until_stop="$3"
+    local episode="$4"
 
     local body
     body="Container: $container
@@ -460,9 +495,9 @@ To stop and retire now (frees GPU immediately):
 
     local msg
     msg=$(ds01_format_message "WARNING" "FINAL IDLE WARNING — STOPPING SOON" "$body" "$username")
-    ds01_notify "$username" "$container" "$msg"
+    ds01_notify_queue "$username" "$container" WARNING idle.final "$msg" 0 "$episode"
 
-    log_color "Final idle warning sent to $username about container $container" "$YELLOW"
+    log_color "Final idle warning queued for $username about container $container" "$YELLOW"
 }
 
 # Get SIGTERM grace period for container type
@@ -532,7 +567,7 @@ To prevent auto-stop in future:
 
     local msg
     msg=$(ds01_format_message "STOPPED" "CONTAINER AUTO-STOPPED" "$body" "$username")
-    ds01_notify "$username" "$container" "$msg"
+    ds01_notify_queue "$username" "$container" STOPPED idle.stopped "$msg"
 
     # Stop container with variable SIGTERM grace by container type
     local container_type
@@ -583,6 +618,8 @@ monitor_containers() {
     HIGH_DEMAND_MODE=$(is_high_demand "$hd_threshold")
     HIGH_DEMAND_REDUCTION="$hd_reduction"
 
+    load_gpu_history
+
     # Get grace period from config
     local grace_period_str
     grace_period_str=$(get_grace_period)
@@ -622,6 +659,7 @@ monitor_containers() {
     local skipped_devcontainer=0
 
     for container in $containers; do
+        ((DS01_JOB_ITEMS += 1))
         # Verify container still exists (race condition protection)
         if ! docker ps --format "{{.Names}}" | grep -q "^${container}$"; then
             log "Container $container no longer exists, skipping"
@@ -811,8 +849,6 @@ process_container_universal() {
             {
                 echo "LAST_ACTIVITY=$start_epoch"
                 echo "LAST_CPU=0.0"
-                echo "WARNED=false"
-                echo "WARNED_FINAL=false"
                 echo "IDLE_STREAK=0"
             } >"$state_file"
         fi
@@ -845,28 +881,31 @@ process_container_universal() {
 
         log "Container $container (user: $username, type: $container_type): idle for ${idle_minutes}m (timeout: ${timeout_str}h, streak: $current_streak)"
 
+        # Each warning goes out once per idle period: the notification index
+        # keys it on the last activity time (reset by any activity)
+
         # If user is exempt, send informational warning only
         if [ "$is_exempt" = true ]; then
             # Send FYI-only warning once (at warning threshold)
-            if [ "$idle_seconds" -ge "$warning_seconds" ] && [ "$WARNED" != "true" ]; then
-                send_informational_warning "$username" "$container" "$exempt_reason"
-                sed -i "s/^WARNED=.*/WARNED=true/" "$state_file"
+            if [ "$idle_seconds" -ge "$warning_seconds" ] &&
+                ds01_notify_due "$username" "$container" idle.notice 0 "$last_activity"; then
+                send_informational_warning "$username" "$container" "$exempt_reason" "$last_activity"
             fi
             return 0
         fi
 
         # First warning at 80% of timeout
-        if [ "$idle_seconds" -ge "$warning_seconds" ] && [ "$WARNED" != "true" ]; then
+        if [ "$idle_seconds" -ge "$warning_seconds" ] &&
+            ds01_notify_due "$username" "$container" idle.warning 0 "$last_activity"; then
             local minutes_until_stop=$(((timeout_seconds - idle_seconds) / 60))
-            send_warning "$username" "$container" "$minutes_until_stop"
-            sed -i "s/^WARNED=.*/WARNED=true/" "$state_file"
+            send_warning "$username" "$container" "$minutes_until_stop" "$last_activity"
         fi
 
         # Final warning at 95% of timeout
-        if [ "$idle_seconds" -ge "$final_warning_seconds" ] && [ "${WARNED_FINAL:-false}" != "true" ]; then
+        if [ "$idle_seconds" -ge "$final_warning_seconds" ] &&
+            ds01_notify_due "$username" "$container" idle.final 0 "$last_activity"; then
             local minutes_until_stop=$(((timeout_seconds - idle_seconds) / 60))
-            send_final_warning "$username" "$container" "$minutes_until_stop"
-            grep -q "^WARNED_FINAL=" "$state_file" && sed -i "s/^WARNED_FINAL=.*/WARNED_FINAL=true/" "$state_file" || echo "WARNED_FINAL=true" >>"$state_file"
+            send_final_warning "$username" "$container" "$minutes_until_stop" "$last_activity"
         fi
 
         # Check if we should stop
@@ -895,5 +934,6 @@ done
 
 # Only run when executed, not sourced
 if [[ ${BASH_SOURCE[0]} == "${0}" ]]; then
+    ds01_job_track check-idle-containers
     monitor_containers
 fi
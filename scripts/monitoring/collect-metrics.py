@@ -0,0 +1,800 @@
+#!/usr/bin/env python3
+"""
+DS01 Metrics Collector
+/opt/ds01-infra/scripts/monitoring/collect-metrics.py
+
+Samples GPUs, CPU, memory, disks, network, containers and user slices in one
+process and appends typed records to the per-day metrics file (see
+scripts/lib/ds01_metrics_store.py). Replaces collect-{gpu,cpu,memory,disk,
+container}-metrics.sh and the body of collect-resource-stats.sh.
+
+One pass shares its readers:
+- One /proc scan gives per-user CPU/RSS, the top processes and the owners of
+  GPU processes (no ps/xargs per line)
+- One nvidia-smi call per query (devices, compute apps)
+- One `docker ps`; container CPU/memory/IO come from cgroup files instead of
+  `docker stats`
+- CPU and container CPU percentages are deltas against the previous pass
+  (state in /var/lib/ds01/metrics/collector-state.json)
+
+Run every minute from cron (via collect-resource-stats.sh). User slices are
+sampled on every run; host groups when HOST_INTERVAL has passed since the last
+host pass. OOM kills in user slices are still logged as resource.oom_kill.
+Host passes also integrate the open intervals of the usage accounting ledger
+(scripts/lib/ds01_accounting.py) with the GPU power draw just sampled.
+
+Usage:
+    collect-metrics.py                  # Slices, plus host groups when due
+    collect-metrics.py --all            # Every group now
+    collect-metrics.py --only gpu,cpu   # Just these groups
+    collect-metrics.py --verbose
+
+Read the records back with:
+    python3 scripts/lib/ds01_metrics_store.py dump YYYY-MM-DD [--kind gpu]
+"""
+
+import argparse
+import json
+import os
+import pwd
+import re
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROC_ROOT = Path("/proc")
+CGROUP_FS = Path("/sys/fs/cgroup")
+SYS_BLOCK = Path("/sys/block")
+STATE_FILE = Path("/var/lib/ds01/metrics/collector-state.json")
+OOM_STATE_FILE = Path("/var/lib/ds01/resource-stats/oom-counts.json")
+DOCKER_BIN = "docker"
+
+HOST_INTERVAL = 300  # Seconds between host passes (GPU/CPU/memory/disk/containers)
+INTERVAL_SLACK = 30  # Cron jitter tolerated when deciding a host pass is due
+TOP_N = 10  # Processes kept per ranking (CPU, memory)
+MIN_USER_UID = 1000  # Per-user aggregates skip system accounts
+COMMAND_MAX = 100  # Characters of command line kept
+COMMAND_TIMEOUT = 30
+
+HOST_GROUPS = ("gpu", "cpu", "memory", "disk", "containers")
+ALL_GROUPS = (*HOST_GROUPS, "slices")
+
+sys.path.insert(0, str(SCRIPT_DIR.parent / "lib"))
+from ds01_metrics_store import MetricsWriter, compress_old  # noqa: E402
+
+# Event logging in-process (never breaks collection if the library is missing)
+try:
+    from ds01_events import log_event as _log_event
+except ImportError:
+
+    def _log_event(*args, **kwargs) -> bool:
+        return False
+
+
+# Usage accounting ledger (optional, like event logging)
+try:
+    from ds01_accounting import tick as _account_tick
+except ImportError:
+
+    def _account_tick(*args, **kwargs) -> int:
+        return 0
+
+
+_CONTAINER_CGROUP_RE = re.compile(r"(?:docker-|/docker/)([0-9a-f]{64})(?:\.scope)?")
+_CONTAINER_ID_RE = re.compile(r"[0-9a-f]{64}")
+_SLICE_RE = re.compile(r"^ds01-([^-]+)-(.+)\.slice$")
+
+VERBOSE = False
+
+
+def log_verbose(message: str) -> None:
+    if VERBOSE:
+        print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+
+
+def _read(path: Path) -> str | None:
+    try:
+        return path.read_text()
+    except OSError:
+        return None
+
+
+def _read_int(path: Path) -> int | None:
+    """Integer cgroup value; 'max' and unreadable files are None."""
+    text = _read(path)
+    try:
+        return int(text) if text is not None else None
+    except ValueError:
+        return None
+
+
+def _run(cmd: list[str]) -> str | None:
+    try:
+        result = subprocess.run(
+            cmd, capture_output=True, text=True, timeout=COMMAND_TIMEOUT, check=True
+        )
+    except (OSError, subprocess.SubprocessError) as e:
+        log_verbose(f"{cmd[0]} failed: {e}")
+        return None
+    return result.stdout
+
+
+class UserNames:
+    """uid -> username, one passwd lookup per uid per run."""
+
+    def __init__(self):
+        self._names: dict[int, str] = {}
+
+    def __call__(self, uid: int) -> str:
+        if uid not in self._names:
+            try:
+                self._names[uid] = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                self._names[uid] = str(uid)
+        return self._names[uid]
+
+
+# ============================================================================
+# Processes (/proc)
+# ============================================================================
+
+
+class Proc(NamedTuple):
+    pid: int
+    uid: int
+    comm: str
+    cpu_pct: float  # Lifetime average, as ps %cpu
+    rss: int
+
+
+def scan_processes(proc_root: Path | None = None) -> list[Proc]:
+    """One pass over /proc/<pid>/stat."""
+    proc_root = proc_root or PROC_ROOT
+    hz = os.sysconf("SC_CLK_TCK")
+    page = os.sysconf("SC_PAGE_SIZE")
+    try:
+        uptime = float((proc_root / "uptime").read_text().split()[0])
+    except (OSError, ValueError, IndexError):
+        uptime = 0.0
+    procs = []
+    for entry in os.scandir(proc_root):
+        if not entry.name.isdigit():
+            continue
+        try:
+            uid = entry.stat().st_uid
+            with open(f"{entry.path}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue  # Exited during the scan
+        # comm may contain spaces and parentheses; fields resume after the last ')'
+        comm = stat[stat.find("(") + 1 : stat.rfind(")")]
+        fields = stat[stat.rfind(")") + 2 :].split()
+        try:
+            cpu_ticks = int(fields[11]) + int(fields[12])
+            elapsed = uptime - int(fields[19]) / hz
+            rss = int(fields[21]) * page
+        except (IndexError, ValueError):
+            continue
+        cpu_pct = 100.0 * cpu_ticks / hz / elapsed if elapsed > 0 else 0.0
+        procs.append(Proc(int(entry.name), uid, comm, round(cpu_pct, 2), rss))
+    return procs
+
+
+def read_cmdline(pid: int, proc_root: Path | None = None) -> str | None:
+    try:
+        raw = ((proc_root or PROC_ROOT) / str(pid) / "cmdline").read_bytes()
+    except OSError:
+        return None
+    return raw.replace(b"\0", b" ").decode("utf-8", "replace").strip()[:COMMAND_MAX] or None
+
+
+def container_of(pid: int, proc_root: Path | None = None) -> str | None:
+    """Short ID of the Docker container a process runs in, from its cgroup."""
+    text = _read((proc_root or PROC_ROOT) / str(pid) / "cgroup") or ""
+    match = _CONTAINER_CGROUP_RE.search(text)
+    return match.group(1)[:12] if match else None
+
+
+def collect_users(procs: list[Proc], names: UserNames) -> list[tuple[str, dict]]:
+    totals: dict[str, list] = {}
+    for p in procs:
+        if p.uid < MIN_USER_UID:
+            continue
+        total = totals.setdefault(names(p.uid), [0.0, 0, 0])
+        total[0] += p.cpu_pct
+        total[1] += p.rss
+        total[2] += 1
+    return [
+        ("user", {"user": user, "cpu_pct": round(cpu, 2), "rss": rss, "procs": n})
+        for user, (cpu, rss, n) in sorted(totals.items())
+    ]
+
+
+def collect_top(procs: list[Proc], names: UserNames) -> list[tuple[str, dict]]:
+    records = []
+    for rank_by, key in (("cpu", lambda p: p.cpu_pct), ("mem", lambda p: p.rss)):
+        for p in sorted(procs, key=key, reverse=True)[:TOP_N]:
+            data = {
+                "rank_by": rank_by,
+                "pid": p.pid,
+                "user": names(p.uid),
+                "cpu_pct": p.cpu_pct,
+                "rss": p.rss,
+                "command": read_cmdline(p.pid) or p.comm,
+            }
+            records.append(("process", data))
+    return records
+
+
+# ============================================================================
+# GPU (nvidia-smi)
+# ============================================================================
+
+
+def _num(value: str) -> float | None:
+    try:
+        return float(value)
+    except ValueError:
+        return None  # "[N/A]", "[Not Supported]"
+
+
+def collect_gpu(procs: list[Proc], names: UserNames) -> list[tuple[str, dict]]:
+    devices = _run(
+        [
+            "nvidia-smi",
+            "--query-gpu=index,uuid,name,utilization.gpu,memory.used,memory.total,"
+            "temperature.gpu,power.draw,power.limit",
+            "--format=csv,noheader,nounits",
+        ]
+    )
+    if devices is None:
+        return []
+    records = []
+    for line in devices.splitlines():
+        cols = [c.strip() for c in line.split(",")]
+        if len(cols) < 9:
+            continue
+        mem_used, mem_total = _num(cols[4]), _num(cols[5])
+        records.append(
+            (
+                "gpu",
+                {
+                    "index": cols[0],
+                    "uuid": cols[1],
+                    "name": cols[2],
+                    "util": _num(cols[3]),
+                    "mem_used": None if mem_used is None else int(mem_used * 1024**2),
+                    "mem_total": None if mem_total is None else int(mem_total * 1024**2),
+                    "temp": _num(cols[6]),
+                    "power_draw": _num(cols[7]),
+                    "power_limit": _num(cols[8]),
+                },
+            )
+        )
+
+    apps = _run(
+        [
+            "nvidia-smi",
+            "--query-compute-apps=pid,gpu_uuid,used_memory,process_name",
+            "--format=csv,noheader,nounits",
+        ]
+    )
+    by_pid = {p.pid: p for p in procs}
+    for line in (apps or "").splitlines():
+        cols = [c.strip() for c in line.split(",", 3)]
+        if len(cols) < 4 or not cols[0].isdigit():
+            continue
+        pid = int(cols[0])
+        proc = by_pid.get(pid)
+        if proc is None:
+            continue  # Exited, or not visible from this namespace
+        mem = _num(cols[2])
+        records.append(
+            (
+                "gpu_process",
+                {
+                    "pid": pid,
+                    "user": names(proc.uid),
+                    "gpu_uuid": cols[1],
+                    "mem_used": None if mem is None else int(mem * 1024**2),
+                    "process": cols[3],
+                    "command": read_cmdline(pid),
+                    "container": container_of(pid),
+                },
+            )
+        )
+    return records
+
+
+# ============================================================================
+# CPU, memory, disks, network (/proc)
+# ============================================================================
+
+
+def read_cpu_times(proc_root: Path | None = None) -> dict[str, list[int]]:
+    times = {}
+    for line in (_read((proc_root or PROC_ROOT) / "stat") or "").splitlines():
+        if line.startswith("cpu"):
+            name, *values = line.split()
+            times[name] = [int(v) for v in values]
+    return times
+
+
+def _cpu_util(now: list[int], before: list[int] | None) -> float | None:
+    """Busy percent between two /proc/stat rows (idle = idle + iowait)."""
+    if before is None or len(before) != len(now):
+        before = [0] * len(now)  # First pass: average since boot
+    delta = [a - b for a, b in zip(now, before)]
+    total = sum(delta[:8])  # Guest time is already included in user/nice
+    if total <= 0:
+        return None
+    return round(100.0 * (total - delta[3] - delta[4]) / total, 2)
+
+
+def collect_cpu(state: dict, proc_root: Path | None = None) -> list[tuple[str, dict]]:
+    proc_root = proc_root or PROC_ROOT
+    times = read_cpu_times(proc_root)
+    previous = state.get("cpu", {})
+    state["cpu"] = times
+    if "cpu" not in times:
+        return []
+    try:
+        load = [float(v) for v in (proc_root / "loadavg").read_text().split()[:3]]
+    except (OSError, ValueError):
+        load = [None, None, None]
+    cores = sorted((int(name[3:]), name) for name in times if name != "cpu")
+    records = [
+        (
+            "cpu",
+            {
+                "util": _cpu_util(times["cpu"], previous.get("cpu")),
+                "load1": load[0],
+                "load5": load[1],
+                "load15": load[2],
+                "cores": len(cores),
+            },
+        )
+    ]
+    for core, name in cores:
+        util = _cpu_util(times[name], previous.get(name))
+        records.append(("cpu_core", {"core": core, "util": util}))
+    return records
+
+
+def collect_memory(proc_root: Path | None = None) -> list[tuple[str, dict]]:
+    info = {}
+    for line in (_read((proc_root or PROC_ROOT) / "meminfo") or "").splitlines():
+        name, _, rest = line.partition(":")
+        fields = rest.split()
+        if fields and fields[0].isdigit():
+            info[name] = int(fields[0]) * 1024
+    if "MemTotal" not in info:
+        return []
+    total, free = info["MemTotal"], info.get("MemFree", 0)
+    buff_cache = info.get("Buffers", 0) + info.get("Cached", 0) + info.get("SReclaimable", 0)
+    swap_total = info.get("SwapTotal", 0)
+    return [
+        (
+            "memory",
+            {
+                "total": total,
+                "used": max(total - free - buff_cache, 0),
+                "free": free,
+                "buff_cache": buff_cache,
+                "available": info.get("MemAvailable"),
+                "swap_total": swap_total,
+                "swap_used": swap_total - info.get("SwapFree", 0),
+            },
+        )
+    ]
+
+
+def collect_disks(proc_root: Path | None = None) -> list[tuple[str, dict]]:
+    proc_root = proc_root or PROC_ROOT
+    records = []
+    seen = set()
+    for line in (_read(proc_root / "mounts") or "").splitlines():
+        fields = line.split()
+        if len(fields) < 2 or not fields[0].startswith("/dev/") or fields[0] in seen:
+            continue
+        device, mount = fields[0], fields[1].replace("\\040", " ")
+        try:
+            st = os.statvfs(mount)
+        except OSError:
+            continue
+        seen.add(device)
+        size, avail = st.f_blocks * st.f_frsize, st.f_bavail * st.f_frsize
+        records.append(
+            (
+                "disk",
+                {
+                    "mount": mount,
+                    "device": device,
+                    "size": size,
+                    "used": size - st.f_bfree * st.f_frsize,
+                    "avail": avail,
+                    "inodes": st.f_files,
+                    "inodes_used": st.f_files - st.f_ffree,
+                },
+            )
+        )
+
+    # Cumulative counters for whole block devices; reports take deltas
+    for line in (_read(proc_root / "diskstats") or "").splitlines():
+        fields = line.split()
+        if len(fields) < 13 or not (SYS_BLOCK / fields[2]).exists():
+            continue
+        if fields[2].startswith(("loop", "ram")):
+            continue
+        records.append(
+            (
+                "disk_io",
+                {
+                    "device": fields[2],
+                    "reads": int(fields[3]),
+                    "writes": int(fields[7]),
+                    "read_bytes": int(fields[5]) * 512,
+                    "write_bytes": int(fields[9]) * 512,
+                    "io_ms": int(fields[12]),
+                },
+            )
+        )
+
+    for line in (_read(proc_root / "net" / "dev") or "").splitlines()[2:]:
+        iface, _, counters = line.partition(":")
+        fields = counters.split()
+        if len(fields) >= 9:
+            records.append(
+                (
+                    "net",
+                    {
+                        "iface": iface.strip(),
+                        "rx_bytes": int(fields[0]),
+                        "tx_bytes": int(fields[8]),
+                    },
+                )
+            )
+    return records
+
+
+# ============================================================================
+# Containers (one docker ps + cgroup files)
+# ============================================================================
+
+
+def find_container_cgroups(cgroup_fs: Path | None = None, max_depth: int = 4) -> dict[str, Path]:
+    """Full container ID -> cgroup v2 directory (systemd or cgroupfs driver)."""
+    cgroup_fs = cgroup_fs or CGROUP_FS
+    found: dict[str, Path] = {}
+
+    def walk(path: Path, depth: int) -> None:
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            name = entry.name
+            if name.startswith("docker-") and name.endswith(".scope"):
+                name = name[len("docker-") : -len(".scope")]
+            if _CONTAINER_ID_RE.fullmatch(name):
+                found[name] = Path(entry.path)
+            elif depth < max_depth and name.endswith(".slice"):
+                walk(Path(entry.path), depth + 1)
+
+    for top in ("ds01.slice", "system.slice", "docker"):  # docker/: cgroupfs driver
+        walk(cgroup_fs / top, 1)
+    return found
+
+
+def _cgroup_usage(path: Path) -> tuple[int | None, int | None, int | None, int | None]:
+    """(cpu usage_usec, memory.current, pids.current, (read, write) bytes) of one cgroup."""
+    usage = None
+    for line in (_read(path / "cpu.stat") or "").splitlines():
+        if line.startswith("usage_usec "):
+            usage = int(line.split()[1])
+    io_read = io_write = None
+    for line in (_read(path / "io.stat") or "").splitlines():
+        for pair in line.split()[1:]:
+            key, _, value = pair.partition("=")
+            if key == "rbytes":
+                io_read = (io_read or 0) + int(value)
+            elif key == "wbytes":
+                io_write = (io_write or 0) + int(value)
+    return (
+        usage,
+        _read_int(path / "memory.current"),
+        _read_int(path / "pids.current"),
+        (io_read, io_write),
+    )
+
+
+def collect_containers(state: dict, now: float, names: UserNames) -> list[tuple[str, dict]]:
+    listing = _run(
+        [
+            DOCKER_BIN,
+            "ps",
+            "-a",
+            "--no-trunc",
+            "--format",
+            '{{.ID}}\t{{.Names}}\t{{.Image}}\t{{.State}}\t{{.CreatedAt}}\t{{.Label "ds01.user"}}',
+        ]
+    )
+    if listing is None:
+        return []
+    cgroups = find_container_cgroups()
+    previous = state.get("containers", {})
+    current: dict[str, list] = {}
+    records = []
+    for line in listing.splitlines():
+        cols = line.split("\t")
+        if len(cols) < 6:
+            continue
+        cid, name, image, status, created, user = cols[:6]
+        if not user and "._." in name:
+            uid = name.rsplit("._.", 1)[1]
+            user = names(int(uid)) if uid.isdigit() else None
+        data = {
+            "id": cid[:12],
+            "name": name,
+            "image": image,
+            "state": status,
+            "user": user or None,
+            "created": created,
+        }
+        path = cgroups.get(cid)
+        if path is not None:
+            usage, data["mem_used"], data["pids"], (data["io_read"], data["io_write"]) = (
+                _cgroup_usage(path)
+            )
+            if usage is not None:
+                current[cid] = [usage, now]
+                before = previous.get(cid)
+                if before and now > before[1] and usage >= before[0]:
+                    # 100% = one core, as docker stats reports it
+                    data["cpu_pct"] = round((usage - before[0]) / 1e4 / (now - before[1]), 2)
+        records.append(("container", data))
+    state["containers"] = current
+    return records
+
+
+def account_usage(records: list[tuple[str, dict]], now: float) -> int:
+    """Integrate open ledger intervals up to now with this pass's GPU power draw."""
+    power = {}
+    for kind, data in records:
+        if kind == "gpu" and data["power_draw"] is not None:
+            power[data["index"]] = power[data["uuid"]] = data["power_draw"]
+    return _account_tick(now, cgroups=find_container_cgroups(), power=power)
+
+
+# ============================================================================
+# User slices (cgroup memory/pids/PSI/OOM)
+# ============================================================================
+
+
+def detect_cgroup_root(cgroup_fs: Path | None = None) -> tuple[Path | None, str]:
+    """ds01.slice directory and cgroup version (pure v2, v1 hybrid, v1 memory)."""
+    cgroup_fs = cgroup_fs or CGROUP_FS
+    if (cgroup_fs / "ds01.slice").is_dir() and (cgroup_fs / "cgroup.controllers").is_file():
+        return cgroup_fs / "ds01.slice", "v2"
+    if (cgroup_fs / "unified" / "ds01.slice").is_dir():
+        return cgroup_fs / "unified" / "ds01.slice", "v2"
+    if (cgroup_fs / "memory" / "ds01.slice").is_dir():
+        return cgroup_fs / "memory" / "ds01.slice", "v1"
+    return None, "v2"
+
+
+def _psi_avg10(text: str | None) -> dict[str, float]:
+    values = {}
+    for line in (text or "").splitlines():
+        kind, *pairs = line.split()
+        for pair in pairs:
+            if pair.startswith("avg10="):
+                values[kind] = float(pair[6:])
+    return values
+
+
+def _flat_keyed(text: str | None) -> dict[str, int]:
+    values = {}
+    for line in (text or "").splitlines():
+        parts = line.split()
+        if len(parts) == 2 and parts[1].isdigit():
+            values[parts[0]] = int(parts[1])
+    return values
+
+
+def collect_slices(cgroup_fs: Path | None = None) -> list[tuple[str, dict]]:
+    cgroup_fs = cgroup_fs or CGROUP_FS
+    root, version = detect_cgroup_root(cgroup_fs)
+    if root is None:
+        log_verbose("Cgroup root not found, no slices to collect")
+        return []
+    records = []
+    for group_dir in sorted(root.glob("ds01-*.slice")):
+        if not group_dir.is_dir() or group_dir.name.count("-") > 1:
+            continue
+        for slice_dir in sorted(group_dir.glob("ds01-*-*.slice")):
+            match = _SLICE_RE.match(slice_dir.name)
+            if not match or not slice_dir.is_dir():
+                continue
+            group, user = match.groups()
+            rel = slice_dir.relative_to(root)
+            if version == "v1":
+                mem_current = _read_int(slice_dir / "memory.usage_in_bytes")
+                mem_max = _read_int(slice_dir / "memory.limit_in_bytes")
+                pids_dir = cgroup_fs / "pids" / "ds01.slice" / rel
+                psi_dir = cgroup_fs / "unified" / "ds01.slice" / rel
+            else:
+                mem_current = _read_int(slice_dir / "memory.current")
+                mem_max = _read_int(slice_dir / "memory.max")
+                pids_dir = psi_dir = slice_dir
+            psi_mem = _psi_avg10(_read(psi_dir / "memory.pressure"))
+            psi_cpu = _psi_avg10(_read(psi_dir / "cpu.pressure"))
+            events = _flat_keyed(_read(slice_dir / "memory.events"))
+            records.append(
+                (
+                    "slice",
+                    {
+                        "user": user,
+                        "group": group,
+                        "mem_current": mem_current,
+                        "mem_max": mem_max,
+                        "pids_current": _read_int(pids_dir / "pids.current"),
+                        "pids_max": _read_int(pids_dir / "pids.max"),
+                        "psi_mem_some": psi_mem.get("some"),
+                        "psi_mem_full": psi_mem.get("full"),
+                        "psi_cpu_some": psi_cpu.get("some"),
+                        "psi_cpu_full": psi_cpu.get("full"),
+                        "oom": events.get("oom", 0),
+                        "oom_kill": events.get("oom_kill", 0),
+                    },
+                )
+            )
+            log_verbose(f"  {slice_dir.name}: memory {mem_current}/{mem_max}")
+    return records
+
+
+def check_oom_kills(slices: list[tuple[str, dict]], state_file: Path | None = None) -> int:
+    """Log resource.oom_kill for slices whose oom_kill counter rose. Returns events logged."""
+    state_file = state_file or OOM_STATE_FILE
+    try:
+        counts = json.loads(state_file.read_text())
+    except (OSError, ValueError):
+        counts = {}
+    logged = 0
+    for _, data in slices:
+        user, current = data["user"], data["oom_kill"]
+        previous = counts.get(user, 0)
+        if current > previous:
+            log_verbose(f"OOM kill detected for user {user} (count: {previous} -> {current})")
+            _log_event(
+                "resource.oom_kill",
+                user=user,
+                source="collect-resource-stats",
+                group=data["group"],
+                oom_count=current - previous,
+                total_oom_kills=current,
+            )
+            counts[user] = current
+            logged += 1
+    if logged:
+        _write_json(state_file, counts)
+    return logged
+
+
+# ============================================================================
+# Pass
+# ============================================================================
+
+
+def _write_json(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, indent=2))
+    tmp.chmod(0o644)
+    os.replace(tmp, path)
+
+
+def load_state(state_file: Path | None = None) -> dict:
+    try:
+        state = json.loads((state_file or STATE_FILE).read_text())
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def due_groups(state: dict, now: float) -> tuple[str, ...]:
+    """Slices every run; host groups once HOST_INTERVAL has passed."""
+    if now - state.get("host_ts", 0) >= HOST_INTERVAL - INTERVAL_SLACK:
+        return ALL_GROUPS
+    return ("slices",)
+
+
+def collect(groups: tuple[str, ...], state: dict, now: float) -> list[tuple[str, dict]]:
+    """Sample the requested groups, sharing one /proc scan between them."""
+    names = UserNames()
+    procs = scan_processes() if {"gpu", "cpu", "memory"} & set(groups) else []
+    records: list[tuple[str, dict]] = []
+    if "gpu" in groups:
+        records += collect_gpu(procs, names)
+    if "cpu" in groups:
+        records += collect_cpu(state)
+        records += collect_users(procs, names)
+    if "memory" in groups:
+        records += collect_memory()
+    if "cpu" in groups or "memory" in groups:
+        records += collect_top(procs, names)
+    if "disk" in groups:
+        records += collect_disks()
+    if "containers" in groups:
+        records += collect_containers(state, now, names)
+    if "slices" in groups:
+        slices = collect_slices()
+        check_oom_kills(slices)
+        records += slices
+    if set(HOST_GROUPS) <= set(groups):
+        account_usage(records, now)
+        state["host_ts"] = now
+    return records
+
+
+def run(
+    groups: tuple[str, ...] | None = None,
+    now: float | None = None,
+    writer: MetricsWriter | None = None,
+    state_file: Path | None = None,
+) -> int:
+    """One collection pass. Returns the number of records written."""
+    now = time.time() if now is None else now
+    state_file = state_file or STATE_FILE
+    state = load_state(state_file)
+    groups = groups or due_groups(state, now)
+    log_verbose(f"Collecting: {', '.join(groups)}")
+
+    started = time.monotonic()
+    records = collect(groups, state, now)
+    duration_ms = round((time.monotonic() - started) * 1000, 1)
+    records.append(("sample", {"groups": ",".join(groups), "duration_ms": duration_ms}))
+
+    writer = writer or MetricsWriter()
+    writer.append(records, ts=now)
+    _write_json(state_file, state)
+    if "disk" in groups:
+        compress_old(writer.metrics_dir, now)
+    log_verbose(f"Wrote {len(records)} records in {duration_ms} ms")
+    return len(records)
+
+
+def main() -> int:
+    global VERBOSE
+
+    parser = argparse.ArgumentParser(description="Collect DS01 host and user-slice metrics")
+    parser.add_argument("--all", action="store_true", help="Sample every group now")
+    parser.add_argument("--only", help=f"Comma-separated groups: {','.join(ALL_GROUPS)}")
+    parser.add_argument("--verbose", "-v", action="store_true")
+    args = parser.parse_args()
+    VERBOSE = args.verbose
+
+    groups = None
+    if args.all:
+        groups = ALL_GROUPS
+    elif args.only:
+        groups = tuple(g.strip() for g in args.only.split(",") if g.strip())
+        unknown = set(groups) - set(ALL_GROUPS)
+        if unknown:
+            parser.error(f"unknown group(s): {', '.join(sorted(unknown))}")
+
+    try:
+        run(groups)
+    except OSError as e:
+        print(f"collect-metrics: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -28,6 +28,9 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+import ds01_trace  # noqa: E402,F401  (opt-in DS01_TRACE=1 tracing)
+
 # Configuration
 MIN_UID = 1000  # Minimum UID to consider (skip system users)
 MIN_RUNTIME_SECONDS = 60  # Minimum runtime to report
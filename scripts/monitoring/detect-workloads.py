@@ -12,10 +12,15 @@ Core functionality:
 - Transient filtering: GPU processes must persist for 2 scans before events emitted
 
 Design:
-- Runs as oneshot script (invoked by systemd timer every 30s)
-- Near-real-time inventory (max 30s lag from polling interval)
+- Runs as oneshot script (invoked by systemd timer every 10s)
+- Near-real-time inventory (max 10s lag from polling interval)
 - System GPU processes excluded from user-facing inventory
 - Safe import fallback for event logging (scanner must work even if logging fails)
+- Delta-only: one container list call per tick; each entry is hashed into a
+  compact digest (workload-inventory.digest.json). Only containers whose
+  digest changed are inspected, and the inventory is rewritten (and events
+  emitted) only when the digest changed or the file is older than
+  INVENTORY_MAX_AGE
 
 Usage:
     python3 detect-workloads.py              # Full scan, save inventory, emit events
@@ -25,11 +30,14 @@ Usage:
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
+import pwd
 import subprocess
 import sys
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
@@ -48,12 +56,40 @@ except ImportError:
         return False
 
 
+# Cached uid -> username (snapshot + negative caching; SSSD misses are network round trips)
+try:
+    from ds01_identity import uid_to_name
+except ImportError:
+
+    def uid_to_name(uid) -> str | None:
+        try:
+            return pwd.getpwuid(int(uid)).pw_name
+        except (KeyError, ValueError):
+            return None
+
+
+# Opt-in tracing (DS01_TRACE=1); Docker SDK calls bypass subprocess, so they get spans
+try:
+    from ds01_trace import install as trace_install
+    from ds01_trace import span as trace_span
+except ImportError:
+    from contextlib import nullcontext
+
+    def trace_install(*args, **kwargs) -> bool:
+        return False
+
+    def trace_span(*args, **kwargs):
+        return nullcontext()
+
+
 # Lazy import docker (only when needed)
 docker = None
 
 
 # Constants
 INVENTORY_FILE = Path("/var/lib/ds01/workload-inventory.json")
+DIGEST_FILE = INVENTORY_FILE.with_name("workload-inventory.digest.json")
+INVENTORY_MAX_AGE = 300  # Rewrite unchanged inventory this often (refreshes last_scan)
 SYSTEM_GPU_PROCESSES = {
     "nvidia-persistenced",
     "nv-hostengine",
@@ -63,7 +99,7 @@ SYSTEM_GPU_PROCESSES = {
     "Xorg",
     "X",
 }
-SCAN_TIMEOUT = 25  # Must be shorter than 30s timer interval
+SCAN_TIMEOUT = 8  # Must be shorter than 10s timer interval
 
 # Logging setup
 logger = logging.getLogger(__name__)
@@ -119,14 +155,12 @@ def has_gpu_access(container) -> bool:
     - HostConfig.Devices with nvidia paths
 
     Args:
-        container: Docker container object
+        container: Docker container object (built from inspect data)
 
     Returns:
         True if container has GPU access
     """
     try:
-        # Reload to get full HostConfig
-        container.reload()
         host_config = container.attrs.get("HostConfig", {})
 
         # Check 1: nvidia runtime
@@ -204,16 +238,7 @@ def get_container_user(container) -> str:
                     for line in status_file.read_text().splitlines():
                         if line.startswith("Uid:"):
                             uid = line.split()[1]  # Real UID is first field
-                            # Resolve UID to username
-                            result = subprocess.run(
-                                ["getent", "passwd", uid],
-                                capture_output=True,
-                                text=True,
-                                timeout=1,
-                            )
-                            if result.returncode == 0:
-                                username = result.stdout.split(":")[0]
-                                return username
+                            return uid_to_name(uid) or "unknown"
         except Exception as e:
             logger.debug(f"Could not get process owner for {container.name}: {e}")
 
@@ -230,7 +255,7 @@ def get_container_gpu_devices(container) -> list[str]:
     2. DeviceRequests device IDs
 
     Args:
-        container: Docker container object
+        container: Docker container object (built from inspect data)
 
     Returns:
         List of GPU device strings, empty if no GPU
@@ -243,7 +268,6 @@ def get_container_gpu_devices(container) -> list[str]:
 
     # Check DeviceRequests
     try:
-        container.reload()
         host_config = container.attrs.get("HostConfig", {})
         device_requests = host_config.get("DeviceRequests", [])
         for request in device_requests:
@@ -256,7 +280,93 @@ def get_container_gpu_devices(container) -> list[str]:
     return []
 
 
-def scan_containers(client) -> dict[str, dict[str, Any]]:
+def container_digest(summary: dict[str, Any]) -> str:
+    """
+    Hash the container-list fields every inventory field is derived from.
+
+    HostConfig (GPU access, device requests) cannot change after creation,
+    so name, state, labels and image identify when an entry must be rebuilt.
+
+    Args:
+        summary: Entry from the container list endpoint (GET /containers/json)
+
+    Returns:
+        Short hex digest
+    """
+    return _digest(
+        summary.get("Names"), summary.get("State"), summary.get("Labels"), summary.get("ImageID")
+    )
+
+
+def process_digest(process: dict[str, Any]) -> str:
+    """Hash the identifying fields of a host GPU process (not its memory use)."""
+    return _digest(
+        process.get("pid"), process.get("user"), process.get("cmdline"), process.get("gpu_uuid")
+    )
+
+
+def _digest(*fields: Any) -> str:
+    encoded = json.dumps(fields, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+def resolve_image_name(client, image_id: str, image_tags: dict[str, str]) -> str:
+    """
+    Map an image ID to its first tag, via a persisted ID -> tag cache.
+
+    A miss refreshes the whole cache with a single image list call instead
+    of one image lookup per container.
+
+    Args:
+        client: Docker client
+        image_id: Full image ID (sha256:...)
+        image_tags: Cache, updated in place
+
+    Returns:
+        Image tag, or short image ID if untagged
+    """
+    if image_id not in image_tags:
+        try:
+            for image in client.api.images(all=True):
+                tags = [t for t in image.get("RepoTags") or [] if t != "<none>:<none>"]
+                image_tags[image["Id"]] = tags[0] if tags else image["Id"][:12]
+        except Exception as e:
+            logger.debug(f"Could not list images: {e}")
+    return image_tags.get(image_id, image_id[:12] if image_id else "unknown")
+
+
+def build_container_entry(client, summary: dict[str, Any], image_tags: dict[str, str]) -> dict:
+    """
+    Build one inventory entry from a single inspect call.
+
+    Args:
+        client: Docker client
+        summary: Entry from the container list endpoint
+        image_tags: Image ID -> tag cache
+
+    Returns:
+        Inventory entry
+    """
+    container = client.containers.prepare_model(client.api.inspect_container(summary["Id"]))
+    container_id = container.id[:12]
+    return {
+        "id": container_id,
+        "name": container.name,
+        "origin": classify_container(container),
+        "user": get_container_user(container),
+        "has_gpu": has_gpu_access(container),
+        "gpu_devices": get_container_gpu_devices(container),
+        "status": container.status,
+        "image": resolve_image_name(client, summary.get("ImageID", ""), image_tags),
+    }
+
+
+def scan_containers(
+    client,
+    summaries: list[dict[str, Any]] | None = None,
+    reuse: dict[str, dict[str, Any]] | None = None,
+    image_tags: dict[str, str] | None = None,
+) -> dict[str, dict[str, Any]]:
     """
     Scan all containers and build inventory.
 
@@ -272,39 +382,34 @@ def scan_containers(client) -> dict[str, dict[str, Any]]:
 
     Args:
         client: Docker client
+        summaries: Container list result, if already fetched
+        reuse: Entries known to be current (unchanged digest), kept as is
+        image_tags: Image ID -> tag cache, updated in place
 
     Returns:
         Dict of container entries keyed by container ID
     """
+    reuse = reuse or {}
+    image_tags = {} if image_tags is None else image_tags
     try:
-        containers = client.containers.list(all=True)
+        if summaries is None:
+            summaries = client.api.containers(all=True)
         inventory = {}
+        inspected = 0
 
-        for container in containers:
-            container_id = container.id[:12]
-
-            # Get image name
-            image_name = "unknown"
+        for summary in summaries:
+            container_id = summary["Id"][:12]
+            if container_id in reuse:
+                inventory[container_id] = reuse[container_id]
+                continue
             try:
-                if container.image.tags:
-                    image_name = container.image.tags[0]
-                else:
-                    image_name = container.image.id[:12]
-            except Exception:
-                pass
-
-            inventory[container_id] = {
-                "id": container_id,
-                "name": container.name,
-                "origin": classify_container(container),
-                "user": get_container_user(container),
-                "has_gpu": has_gpu_access(container),
-                "gpu_devices": get_container_gpu_devices(container),
-                "status": container.status,
-                "image": image_name,
-            }
+                inventory[container_id] = build_container_entry(client, summary, image_tags)
+                inspected += 1
+            except Exception as e:
+                # Removed between list and inspect
+                logger.debug(f"Could not inspect {container_id}: {e}")
 
-        logger.info(f"Scanned {len(inventory)} containers")
+        logger.info(f"Scanned {len(inventory)} containers ({inspected} inspected)")
         return inventory
 
     except Exception as e:
@@ -340,7 +445,7 @@ def get_process_user(pid: int) -> str:
     """
     Get username of process owner.
 
-    Reads /proc/{pid}/status for UID, then resolves via getent.
+    Reads /proc/{pid}/status for UID, then resolves it in-process (NSS).
 
     Args:
         pid: Process ID
@@ -356,18 +461,7 @@ def get_process_user(pid: int) -> str:
         for line in status_file.read_text().splitlines():
             if line.startswith("Uid:"):
                 uid = line.split()[1]  # Real UID
-
-                # Resolve UID to username
-                result = subprocess.run(
-                    ["getent", "passwd", uid],
-                    capture_output=True,
-                    text=True,
-                    timeout=1,
-                )
-
-                if result.returncode == 0:
-                    username = result.stdout.split(":")[0]
-                    return username
+                return uid_to_name(uid) or "unknown"
 
         return "unknown"
 
@@ -520,6 +614,15 @@ def load_inventory() -> dict[str, Any]:
     }
 
 
+def _write_json_atomic(path: Path, data: dict[str, Any], indent: int | None = None) -> None:
+    """Write JSON via a temporary file and rename, so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.parent / f"{path.name}.tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(data, f, indent=indent)
+    os.rename(tmp_file, path)
+
+
 def save_inventory(inventory: dict[str, Any]) -> None:
     """
     Save inventory to disk atomically.
@@ -530,20 +633,90 @@ def save_inventory(inventory: dict[str, Any]) -> None:
         inventory: Inventory dict to save
     """
     try:
-        # Ensure parent directory exists
-        INVENTORY_FILE.parent.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(INVENTORY_FILE, inventory, indent=2)
+        logger.debug(f"Saved inventory to {INVENTORY_FILE}")
+    except OSError as e:
+        logger.warning(f"Failed to save inventory: {e}")
 
-        # Write to temporary file
-        tmp_file = INVENTORY_FILE.parent / f"{INVENTORY_FILE.name}.tmp"
-        with open(tmp_file, "w") as f:
-            json.dump(inventory, f, indent=2)
 
-        # Atomic rename
-        os.rename(tmp_file, INVENTORY_FILE)
-        logger.debug(f"Saved inventory to {INVENTORY_FILE}")
+def empty_digest() -> dict[str, Any]:
+    return {"containers": {}, "host_processes": {}, "_pending_processes": {}, "images": {}}
+
+
+def load_digest() -> dict[str, Any]:
+    """
+    Load the digest of the last saved inventory.
+
+    Same layout as the inventory, with a short hash in place of each entry,
+    plus the persisted image ID -> tag cache. Returns an empty digest (forcing
+    a full rebuild) if it is missing, unreadable, or the inventory is gone.
+
+    Returns:
+        Digest dict
+    """
+    try:
+        if INVENTORY_FILE.exists():
+            digest = json.loads(DIGEST_FILE.read_text())
+            return {**empty_digest(), **digest}
+    except FileNotFoundError:
+        pass
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"Ignoring unreadable digest: {e}")
+    return empty_digest()
 
+
+def save_digest(digest: dict[str, Any]) -> None:
+    """Save the digest atomically (written after the inventory it describes)."""
+    try:
+        _write_json_atomic(DIGEST_FILE, digest)
     except OSError as e:
-        logger.warning(f"Failed to save inventory: {e}")
+        logger.warning(f"Failed to save digest: {e}")
+
+
+def build_digest(
+    summaries: list[dict[str, Any]],
+    scanned_processes: dict[str, dict[str, Any]],
+    previous: dict[str, Any],
+) -> dict[str, Any]:
+    """
+    Hash the current scan, applying the transient filter to host processes.
+
+    Args:
+        summaries: Container list result
+        scanned_processes: All host GPU processes seen this scan
+        previous: Digest of the last saved inventory
+
+    Returns:
+        New digest (its image cache is the previous one, shared)
+    """
+    confirmed = apply_transient_filter(previous, scanned_processes)
+    known = (
+        previous.get("host_processes", {}).keys() | previous.get("_pending_processes", {}).keys()
+    )
+    return {
+        "containers": {s["Id"][:12]: container_digest(s) for s in summaries},
+        "host_processes": {pid: process_digest(p) for pid, p in confirmed.items()},
+        "_pending_processes": {
+            pid: process_digest(p) for pid, p in scanned_processes.items() if pid not in known
+        },
+        "images": previous.get("images", {}),
+    }
+
+
+def digest_changed(old: dict[str, Any], new: dict[str, Any]) -> bool:
+    """True if any container or host process entry differs (image cache ignored)."""
+    return any(
+        old.get(key) != new.get(key)
+        for key in ("containers", "host_processes", "_pending_processes")
+    )
+
+
+def inventory_is_fresh() -> bool:
+    """True if the saved inventory was written less than INVENTORY_MAX_AGE ago."""
+    try:
+        return time.time() - INVENTORY_FILE.stat().st_mtime < INVENTORY_MAX_AGE
+    except OSError:
+        return False
 
 
 def detect_transitions(old: dict[str, Any], new: dict[str, Any]) -> None:
@@ -710,52 +883,66 @@ def merge_timestamps(old_inventory: dict[str, Any], new_inventory: dict[str, Any
             process["detected_at"] = now
 
 
-def run_scan() -> dict[str, Any]:
+def get_docker_client():
+    """Create a Docker client (lazy import of the docker package)."""
+    global docker
+
+    if docker is None:
+        import docker as docker_module
+
+        docker = docker_module
+
+    return docker.from_env()
+
+
+def run_scan(
+    client,
+    summaries: list[dict[str, Any]],
+    scanned_processes: dict[str, dict[str, Any]],
+    old_inventory: dict[str, Any],
+    old_digest: dict[str, Any],
+    digest: dict[str, Any],
+) -> dict[str, Any]:
     """
-    Execute complete scan cycle.
+    Build the inventory for a scan whose digest changed.
+
+    Containers whose digest is unchanged keep their previous entry; only new
+    or changed ones are inspected.
 
     Returns inventory dict with:
     - last_scan: UTC ISO timestamp
     - containers: Dict of container entries
-    - host_processes: Dict of host process entries
+    - host_processes: Dict of confirmed host process entries
+    - _pending_processes: Dict of host processes seen for the first time
 
     Returns:
         Inventory dict
     """
-    global docker
-
-    # Lazy import docker
-    if docker is None:
-        import docker as docker_module
-
-        docker = docker_module
-
-    # Create docker client
-    try:
-        client = docker.from_env()
-    except Exception as e:
-        logger.error(f"Failed to create Docker client: {e}")
-        return {
-            "last_scan": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-            "containers": {},
-            "host_processes": {},
-        }
+    reuse = {
+        container_id: entry
+        for container_id, entry in old_inventory.get("containers", {}).items()
+        if container_id in digest["containers"]
+        and old_digest["containers"].get(container_id) == digest["containers"][container_id]
+    }
 
-    # Scan containers
-    containers = scan_containers(client)
+    with trace_span("docker.sdk.scan_containers"):
+        containers = scan_containers(client, summaries, reuse, digest["images"])
 
-    # Scan host GPU processes
-    host_processes = scan_host_gpu_processes()
+    # Keep the image cache to images still in use
+    in_use = {s.get("ImageID") for s in summaries}
+    digest["images"] = {k: v for k, v in digest["images"].items() if k in in_use}
 
-    # Build inventory
-    inventory = {
+    return {
         "last_scan": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
         "containers": containers,
-        "host_processes": host_processes,
+        "host_processes": {
+            pid: p for pid, p in scanned_processes.items() if pid in digest["host_processes"]
+        },
+        "_pending_processes": {
+            pid: p for pid, p in scanned_processes.items() if pid in digest["_pending_processes"]
+        },
     }
 
-    return inventory
-
 
 def main() -> int:
     """
@@ -788,6 +975,7 @@ Examples:
     )
 
     args = parser.parse_args()
+    trace_install("detect-workloads")
 
     # Setup logging
     log_level = logging.DEBUG if args.verbose else logging.INFO
@@ -798,34 +986,31 @@ Examples:
     )
 
     try:
-        # Load previous inventory
-        old_inventory = load_inventory()
+        # Digest of the last saved inventory (compact; the inventory itself is
+        # only read when something changed)
+        old_digest = load_digest()
 
-        # Run scan
         logger.info("Starting workload scan")
-        scanned_inventory = run_scan()
-
-        # Apply transient filter for host processes
-        scanned_processes = scanned_inventory.get("host_processes", {})
-        confirmed_processes = apply_transient_filter(old_inventory, scanned_processes)
-
-        # Update pending processes list
-        old_processes = old_inventory.get("host_processes", {})
-        old_pending = old_inventory.get("_pending_processes", {})
-        new_pending = {}
-
-        for pid, process in scanned_processes.items():
-            if pid not in old_processes and pid not in old_pending:
-                # First time seeing this process - add to pending
-                new_pending[pid] = process
-
-        # Build new inventory with confirmed processes
-        new_inventory = {
-            "last_scan": scanned_inventory["last_scan"],
-            "containers": scanned_inventory["containers"],
-            "host_processes": confirmed_processes,
-            "_pending_processes": new_pending,
-        }
+        try:
+            client = get_docker_client()
+            with trace_span("docker.sdk.list_containers"):
+                summaries = client.api.containers(all=True)
+        except Exception as e:
+            # Skip the tick: an empty list would report every container as exited
+            logger.error(f"Cannot list containers: {e}")
+            return 1
+
+        scanned_processes = scan_host_gpu_processes()
+        digest = build_digest(summaries, scanned_processes, old_digest)
+
+        if not args.dry_run and not digest_changed(old_digest, digest) and inventory_is_fresh():
+            logger.info(f"No changes ({len(summaries)} containers)")
+            return 0
+
+        old_inventory = load_inventory()
+        new_inventory = run_scan(
+            client, summaries, scanned_processes, old_inventory, old_digest, digest
+        )
 
         # Detect transitions and emit events (skip if dry-run)
         if not args.dry_run:
@@ -839,8 +1024,9 @@ Examples:
             # Print to stdout
             print(json.dumps(new_inventory, indent=2))
         else:
-            # Save to disk
+            # Save to disk (digest last: it must never describe a newer inventory)
             save_inventory(new_inventory)
+            save_digest(digest)
 
         # Summary
         num_containers = len(new_inventory.get("containers", {}))
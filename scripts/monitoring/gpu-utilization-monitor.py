@@ -19,6 +19,10 @@ import sys
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+import ds01_trace  # noqa: E402,F401  (opt-in DS01_TRACE=1 tracing)
+from ds01_util_history import analyze, load_window, wasted  # noqa: E402
+
 # Configuration
 INFRA_ROOT = Path("/opt/ds01-infra")
 STATE_DIR = Path("/var/lib/ds01")
@@ -217,75 +221,28 @@ def check_wasted_allocations():
         print("  This file is only readable by admins.", file=sys.stderr)
         sys.exit(1)
 
-    # Read recent history
+    # Load only the window (seek into the log), as columns
     cutoff = now_utc() - timedelta(minutes=WASTE_DURATION_MINUTES)
-    history = []
-
-    with open(UTILIZATION_LOG) as f:
-        for line in f:
-            try:
-                entry = json.loads(line.strip())
-                ts_str = entry["timestamp"].replace("Z", "+00:00")
-                ts = datetime.fromisoformat(ts_str)
-                if ts > cutoff:
-                    history.append(entry)
-            except (json.JSONDecodeError, KeyError, ValueError):
-                continue
+    window = load_window(UTILIZATION_LOG, cutoff.timestamp(), "gpu")
 
-    if len(history) < 3:  # Need at least a few data points
-        print(f"Not enough data points yet ({len(history)} found, need 3+).")
+    if len(window) < 3:  # Need at least a few data points
+        print(f"Not enough data points yet ({len(window)} found, need 3+).")
         print("Run 'sudo gpu-utilization-monitor.py --record' every 5 minutes to collect data.")
         return []
 
-    # Analyze each container's GPU usage
-    container_usage = {}
-    for entry in history:
-        for alloc in entry.get("allocations", []):
-            container = alloc.get("container", "")
-            if not container:
-                continue
-            if container not in container_usage:
-                container_usage[container] = {
-                    "user": alloc.get("user", "unknown"),
-                    "gpu_slot": alloc.get("gpu_slot", ""),
-                    "samples": 0,
-                    "low_util_samples": 0,
-                }
-
-            # Check GPU utilization for this container's GPU
-            gpu_slot = alloc.get("gpu_slot", "")
-            if "." in gpu_slot:
-                gpu_idx = int(gpu_slot.split(".")[0])
-            else:
-                try:
-                    gpu_idx = int(gpu_slot) if gpu_slot else -1
-                except ValueError:
-                    gpu_idx = -1
-
-            if gpu_idx >= 0 and gpu_idx < len(entry.get("gpus", [])):
-                gpu_util = entry["gpus"][gpu_idx].get("gpu_util_percent", 0)
-                container_usage[container]["samples"] += 1
-                if gpu_util < WASTE_THRESHOLD:
-                    container_usage[container]["low_util_samples"] += 1
-
-    # Find wasted allocations
-    wasted = []
-    for container, usage in container_usage.items():
-        if usage["samples"] < 3:
-            continue
-        waste_ratio = usage["low_util_samples"] / usage["samples"]
-        if waste_ratio > 0.8:  # 80%+ of samples show low utilization
-            wasted.append(
-                {
-                    "container": container,
-                    "user": usage["user"],
-                    "gpu_slot": usage["gpu_slot"],
-                    "waste_ratio": waste_ratio,
-                    "samples": usage["samples"],
-                }
-            )
-
-    return wasted
+    # 80%+ of a container's samples below WASTE_THRESHOLD (3+ samples)
+    return [
+        {
+            "container": s.container,
+            "user": s.user,
+            "gpu_slot": s.slot,
+            "waste_ratio": s.waste_ratio,
+            "samples": s.samples,
+            "idle_minutes": round(s.idle_streak_s / 60),
+            "p90": s.p90,
+        }
+        for s in wasted(analyze(window, WASTE_THRESHOLD))
+    ]
 
 
 def log_event(event_type, user, message):
@@ -389,7 +346,9 @@ def main():
             print(f"Found {len(wasted)} potentially wasted GPU allocation(s):")
             for w in wasted:
                 print(
-                    f"  - {w['container']} ({w['user']}): GPU {w['gpu_slot']} - {w['waste_ratio'] * 100:.0f}% idle"
+                    f"  - {w['container']} ({w['user']}): GPU {w['gpu_slot']} - "
+                    f"{w['waste_ratio'] * 100:.0f}% idle, idle for {w['idle_minutes']}m, "
+                    f"p90 {w['p90']:.0f}%"
                 )
                 log_event(
                     "alert.gpu_waste",
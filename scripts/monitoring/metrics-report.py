@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+DS01 Metrics Report Aggregator
+/opt/ds01-infra/scripts/monitoring/metrics-report.py
+
+Builds the daily server report (and weekly/monthly rollups) from the records
+written by collect-metrics.py. Called by compile-daily-report.sh.
+
+Each day's metrics file is read once: every record is dispatched to the
+accumulators of all report sections at the same time (GPU, per-user GPU
+memory, CPU, per-user CPU/memory, memory, disk, containers, sample count).
+The accumulators for a day are saved as a partial:
+
+    /var/log/ds01-infra/reports/partials/YYYY-MM-DD.json
+
+Partials only hold mergeable state (count/sum/min/max per series, counters,
+latest snapshot), so weekly and monthly reports merge daily partials instead
+of re-reading raw metrics. A partial built before its day ended (the 23:55
+daily run) is rebuilt once when a rollup needs it.
+
+Usage:
+    metrics-report.py daily [YYYY-MM-DD]      # Default: today
+    metrics-report.py weekly [YYYY-MM-DD]     # ISO week containing the date (default: yesterday)
+    metrics-report.py monthly [YYYY-MM-DD]    # Month containing the date (default: yesterday)
+    metrics-report.py daily 2026-03-02 --stdout
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPORTS_DIR = Path("/var/log/ds01-infra/reports")
+PARTIALS_DIR = REPORTS_DIR / "partials"
+PARTIAL_VERSION = 1
+
+REPORT_KINDS = {"sample", "gpu", "gpu_process", "cpu", "user", "memory", "disk", "container"}
+MB = 1024**2
+
+sys.path.insert(0, str(SCRIPT_DIR.parent / "lib"))
+import ds01_metrics_store  # noqa: E402
+
+# ============================================================================
+# Accumulators
+# ============================================================================
+
+
+class Stat:
+    """count/sum/min/max of one series; merging two is exact."""
+
+    __slots__ = ("n", "total", "lo", "hi")
+
+    def __init__(self, n=0, total=0.0, lo=None, hi=None):
+        self.n, self.total, self.lo, self.hi = n, total, lo, hi
+
+    def add(self, value) -> None:
+        if value is None:
+            return
+        self.n += 1
+        self.total += value
+        self.lo = value if self.lo is None else min(self.lo, value)
+        self.hi = value if self.hi is None else max(self.hi, value)
+
+    def merge(self, other: "Stat") -> None:
+        self.n += other.n
+        self.total += other.total
+        for value in (other.lo, other.hi):
+            if value is not None:
+                self.lo = value if self.lo is None else min(self.lo, value)
+                self.hi = value if self.hi is None else max(self.hi, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else 0.0
+
+    def to_list(self) -> list:
+        return [self.n, self.total, self.lo, self.hi]
+
+
+class ReportPartial:
+    """Mergeable accumulators for all report sections over [start, end]."""
+
+    def __init__(self, start: str, end: str | None = None):
+        self.start = start
+        self.end = end or start
+        self.built_at = time.time()
+        self.days: set[str] = set()
+        self.samples = 0
+        # section -> key (GPU index, user, or "" for host-wide) -> Stat
+        self.stats: dict[str, dict[str, Stat]] = {}
+        # section -> key -> latest value (GPU memory total, RAM/swap size)
+        self.latest: dict[str, dict[str, float]] = {}
+        self.containers: Counter = Counter()
+        self.disk_ts = 0.0
+        self.disks: list[dict] = []
+
+    def _stat(self, section: str, key: str = "") -> Stat:
+        return self.stats.setdefault(section, {}).setdefault(key, Stat())
+
+    def add(self, rec) -> None:
+        """Fold one metrics record into every section it feeds."""
+        d = rec.data
+        kind = rec.kind
+        if kind == "gpu":
+            idx = d["index"]
+            self._stat("gpu_util", idx).add(d["util"])
+            self._stat("gpu_mem", idx).add(_mb(d["mem_used"]))
+            self._stat("gpu_temp", idx).add(d["temp"])
+            self._stat("gpu_power", idx).add(d["power_draw"])
+            if d["mem_total"] is not None:
+                self.latest.setdefault("gpu_mem_total", {})[idx] = _mb(d["mem_total"])
+        elif kind == "gpu_process":
+            self._stat("gpu_user_mem", d["user"] or "?").add(_mb(d["mem_used"]))
+        elif kind == "cpu":
+            self._stat("cpu_util").add(d["util"])
+            for load in ("load1", "load5", "load15"):
+                self._stat(load).add(d[load])
+        elif kind == "user":
+            self._stat("user_cpu", d["user"]).add(d["cpu_pct"])
+            self._stat("user_rss", d["user"]).add(_mb(d["rss"]))
+        elif kind == "memory":
+            total, used = _mb(d["total"]), _mb(d["used"])
+            self._stat("mem_used").add(used)
+            if total and used is not None:
+                self._stat("mem_pct").add(used * 100 / total)
+                self.latest.setdefault("memory", {})["total"] = total
+            if d["swap_total"]:
+                self._stat("swap_used").add(_mb(d["swap_used"]))
+                self.latest.setdefault("memory", {})["swap_total"] = _mb(d["swap_total"])
+        elif kind == "disk":
+            if rec.ts != self.disk_ts:
+                self.disk_ts, self.disks = rec.ts, []
+            self.disks.append(d)
+        elif kind == "container":
+            if d["state"] == "running":
+                self.containers[d["name"]] += 1
+        elif kind == "sample":
+            if "cpu" in (d["groups"] or "").split(","):
+                self.samples += 1
+
+    def merge(self, other: "ReportPartial") -> None:
+        self.start = min(self.start, other.start)
+        self.end = max(self.end, other.end)
+        self.days |= other.days
+        self.samples += other.samples
+        for section, stats in other.stats.items():
+            for key, stat in stats.items():
+                self._stat(section, key).merge(stat)
+        for section, values in other.latest.items():
+            self.latest.setdefault(section, {}).update(values)  # Merged in date order
+        self.containers.update(other.containers)
+        if other.disk_ts >= self.disk_ts:
+            self.disk_ts, self.disks = other.disk_ts, other.disks
+
+    @property
+    def final(self) -> bool:
+        """Built after its last day ended, so no more records can arrive."""
+        end_of_day = datetime.strptime(self.end, "%Y-%m-%d") + timedelta(days=1)
+        return self.built_at >= end_of_day.timestamp()
+
+    def to_dict(self) -> dict:
+        return {
+            "version": PARTIAL_VERSION,
+            "start": self.start,
+            "end": self.end,
+            "built_at": self.built_at,
+            "days": sorted(self.days),
+            "samples": self.samples,
+            "stats": {
+                section: {key: stat.to_list() for key, stat in stats.items()}
+                for section, stats in self.stats.items()
+            },
+            "latest": self.latest,
+            "containers": dict(self.containers),
+            "disk_ts": self.disk_ts,
+            "disks": self.disks,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReportPartial":
+        partial = cls(data["start"], data["end"])
+        partial.built_at = data["built_at"]
+        partial.days = set(data["days"])
+        partial.samples = data["samples"]
+        partial.stats = {
+            section: {key: Stat(*values) for key, values in stats.items()}
+            for section, stats in data["stats"].items()
+        }
+        partial.latest = data["latest"]
+        partial.containers = Counter(data["containers"])
+        partial.disk_ts = data["disk_ts"]
+        partial.disks = data["disks"]
+        return partial
+
+
+def _mb(value):
+    return None if value is None else value / MB
+
+
+# ============================================================================
+# Building and merging partials
+# ============================================================================
+
+
+def build_day(day: str, metrics_dir: Path | None = None) -> ReportPartial:
+    """One pass over a day's records, feeding all sections at once."""
+    partial = ReportPartial(day)
+    for rec in ds01_metrics_store.read_day(day, REPORT_KINDS, metrics_dir):
+        partial.add(rec)
+    if partial.samples or partial.stats:
+        partial.days.add(day)
+    return partial
+
+
+def _partial_path(day: str, partials_dir: Path) -> Path:
+    return partials_dir / f"{day}.json"
+
+
+def save_partial(partial: ReportPartial, partials_dir: Path | None = None) -> None:
+    partials_dir = partials_dir or PARTIALS_DIR
+    partials_dir.mkdir(parents=True, exist_ok=True)
+    path = _partial_path(partial.start, partials_dir)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(partial.to_dict(), separators=(",", ":")))
+    os.replace(tmp, path)
+
+
+def load_partial(day: str, partials_dir: Path | None = None) -> ReportPartial | None:
+    path = _partial_path(day, partials_dir or PARTIALS_DIR)
+    try:
+        data = json.loads(path.read_text())
+        if data.get("version") != PARTIAL_VERSION:
+            return None
+        return ReportPartial.from_dict(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def day_partial(
+    day: str, metrics_dir: Path | None = None, partials_dir: Path | None = None
+) -> ReportPartial:
+    """Saved partial for a day, rebuilt from raw records only if missing or not final."""
+    partial = load_partial(day, partials_dir)
+    if partial is None or not partial.final:
+        partial = build_day(day, metrics_dir)
+        save_partial(partial, partials_dir)
+    return partial
+
+
+def rollup(
+    first: date, last: date, metrics_dir: Path | None = None, partials_dir: Path | None = None
+) -> ReportPartial:
+    total = ReportPartial(first.isoformat(), last.isoformat())
+    day = first
+    while day <= last:
+        total.merge(day_partial(day.isoformat(), metrics_dir, partials_dir))
+        day += timedelta(days=1)
+    return total
+
+
+def period(kind: str, anchor: date) -> tuple[date, date]:
+    if kind == "weekly":
+        first = anchor - timedelta(days=anchor.weekday())
+        return first, first + timedelta(days=6)
+    if kind == "monthly":
+        first = anchor.replace(day=1)
+        next_month = (first + timedelta(days=32)).replace(day=1)
+        return first, next_month - timedelta(days=1)
+    return anchor, anchor
+
+
+# ============================================================================
+# Rendering
+# ============================================================================
+
+
+def render(partial: ReportPartial, kind: str = "daily") -> str:
+    lines = []
+    out = lines.append
+    title = {"daily": "Daily", "weekly": "Weekly", "monthly": "Monthly"}[kind]
+    out(f"# 📊 {title} Server Performance Report")
+    out("")
+    if kind == "daily":
+        out(f"**Date:** {datetime.strptime(partial.start, '%Y-%m-%d'):%A, %B %d, %Y}")
+    else:
+        out(f"**Period:** {partial.start} to {partial.end} ({len(partial.days)} days with data)")
+    out(f"**Report Generated:** {datetime.now():%Y-%m-%d %H:%M:%S}")
+    out("")
+    out("**Collection Interval:** Every 5 minutes")
+    out(f"**Total Samples:** {partial.samples}")
+    out("")
+    out("---")
+    out("")
+    for section in (_gpu, _cpu, _memory, _disk, _containers):
+        lines.extend(section(partial))
+    out("---")
+    out("")
+    out("*Report generated by metrics-report.py*")
+    out("*Source metrics: /var/log/ds01-infra/metrics/*")
+    return "\n".join(lines) + "\n"
+
+
+def _gpu(p: ReportPartial) -> list[str]:
+    util = p.stats.get("gpu_util")
+    if not util:
+        return ["*No GPU data available*"]
+    mem, temp, power = p.stats["gpu_mem"], p.stats["gpu_temp"], p.stats["gpu_power"]
+    totals = p.latest.get("gpu_mem_total", {})
+    lines = [
+        "## 🎮 GPU Utilization Summary",
+        "",
+        "| GPU | Avg Util | Max Util | Avg Mem Used | Max Mem | Avg Temp | Max Temp "
+        "| Avg Power | Samples |",
+        "|-----|----------|----------|--------------|---------|----------|----------"
+        "|-----------|---------|",
+    ]
+    for g in sorted(util, key=_index_key):
+        lines.append(
+            f"| {g} | {util[g].mean:.1f}% | {util[g].hi or 0:.1f}% | {mem[g].mean:.0f} MB "
+            f"| {totals.get(g, 0):.0f} MB | {temp[g].mean:.1f}°C | {temp[g].hi or 0:.1f}°C "
+            f"| {power[g].mean:.1f} W | {util[g].n} |"
+        )
+    lines += ["", "### Per-User GPU Memory Usage", ""]
+    users = p.stats.get("gpu_user_mem", {})
+    if users:
+        lines += [
+            "| User | Total GPU Memory | Avg per Sample | Samples |",
+            "|------|------------------|----------------|---------|",
+        ]
+        for u in sorted(users):
+            s = users[u]
+            lines.append(f"| {u} | {s.total:.0f} MB | {s.mean:.0f} MB | {s.n} |")
+    else:
+        lines.append("*No GPU usage detected*")
+    return lines + [""]
+
+
+def _cpu(p: ReportPartial) -> list[str]:
+    util = p.stats.get("cpu_util", {}).get("")
+    if util is None or not util.n:
+        return ["*No CPU data available*"]
+    load = {name: p.stats[name][""] for name in ("load1", "load5", "load15")}
+    lines = [
+        "## 💻 CPU Utilization Summary",
+        "",
+        f"- **Average CPU Utilization**: {util.mean:.1f}%",
+        f"- **Peak CPU Utilization**: {util.hi:.1f}%",
+        f"- **Minimum CPU Utilization**: {util.lo:.1f}%",
+        f"- **Average Load (1/5/15 min)**: {load['load1'].mean:.2f} / "
+        f"{load['load5'].mean:.2f} / {load['load15'].mean:.2f}",
+        f"- **Peak Load (1 min)**: {load['load1'].hi or 0:.2f}",
+        f"- **Samples**: {util.n}",
+        "",
+        "### Per-User CPU Usage",
+        "",
+    ]
+    users = p.stats.get("user_cpu", {})
+    if users:
+        lines += [
+            "| User | Avg CPU % | Peak CPU % | Samples |",
+            "|------|-----------|------------|---------|",
+        ]
+        for u in sorted(users):
+            s = users[u]
+            lines.append(f"| {u} | {s.mean:.1f}% | {s.hi or 0:.1f}% | {s.n} |")
+    return lines + [""]
+
+
+def _memory(p: ReportPartial) -> list[str]:
+    used = p.stats.get("mem_used", {}).get("")
+    if used is None or not used.n:
+        return ["*No memory data available*"]
+    pct = p.stats.get("mem_pct", {}).get("", Stat())
+    latest = p.latest.get("memory", {})
+    total = latest.get("total", 0)
+    lines = [
+        "## 🧠 Memory Summary",
+        "",
+        f"- **Total Memory**: {total:.0f} MB ({total / 1024:.1f} GB)",
+        f"- **Average Used**: {used.mean:.0f} MB ({pct.mean:.1f}%)",
+        f"- **Peak Used**: {used.hi:.0f} MB ({pct.hi or 0:.1f}%)",
+    ]
+    swap = p.stats.get("swap_used", {}).get("")
+    if swap is not None and swap.n:
+        lines += [
+            f"- **Total Swap**: {latest.get('swap_total', 0):.0f} MB",
+            f"- **Average Swap Used**: {swap.mean:.0f} MB",
+            f"- **Peak Swap Used**: {swap.hi:.0f} MB",
+        ]
+    lines += [f"- **Samples**: {used.n}", "", "### Per-User Memory Usage", ""]
+    users = p.stats.get("user_rss", {})
+    if users:
+        lines += [
+            "| User | Avg Memory (MB) | Peak Memory (MB) | Samples |",
+            "|------|-----------------|------------------|---------|",
+        ]
+        for u in sorted(users):
+            s = users[u]
+            lines.append(f"| {u} | {s.mean:.0f} | {s.hi or 0:.0f} | {s.n} |")
+    return lines + [""]
+
+
+def _disk(p: ReportPartial) -> list[str]:
+    if not p.disks:
+        return ["*No disk data available*"]
+    lines = [
+        "## 💾 Disk Usage Summary",
+        "",
+        "**Latest Disk Space** (from last sample):",
+        "",
+        "| Filesystem | Size | Used | Available | Use% | Mounted On |",
+        "|------------|------|------|-----------|------|------------|",
+    ]
+    for d in p.disks:
+        size, used = d["size"] or 0, d["used"] or 0
+        pct = used * 100 / size if size else 0
+        lines.append(
+            f"| {d['device']} | {_human(size)} | {_human(used)} | {_human(d['avail'] or 0)} "
+            f"| {pct:.0f}% | {d['mount']} |"
+        )
+    return lines + [""]
+
+
+def _containers(p: ReportPartial) -> list[str]:
+    lines = ["## 🐳 Docker Container Activity", ""]
+    if not p.containers:
+        return lines + ["*No Docker containers detected*", ""]
+    lines.append("**Active Containers:**")
+    for name, count in sorted(p.containers.items()):
+        lines.append(f"- `{name}` (active in {count} samples)")
+    return lines + [""]
+
+
+def _index_key(index: str):
+    return (0, int(index), "") if index.isdigit() else (1, 0, index)
+
+
+def _human(size: float) -> str:
+    if size >= 1024**4:
+        return f"{size / 1024**4:.1f}T"
+    if size >= 1024**3:
+        return f"{size / 1024**3:.1f}G"
+    return f"{size / MB:.0f}M"
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build DS01 daily/weekly/monthly reports")
+    parser.add_argument("kind", choices=("daily", "weekly", "monthly"))
+    parser.add_argument("date", nargs="?", help="YYYY-MM-DD")
+    parser.add_argument(
+        "--stdout", action="store_true", help="Print the report instead of writing it"
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.date:
+            anchor = datetime.strptime(args.date, "%Y-%m-%d").date()
+        else:
+            anchor = date.today() - timedelta(days=0 if args.kind == "daily" else 1)
+    except ValueError:
+        parser.error(f"invalid date: {args.date}")
+
+    first, last = period(args.kind, anchor)
+    try:
+        if args.kind == "daily":
+            partial = build_day(first.isoformat())
+            if not args.stdout:
+                save_partial(partial)
+        else:
+            partial = rollup(first, last)
+        report = render(partial, args.kind)
+        if args.stdout:
+            sys.stdout.write(report)
+            return 0
+
+        out_dir = REPORTS_DIR / args.kind
+        name = {
+            "daily": first.isoformat(),
+            "weekly": f"{first:%G-W%V}",
+            "monthly": f"{first:%Y-%m}",
+        }[args.kind]
+        out_dir.mkdir(parents=True, exist_ok=True)
+        report_file = out_dir / f"{name}.md"
+        report_file.write_text(report)
+        latest = out_dir / "_latest.md"
+        latest.unlink(missing_ok=True)
+        latest.symlink_to(report_file.name)
+    except OSError as e:
+        print(f"metrics-report: {e}", file=sys.stderr)
+        return 1
+
+    print(f"✅ {args.kind.capitalize()} report compiled: {report_file}")
+    print(f"📊 Analyzed {partial.samples} samples from {first} to {last}")
+    print(f"📄 Latest report: {latest}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
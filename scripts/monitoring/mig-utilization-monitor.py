@@ -20,6 +20,10 @@ import sys
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+import ds01_trace  # noqa: E402,F401  (opt-in DS01_TRACE=1 tracing)
+from ds01_util_history import analyze, load_window, wasted  # noqa: E402
+
 # Configuration
 INFRA_ROOT = Path("/opt/ds01-infra")
 STATE_DIR = Path("/var/lib/ds01")
@@ -309,68 +313,28 @@ def check_wasted_allocations():
         print("  This file is only readable by admins.", file=sys.stderr)
         sys.exit(1)
 
-    # Read recent history
+    # Load only the window (seek into the log), as columns
     cutoff = now_utc() - timedelta(minutes=WASTE_DURATION_MINUTES)
-    history = []
-
-    with open(UTILIZATION_LOG) as f:
-        for line in f:
-            try:
-                entry = json.loads(line.strip())
-                ts_str = entry["timestamp"].replace("Z", "+00:00")
-                ts = datetime.fromisoformat(ts_str)
-                if ts > cutoff:
-                    history.append(entry)
-            except (json.JSONDecodeError, KeyError, ValueError):
-                continue
+    window = load_window(UTILIZATION_LOG, cutoff.timestamp(), "mig")
 
-    if len(history) < 3:
-        print(f"Not enough data points yet ({len(history)} found, need 3+).")
+    if len(window) < 3:
+        print(f"Not enough data points yet ({len(window)} found, need 3+).")
         print("Run 'sudo mig-utilization-monitor.py --record' every 5 minutes to collect data.")
         return []
 
-    # Analyze each container's MIG usage
-    container_usage = {}
-    for entry in history:
-        for alloc in entry.get("allocations", []):
-            container = alloc.get("container", "")
-            if not container:
-                continue
-            if container not in container_usage:
-                container_usage[container] = {
-                    "user": alloc.get("user", "unknown"),
-                    "mig_slot": alloc.get("mig_slot", ""),
-                    "samples": 0,
-                    "low_util_samples": 0,
-                }
-
-            # Check MIG utilization for this container's instance
-            mig_slot = alloc.get("mig_slot", "")
-            for mig in entry.get("mig_instances", []):
-                if mig.get("slot") == mig_slot:
-                    container_usage[container]["samples"] += 1
-                    if mig.get("gpu_util_percent", 0) < WASTE_THRESHOLD:
-                        container_usage[container]["low_util_samples"] += 1
-                    break
-
-    # Find wasted allocations
-    wasted = []
-    for container, usage in container_usage.items():
-        if usage["samples"] < 3:
-            continue
-        waste_ratio = usage["low_util_samples"] / usage["samples"]
-        if waste_ratio > 0.8:  # 80%+ of samples show low utilization
-            wasted.append(
-                {
-                    "container": container,
-                    "user": usage["user"],
-                    "mig_slot": usage["mig_slot"],
-                    "waste_ratio": waste_ratio,
-                    "samples": usage["samples"],
-                }
-            )
-
-    return wasted
+    # 80%+ of a container's samples below WASTE_THRESHOLD (3+ samples)
+    return [
+        {
+            "container": s.container,
+            "user": s.user,
+            "mig_slot": s.slot,
+            "waste_ratio": s.waste_ratio,
+            "samples": s.samples,
+            "idle_minutes": round(s.idle_streak_s / 60),
+            "p90": s.p90,
+        }
+        for s in wasted(analyze(window, WASTE_THRESHOLD))
+    ]
 
 
 def log_event(event_type, user, message):
@@ -510,7 +474,9 @@ def main():
             print(f"Found {len(wasted)} potentially wasted MIG allocation(s):")
             for w in wasted:
                 print(
-                    f"  - {w['container']} ({w['user']}): MIG {w['mig_slot']} - {w['waste_ratio'] * 100:.0f}% idle"
+                    f"  - {w['container']} ({w['user']}): MIG {w['mig_slot']} - "
+                    f"{w['waste_ratio'] * 100:.0f}% idle, idle for {w['idle_minutes']}m, "
+                    f"p90 {w['p90']:.0f}%"
                 )
                 log_event(
                     "alert.mig_waste",
@@ -0,0 +1,539 @@
+#!/usr/bin/env python3
+"""
+DS01 Resource Alert Engine
+/opt/ds01-infra/scripts/monitoring/resource-alert-engine.py
+
+Evaluates GPU, container-count and memory quota thresholds for every DS01
+user in one pass. Called by resource-alert-checker.sh, which delivers the
+notifications this prints to user terminals.
+
+One run does:
+- One container snapshot: a single `docker ps` plus batched `docker inspect`
+  (instead of a gpu-state-reader listing per user)
+- One compiled limits table from a single ResourceLimitParser
+- One cgroup read per user slice for memory
+- One atomic write of all alert state (alerts/.quota-state.json)
+
+The per-user alert files (alerts/<user>.json) that ds01-login-check and the
+quota greeting read are views of that state: they are rewritten (atomically)
+only for users whose quota alerts changed, and entries written by other
+components (e.g. gpu_available from the GPU queue) are preserved.
+
+Usage:
+    resource-alert-engine.py              # Check all users (prunes old alerts first)
+    resource-alert-engine.py <username>   # Check one user
+    resource-alert-engine.py --clean      # Remove alerts older than 24h
+
+Output: one tab-separated line per active alert of the checked users:
+    <username>\\t<alert type>\\t<WARNING|ALERT>\\t<cooldown seconds>\\t<message>
+
+The checker queues every line; the notification index (ds01_notify_queue.py)
+holds each (user, alert type) to one delivery per cooldown.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+from collections import Counter, defaultdict
+from collections.abc import Iterable
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DOCKER_DIR = SCRIPT_DIR.parent / "docker"
+ALERTS_DIR = Path("/var/lib/ds01/alerts")
+STATE_FILE = ALERTS_DIR / ".quota-state.json"
+CGROUP_ROOT = Path("/sys/fs/cgroup/ds01.slice")
+
+SOFT_LIMIT_THRESHOLD = 80  # Percent of a limit that raises a *_usage_high warning
+ALERT_RETENTION_HOURS = 24  # Alerts not re-raised for this long are dropped by --clean
+NOTIFY_COOLDOWN_HOURS = 4  # Minimum gap between notifications per alert type (notify index)
+INSPECT_BATCH_SIZE = 50  # Containers per `docker inspect` call
+
+# resource -> (warning type, limit type); the event types match the old checker
+ALERT_TYPES = {
+    "gpu": ("gpu_usage_high", "gpu_limit_reached"),
+    "container": ("container_usage_high", "container_limit_reached"),
+    "memory": ("memory_usage_high", "memory_limit_reached"),
+}
+QUOTA_ALERT_TYPES = frozenset(t for pair in ALERT_TYPES.values() for t in pair)
+
+sys.path.insert(0, str(SCRIPT_DIR.parent / "lib"))
+sys.path.insert(0, str(DOCKER_DIR))
+from get_resource_limits import (  # noqa: E402
+    _SENTINEL,
+    ResourceLimitParser,
+    _format_gpueq,
+    _resolve_max_gpu_equivalents,
+    sanitize_username_for_slice,
+)
+
+# Event logging in-process (never breaks alerting if the library is missing)
+try:
+    from ds01_events import log_event as _log_event
+except ImportError:
+
+    def _log_event(*args, **kwargs) -> bool:
+        return False
+
+
+_spec = importlib.util.spec_from_file_location(
+    "gpu_state_reader", str(DOCKER_DIR / "gpu-state-reader.py")
+)
+gpu_state_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(gpu_state_module)
+DOCKER_BIN = gpu_state_module.DOCKER_BIN
+
+
+def now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _iso(ts: datetime) -> str:
+    return ts.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _parse_iso(value: str | None) -> datetime | None:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+# ============================================================================
+# Snapshot
+# ============================================================================
+
+
+class Snapshot:
+    """Per-user container counts and GPU slots from one pass over Docker."""
+
+    def __init__(self):
+        self.users: set[str] = set()
+        self.container_counts: Counter = Counter()
+        self.gpu_slots: dict[str, set[str]] = defaultdict(set)
+
+    def add(self, container_data: dict, gpu_info: dict | None) -> None:
+        labels = container_data.get("Config", {}).get("Labels", {}) or {}
+        owner = labels.get("ds01.user")
+        if owner:
+            # Same population as `docker ps -a --filter label=ds01.user=<user>`
+            self.container_counts[owner] += 1
+            if labels.get("ds01.managed") == "true":
+                self.users.add(owner)
+
+        # Same population and slot counting as GPUStateReader.get_user_gpu_count
+        name = container_data.get("Name", "").lstrip("/")
+        if gpu_info and gpu_info.get("user"):
+            if gpu_state_module.GPUStateReader._is_ds01_container(name, container_data):
+                slots = gpu_info.get("gpu_slots") or [gpu_info.get("gpu_slot")]
+                self.gpu_slots[gpu_info["user"]].update(s for s in slots if s)
+
+
+def _docker_inspect(container_ids: list[str]) -> list[dict]:
+    """`docker inspect` a batch; containers removed since `docker ps` are skipped."""
+    try:
+        result = subprocess.run(
+            [DOCKER_BIN, "inspect", *container_ids],
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+        return json.loads(result.stdout or "[]")
+    except (subprocess.TimeoutExpired, json.JSONDecodeError):
+        return []
+
+
+def take_snapshot(reader) -> Snapshot:
+    """List every container once and inspect them in batches.
+
+    Raises RuntimeError if Docker cannot be listed: alerts must not be
+    cleared on the strength of an empty snapshot.
+    """
+    try:
+        result = subprocess.run(
+            [DOCKER_BIN, "ps", "-a", "--no-trunc", "--format", "{{.ID}}"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=30,
+        )
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+        raise RuntimeError(f"cannot list containers: {e}") from e
+
+    container_ids = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+    snapshot = Snapshot()
+    for i in range(0, len(container_ids), INSPECT_BATCH_SIZE):
+        for container_data in _docker_inspect(container_ids[i : i + INSPECT_BATCH_SIZE]):
+            snapshot.add(container_data, reader._extract_gpu_from_container(container_data))
+    return snapshot
+
+
+# ============================================================================
+# Limits and usage
+# ============================================================================
+
+
+def parse_memory(value) -> int | None:
+    """Bytes for a memory_max value like '16G', '512m' or raw bytes; None if unlimited."""
+    if value is None:
+        return None
+    text = str(value).strip().lower()
+    if text in ("", "none", "null", "unlimited", "max"):
+        return None
+    multiplier = {"g": 1024**3, "m": 1024**2}.get(text[-1], 1)
+    try:
+        number = float(text[:-1]) if multiplier > 1 else float(text)
+    except ValueError:
+        return None
+    return int(number * multiplier) or None
+
+
+def compile_limits(parser: ResourceLimitParser, users) -> dict[str, dict]:
+    """Resolve every user's quota once.
+
+    Admin users and users without an aggregate section only get the GPU
+    check, as before: their container count and memory are not limited.
+    """
+    table = {}
+    for user in users:
+        group = parser.get_user_group(user)
+        limits = parser.get_user_limits(user)
+        aggregate = parser.get_aggregate_limits(user)
+
+        max_gpus = _resolve_max_gpu_equivalents(limits)
+        if max_gpus is _SENTINEL:
+            max_gpus = 1.0  # Unconfigured → conservative default
+
+        limited = group != "admin" and aggregate is not None
+        table[user] = {
+            "group": group,
+            "max_gpus": max_gpus,
+            "max_containers": limits.get("max_containers_per_user", 3) if limited else None,
+            "memory_max": parse_memory(aggregate.get("memory_max")) if limited else None,
+        }
+    return table
+
+
+def read_slice_memory(group: str, user: str, root: Path = CGROUP_ROOT) -> int | None:
+    """memory.current of the user's slice, or None if the slice is not active."""
+    sanitized = sanitize_username_for_slice(user)
+    path = root / f"ds01-{group}.slice" / f"ds01-{group}-{sanitized}.slice" / "memory.current"
+    try:
+        return int(path.read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+# ============================================================================
+# Evaluation
+# ============================================================================
+
+
+def _percent(current: float, limit: float) -> int:
+    return int(current * 100 / limit) if limit > 0 else 0
+
+
+def evaluate_user(limits: dict, gpus: int, containers: int, memory: int | None) -> dict:
+    """Threshold verdicts for one user.
+
+    Returns resource -> (alert_type, message, event_type, event_message) when
+    over the soft threshold, or None when below it (clear). Resources that
+    are unlimited, or whose usage is unknown, are absent: their alerts are
+    left as they are.
+    """
+    verdicts = {}
+
+    max_gpus = limits["max_gpus"]
+    if max_gpus is not None:
+        percent = _percent(gpus, max_gpus)
+        shown = _format_gpueq(max_gpus)
+        if percent >= 100:
+            verdicts["gpu"] = (
+                "gpu_limit_reached",
+                f"GPU limit reached: {gpus}/{shown} GPUs allocated",
+                "alert.gpu_limit",
+                f"GPU limit reached: {gpus}/{shown}",
+            )
+        elif percent >= SOFT_LIMIT_THRESHOLD:
+            verdicts["gpu"] = (
+                "gpu_usage_high",
+                f"GPU usage high: {gpus}/{shown} GPUs ({percent}%)",
+                "alert.gpu_warning",
+                f"GPU usage at {percent}%",
+            )
+        else:
+            verdicts["gpu"] = None
+
+    max_containers = limits["max_containers"]
+    if max_containers is not None:
+        percent = _percent(containers, max_containers)
+        if percent >= 100:
+            verdicts["container"] = (
+                "container_limit_reached",
+                f"Container limit reached: {containers}/{max_containers}",
+                "alert.container_limit",
+                f"Container limit reached: {containers}/{max_containers}",
+            )
+        elif percent >= SOFT_LIMIT_THRESHOLD:
+            verdicts["container"] = (
+                "container_usage_high",
+                f"Container usage high: {containers}/{max_containers} ({percent}%)",
+                "alert.container_warning",
+                f"Container usage at {percent}%",
+            )
+        else:
+            verdicts["container"] = None
+
+    memory_max = limits["memory_max"]
+    if memory_max and memory is not None:
+        percent = _percent(memory, memory_max)
+        shown = f"{memory / 1024**3:.1f}/{memory_max / 1024**3:.0f} GB"
+        if percent >= 100:
+            verdicts["memory"] = (
+                "memory_limit_reached",
+                f"Memory limit reached: {shown} ({percent}%)",
+                "alert.memory_limit",
+                f"Memory limit reached: {shown}",
+            )
+        elif percent >= SOFT_LIMIT_THRESHOLD:
+            verdicts["memory"] = (
+                "memory_usage_high",
+                f"Memory usage high: {shown} ({percent}%)",
+                "alert.memory_warning",
+                f"Memory usage at {percent}%",
+            )
+        else:
+            verdicts["memory"] = None
+
+    return verdicts
+
+
+# ============================================================================
+# Alert state
+# ============================================================================
+
+
+def _write_json_atomic(path: Path, data) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        tmp.write_text(json.dumps(data, indent=2))
+        tmp.chmod(0o644)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def _read_view(path: Path) -> list[dict]:
+    try:
+        alerts = json.loads(path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return []
+    return alerts if isinstance(alerts, list) else []
+
+
+def _view_files(alerts_dir: Path):
+    return (p for p in alerts_dir.glob("*.json") if not p.name.startswith("."))
+
+
+class AlertState:
+    """All users' quota alerts, kept in one file.
+
+    Entry per (user, alert type): message, created_at, updated_at (when the
+    message last changed; shown in the user view) and seen_at (last run that
+    raised it; drives retention). Notification cooldowns live in the shared
+    notification index, not here.
+    """
+
+    def __init__(self, alerts_dir: Path = ALERTS_DIR, state_file: Path | None = None):
+        self.alerts_dir = alerts_dir
+        self.state_file = state_file or alerts_dir / STATE_FILE.name
+        self.alerts: dict[str, dict[str, dict]] = self._load()
+        self._views_before = {user: self._view(user) for user in self.alerts}
+
+    def _load(self) -> dict:
+        try:
+            return json.loads(self.state_file.read_text()).get("alerts", {})
+        except (OSError, json.JSONDecodeError, AttributeError):
+            return self._seed_from_views()
+
+    def _seed_from_views(self) -> dict:
+        """First run: adopt the quota alerts already in user files."""
+        alerts = {}
+        for path in _view_files(self.alerts_dir):
+            for entry in _read_view(path):
+                if entry.get("type") in QUOTA_ALERT_TYPES:
+                    alerts.setdefault(path.stem, {})[entry["type"]] = {
+                        "message": entry.get("message", ""),
+                        "created_at": entry.get("created_at"),
+                        "updated_at": entry.get("updated_at"),
+                        "seen_at": entry.get("updated_at"),
+                    }
+        return alerts
+
+    def _view(self, user: str) -> list[dict]:
+        """The user-file entries for a user's quota alerts."""
+        return [
+            {
+                "type": alert_type,
+                "message": entry["message"],
+                "created_at": entry["created_at"],
+                "updated_at": entry["updated_at"],
+            }
+            for alert_type, entry in sorted(self.alerts.get(user, {}).items())
+        ]
+
+    def apply(self, user: str, verdicts: dict, now: datetime) -> list[tuple[str, str]]:
+        """Record a user's verdicts; returns (event_type, event_message) for raised alerts."""
+        raised = []
+        user_alerts = self.alerts.setdefault(user, {})
+        for resource, verdict in verdicts.items():
+            for alert_type in ALERT_TYPES[resource]:
+                if verdict is None or verdict[0] != alert_type:
+                    user_alerts.pop(alert_type, None)
+            if verdict is None:
+                continue
+
+            alert_type, message, event_type, event_message = verdict
+            entry = user_alerts.setdefault(
+                alert_type, {"message": message, "created_at": _iso(now), "updated_at": _iso(now)}
+            )
+            if entry["message"] != message:
+                entry["message"] = message
+                entry["updated_at"] = _iso(now)
+            entry["seen_at"] = _iso(now)
+            raised.append((event_type, event_message))
+        if not user_alerts:
+            del self.alerts[user]
+        return raised
+
+    def notifications(self, users: Iterable[str] | None = None) -> list[tuple[str, str, str, str]]:
+        """(user, alert type, severity, message) for every active alert."""
+        active = []
+        selected = self.alerts if users is None else set(users) & set(self.alerts)
+        for user in sorted(selected):
+            for alert_type, entry in sorted(self.alerts[user].items()):
+                severity = "ALERT" if "reached" in alert_type else "WARNING"
+                active.append((user, alert_type, severity, entry["message"]))
+        return active
+
+    def prune(self, now: datetime) -> None:
+        """Drop alerts not raised within ALERT_RETENTION_HOURS."""
+        cutoff = now - timedelta(hours=ALERT_RETENTION_HOURS)
+        for user in list(self.alerts):
+            for alert_type, entry in list(self.alerts[user].items()):
+                seen = _parse_iso(entry.get("seen_at"))
+                if seen is None or seen <= cutoff:
+                    del self.alerts[user][alert_type]
+            if not self.alerts[user]:
+                del self.alerts[user]
+
+    def save(self, now: datetime) -> None:
+        """Write the state (one atomic write), then only the user views that changed."""
+        self.alerts_dir.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(
+            self.state_file, {"version": 1, "updated_at": _iso(now), "alerts": self.alerts}
+        )
+        for user in set(self._views_before) | set(self.alerts):
+            view = self._view(user)
+            if view != self._views_before.get(user, []):
+                self._write_view(user, view)
+        self._views_before = {user: self._view(user) for user in self.alerts}
+
+    def _write_view(self, user: str, view: list[dict]) -> None:
+        path = self.alerts_dir / f"{user}.json"
+        foreign = [a for a in _read_view(path) if a.get("type") not in QUOTA_ALERT_TYPES]
+        alerts = foreign + view
+        if alerts:
+            _write_json_atomic(path, alerts)
+        else:
+            path.unlink(missing_ok=True)
+
+    def clean_views(self, now: datetime) -> None:
+        """Prune every user file: quota entries follow the state, others age out."""
+        cutoff = now - timedelta(hours=ALERT_RETENTION_HOURS)
+        for path in list(_view_files(self.alerts_dir)):
+            alerts = _read_view(path)
+            kept = [
+                a
+                for a in alerts
+                if a.get("type") not in QUOTA_ALERT_TYPES
+                and (_parse_iso(a.get("updated_at")) or cutoff) > cutoff
+            ] + self._view(path.stem)
+            if not kept:
+                path.unlink(missing_ok=True)
+            elif kept != alerts:
+                _write_json_atomic(path, kept)
+
+
+# ============================================================================
+# Runs
+# ============================================================================
+
+
+def run_check(
+    user: str | None = None, state: AlertState | None = None, now: datetime | None = None
+) -> list[tuple[str, str, str, str]]:
+    """Evaluate all users (or one) and persist; returns notifications to queue."""
+    now = now or now_utc()
+    state = state or AlertState()
+    snapshot = take_snapshot(gpu_state_module.GPUStateReader())
+    users = [user] if user else sorted(snapshot.users)
+    table = compile_limits(ResourceLimitParser(), users)
+
+    if user is None:
+        state.prune(now)
+    for name in users:
+        limits = table[name]
+        memory = read_slice_memory(limits["group"], name) if limits["memory_max"] else None
+        verdicts = evaluate_user(
+            limits, len(snapshot.gpu_slots[name]), snapshot.container_counts[name], memory
+        )
+        for event_type, message in state.apply(name, verdicts, now):
+            _log_event(event_type, user=name, source="resource-alert-checker", message=message)
+
+    notifications = state.notifications(users=[user] if user else None)
+    state.save(now)
+    if user is None:
+        state.clean_views(now)
+    return notifications
+
+
+def run_clean(state: AlertState | None = None, now: datetime | None = None) -> None:
+    now = now or now_utc()
+    state = state or AlertState()
+    state.prune(now)
+    state.save(now)
+    state.clean_views(now)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Evaluate DS01 resource quota alerts")
+    parser.add_argument("user", nargs="?", help="Check a single user")
+    parser.add_argument("--clean", action="store_true", help="Remove old alerts")
+    args = parser.parse_args()
+
+    try:
+        if args.clean:
+            run_clean()
+            return 0
+        notifications = run_check(args.user)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"resource-alert-engine: {e}", file=sys.stderr)
+        return 1
+
+    cooldown = NOTIFY_COOLDOWN_HOURS * 3600
+    for user, alert_type, severity, message in notifications:
+        print(f"{user}\t{alert_type}\t{severity}\t{cooldown}\t{message}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,44 +7,107 @@ Detects and optionally repairs inconsistencies.
 
 Checks performed:
 1. GPU exists: Containers with GPU labels reference valid GPUs
-2. No orphaned allocations: GPUs aren't allocated to non-existent containers
-3. No duplicates: Each GPU slot allocated to only one container
-4. Labels valid: DS01 labels have valid format
-5. User exists: Container owners are valid system users
+2. No duplicates: Each GPU slot allocated to only one container
+3. Labels valid: DS01 labels have valid format
+4. User exists: Container owners are valid system users
+
+Findings are keyed by container (or GPU slot for duplicates), so a change to
+one container only re-runs the checks for that container and the slots it
+moved between. In --watch mode the validator keeps its model current from
+Docker container events (whose attributes carry the labels, so no per-event
+docker call), re-validates only what an event touched, and does a full rescan
+every --resync seconds in case events were missed.
+
+Every run writes its findings to /var/lib/ds01/state-validation.json, which
+the DS01 exporter serves as ds01_state_validation_* gauges.
 
 Usage:
     validate-state.py             # Check and report
     validate-state.py --repair    # Auto-repair minor issues
     validate-state.py --json      # JSON output
+    validate-state.py --watch     # Continuous mode (ds01-state-validator.service)
 """
 
 import json
+import os
+import pwd
 import re
+import select
 import subprocess
 import sys
+import time
 from datetime import datetime, timezone
 from pathlib import Path
 
 INFRA_ROOT = Path("/opt/ds01-infra")
-EVENT_LOGGER = INFRA_ROOT / "scripts/docker/event-logger.py"
+STATE_DIR = Path("/var/lib/ds01")
+FINDINGS_FILE = STATE_DIR / "state-validation.json"
+
+GPU_LABEL = "ds01.gpu_slot"
+USER_LABEL = "ds01.user"
+SLOT_FORMAT = re.compile(r"^\d+(\.\d+)?$")
+
+GPU_INVENTORY_TTL = 300  # Re-run nvidia-smi at most this often (MIG reconfiguration)
+USER_TABLE_TTL = 300  # Re-check a cached user (hit or miss) after this long
+RESYNC_INTERVAL = 3600  # Full rescan in watch mode, in case events were missed
+WATCH_EVENTS = ("create", "start", "die", "destroy", "rename")
+
+# Event logging in-process (never breaks validation if the library is missing)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "lib"))
+import ds01_trace  # noqa: E402,F401  (opt-in DS01_TRACE=1 tracing)
+
+try:
+    from ds01_events import log_event as _log_event
+except ImportError:
+
+    def _log_event(*args, **kwargs) -> bool:
+        return False
+
+
+class UserTable:
+    """Cached system user lookups: one getpwnam per name per TTL, misses included."""
+
+    def __init__(self, ttl: float = USER_TABLE_TTL):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[bool, float]] = {}
+
+    def exists(self, user: str) -> bool:
+        now = time.monotonic()
+        cached = self._entries.get(user)
+        if cached and now - cached[1] < self.ttl:
+            return cached[0]
+        try:
+            pwd.getpwnam(user)
+            found = True
+        except KeyError:
+            found = False
+        self._entries[user] = (found, now)
+        return found
 
 
 class StateValidator:
     def __init__(self, repair: bool = False):
         self.repair = repair
-        self.issues = []
+        self.issues = []  # Query failures (nvidia-smi, docker), reset per full scan
         self.repairs = []
+        self.users = UserTable()
+
+        # Model: GPU inventory and labelled containers, keyed by container ID
+        self.nvidia_gpus: dict[str, dict] = {}
+        self.allocations: dict[str, dict] = {}
+        self._gpus_checked_at: float | None = None
+
+        # Findings keyed by (check, subject): subject is a container ID or GPU slot
+        self.findings: dict[tuple[str, str], dict] = {}
+        self._repaired: set[str] = set()
 
     def log_event(self, event_type: str, **kwargs):
         """Log to centralized event system."""
-        try:
-            if EVENT_LOGGER.exists():
-                args = ["python3", str(EVENT_LOGGER), "log", event_type]
-                for k, v in kwargs.items():
-                    args.append(f"{k}={v}")
-                subprocess.run(args, capture_output=True, check=False, timeout=10)
-        except Exception:
-            pass
+        _log_event(event_type, source="validate-state", **kwargs)
+
+    # ------------------------------------------------------------------
+    # Model
+    # ------------------------------------------------------------------
 
     def _get_nvidia_gpus(self) -> dict[str, dict]:
         """Get all GPUs/MIG instances from nvidia-smi."""
@@ -92,45 +155,65 @@ class StateValidator:
 
         return gpus
 
+    def refresh_gpus(self, force: bool = False) -> bool:
+        """Re-read the GPU inventory if it is older than GPU_INVENTORY_TTL.
+
+        Returns True if the set of slots changed.
+        """
+        now = time.monotonic()
+        if (
+            not force
+            and self._gpus_checked_at is not None
+            and now - self._gpus_checked_at < GPU_INVENTORY_TTL
+        ):
+            return False
+        self._gpus_checked_at = now
+        gpus = self._get_nvidia_gpus()
+        changed = gpus.keys() != self.nvidia_gpus.keys()
+        self.nvidia_gpus = gpus
+        return changed
+
     def _get_docker_allocations(self) -> dict[str, dict]:
-        """Get GPU allocations from Docker container labels."""
+        """Get GPU allocations from Docker container labels.
+
+        Only GPU-labelled containers are listed, and label values are read
+        by key through the format template instead of parsed from the
+        comma-joined label string.
+        """
         allocations = {}
 
         try:
             result = subprocess.run(
-                ["docker", "ps", "-a", "--format", "{{.Names}}|||{{.Labels}}|||{{.Status}}"],
+                [
+                    "docker",
+                    "ps",
+                    "-a",
+                    "--no-trunc",
+                    "--filter",
+                    f"label={GPU_LABEL}",
+                    "--format",
+                    "{{.ID}}\t{{.Names}}\t{{.Status}}"
+                    f'\t{{{{.Label "{GPU_LABEL}"}}}}\t{{{{.Label "{USER_LABEL}"}}}}',
+                ],
                 capture_output=True,
                 text=True,
                 check=True,
                 timeout=30,
             )
 
-            for line in result.stdout.strip().split("\n"):
-                if not line.strip():
+            for line in result.stdout.splitlines():
+                parts = line.split("\t")
+                if len(parts) < 5:
                     continue
 
-                parts = line.split("|||")
-                if len(parts) < 3:
-                    continue
-
-                name = parts[0]
-                labels = parts[1]
-                status = parts[2]
-
-                # Parse GPU slot from labels
-                gpu_match = re.search(r"ds01\.gpu_slot=([^,]+)", labels)
-                user_match = re.search(r"ds01\.user=([^,]+)", labels)
-
-                if gpu_match:
-                    gpu_slot = gpu_match.group(1)
-                    user = user_match.group(1) if user_match else "unknown"
-
-                    allocations[name] = {
-                        "gpu_slot": gpu_slot,
-                        "user": user,
-                        "status": status,
-                        "running": "Up" in status,
-                    }
+                container_id, name, status, gpu_slot, user = parts[:5]
+                allocations[container_id] = {
+                    "name": name,
+                    "gpu_slot": gpu_slot,
+                    "user": user or "unknown",
+                    "status": status,
+                    "running": status.startswith("Up"),
+                }
 
         except Exception as e:
             self.issues.append(
@@ -143,165 +226,331 @@ class StateValidator:
 
         return allocations
 
-    def check_gpu_exists(self, nvidia_gpus: dict, allocations: dict):
+    def apply_event(self, event: dict) -> tuple[set[str], set[str]]:
+        """Update the model from one Docker container event.
+
+        Container event attributes include the container's labels, so the
+        allocation is read straight from the event. Returns the container IDs
+        and GPU slots whose findings need re-checking.
+        """
+        action = event.get("Action") or event.get("status", "")
+        actor = event.get("Actor") or {}
+        container_id = actor.get("ID") or event.get("id", "")
+        attributes = actor.get("Attributes") or {}
+        if not container_id or action not in WATCH_EVENTS:
+            return set(), set()
+
+        old = self.allocations.get(container_id)
+        slots = {old["gpu_slot"]} if old else set()
+
+        if action == "destroy" or GPU_LABEL not in attributes:
+            self.allocations.pop(container_id, None)
+            self._repaired.discard(container_id)
+        else:
+            running = old["running"] if old else False
+            if action == "start":
+                running = True
+            elif action in ("create", "die"):
+                running = False
+            self.allocations[container_id] = {
+                "name": attributes.get("name", old["name"] if old else container_id[:12]),
+                "gpu_slot": attributes[GPU_LABEL],
+                "user": attributes.get(USER_LABEL) or "unknown",
+                "status": "Up" if running else "Exited",
+                "running": running,
+            }
+            slots.add(attributes[GPU_LABEL])
+
+        return {container_id}, slots
+
+    # ------------------------------------------------------------------
+    # Checks
+    # ------------------------------------------------------------------
+
+    def _finding(self, check: str, subject: str, issue: dict):
+        self.findings[(check, subject)] = {"check": check, **issue}
+
+    def check_gpu_exists(self, container_ids):
         """Check that allocated GPUs actually exist."""
-        for container, info in allocations.items():
+        if not self.nvidia_gpus:
+            return  # Inventory unavailable (reported as nvidia_smi error)
+
+        for container_id in container_ids:
+            info = self.allocations[container_id]
+            container = info["name"]
             gpu_slot = info["gpu_slot"]
 
-            if gpu_slot not in nvidia_gpus:
-                self.issues.append(
+            if gpu_slot not in self.nvidia_gpus:
+                self._finding(
+                    "gpu_exists",
+                    container_id,
                     {
                         "severity": "warning",
-                        "check": "gpu_exists",
                         "container": container,
                         "gpu_slot": gpu_slot,
                         "message": f"GPU {gpu_slot} does not exist (container: {container})",
-                    }
+                    },
                 )
 
                 # Repair: If container stopped, clear the GPU label
                 if self.repair and not info["running"]:
-                    self._repair_clear_gpu_label(container)
+                    self._repair_clear_gpu_label(container_id)
 
-    def check_no_duplicates(self, allocations: dict):
+    def check_no_duplicates(self, gpu_slots):
         """Check for duplicate GPU allocations."""
-        gpu_to_containers: dict[str, list[str]] = {}
-
-        for container, info in allocations.items():
-            gpu_slot = info["gpu_slot"]
-
-            if gpu_slot not in gpu_to_containers:
-                gpu_to_containers[gpu_slot] = []
-            gpu_to_containers[gpu_slot].append(container)
-
-        for gpu_slot, containers in gpu_to_containers.items():
-            if len(containers) > 1:
+        holders: dict[str, list[str]] = {slot: [] for slot in gpu_slots}
+        for container_id, info in self.allocations.items():
+            if info["gpu_slot"] in holders:
+                holders[info["gpu_slot"]].append(container_id)
+
+        for gpu_slot, container_ids in holders.items():
+            if len(container_ids) > 1:
+                containers = sorted(self.allocations[c]["name"] for c in container_ids)
                 # Determine which is running
-                running = [c for c in containers if allocations[c]["running"]]
-                stopped = [c for c in containers if not allocations[c]["running"]]
+                running = [c for c in container_ids if self.allocations[c]["running"]]
+                stopped = [c for c in container_ids if not self.allocations[c]["running"]]
 
-                self.issues.append(
+                self._finding(
+                    "duplicate_allocation",
+                    gpu_slot,
                     {
                         "severity": "error",
-                        "check": "duplicate_allocation",
                         "gpu_slot": gpu_slot,
                         "containers": containers,
                         "message": f"GPU {gpu_slot} allocated to multiple containers: {containers}",
-                    }
+                    },
                 )
 
                 # Repair: Keep running container, clear others
                 if self.repair and len(running) == 1 and stopped:
-                    for container in stopped:
-                        self._repair_clear_gpu_label(container)
+                    for container_id in stopped:
+                        self._repair_clear_gpu_label(container_id)
 
-    def check_label_format(self, allocations: dict):
+    def check_label_format(self, container_ids):
         """Check that labels have valid format."""
-        for container, info in allocations.items():
+        for container_id in container_ids:
+            info = self.allocations[container_id]
             gpu_slot = info["gpu_slot"]
 
             # Valid formats: "0", "1", "0.0", "1.2", etc.
-            if not re.match(r"^\d+(\.\d+)?$", gpu_slot):
-                self.issues.append(
+            if not SLOT_FORMAT.match(gpu_slot):
+                self._finding(
+                    "label_format",
+                    container_id,
                     {
                         "severity": "warning",
-                        "check": "label_format",
-                        "container": container,
+                        "container": info["name"],
                         "gpu_slot": gpu_slot,
                         "message": f"Invalid GPU slot format: {gpu_slot}",
-                    }
+                    },
                 )
 
-    def check_user_exists(self, allocations: dict):
+    def check_user_exists(self, container_ids):
         """Check that container owners are valid users."""
-        import pwd
-
-        for container, info in allocations.items():
+        for container_id in container_ids:
+            info = self.allocations[container_id]
             user = info.get("user", "unknown")
 
             if user == "unknown":
                 continue
 
-            try:
-                pwd.getpwnam(user)
-            except KeyError:
-                self.issues.append(
+            if not self.users.exists(user):
+                self._finding(
+                    "user_exists",
+                    container_id,
                     {
                         "severity": "info",
-                        "check": "user_exists",
-                        "container": container,
+                        "container": info["name"],
                         "user": user,
                         "message": f"User {user} does not exist on system",
-                    }
+                    },
                 )
 
-    def _repair_clear_gpu_label(self, container: str):
-        """Clear GPU label from a container (repair action)."""
-        try:
-            # Note: Docker doesn't support removing labels from existing containers
-            # We can only note this for manual cleanup
-            self.repairs.append(
-                {
-                    "action": "note",
-                    "container": container,
-                    "message": f"Container {container} has stale GPU allocation. "
-                    f"Remove with: docker rm {container}",
-                }
-            )
+    def revalidate(self, container_ids, gpu_slots) -> bool:
+        """Re-run the checks for the given containers and slots only.
 
-            self.log_event(
-                "state.repair_needed", container=container, action="remove_stale_container"
-            )
+        Returns True if the findings changed.
+        """
+        container_ids = set(container_ids)
+        gpu_slots = set(gpu_slots)
+        before = dict(self.findings)
 
-        except Exception as e:
-            self.issues.append(
-                {
-                    "severity": "error",
-                    "check": "repair",
-                    "message": f"Failed to repair {container}: {e}",
-                }
-            )
+        for key in list(self.findings):
+            if key[1] in (gpu_slots if key[0] == "duplicate_allocation" else container_ids):
+                del self.findings[key]
 
-    def validate(self) -> dict:
-        """Run all validation checks."""
-        nvidia_gpus = self._get_nvidia_gpus()
-        allocations = self._get_docker_allocations()
+        present = [c for c in container_ids if c in self.allocations]
+        self.check_gpu_exists(present)
+        self.check_no_duplicates(gpu_slots)
+        self.check_label_format(present)
+        self.check_user_exists(present)
 
-        # Run checks
-        self.check_gpu_exists(nvidia_gpus, allocations)
-        self.check_no_duplicates(allocations)
-        self.check_label_format(allocations)
-        self.check_user_exists(allocations)
+        return self.findings != before
 
-        # Build result
-        errors = [i for i in self.issues if i["severity"] == "error"]
-        warnings = [i for i in self.issues if i["severity"] == "warning"]
-        info = [i for i in self.issues if i["severity"] == "info"]
+    def _repair_clear_gpu_label(self, container_id: str):
+        """Clear GPU label from a container (repair action)."""
+        if container_id in self._repaired:
+            return  # Already noted for this container
+        self._repaired.add(container_id)
+        container = self.allocations[container_id]["name"]
+
+        # Note: Docker doesn't support removing labels from existing containers
+        # We can only note this for manual cleanup
+        self.repairs.append(
+            {
+                "action": "note",
+                "container": container,
+                "message": f"Container {container} has stale GPU allocation. "
+                f"Remove with: docker rm {container}",
+            }
+        )
+
+        self.log_event("state.repair_needed", container=container, action="remove_stale_container")
 
-        result = {
+    # ------------------------------------------------------------------
+    # Runs
+    # ------------------------------------------------------------------
+
+    def full_scan(self) -> bool:
+        """Rebuild the model from nvidia-smi and docker and re-check everything."""
+        self.issues = []
+        self.refresh_gpus(force=True)
+        self.allocations = self._get_docker_allocations()
+        self._repaired &= self.allocations.keys()
+
+        stale = {key for key in self.findings if key[0] != "duplicate_allocation"}
+        stale_ids = {subject for _, subject in stale}
+        slots = {info["gpu_slot"] for info in self.allocations.values()}
+        slots |= {subject for check, subject in self.findings if check == "duplicate_allocation"}
+        return self.revalidate(self.allocations.keys() | stale_ids, slots)
+
+    def result(self) -> dict:
+        """Current findings as the validation result."""
+        issues = self.issues + sorted(
+            self.findings.values(), key=lambda i: (i["check"], i.get("gpu_slot", ""))
+        )
+        errors = [i for i in issues if i["severity"] == "error"]
+        warnings = [i for i in issues if i["severity"] == "warning"]
+        info = [i for i in issues if i["severity"] == "info"]
+
+        return {
             "timestamp": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
             "valid": len(errors) == 0,
             "summary": {
                 "errors": len(errors),
                 "warnings": len(warnings),
                 "info": len(info),
-                "total_gpus": len(nvidia_gpus),
-                "allocated": len(allocations),
+                "total_gpus": len(self.nvidia_gpus),
+                "allocated": len(self.allocations),
             },
-            "issues": self.issues,
+            "issues": issues,
             "repairs": self.repairs if self.repair else [],
         }
 
+    def write_findings(self, result: dict, path: Path = FINDINGS_FILE):
+        """Publish the result for the exporter (atomic replace, never raises)."""
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(result, indent=2))
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def validate(self) -> dict:
+        """Run all validation checks."""
+        self.full_scan()
+        result = self.result()
+        self.write_findings(result)
+
         # Log validation result
         self.log_event(
             "state.validation",
             valid=str(result["valid"]).lower(),
-            errors=str(len(errors)),
-            warnings=str(len(warnings)),
+            errors=str(result["summary"]["errors"]),
+            warnings=str(result["summary"]["warnings"]),
         )
 
         return result
 
+    def watch(self, resync: float = RESYNC_INTERVAL):
+        """Validate continuously from Docker container events.
+
+        Each event re-checks only the container it names and the GPU slots it
+        moved between. The model is rebuilt on every (re)connect and every
+        `resync` seconds; findings are republished whenever they change.
+        """
+        cmd = ["docker", "events", "--format", "{{json .}}", "--filter", "type=container"]
+        for action in WATCH_EVENTS:
+            cmd += ["--filter", f"event={action}"]
+
+        def publish(changed: bool):
+            if changed:
+                result = self.result()
+                self.write_findings(result)
+                print(
+                    f"Findings: {result['summary']['errors']} errors, "
+                    f"{result['summary']['warnings']} warnings, {result['summary']['info']} info",
+                    flush=True,
+                )
+
+        def handle(line: bytes):
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                return
+            container_ids, slots = self.apply_event(event)
+            if not container_ids:
+                return
+            if self.refresh_gpus():
+                container_ids = self.allocations.keys() | container_ids
+            publish(self.revalidate(container_ids, slots))
+
+        print(f"Watching Docker events (resync {resync:.0f}s)", flush=True)
+        while True:
+            try:
+                # Unbuffered: select() must see every byte Docker has written,
+                # not stop at lines already pulled into a file object's buffer
+                events = subprocess.Popen(
+                    cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0
+                )
+            except OSError as e:
+                print(f"Error: cannot start docker events: {e}", file=sys.stderr)
+                time.sleep(5)
+                continue
+
+            try:
+                # Subscribe first, then scan, so nothing between the two is lost
+                self.full_scan()
+                publish(True)
+                last_scan = time.monotonic()
+                fd = events.stdout.fileno()
+                pending = b""
+
+                while events.poll() is None:
+                    timeout = max(0.0, last_scan + resync - time.monotonic())
+                    ready, _, _ = select.select([fd], [], [], timeout)
+                    if not ready:
+                        publish(self.full_scan())
+                        last_scan = time.monotonic()
+                        continue
+
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    # Bursts (create+start, bulk destroys) arrive in one read
+                    *lines, pending = (pending + chunk).split(b"\n")
+                    for line in lines:
+                        handle(line)
+            finally:
+                events.terminate()
+                try:
+                    events.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    events.kill()
+
+            print("Docker events stream ended, reconnecting...", file=sys.stderr)
+            time.sleep(2)
+
 
 def main():
     import argparse
@@ -309,10 +558,26 @@ def main():
     parser = argparse.ArgumentParser(description="DS01 State Validation")
     parser.add_argument("--repair", action="store_true", help="Attempt to repair issues")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument(
+        "--watch", action="store_true", help="Validate continuously from Docker events"
+    )
+    parser.add_argument(
+        "--resync",
+        type=float,
+        default=RESYNC_INTERVAL,
+        help=f"Full rescan interval in watch mode, seconds (default: {RESYNC_INTERVAL})",
+    )
 
     args = parser.parse_args()
 
     validator = StateValidator(repair=args.repair)
+    if args.watch:
+        try:
+            validator.watch(resync=args.resync)
+        except KeyboardInterrupt:
+            pass
+        return
+
     result = validator.validate()
 
     if args.json:
@@ -59,6 +59,9 @@ usermod -aG docker "$CANONICAL_USER"
 echo "Adding $CANONICAL_USER to video group..."
 usermod -aG video "$CANONICAL_USER"
 
+# Refresh the cached group snapshot read by the docker/nvidia wrappers
+python3 "$(dirname "$(readlink -f "$0")")/../lib/ds01_identity.py" refresh >/dev/null 2>&1 || true
+
 echo ""
 echo "$CANONICAL_USER has been added to the docker and video groups"
 echo ""
@@ -43,6 +43,15 @@ if [ ! -f "$PARENT_SLICE_FILE" ]; then
     exit 1
 fi
 
+# Reconcile this user's slice (unit file + aggregate limits drop-in, one
+# daemon-reload) and record it in /var/lib/ds01/slice-state, so docker-wrapper.sh
+# can skip this sudo call next time. Falls back to creating the unit file below
+# if the generator is not deployed or fails.
+GENERATOR="$SCRIPT_DIR/generate-user-slice-limits.py"
+if [ -x "$GENERATOR" ] && python3 "$GENERATOR" --user "$USERNAME" --group "$GROUP" >/dev/null 2>&1; then
+    exit 0
+fi
+
 # Check if user slice already exists
 if [ -f "$SLICE_FILE" ]; then
     # Slice already exists, nothing to do
@@ -67,13 +76,6 @@ EOF
 # Reload systemd
 systemctl daemon-reload
 
-# Apply aggregate resource limits from resource-limits.yaml
-# Uses generate-user-slice-limits.py with --user flag for fast single-user update
-# Falls back gracefully if generator not deployed yet
-if [ -x "$SCRIPT_DIR/generate-user-slice-limits.py" ]; then
-    python3 "$SCRIPT_DIR/generate-user-slice-limits.py" --user "$USERNAME" 2>/dev/null || true
-fi
-
 # Note: We don't set resource limits at the user level.
 # Resource limits are enforced at:
 # 1. Group level (via parent slice)
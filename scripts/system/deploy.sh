@@ -375,6 +375,7 @@ deploy_cmd "$INFRA_ROOT/scripts/monitoring/ds01-workloads" "ds01-workloads" "Adm
 deploy_cmd "$INFRA_ROOT/scripts/monitoring/monitoring-status" "monitoring-status" "Admin"
 deploy_cmd "$INFRA_ROOT/scripts/admin/ds01-mig-partition" "ds01-mig-partition" "Admin"
 deploy_cmd "$INFRA_ROOT/scripts/admin/mig-configure" "mig-configure" "Admin"
+deploy_cmd "$INFRA_ROOT/scripts/admin/ds01-warm-images" "ds01-warm-images" "Admin"
 deploy_cmd "$INFRA_ROOT/scripts/monitoring/who-owns-containers.sh" "ds01-who" "Admin"
 deploy_cmd "$INFRA_ROOT/scripts/monitoring/ds01-health-check" "ds01-health" "Admin"
 deploy_cmd "$INFRA_ROOT/scripts/monitoring/audit-system.sh" "ds01-audit" "Admin"
@@ -584,12 +585,29 @@ else
     echo -e "  ${DIM}Workload detector units not found (will be created in Phase 2)${NC}"
 fi
 
+# Deploy identity cache snapshot units (uid/username/group lookups for wrappers and monitors)
+if [ -f "$INFRA_ROOT/config/deploy/systemd/ds01-identity-cache.timer" ] &&
+    [ -f "$INFRA_ROOT/config/deploy/systemd/ds01-identity-cache.service" ]; then
+    cp "$INFRA_ROOT/config/deploy/systemd/ds01-identity-cache.timer" /etc/systemd/system/
+    cp "$INFRA_ROOT/config/deploy/systemd/ds01-identity-cache.service" /etc/systemd/system/
+    systemctl daemon-reload
+    systemctl enable --now ds01-identity-cache.timer >/dev/null 2>&1
+    # Write the first snapshot now rather than a minute after boot
+    systemctl start ds01-identity-cache.service >/dev/null 2>&1 || true
+    if systemctl is-active --quiet ds01-identity-cache.timer; then
+        echo -e "  ${GREEN}✓${NC} Identity cache timer enabled and started"
+    else
+        echo -e "  ${YELLOW}!${NC} Identity cache timer not running (check systemctl status)"
+    fi
+fi
+
 # ---------------------------------------------------------------------------
-# Code-caching daemons: exporter, container-owner-tracker, container-sync
+# Code-caching daemons: exporter, container-owner-tracker, container-sync, gpu-queue,
+# state-validator, notify
 # ---------------------------------------------------------------------------
-# These three long-running services import their Python once at start and only
+# These long-running services import their Python once at start and only
 # pick up new code on restart. Refresh their units (reloading systemd only if a
-# unit actually changed) then try-restart all three, so a deploy propagates code
+# unit actually changed) then try-restart all of them, so a deploy propagates code
 # changes to every one of them — not just the exporter.
 #
 # Replaces the old exporter-only, mtime-gated block: mtime gating was fragile
@@ -599,7 +617,8 @@ fi
 echo -e "${DIM}Refreshing code-caching daemons...${NC}"
 
 units_changed=false
-for unit in ds01-exporter.service ds01-container-owner-tracker.service ds01-container-sync.service; do
+for unit in ds01-exporter.service ds01-container-owner-tracker.service ds01-container-sync.service \
+    ds01-gpu-queue.service ds01-state-validator.service ds01-notify.service; do
     src="$INFRA_ROOT/config/deploy/systemd/$unit"
     dst="/etc/systemd/system/$unit"
     if [ ! -f "$src" ]; then
@@ -618,7 +637,7 @@ done
 # daemon-reload only if a unit file actually changed.
 $units_changed && systemctl daemon-reload
 
-DAEMONS="ds01-exporter ds01-container-owner-tracker ds01-container-sync"
+DAEMONS="ds01-exporter ds01-container-owner-tracker ds01-container-sync ds01-gpu-queue ds01-state-validator ds01-notify"
 systemctl enable $DAEMONS >/dev/null 2>&1 || true
 # Restart the ones that are running so they load the new code; || true tolerates
 # a fresh box where a unit is not yet installed.
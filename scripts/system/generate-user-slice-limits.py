@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 """
 DS01 Infrastructure - Generate User Slice Resource Limits
-Reads config/runtime/resource-limits.yaml and generates systemd drop-in files
-that enforce per-user aggregate resource limits.
+Reads config/runtime/resource-limits.yaml and reconciles the per-user systemd
+slices (unit files and aggregate limit drop-ins) against it.
 
 Usage:
-    generate-user-slice-limits.py [--dry-run] [--verbose] [--user USERNAME]
+    generate-user-slice-limits.py [--dry-run] [--verbose] [--user USERNAME [--group GROUP]]
 
 Purpose:
     This is the foundation of Phase 4 comprehensive resource enforcement.
@@ -16,8 +16,17 @@ Purpose:
     across multiple containers. Container limits (via Docker) remain the primary
     enforcement, but aggregate limits provide an additional safety boundary.
 
+Reconciliation:
+    The desired slice set (one entry per ds01-{group}-{sanitized_user}.slice,
+    indexed by slice name) is computed once, diffed against /etc/systemd/system,
+    and all changes are applied followed by a single daemon-reload. The result is
+    recorded in /var/lib/ds01/slice-state with a generation number that is bumped
+    whenever something changed; docker-wrapper.sh reads it to skip the sudo
+    create-user-slice.sh call when a user's slice is already current.
+
 Output:
-    Creates/updates systemd drop-in files at:
+    Creates/updates slice units and systemd drop-in files at:
+    /etc/systemd/system/ds01-{group}-{sanitized_user}.slice
     /etc/systemd/system/ds01-{group}-{sanitized_user}.slice.d/10-resource-limits.conf
 
     Drop-in format:
@@ -36,14 +45,17 @@ Example:
     # Dry-run to preview changes
     python3 generate-user-slice-limits.py --dry-run
 
-    # Update limits for single user (fast, for create-user-slice.sh integration)
-    sudo python3 generate-user-slice-limits.py --user alice
+    # Reconcile a single user's slice (fast, for create-user-slice.sh integration)
+    sudo python3 generate-user-slice-limits.py --user alice --group student
 """
 
 import argparse
+import fcntl
 import os
 import sys
+import tempfile
 from pathlib import Path
+from typing import NamedTuple
 
 import yaml
 
@@ -69,6 +81,11 @@ except ImportError:
         return sanitized
 
 
+SYSTEMD_DIR = Path("/etc/systemd/system")
+STATE_FILE = Path("/var/lib/ds01/slice-state")
+DROP_IN_NAME = "10-resource-limits.conf"
+
+
 def load_config(config_path: Path) -> dict:
     """Load and parse resource-limits.yaml."""
     if not config_path.exists():
@@ -154,86 +171,180 @@ def generate_drop_in_content(limits: dict) -> str:
     return content
 
 
-def write_drop_in(username: str, group: str, limits: dict, dry_run: bool, verbose: bool) -> bool:
-    """Write drop-in file for a user.
+def generate_slice_unit(username: str, group: str, sanitized: str) -> str:
+    """Generate the user slice unit (same content as create-user-slice.sh writes)."""
+    content = "[Unit]\n"
+    content += f"Description=DS01 {group[:1].upper()}{group[1:]} - {username} ({sanitized})\n"
+    content += "Before=slices.target\n"
+    content += "\n"
+    content += "[Slice]\n"
+    content += f"Slice=ds01-{group}.slice\n"
+    content += "CPUAccounting=true\n"
+    content += "MemoryAccounting=true\n"
+    content += "TasksAccounting=true\n"
+    content += "IOAccounting=true\n"
+    return content
 
-    Returns:
-        True if drop-in was written/updated, False if skipped
-    """
-    sanitized = sanitize_username_for_slice(username)
-    slice_name = f"ds01-{group}-{sanitized}.slice"
-    drop_in_dir = Path(f"/etc/systemd/system/{slice_name}.d")
-    drop_in_file = drop_in_dir / "10-resource-limits.conf"
 
-    content = generate_drop_in_content(limits)
+class SliceSpec(NamedTuple):
+    username: str
+    group: str
+    unit: str
+    drop_in: str | None  # None: no aggregate limits (admin or unconfigured)
 
-    if dry_run:
-        print(f"\n[DRY-RUN] Would write: {drop_in_file}")
-        print(content)
-        return True
 
-    # Check if content already matches (idempotent)
-    if drop_in_file.exists():
-        with open(drop_in_file) as f:
-            existing_content = f.read()
-        if existing_content == content:
-            if verbose:
-                print(f"  ✓ {slice_name} (unchanged)")
-            return False
+def desired_slices(config: dict, users: dict, manage_limits: bool = True) -> dict:
+    """Desired user slices, keyed by slice unit name.
 
-    # Create drop-in directory
-    drop_in_dir.mkdir(parents=True, exist_ok=True)
+    Args:
+        users: {username: group_name}
+        manage_limits: False when aggregate limits are disabled (drop-ins left alone)
 
-    # Write drop-in file
-    with open(drop_in_file, "w") as f:
-        f.write(content)
+    Returns:
+        dict: {slice_name: SliceSpec}
+    """
+    desired = {}
+    for username, group in sorted(users.items()):
+        sanitized = sanitize_username_for_slice(username)
+        slice_name = f"ds01-{group}-{sanitized}.slice"
+        if slice_name in desired:
+            print(
+                f"Warning: {username} and {desired[slice_name].username} both map to {slice_name}",
+                file=sys.stderr,
+            )
+            continue
+        limits = get_aggregate_limits(config, username, group) if manage_limits else None
+        desired[slice_name] = SliceSpec(
+            username=username,
+            group=group,
+            unit=generate_slice_unit(username, group, sanitized),
+            drop_in=generate_drop_in_content(limits) if limits else None,
+        )
+    return desired
 
-    if verbose:
-        print(f"  ✓ {slice_name} (updated)")
 
-    return True
+def _read(path: Path) -> str | None:
+    try:
+        return path.read_text()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
 
 
-def remove_stale_drop_ins(current_users: set, config_dir: Path, dry_run: bool, verbose: bool):
-    """Remove drop-in directories for users no longer in any group."""
-    systemd_dir = Path("/etc/systemd/system")
+def diff_slices(
+    desired: dict, systemd_dir: Path, full: bool, manage_limits: bool = True
+) -> list[tuple[str, Path, str | None]]:
+    """Changes needed to bring systemd_dir to the desired state.
 
-    if not systemd_dir.exists():
-        return
+    Returns:
+        list of (action, path, content): action is "write" or "remove"
+    """
+    changes = []
+    for slice_name, spec in desired.items():
+        if not (systemd_dir / f"ds01-{spec.group}.slice").exists():
+            print(
+                f"Warning: parent slice ds01-{spec.group}.slice missing for {slice_name}",
+                file=sys.stderr,
+            )
+            continue
+        unit_path = systemd_dir / slice_name
+        if _read(unit_path) != spec.unit:
+            changes.append(("write", unit_path, spec.unit))
+        if not manage_limits:
+            continue
+        drop_in_path = systemd_dir / f"{slice_name}.d" / DROP_IN_NAME
+        current = _read(drop_in_path)
+        if spec.drop_in is not None and current != spec.drop_in:
+            changes.append(("write", drop_in_path, spec.drop_in))
+        elif spec.drop_in is None and current is not None:
+            changes.append(("remove", drop_in_path, None))
+
+    # Stale drop-ins: one hash lookup per existing slice.d directory
+    if full and manage_limits and systemd_dir.exists():
+        for drop_in_dir in systemd_dir.glob("ds01-*-*.slice.d"):
+            slice_name = drop_in_dir.name[: -len(".d")]
+            drop_in_path = drop_in_dir / DROP_IN_NAME
+            if slice_name not in desired and drop_in_path.exists():
+                changes.append(("remove", drop_in_path, None))
+    return changes
+
+
+def apply_changes(changes: list, dry_run: bool, verbose: bool) -> int:
+    """Apply changes from diff_slices(); returns the number applied."""
+    applied = 0
+    for action, path, content in changes:
+        label = path.name if path.suffix == ".slice" else f"{path.parent.name}/{path.name}"
+        if dry_run:
+            print(f"\n[DRY-RUN] Would {action}: {path}")
+            if content:
+                print(content)
+            applied += 1
+            continue
+        try:
+            if action == "write":
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(content)
+            else:
+                path.unlink(missing_ok=True)
+                try:
+                    path.parent.rmdir()  # Only if nothing else lives in the drop-in dir
+                except OSError:
+                    pass
+        except OSError as e:
+            print(f"  ! Failed to {action} {path}: {e}", file=sys.stderr)
+            continue
+        applied += 1
+        if verbose:
+            print(f"  {'✓' if action == 'write' else '✗'} {label} ({action}d)")
+    return applied
 
-    # Find all ds01-*-*.slice.d directories
-    for drop_in_dir in systemd_dir.glob("ds01-*-*.slice.d"):
-        # Extract group and sanitized username from path
-        # Format: ds01-{group}-{sanitized_user}.slice.d
-        slice_name = drop_in_dir.name.replace(".d", "")
-        parts = slice_name.split("-")
 
-        if len(parts) < 3:
-            continue
+# Reconciliation state (read by docker-wrapper.sh). Format:
+#   # ds01-slices <generation>
+#   <slice_name>\t<username>\t<group>
+#
+# The file is rewritten on every reconcile, so it is newer than the config
+# inputs exactly when every slice it lists was reconciled against them.
 
-        parts[1]
-        sanitized_user = "-".join(parts[2:]).replace(".slice", "")
 
-        # Check if this sanitized username matches any current user
-        found = False
-        for username in current_users:
-            if sanitize_username_for_slice(username) == sanitized_user:
-                found = True
-                break
+def read_state(path: Path) -> tuple[int, dict]:
+    """Returns (generation, {slice_name: (username, group)})."""
+    slices = {}
+    try:
+        with open(path) as f:
+            header = f.readline().split()
+            generation = int(header[2]) if header[:2] == ["#", "ds01-slices"] else 0
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) == 3:
+                    slices[fields[0]] = (fields[1], fields[2])
+    except (OSError, ValueError, IndexError):
+        return 0, {}
+    return generation, slices
 
-        if not found:
-            if dry_run:
-                print(f"\n[DRY-RUN] Would remove stale: {drop_in_dir}")
-            else:
-                # Remove drop-in directory
-                import shutil
 
-                try:
-                    shutil.rmtree(drop_in_dir)
-                    if verbose:
-                        print(f"  ✗ Removed stale: {slice_name}")
-                except Exception as e:
-                    print(f"  ! Failed to remove {drop_in_dir}: {e}", file=sys.stderr)
+def write_state(path: Path, generation: int, slices: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".slice-state.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(f"# ds01-slices {generation}\n")
+            for slice_name, (username, group) in sorted(slices.items()):
+                f.write(f"{slice_name}\t{username}\t{group}\n")
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except OSError:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def state_is_fresh(path: Path, config_path: Path) -> bool:
+    """True if the state file is newer than resource-limits.yaml and every members file."""
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return False
+    inputs = [config_path, *(config_path.parent / "groups").glob("*.members")]
+    return all(p.stat().st_mtime < mtime for p in inputs if p.exists())
 
 
 def main():
@@ -247,7 +358,12 @@ def main():
     parser.add_argument(
         "--user",
         metavar="USERNAME",
-        help="Only generate limits for specific user (for fast updates)",
+        help="Only reconcile the slice of a specific user (for fast updates)",
+    )
+    parser.add_argument(
+        "--group",
+        metavar="GROUP",
+        help="Group of --user when not listed in a members file (default group users)",
     )
 
     args = parser.parse_args()
@@ -271,61 +387,78 @@ def main():
         print(f"Error: Invalid YAML in {config_path}: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # Check if aggregate limits are enabled
+    # Aggregate limits disabled: slice units are still reconciled, drop-ins are left alone
     enforcement = config.get("enforcement", {})
-    if not enforcement.get("aggregate_limits", False):
+    manage_limits = bool(enforcement.get("aggregate_limits", False))
+    if not manage_limits:
         print("Note: Aggregate limits disabled in config (enforcement.aggregate_limits: false)")
-        if not args.dry_run:
-            sys.exit(0)
 
     # Get all users
     all_users = get_all_users_with_groups(config, config_dir)
 
-    if not all_users:
+    if not all_users and not args.user:
         print("Warning: No users found in group membership files", file=sys.stderr)
         sys.exit(0)
 
-    # Filter to single user if requested
+    lock_fd = None
+    if not args.dry_run:
+        STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        lock_fd = os.open(f"{STATE_FILE}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)  # Concurrent container creates via sudo
+
+    generation, state = read_state(STATE_FILE)
+
     if args.user:
-        if args.user not in all_users:
+        # Single user: members file group wins, --group covers default-group users
+        group = all_users.get(args.user) or args.group
+        if not group:
             print(f"Error: User '{args.user}' not found in any group", file=sys.stderr)
             sys.exit(1)
-        all_users = {args.user: all_users[args.user]}
+        users = {args.user: group}
+        # Entries reconciled before a config change are no longer current
+        if not state_is_fresh(STATE_FILE, config_path):
+            state = {}
+    else:
+        # Full run: members plus default-group users whose slices were created on demand
+        users = dict(all_users)
+        for slice_name, (username, group) in state.items():
+            if username not in users and (SYSTEMD_DIR / slice_name).exists():
+                users[username] = group
+        state = {}
 
     if args.verbose or args.dry_run:
-        print(f"Generating aggregate limit drop-ins for {len(all_users)} user(s)...")
-
-    # Generate drop-ins
-    updated_count = 0
-    skipped_count = 0
-
-    for username, group in sorted(all_users.items()):
-        limits = get_aggregate_limits(config, username, group)
-
-        if limits is None:
+        print(f"Reconciling slices for {len(users)} user(s)...")
+
+    desired = desired_slices(config, users, manage_limits)
+    changes = diff_slices(desired, SYSTEMD_DIR, full=not args.user, manage_limits=manage_limits)
+    updated_count = apply_changes(changes, args.dry_run, args.verbose)
+    touched = {
+        p.name if p.suffix == ".slice" else p.parent.name[: -len(".d")] for _, p, _ in changes
+    }
+    skipped_count = sum(1 for slice_name in desired if slice_name not in touched)
+
+    if not args.dry_run:
+        # One daemon-reload for the whole batch
+        if updated_count > 0:
             if args.verbose:
-                print(f"  - {username} ({group}): No aggregate limits (admin or unconfigured)")
-            skipped_count += 1
-            continue
-
-        if write_drop_in(username, group, limits, args.dry_run, args.verbose):
-            updated_count += 1
-        else:
-            skipped_count += 1
-
-    # Clean up stale drop-ins (only if processing all users, not single user)
-    if not args.user:
-        remove_stale_drop_ins(set(all_users.keys()), config_dir, args.dry_run, args.verbose)
-
-    # Reload systemd if any changes made
-    if updated_count > 0 and not args.dry_run:
-        if args.verbose:
-            print("\nReloading systemd daemon...")
-        os.system("systemctl daemon-reload")
+                print("\nReloading systemd daemon...")
+            os.system("systemctl daemon-reload")
+            generation += 1
+        for slice_name, spec in desired.items():
+            if (SYSTEMD_DIR / slice_name).exists():
+                state[slice_name] = (spec.username, spec.group)
+        try:
+            write_state(STATE_FILE, generation, state)
+        except OSError as e:
+            print(f"Warning: Could not record slice state: {e}", file=sys.stderr)
+        os.close(lock_fd)
 
     # Summary
     if args.verbose or args.dry_run:
-        print(f"\nSummary: {updated_count} updated, {skipped_count} unchanged/skipped")
+        print(
+            f"\nSummary: {updated_count} updated, {skipped_count} unchanged/skipped "
+            f"(generation {generation})"
+        )
 
     sys.exit(0)
 
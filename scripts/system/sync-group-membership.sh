@@ -340,6 +340,11 @@ sync_groups
 # Optionally sync Linux groups (only if running as root)
 if [[ $EUID -eq 0 ]]; then
     sync_linux_groups
+    # Membership may have changed: rewrite the cached identity snapshot
+    if [[ $DRY_RUN != "true" ]]; then
+        python3 "${INFRA_ROOT}/scripts/lib/ds01_identity.py" refresh >/dev/null 2>&1 ||
+            log "Identity snapshot refresh failed"
+    fi
 else
     log "Not running as root - skipping Linux group sync"
 fi
@@ -549,19 +549,20 @@ class TestIdleDetectionWindow:
 
     @pytest.mark.integration
     def test_activity_resets_streak(self, mock_env):
-        """Activity detection resets IDLE_STREAK to 0 and WARNED to false."""
+        """Activity detection resets IDLE_STREAK to 0 and starts a new warning episode."""
         mock_env.set_state_file(
-            "test-ctr", idle_streak="5", warned="true", last_activity="1699999000", last_cpu="0.0"
+            "test-ctr", idle_streak="5", last_activity="1699999000", last_cpu="0.0"
         )
         code = mock_env.harness_idle(
             'update_activity "test-ctr" "true"\n'
             f'source "{mock_env.state_dir}/test-ctr.state"\n'
             'echo "streak:$IDLE_STREAK"\n'
-            'echo "warned:$WARNED"'
+            'echo "activity:$LAST_ACTIVITY"'
         )
         result = mock_env.run(code)
         assert "streak:0" in result.stdout
-        assert "warned:false" in result.stdout
+        # LAST_ACTIVITY is the episode the notification index keys warnings on
+        assert "activity:1699999000" not in result.stdout
 
     @pytest.mark.integration
     def test_group_specific_detection_window(self, mock_env):
@@ -628,42 +629,36 @@ class TestExemptUserIdleHandling:
 
     @pytest.mark.integration
     def test_fyi_warning_sent_once(self, mock_env):
-        """FYI warning for exempt users fires once, then suppressed by WARNED flag."""
-        mock_env.set_state_file(
-            "exempt-ctr",
-            idle_streak="5",
-            warned="false",
-            last_activity="1699990000",
-            last_cpu="0.0",
-        )
+        """FYI warning for exempt users fires once per idle period (notification index)."""
+        index = mock_env.root / "notify-index.tsv"
         code = mock_env.harness_idle(
-            f'state_file="{mock_env.state_dir}/exempt-ctr.state"\n'
-            'source "$state_file"\n'
+            f'DS01_NOTIFY_INDEX="{index}"\n'
+            "last_activity=1699990000\n"
             "is_exempt=true\n"
             "idle_seconds=2000\n"
             "warning_seconds=1800\n"
-            # First check
-            'if [ "$is_exempt" = true ]; then\n'
-            '    if [ "$idle_seconds" -ge "$warning_seconds" ] && [ "$WARNED" != "true" ]; then\n'
-            '        echo "action:send_fyi"\n'
-            '        sed -i "s/^WARNED=.*/WARNED=true/" "$state_file"\n'
-            "    else\n"
-            '        echo "action:none"\n'
-            "    fi\n"
-            "fi\n"
-            # Second check
-            'source "$state_file"\n'
-            'if [ "$is_exempt" = true ]; then\n'
-            '    if [ "$idle_seconds" -ge "$warning_seconds" ] && [ "$WARNED" != "true" ]; then\n'
-            '        echo "second:send_fyi"\n'
-            "    else\n"
-            '        echo "second:suppressed"\n'
+            "check() {\n"
+            '    if [ "$is_exempt" = true ]; then\n'
+            '        if [ "$idle_seconds" -ge "$warning_seconds" ] &&\n'
+            '            ds01_notify_due testuser exempt-ctr idle.notice 0 "$last_activity"; then\n'
+            '            echo "$1:send_fyi"\n'
+            "        else\n"
+            '            echo "$1:suppressed"\n'
+            "        fi\n"
             "    fi\n"
-            "fi"
+            "}\n"
+            "check first\n"
+            # ds01-notify records the delivery in the index
+            f'printf \'testuser|exempt-ctr|idle.notice\\t%s\\t1699990000\\n\' "$(date +%s)" >"{index}"\n'
+            "check second\n"
+            # Activity started a new idle period
+            "last_activity=1699995000\n"
+            "check third"
         )
         result = mock_env.run(code)
-        assert "action:send_fyi" in result.stdout
+        assert "first:send_fyi" in result.stdout
         assert "second:suppressed" in result.stdout
+        assert "third:send_fyi" in result.stdout
 
     @pytest.mark.integration
     def test_exempt_user_never_stopped(self, mock_env):
@@ -780,24 +775,24 @@ class TestMaxRuntimeExemption:
 
     @pytest.mark.integration
     def test_warning_at_90_percent(self, mock_env):
-        """Warning sent when runtime reaches 90% of limit."""
-        mock_env.set_state_file("warn-ctr", warned="false")
+        """Warning sent when runtime reaches 90% of limit, once per container run."""
+        index = mock_env.root / "notify-index.tsv"
+        index.write_text("testuser|warn-ctr|runtime.final\t1700000000\t1699000000\n")
 
         code = mock_env.harness_runtime(
-            f'state_file="{mock_env.state_dir}/warn-ctr.state"\n'
-            'source "$state_file"\n'
+            f'DS01_NOTIFY_INDEX="{index}"\n'
             "runtime_seconds=86400\n"  # 24h
             "warning_seconds=$((runtime_seconds * 90 / 100))\n"
             "runtime_seconds_actual=79200\n"  # 22h — past 90%
-            'if [ "$runtime_seconds_actual" -ge "$warning_seconds" ] && [ "$WARNED" != "true" ]; then\n'
-            '    echo "action:warn"\n'
-            '    sed -i "s/^WARNED=.*/WARNED=true/" "$state_file"\n'
-            "else\n"
-            '    echo "action:none"\n'
-            "fi\n"
-            'source "$state_file"\n'
-            'echo "warned:$WARNED"'
+            "for start_time in 1699000000 1699500000; do\n"
+            '    if [ "$runtime_seconds_actual" -ge "$warning_seconds" ] &&\n'
+            '        ds01_notify_due testuser warn-ctr runtime.final 0 "$start_time"; then\n'
+            '        echo "$start_time:warn"\n'
+            "    else\n"
+            '        echo "$start_time:none"\n'
+            "    fi\n"
+            "done"
         )
         result = mock_env.run(code)
-        assert "action:warn" in result.stdout
-        assert "warned:true" in result.stdout
+        assert "1699000000:none" in result.stdout  # already warned during this run
+        assert "1699500000:warn" in result.stdout  # restarted container
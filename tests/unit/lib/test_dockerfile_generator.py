@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for /opt/ds01-infra/scripts/lib/dockerfile-generator.sh
+
+Covers the cache-friendly layer order (shared layers first, per-user metadata
+last), BuildKit cache mounts, the warm image being a byte-identical prefix of
+user Dockerfiles, and image-update's pip line matching.
+"""
+
+import subprocess
+from pathlib import Path
+
+GENERATOR = Path(__file__).resolve().parents[3] / "scripts" / "lib" / "dockerfile-generator.sh"
+BASE = "aimehub/pytorch-2.5.1-aime-cuda12.1.1:latest"
+
+
+def run_generator(commands: str) -> str:
+    result = subprocess.run(
+        ["bash", "-c", f'source "{GENERATOR}"\n{commands}'],
+        capture_output=True,
+        text=True,
+        timeout=10,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def instructions(dockerfile: str) -> list[str]:
+    """Dockerfile instructions with continuation lines joined, comments dropped."""
+    joined = dockerfile.replace("\\\n", "")
+    return [line for line in joined.splitlines() if line and not line.startswith("#")]
+
+
+def generate(tmp_path, *extra: str) -> str:
+    output = tmp_path / "Dockerfile"
+    args = " ".join(extra)
+    run_generator(
+        f'generate_dockerfile --output "{output}" --base-image "{BASE}" --project proj '
+        f"--user-id 1001 --username alice {args} >/dev/null"
+    )
+    return output.read_text()
+
+
+class TestLayerOrder:
+    def test_metadata_after_all_package_layers(self, tmp_path):
+        steps = instructions(generate(tmp_path, '--python-packages "numpy torch"'))
+        last_run = max(i for i, s in enumerate(steps) if s.startswith("RUN"))
+        first_meta = min(i for i, s in enumerate(steps) if s.startswith(("LABEL", "ARG")))
+        assert first_meta > last_run
+        assert steps[0] == f"FROM {BASE}"
+
+    def test_user_system_packages_get_own_layer(self, tmp_path):
+        steps = instructions(generate(tmp_path, '--system-packages "ffmpeg"'))
+        apt = [s for s in steps if "apt-get install" in s]
+        assert len(apt) == 2
+        assert "ffmpeg" not in apt[0]
+        assert apt[1].rstrip().endswith("ffmpeg")
+
+    def test_cache_mounts_replace_no_cache_dir(self, tmp_path):
+        dockerfile = generate(tmp_path, '--python-packages "numpy"')
+        assert "--no-cache-dir" not in dockerfile
+        assert "rm -rf /var/lib/apt/lists" not in dockerfile
+        assert "--mount=type=cache,id=ds01-pip" in dockerfile
+        assert "--mount=type=cache,id=ds01-apt-lists" in dockerfile
+
+
+class TestWarmImage:
+    def test_warm_layers_are_prefix_of_image_create_layers(self, tmp_path):
+        # image-create writes the same helpers in the same order for the default choices
+        warm = tmp_path / "warm"
+        user = tmp_path / "user"
+        run_generator(
+            f'generate_warm_dockerfile "{warm}" "{BASE}" >/dev/null\n'
+            f'echo "FROM {BASE}" > "{user}"\n'
+            f'_write_apt_install "{user}" "$DS01_BASE_SYSTEM_PACKAGES"\n'
+            f'_write_pip_install "{user}" "$DS01_JUPYTER_PACKAGES"\n'
+            f'_write_pip_install "{user}" "$DS01_DATA_SCIENCE_PACKAGES"\n'
+            f'_write_pip_install "{user}" "transformers"\n'
+        )
+        warm_steps = [s for s in instructions(warm.read_text()) if not s.startswith("LABEL")]
+        user_steps = instructions(user.read_text())
+        assert user_steps[: len(warm_steps)] == warm_steps
+        assert len(warm_steps) == 4
+
+
+class TestPipLineMatching:
+    def test_regex_matches_old_and_new_forms(self):
+        out = run_generator(
+            "for line in 'RUN pip install --no-cache-dir \\\\' "
+            '"RUN $DS01_PIP_CACHE_MOUNT pip install \\\\" '
+            "'RUN apt-get update'; do\n"
+            "  [[ $line =~ $DS01_PIP_RUN_REGEX ]] && echo yes || echo no\n"
+            "done"
+        )
+        assert out.split() == ["yes", "yes", "no"]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_accounting.py (usage accounting ledger)
+/opt/ds01-infra/tests/unit/lib/test_ds01_accounting.py
+
+Run: pytest tests/unit/lib/test_ds01_accounting.py -v
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+from ds01_accounting import (  # noqa: E402
+    compact,
+    open_intervals,
+    record_close,
+    record_open,
+    tick,
+    usage_totals,
+)
+
+T0 = datetime(2026, 3, 2, 12, 0).timestamp()
+CID = "c" * 64
+
+
+def _cgroup(root, usage_usec):
+    root.mkdir(exist_ok=True)
+    (root / "cpu.stat").write_text(f"usage_usec {usage_usec}\nuser_usec 0\n")
+    return {CID: root}
+
+
+def _ledger(acct, day):
+    return [
+        json.loads(line) for line in (acct / "ledger" / f"{day}.jsonl").read_text().splitlines()
+    ]
+
+
+class TestIntervals:
+    def test_tick_and_close_integrate_gpueq_cpu_and_energy(self, tmp_path):
+        acct = tmp_path / "acct"
+        cg = tmp_path / "cg"
+        assert record_open(
+            "proj._.1001", "alice", {"0": 1.0, "1.2": 0.25}, ts=T0, accounting_dir=acct
+        )
+        # docker create event for the same container only binds its ID
+        assert record_open("proj._.1001", "bob", {"3": 1.0}, CID, ts=T0 + 5, accounting_dir=acct)
+        interval = open_intervals(acct)["proj._.1001"]
+        assert interval["user"] == "alice" and interval["gpueq"] == 1.25
+        assert interval["container_id"] == CID
+
+        # First pass sees the cgroup: baseline only, no CPU charged yet
+        power = {"0": 200.0, "1": 100.0}
+        assert tick(T0 + 300, _cgroup(cg, 5_000_000), power, acct) == 1
+        assert tick(T0 + 600, _cgroup(cg, 65_000_000), power, acct) == 1
+        assert record_close("gone", accounting_dir=acct)  # Unknown: no-op
+        assert record_close("other", CID[:12], T0 + 660, _cgroup(cg, 71_000_000), acct)
+        assert open_intervals(acct) == {}
+
+        usage = [e for e in _ledger(acct, "2026-03-02") if e["type"] == "usage"]
+        assert [e["gpueq_s"] for e in usage] == [375.0, 375.0, 75.0]
+        assert "cpu_s" not in usage[0]
+        assert [e["cpu_s"] for e in usage[1:]] == [60.0, 6.0]
+        # 200 W (full GPU 0) + 100 W x 0.25 (MIG slice of GPU 1)
+        assert [e["energy_j"] for e in usage] == [67500.0, 67500.0, 13500.0]
+
+    def test_usage_across_midnight_is_split(self, tmp_path):
+        acct = tmp_path / "acct"
+        late = datetime(2026, 3, 2, 23, 50).timestamp()
+        record_open("proj._.1001", "alice", {"0": 1.0}, ts=late, accounting_dir=acct)
+        tick(late + 1200, accounting_dir=acct)
+
+        (before,) = [e for e in _ledger(acct, "2026-03-02") if e["type"] == "usage"]
+        (after,) = _ledger(acct, "2026-03-03")
+        assert before["gpueq_s"] == 600.0 and after["gpueq_s"] == 600.0
+
+    def test_failures_never_raise(self, tmp_path):
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        assert record_open("proj._.1001", "alice", {"0": 1.0}, accounting_dir=blocker) is False
+        assert record_close("proj._.1001", accounting_dir=blocker) is False
+        assert tick(accounting_dir=blocker) == 0
+        assert record_open("", "alice", {"0": 1.0}, accounting_dir=tmp_path) is False
+
+
+class TestCompaction:
+    def _two_days(self, acct):
+        for day, hours in ((2, 2), (3, 1)):
+            start = datetime(2026, 3, day, 9, 0).timestamp()
+            record_open(f"p{day}._.1001", "alice", {"0": 1.0}, ts=start, accounting_dir=acct)
+            record_close(f"p{day}._.1001", ts=start + hours * 3600, accounting_dir=acct)
+        record_open("q._.1002", "bob", {"1": 0.5}, ts=T0, accounting_dir=acct)
+        record_close("q._.1002", ts=T0 + 3600, accounting_dir=acct)
+
+    def test_daily_totals_and_range(self, tmp_path):
+        acct = tmp_path / "acct"
+        self._two_days(acct)
+
+        day = compact("2026-03-02", acct, now=T0 + 86400)
+        assert day["final"]
+        assert day["users"]["alice"]["gpueq_s"] == 7200.0
+        assert day["containers"]["q._.1002"] == {
+            "user": "bob",
+            "gpueq_s": 1800.0,
+            "cpu_s": 0.0,
+            "energy_j": 0.0,
+        }
+
+        totals = usage_totals("2026-03-01", "2026-03-03", acct)
+        assert totals["days"] == ["2026-03-02", "2026-03-03"]
+        assert totals["users"]["alice"]["gpueq_s"] == 3 * 3600.0
+        assert set(totals["containers"]) == {"p2._.1001", "p3._.1001", "q._.1002"}
+
+    def test_final_day_not_reread(self, tmp_path):
+        acct = tmp_path / "acct"
+        self._two_days(acct)
+        compact("2026-03-02", acct, now=T0 + 86400)
+        (acct / "ledger" / "2026-03-02.jsonl").unlink()
+
+        assert compact("2026-03-02", acct)["users"]["alice"]["gpueq_s"] == 7200.0
+        partial = compact("2026-03-03", acct, now=T0)  # Built before the day ended
+        assert not partial["final"]
+        assert compact("2026-03-03", acct, now=T0 + 3 * 86400)["final"]
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_event_index.py (indexed event log scanning)
+/opt/ds01-infra/tests/unit/lib/test_ds01_event_index.py
+
+Builds a fake /var/log/ds01 with a live events.jsonl plus gzipped and
+uncompressed rotated archives, and checks scan_events() against a naive
+full-parse reference scan, including archives packed as hourly gzip frames.
+
+Run: pytest tests/unit/lib/test_ds01_event_index.py -v
+"""
+
+import gzip
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+import ds01_event_index  # noqa: E402
+import pytest  # noqa: E402
+from ds01_event_index import (  # noqa: E402
+    build_all,
+    index_path,
+    iter_events,
+    load_index,
+    pack_archive,
+    scan_events,
+)
+
+MARCH_START = datetime(2026, 3, 1, tzinfo=timezone.utc).timestamp()
+APRIL_START = datetime(2026, 4, 1, tzinfo=timezone.utc).timestamp()
+
+
+def _event(ts: str, etype: str, user: str = "alice", **details) -> str:
+    event = {"timestamp": ts, "event_type": etype, "user": user, "schema_version": "1"}
+    if details:
+        event["details"] = details
+    return json.dumps(event, separators=(",", ":"))
+
+
+def _write(path: Path, lines: list[str]) -> Path:
+    data = "\n".join(lines) + "\n"
+    if path.suffix == ".gz":
+        with gzip.open(path, "wt") as f:
+            f.write(data)
+    else:
+        path.write_text(data)
+    return path
+
+
+def reference_scan(events_file, start_ts, end_ts, match_types, collect):
+    """Full-parse scan (the original ds01-monthly-report algorithm, dual-schema)."""
+    files = sorted(events_file.parent.glob("events.jsonl-*.gz"))
+    files += sorted(events_file.parent.glob("events.jsonl-*[0-9]"))
+    files.append(events_file)
+    counts = {}
+    for f in files:
+        opener = gzip.open(f, "rt") if f.suffix == ".gz" else open(f)
+        with opener as fh:
+            for line in fh:
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                etype = event.get("event_type") or event.get("event") or ""
+                ts_str = event.get("timestamp") or event.get("ts")
+                if etype not in match_types or not ts_str:
+                    continue
+                ts = datetime.fromisoformat(ts_str.replace("Z", "+00:00")).timestamp()
+                if start_ts <= ts <= end_ts:
+                    counts[etype] = counts.get(etype, 0) + 1
+                    if etype in collect:
+                        entry = {"user": event.get("user", "unknown"), "ts": ts}
+                        entry.update(event.get("details", {}))
+                        collect[etype].append(entry)
+    return counts
+
+
+@pytest.fixture
+def events_file(temp_dir) -> Path:
+    """Log dir spanning February to April with boundary-straddling archives."""
+    _write(
+        temp_dir / "events.jsonl-20260215.gz",
+        [
+            _event("2026-02-14T10:00:00Z", "container.create", container="old"),
+            _event("2026-02-15T00:00:00Z", "gpu.rejected"),
+        ],
+    )
+    _write(
+        temp_dir / "events.jsonl-20260301.gz",
+        [
+            _event("2026-02-28T23:59:59.900000Z", "container.create", container="feb"),
+            _event("2026-03-01T00:00:00Z", "container.create", container="first"),
+            _event("2026-03-01T00:00:00.500000+00:00", "gpu.rejected", user="bob"),
+            "not json at all",
+        ],
+    )
+    _write(
+        temp_dir / "events.jsonl-20260315.gz",
+        [
+            _event("2026-03-14T09:00:00Z", "container.create", container="mid"),
+            _event("2026-03-14T09:05:00Z", "user.added", user="carol"),
+            _event("2026-03-14T09:06:00Z", "maintenance.idle_kill"),
+            '{"ts":"2026-03-14T10:00:00Z","event":"user.added","user":"legacy"}',
+        ],
+    )
+    _write(
+        temp_dir / "events.jsonl-20260401",
+        [
+            _event("2026-03-31T23:59:59Z", "user.added", user="dave"),
+            _event("2026-04-01T00:00:00.250000Z", "user.added", user="erin"),
+            _event("2026-03-31T22:00:00+02:00", "container.create", container="tz"),
+        ],
+    )
+    live = _write(
+        temp_dir / "events.jsonl",
+        [_event("2026-04-02T08:00:00Z", "container.create", container="april")],
+    )
+    return live
+
+
+MATCH = {"container.create", "gpu.rejected", "user.added", "maintenance.idle_kill"}
+
+
+class TestScanEvents:
+    """scan_events() must agree with the naive full scan."""
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_matches_reference_scan(self, events_file, workers):
+        expected_collect = {"container.create": [], "gpu.rejected": []}
+        expected = reference_scan(events_file, MARCH_START, APRIL_START, MATCH, expected_collect)
+
+        # Cold (builds sidecars) and warm (uses sidecars) runs must agree
+        for _ in range(2):
+            collect = {"container.create": [], "gpu.rejected": []}
+            counts = scan_events(
+                MARCH_START, APRIL_START, MATCH, collect, events_file=events_file, workers=workers
+            )
+            assert counts == expected
+            assert collect == expected_collect
+
+    def test_legacy_schema_counted(self, events_file):
+        counts = scan_events(
+            MARCH_START, APRIL_START, {"user.added"}, events_file=events_file, workers=1
+        )
+        assert counts == {"user.added": 3}  # carol, legacy, dave
+
+    def test_boundary_fractional_seconds(self, events_file):
+        collect = {"container.create": []}
+        scan_events(MARCH_START, APRIL_START, {"container.create"}, collect, events_file, workers=1)
+        containers = [e["container"] for e in collect["container.create"]]
+        assert "feb" not in containers
+        assert containers == ["first", "mid", "tz"]
+
+    def test_builds_sidecars_for_rotated_archives_only(self, events_file):
+        scan_events(MARCH_START, APRIL_START, MATCH, events_file=events_file, workers=1)
+        sidecars = sorted(p.name for p in events_file.parent.glob("*.idx.json"))
+        assert sidecars == [
+            "events.jsonl-20260215.gz.idx.json",
+            "events.jsonl-20260301.gz.idx.json",
+            "events.jsonl-20260315.gz.idx.json",
+            "events.jsonl-20260401.idx.json",
+        ]
+        idx = load_index(events_file.parent / "events.jsonl-20260301.gz")
+        assert idx["first_ts"] == "2026-02-28T23:59:59"
+        assert idx["last_ts"] == "2026-03-01T00:00:00"
+        assert idx["counts"] == {"container.create": 2, "gpu.rejected": 1}
+
+    def test_indexed_archives_outside_window_are_not_opened(self, events_file, monkeypatch):
+        build_all(events_file)
+        opened = []
+        real_open = ds01_event_index._open_events
+        monkeypatch.setattr(
+            ds01_event_index,
+            "_open_events",
+            lambda p, ranges=None: opened.append(p.name) or real_open(p, ranges),
+        )
+
+        counts = scan_events(
+            MARCH_START, APRIL_START, {"gpu.rejected"}, events_file=events_file, workers=1
+        )
+        assert counts == {"gpu.rejected": 1}
+        # Feb archive out of range, mid-March archive has no gpu.rejected
+        assert "events.jsonl-20260215.gz" not in opened
+        assert "events.jsonl-20260315.gz" not in opened
+
+    def test_count_only_served_from_index(self, events_file, monkeypatch):
+        build_all(events_file)
+        opened = []
+        real_open = ds01_event_index._open_events
+        monkeypatch.setattr(
+            ds01_event_index,
+            "_open_events",
+            lambda p, ranges=None: opened.append(p.name) or real_open(p, ranges),
+        )
+
+        counts = scan_events(
+            MARCH_START, APRIL_START, {"maintenance.idle_kill"}, events_file=events_file, workers=1
+        )
+        assert counts == {"maintenance.idle_kill": 1}
+        assert "events.jsonl-20260315.gz" not in opened
+
+    def test_stale_sidecar_is_rebuilt(self, events_file):
+        archive = events_file.parent / "events.jsonl-20260401"
+        build_all(events_file)
+        _write(archive, [_event("2026-03-20T12:00:00Z", "user.added", user="zed")])
+        assert load_index(archive) is None
+
+        counts = scan_events(
+            MARCH_START, APRIL_START, {"user.added"}, events_file=events_file, workers=1
+        )
+        assert counts == {"user.added": 3}  # carol, legacy, zed
+        assert load_index(archive)["counts"] == {"user.added": 1}
+
+    def test_unparseable_timestamp_left_out_of_index(self, events_file):
+        archive = _write(
+            events_file.parent / "events.jsonl-20260320",
+            [
+                _event("2026-03-19T12:00:00+01:00", "user.added", user="frank"),
+                _event("yesterday", "user.added", user="ghost"),
+            ],
+        )
+        build_all(events_file)
+        idx = load_index(archive)
+        assert idx["counts"] == {"user.added": 1}
+        assert idx["first_ts"] == idx["last_ts"] == "2026-03-19T11:00:00"
+
+
+class TestBuildAll:
+    """Tests for the logrotate-driven index maintenance entry point."""
+
+    def test_builds_missing_and_skips_valid(self, events_file):
+        assert build_all(events_file) == 4
+        assert build_all(events_file) == 0
+        assert build_all(events_file, force=True) == 4
+
+    def test_removes_orphaned_sidecars(self, events_file):
+        build_all(events_file)
+        archive = events_file.parent / "events.jsonl-20260401"
+        archive.unlink()
+        build_all(events_file)
+        assert not index_path(archive).exists()
+
+
+@pytest.fixture
+def hourly_archive(temp_dir) -> Path:
+    """Uncompressed rotation with container.create every 20 minutes on 2026-03-01."""
+    lines = []
+    for hour in range(24):
+        for minute in (0, 20, 40):
+            ts = f"2026-03-01T{hour:02d}:{minute:02d}:00Z"
+            lines.append(_event(ts, "container.create", container=f"c{hour}-{minute}"))
+        lines.append(_event(f"2026-03-01T{hour:02d}:30:00Z", "gpu.allocate"))
+    lines.insert(5, "not json at all")
+    return _write(temp_dir / "events.jsonl-20260302", lines)
+
+
+class TestFramedArchives:
+    """Hourly gzip members with per-frame offsets in the sidecar."""
+
+    def test_pack_writes_plain_gzip_with_hourly_frames(self, hourly_archive):
+        original = hourly_archive.read_text()
+        mtime = hourly_archive.stat().st_mtime
+
+        packed = pack_archive(hourly_archive)
+        assert packed.name == "events.jsonl-20260302.gz"
+        assert not hourly_archive.exists()
+        assert packed.stat().st_mtime == mtime  # Retention by age is unaffected
+        with gzip.open(packed, "rt") as f:
+            assert f.read() == original  # Still readable by zcat/jq
+
+        idx = load_index(packed)
+        assert len(idx["frames"]) == 24
+        assert idx["counts"] == {"container.create": 72, "gpu.allocate": 24}
+        frame = idx["frames"][13]
+        assert (frame["first_ts"], frame["last_ts"]) == (
+            "2026-03-01T13:00:00",
+            "2026-03-01T13:40:00",
+        )
+        assert build_all(hourly_archive.parent / "events.jsonl", force=True) == 1
+        assert load_index(packed)["frames"] == idx["frames"]  # Rebuilt by member scan
+        assert pack_archive(packed) == packed  # Already framed
+
+    def test_scan_decompresses_only_boundary_frames(self, hourly_archive, monkeypatch):
+        packed = pack_archive(hourly_archive)
+        events_file = packed.parent / "events.jsonl"
+        start = datetime(2026, 3, 1, 10, 30, tzinfo=timezone.utc).timestamp()
+        end = datetime(2026, 3, 1, 14, 10, tzinfo=timezone.utc).timestamp()
+        scanned = []
+        real_open = ds01_event_index._open_events
+        monkeypatch.setattr(
+            ds01_event_index,
+            "_open_events",
+            lambda p, ranges=None: scanned.append(ranges) or real_open(p, ranges),
+        )
+
+        counts = scan_events(start, end, {"container.create"}, events_file=events_file, workers=1)
+        assert counts == {"container.create": 11}  # 10:40 .. 14:00
+        offsets = {f["offset"]: f["first_ts"][:13] for f in load_index(packed)["frames"]}
+        assert [offsets[o] for o, _ in scanned[0]] == ["2026-03-01T10", "2026-03-01T14"]
+
+        collect = {"container.create": []}
+        scan_events(start, end, {"container.create"}, collect, events_file, workers=1)
+        assert collect["container.create"][0]["container"] == "c10-40"
+        assert len(collect["container.create"]) == 11
+
+    def test_iter_events_reads_backup_dir_and_filters(self, hourly_archive, events_file):
+        backup = events_file.parent / "backup"
+        backup.mkdir()
+        packed = pack_archive(hourly_archive)
+        packed.rename(backup / packed.name)
+        index_path(packed).rename(backup / index_path(packed).name)
+
+        start = datetime(2026, 3, 1, 22, 0, tzinfo=timezone.utc).timestamp()
+        lines = list(iter_events(start, APRIL_START, "gpu.", events_file, archive_dir=backup))
+        stamps = [json.loads(line)["timestamp"] for line in lines]
+        assert stamps == ["2026-03-01T22:30:00Z", "2026-03-01T23:30:00Z"]
+        assert all(line.endswith("\n") for line in lines)
+
+        lines = list(iter_events(start, APRIL_START, "user.", events_file, archive_dir=backup))
+        assert [json.loads(line)["user"] for line in lines] == ["carol", "legacy", "dave"]
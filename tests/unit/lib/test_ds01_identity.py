@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_identity.py / ds01_identity.sh (cached uid/username/group resolution)
+/opt/ds01-infra/tests/unit/lib/test_ds01_identity.py
+
+NSS is stubbed by counting calls to the module's resolvers; the bash helper
+is run against the same snapshot file.
+
+Run: pytest tests/unit/lib/test_ds01_identity.py -v
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+import ds01_identity  # noqa: E402
+import pytest  # noqa: E402
+from ds01_identity import group_members, in_group, name_to_uid, uid_to_name  # noqa: E402
+
+USERS = {"alice": (1001, 1001), "h.baker@hertie-school.lan": (1722830498, 1722800513)}
+GROUPS = {"alice": ("alice", "ds01-admin", "docker")}
+
+
+@pytest.fixture
+def nss(tmp_path, monkeypatch):
+    """Stub NSS with call counting; snapshot path under tmp_path."""
+    calls = []
+
+    def user(name):
+        calls.append(("user", name))
+        return USERS.get(name)
+
+    def uid(value):
+        calls.append(("uid", value))
+        return next((n for n, (u, _) in USERS.items() if u == value), None)
+
+    monkeypatch.setattr(ds01_identity, "_nss_user", user)
+    monkeypatch.setattr(ds01_identity, "_nss_uid", uid)
+    monkeypatch.setattr(ds01_identity, "_nss_groups", lambda name, gid: GROUPS.get(name, ()))
+    monkeypatch.setattr(
+        ds01_identity, "_nss_group", lambda g: (1500, ("alice",)) if g == "ds01-admin" else None
+    )
+    monkeypatch.setattr(ds01_identity, "_tracked_groups", lambda: {"ds01-admin"})
+    monkeypatch.setattr(ds01_identity, "SNAPSHOT_FILE", tmp_path / "identity.tsv")
+    # Trust snapshots written by the test user, so the suite also runs unprivileged
+    monkeypatch.setattr(
+        ds01_identity,
+        "_trusted",
+        lambda st: st.st_uid == os.geteuid() and not st.st_mode & 0o022,
+    )
+    ds01_identity.clear_cache()
+    yield calls
+    ds01_identity.clear_cache()
+
+
+class TestInProcessCache:
+    def test_hits_and_misses_are_cached(self, nss):
+        assert uid_to_name("1722830498") == "h.baker@hertie-school.lan"
+        assert uid_to_name(1722830498) == "h.baker@hertie-school.lan"
+        assert uid_to_name(4242) is None
+        assert uid_to_name(4242) is None
+        assert uid_to_name("not-a-uid") is None
+        assert nss == [("uid", 1722830498), ("uid", 4242)]
+
+    def test_negative_entries_expire_first(self, nss, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(ds01_identity.time, "monotonic", lambda: now[0])
+        uid_to_name(1001)
+        uid_to_name(4242)
+        now[0] += ds01_identity.NEGATIVE_TTL + 1
+        uid_to_name(1001)
+        uid_to_name(4242)
+        assert nss == [("uid", 1001), ("uid", 4242), ("uid", 4242)]
+
+    def test_lru_evicts_oldest(self):
+        cache = ds01_identity._LRU(maxsize=2)
+        cache.put(("uid", 1), "a")
+        cache.put(("uid", 2), "b")
+        cache.get(("uid", 1))
+        cache.put(("uid", 3), "c")
+        assert cache.get(("uid", 2)) is ds01_identity._MISS
+        assert cache.get(("uid", 1)) == "a"
+
+
+class TestSnapshot:
+    def test_refresh_then_lookups_skip_nss(self, nss, tmp_path):
+        path = tmp_path / "identity.tsv"
+        assert ds01_identity.refresh_snapshot(path, users={"alice", "ghost"}) == 1
+        assert path.read_text().splitlines()[1:] == [
+            "user\talice\t1001\t1001\talice,ds01-admin,docker",
+            "group\tds01-admin\t1500\talice",
+        ]
+
+        nss.clear()
+        assert uid_to_name(1001) == "alice"
+        assert name_to_uid("alice") == 1001
+        assert group_members("ds01-admin") == ["alice"]
+        assert nss == []
+
+    def test_in_group_always_asks_nss(self, nss, tmp_path):
+        ds01_identity.refresh_snapshot(tmp_path / "identity.tsv", users={"alice"})
+        nss.clear()
+        assert in_group("alice", "ds01-admin")
+        assert in_group("alice", "ds01-admin")
+        assert nss == [("user", "alice"), ("user", "alice")]
+
+    def test_writable_or_foreign_snapshot_is_ignored(self, nss, tmp_path):
+        path = tmp_path / "identity.tsv"
+        path.write_text(f"# ds01-identity {int(time.time())}\nuser\tbob\t1002\t1002\tbob\n")
+        path.chmod(0o666)
+        assert uid_to_name(1002) is None
+
+        ds01_identity.clear_cache()
+        path.chmod(0o644)
+        assert uid_to_name(1002) == "bob"
+
+        ds01_identity.clear_cache()
+        if os.geteuid() == 0:
+            os.chown(path, 1002, 1002)
+            assert uid_to_name(1002) is None
+
+    def test_only_root_owned_snapshots_are_trusted(self, tmp_path):
+        path = tmp_path / "identity.tsv"
+        path.write_text("")
+        path.chmod(0o644)
+        st = path.stat()
+        assert ds01_identity._trusted(st) == (st.st_uid == 0)
+        path.chmod(0o664)
+        assert not ds01_identity._trusted(path.stat())
+
+    def test_stale_snapshot_is_ignored(self, nss, tmp_path):
+        path = tmp_path / "identity.tsv"
+        generated = int(time.time()) - ds01_identity.SNAPSHOT_MAX_AGE - 60
+        path.write_text(f"# ds01-identity {generated}\nuser\tbob\t1002\t1002\tbob\n")
+        assert uid_to_name(1002) is None
+        assert nss == [("uid", 1002)]
+
+    def test_bash_helper_reads_snapshot(self, nss, tmp_path):
+        path = tmp_path / "identity.tsv"
+        ds01_identity.refresh_snapshot(path, users={"alice"})
+        script = (
+            f"source {lib_path / 'ds01_identity.sh'}; "
+            f"DS01_IDENTITY_SNAPSHOT={path}; DS01_IDENTITY_OWNER={os.geteuid()}; "
+            "ds01_uid_to_name 1001; ds01_name_to_uid alice; ds01_user_groups alice; "
+            # Membership checks never trust the snapshot
+            "ds01_user_in_group alice ds01-admin || echo not-admin"
+        )
+        result = subprocess.run(
+            ["bash", "-c", script],
+            capture_output=True,
+            text=True,
+            env={"PATH": "/usr/bin:/bin"},
+        )
+        assert result.stdout.split() == [
+            "alice",
+            "1001",
+            "alice",
+            "ds01-admin",
+            "docker",
+            "not-admin",
+        ]
+
+    def test_bash_helper_ignores_environment_override(self, nss, tmp_path):
+        path = tmp_path / "identity.tsv"
+        ds01_identity.refresh_snapshot(path, users={"alice"})
+        result = subprocess.run(
+            ["bash", "-c", f"source {lib_path / 'ds01_identity.sh'}; ds01_name_to_uid alice"],
+            capture_output=True,
+            text=True,
+            env={"DS01_IDENTITY_SNAPSHOT": str(path), "PATH": "/usr/bin:/bin"},
+        )
+        assert result.returncode == 1
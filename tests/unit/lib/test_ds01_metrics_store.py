@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_metrics_store.py (typed metrics record files)
+/opt/ds01-infra/tests/unit/lib/test_ds01_metrics_store.py
+
+Run: pytest tests/unit/lib/test_ds01_metrics_store.py -v
+"""
+
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+import ds01_metrics_store  # noqa: E402
+from ds01_metrics_store import MetricsWriter, day_files, read_columns, read_day  # noqa: E402
+
+TS = datetime(2026, 3, 2, 12, 0).timestamp()
+DAY = "2026-03-02"
+
+
+def _gpu(util, name="NVIDIA A100 80GB PCIe"):
+    return ("gpu", {"index": "0", "name": name, "util": util, "mem_used": 3 * 1024**3})
+
+
+class TestRoundTrip:
+    def test_typed_values_and_nulls(self, tmp_path):
+        MetricsWriter(tmp_path).append(
+            [_gpu(93.5, name="Ünïcode | GPU"), ("cpu", {"util": None, "cores": 64})], ts=TS
+        )
+        gpu, cpu = read_day(DAY, metrics_dir=tmp_path)
+        assert gpu.ts == TS and gpu.kind == "gpu"
+        assert gpu.data["name"] == "Ünïcode | GPU"
+        assert gpu.data["util"] == 93.5 and gpu.data["mem_used"] == 3 * 1024**3
+        assert gpu.data["uuid"] is None and gpu.data["temp"] is None
+        assert cpu.data == {"util": None, "load1": None, "load5": None, "load15": None, "cores": 64}
+
+    def test_kind_filter_and_columns(self, tmp_path):
+        writer = MetricsWriter(tmp_path)
+        for i in range(3):
+            writer.append([_gpu(float(i)), ("sample", {"groups": "gpu"})], ts=TS + 300 * i)
+
+        assert [r.kind for r in read_day(DAY, {"sample"}, tmp_path)] == ["sample"] * 3
+        columns = read_columns(DAY, "gpu", tmp_path)
+        assert columns["util"] == [0.0, 1.0, 2.0]
+        assert columns["ts"] == [TS, TS + 300, TS + 600]
+
+    def test_schema_written_once_per_file(self, tmp_path):
+        writer = MetricsWriter(tmp_path)
+        writer.append([_gpu(1.0)], ts=TS)
+        size = (tmp_path / f"{DAY}.dsm").stat().st_size
+        writer.append([_gpu(1.0)], ts=TS + 60)
+        growth = (tmp_path / f"{DAY}.dsm").stat().st_size - size
+        assert growth < 100  # One data frame, no second schema
+
+
+class TestSchemaChanges:
+    def test_new_schema_starts_a_segment_and_old_records_stay_readable(self, tmp_path):
+        MetricsWriter(tmp_path).append([("cpu", {"util": 10.0, "cores": 8})], ts=TS)
+
+        schema = dict(ds01_metrics_store.SCHEMA)
+        schema["cpu"] = (schema["cpu"][0], (*schema["cpu"][1], ("steal", "f")))
+        MetricsWriter(tmp_path, schema).append([("cpu", {"util": 20.0, "steal": 1.5})], ts=TS + 60)
+
+        assert [p.name for p in day_files(DAY, tmp_path)] == [f"{DAY}.dsm", f"{DAY}.1.dsm"]
+        old, new = read_day(DAY, {"cpu"}, tmp_path)
+        assert "steal" not in old.data and old.data["cores"] == 8
+        assert new.data["steal"] == 1.5
+
+
+class TestDurability:
+    def test_truncated_tail_is_ignored(self, tmp_path):
+        writer = MetricsWriter(tmp_path)
+        writer.append([_gpu(1.0)], ts=TS)
+        writer.append([_gpu(2.0)], ts=TS + 60)
+        path = tmp_path / f"{DAY}.dsm"
+        path.write_bytes(path.read_bytes()[:-5])
+        assert [r.data["util"] for r in read_day(DAY, metrics_dir=tmp_path)] == [1.0]
+
+    def test_compress_old_keeps_files_readable(self, tmp_path):
+        MetricsWriter(tmp_path).append([_gpu(7.0)], ts=TS)
+        path = tmp_path / f"{DAY}.dsm"
+        os.utime(path, (TS, TS))
+
+        assert ds01_metrics_store.compress_old(tmp_path, now=TS + 3600) == 0
+        assert ds01_metrics_store.compress_old(tmp_path, now=TS + 2 * 86400) == 1
+        assert [p.name for p in tmp_path.iterdir()] == [f"{DAY}.dsm.gz"]
+        assert [r.data["util"] for r in read_day(DAY, metrics_dir=tmp_path)] == [7.0]
+
+    def test_compress_old_deletes_past_retention(self, tmp_path):
+        MetricsWriter(tmp_path).append([_gpu(7.0)], ts=TS)
+        os.utime(tmp_path / f"{DAY}.dsm", (TS, TS))
+        (tmp_path / "notes.txt").write_text("kept\n")
+        retention = ds01_metrics_store.RETENTION_DAYS * 86400
+
+        ds01_metrics_store.compress_old(tmp_path, now=TS + 2 * 86400)
+        ds01_metrics_store.compress_old(tmp_path, now=TS + retention - 86400)
+        assert sorted(p.name for p in tmp_path.iterdir()) == [f"{DAY}.dsm.gz", "notes.txt"]
+
+        ds01_metrics_store.compress_old(tmp_path, now=TS + retention + 86400)
+        assert [p.name for p in tmp_path.iterdir()] == ["notes.txt"]
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_mig_planner.py (demand-driven MIG layout planner)
+/opt/ds01-infra/tests/unit/lib/test_ds01_mig_planner.py
+
+Run: pytest tests/unit/lib/test_ds01_mig_planner.py -v
+"""
+
+import json
+import sys
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+from ds01_mig_planner import (  # noqa: E402
+    FULL,
+    build_demand,
+    describe,
+    gpu_config,
+    hour_of_week,
+    load_events,
+    mig_gpus_yaml,
+    parse_mig_layout,
+    plan_layout,
+    quietest_window,
+    slot_profiles,
+    unmet_demand,
+)
+
+NVIDIA_SMI_L = """GPU 0: NVIDIA A100-SXM4-80GB (UUID: GPU-aaa)
+GPU 1: NVIDIA A100-SXM4-80GB (UUID: GPU-bbb)
+  MIG 3g.40gb     Device  0: (UUID: MIG-b0)
+  MIG 3g.40gb     Device  1: (UUID: MIG-b1)
+GPU 2: NVIDIA A100-SXM4-80GB (UUID: GPU-ccc)
+  MIG 1g.10gb     Device  0: (UUID: MIG-c0)
+  MIG 1g.10gb     Device  1: (UUID: MIG-c1)
+"""
+
+# Monday 2026-03-02 10:00 local time
+MONDAY_10 = datetime(2026, 3, 2, 10, 0).timestamp()
+
+
+def _alloc(ts, container, slot, user="alice", **extra):
+    return dict(kind="allocate", ts=ts, user=user, container=container, gpu_uuid=slot, **extra)
+
+
+def _release(ts, container):
+    return {"kind": "release", "ts": ts, "container": container}
+
+
+class TestLayout:
+    def test_parse_nvidia_smi_l(self):
+        layout = parse_mig_layout(NVIDIA_SMI_L)
+        assert layout == {"0": [], "1": ["3g.40gb", "3g.40gb"], "2": ["1g.10gb", "1g.10gb"]}
+        assert slot_profiles(layout)["2.1"] == "1g.10gb"
+        assert slot_profiles(layout)["0"] == FULL
+
+    def test_gpu_config_only_matches_complete_homogeneous_layouts(self):
+        assert gpu_config([]) == FULL
+        assert gpu_config(["3g.40gb", "3g.40gb"]) == "3g.40gb"
+        assert gpu_config(["1g.10gb", "1g.10gb"]) is None  # 7 fit, only 2 configured
+        assert describe("1g.10gb") == "7x 1g.10gb"
+
+
+class TestDemand:
+    def test_concurrency_peak_and_carry_over(self):
+        history = [
+            _alloc(MONDAY_10, "a", "2.0"),
+            _alloc(MONDAY_10 + 60, "b", "2.1"),
+            _release(MONDAY_10 + 120, "b"),
+        ]
+        demand = build_demand(
+            history, [], slot_profiles(parse_mig_layout(NVIDIA_SMI_L)), MONDAY_10, MONDAY_10 + 7200
+        )
+        how = hour_of_week(MONDAY_10)
+        assert demand[how] == Counter({"1g.10gb": 2})
+        # "a" is still running in the next hour
+        assert demand[how + 1] == Counter({"1g.10gb": 1})
+
+    def test_logged_profile_wins_over_current_layout(self):
+        history = [_alloc(MONDAY_10, "a", "2.0", mig_profile="3g.40gb")]
+        demand = build_demand(history, [], {"2.0": "1g.10gb"}, MONDAY_10, MONDAY_10 + 60)
+        assert demand[hour_of_week(MONDAY_10)] == Counter({"3g.40gb": 1})
+
+    def test_retried_rejections_count_once(self):
+        rejects = [
+            {"ts": MONDAY_10 + i, "user": "bob", "container": "x", "reason": "No GPUs available"}
+            for i in range(5)
+        ]
+        rejects.append(
+            {
+                "ts": MONDAY_10,
+                "user": "carol",
+                "container": "y",
+                "reason": "No full GPUs available (all GPUs have allocated MIG instances)",
+            }
+        )
+        demand = build_demand([], rejects, {"2.0": "1g.10gb"}, MONDAY_10, MONDAY_10 + 60)
+        assert demand[hour_of_week(MONDAY_10)] == Counter({"1g.10gb": 1, FULL: 1})
+
+    def test_quantile_across_weeks(self):
+        week = 7 * 86400
+        history = [_alloc(MONDAY_10 + week * w, f"c{w}", "0") for w in range(3)]
+        history += [_release(MONDAY_10 + week * w + 60, f"c{w}") for w in range(3)]
+        history.append(_alloc(MONDAY_10 + 30, "extra", "1"))
+        history.append(_release(MONDAY_10 + 90, "extra"))
+        history.sort(key=lambda e: e["ts"])
+        end = MONDAY_10 + 3 * week
+        how = hour_of_week(MONDAY_10)
+        assert build_demand(history, [], {}, MONDAY_10, end, quantile=0.5)[how][FULL] == 1
+        assert build_demand(history, [], {}, MONDAY_10, end, quantile=1.0)[how][FULL] == 2
+
+
+class TestPlanning:
+    def test_larger_mig_profile_serves_smaller_requests(self):
+        supply = Counter({"3g.40gb": 2, "1g.10gb": 1})
+        assert unmet_demand(Counter({"1g.10gb": 3}), supply) == 0
+        assert unmet_demand(Counter({"3g.40gb": 2, "1g.10gb": 2}), supply) == 1
+        assert unmet_demand(Counter({FULL: 1}), supply) == 1
+
+    def test_recommends_layout_that_serves_demand(self):
+        current = {"0": [], "1": ["3g.40gb"] * 2}
+        demand = {h: Counter() for h in range(168)}
+        demand[10] = Counter({"1g.10gb": 6, FULL: 1})
+
+        plan = plan_layout(demand, current, ["1g.10gb", "3g.40gb"])
+
+        assert plan["layout"] == {"0": FULL, "1": "1g.10gb"}
+        assert plan["changes"] == ["1"]
+        assert plan["current_rejections"] == 4
+        assert plan["expected_rejections"] == 0
+
+    def test_keeps_layout_when_nothing_better(self):
+        current = {"0": [], "1": ["3g.40gb"] * 2}
+        demand = {h: Counter() for h in range(168)}
+        plan = plan_layout(demand, current, ["1g.10gb", "3g.40gb"])
+        assert plan["changes"] == []
+
+    def test_quietest_window_and_yaml(self):
+        demand = {h: Counter({FULL: 1}) for h in range(168)}
+        for h in (30, 31, 32):
+            demand[h] = Counter()
+        assert quietest_window(demand, 3) == 30
+        assert mig_gpus_yaml({"0": FULL, "1": "3g.40gb"}) == (
+            "  mig_gpus:\n"
+            "    0: {enable: false}\n"
+            "    1: {enable: true, profile: 3g.40gb, instances: 2}"
+        )
+
+
+def test_load_events_removals_release_and_only_capacity_rejections(tmp_path):
+    log = tmp_path / "events.jsonl"
+    events = [
+        ("gpu.allocate", {"container": "c", "gpu_uuid": "2.0"}),
+        ("container.remove", {"container": "c"}),
+        ("gpu.reject", {"container": "d", "reason": "USER_AT_LIMIT (2/2)"}),
+        ("gpu.reject", {"container": "e", "reason": "No GPUs available (all allocated)"}),
+    ]
+    log.write_text(
+        "".join(
+            json.dumps(
+                {"timestamp": "2026-03-02T10:00:00Z", "event_type": t, "user": "u", "details": d}
+            )
+            + "\n"
+            for t, d in events
+        )
+    )
+    history, rejects = load_events(0, 4e9, log)
+    assert [(e["kind"], e["container"]) for e in history] == [
+        ("allocate", "c"),
+        ("release", "c"),
+    ]
+    assert [e["container"] for e in rejects] == ["e"]
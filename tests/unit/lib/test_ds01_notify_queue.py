@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_notify_queue.py / ds01_notify.sh (queued notification delivery)
+/opt/ds01-infra/tests/unit/lib/test_ds01_notify_queue.py
+
+The bash producer and the Python service share the spool format, so
+ds01_notify_queue is exercised against the Python parser here. Terminals and
+Docker are stubbed; utmp is a synthetic file.
+
+Run: pytest tests/unit/lib/test_ds01_notify_queue.py -v
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+import ds01_notify_queue  # noqa: E402
+import pytest  # noqa: E402
+from ds01_notify_queue import NotificationService, NotifyIndex, enqueue  # noqa: E402
+
+NOW = 1_800_000_000.0
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    queue = tmp_path / "queue"
+    svc = NotificationService(queue, NotifyIndex(tmp_path / "index.tsv"))
+    svc.ensure_queue()
+    written = []
+    monkeypatch.setattr(ds01_notify_queue, "read_utmp", lambda: {"alice": ["pts/1", "pts/2"]})
+    monkeypatch.setattr(
+        ds01_notify_queue, "write_tty", lambda line, text: written.append((line, text)) or True
+    )
+    svc.written = written
+    svc.monkeypatch = monkeypatch
+    return svc
+
+
+def _queue(svc, user="alice", message="m", queued=NOW, **kwargs):
+    svc.monkeypatch.setattr(ds01_notify_queue.time, "time", lambda: queued)
+    assert enqueue(user, message, queue_dir=svc.queue_dir, **kwargs)
+
+
+class TestCoalescing:
+    def test_one_write_per_terminal_per_user(self, service):
+        _queue(service, message="idle warning", container="a", key="idle.warning")
+        _queue(service, message="runtime warning", container="b", key="runtime.warning")
+
+        assert service.flush(NOW + 30) == 2
+        assert [line for line, _ in service.written] == ["pts/1", "pts/2"]
+        assert service.written[0][1] == "idle warning\nruntime warning\n"
+        assert list((service.queue_dir / "new").iterdir()) == []
+
+    def test_waits_for_quiet_period(self, service):
+        _queue(service, queued=NOW)
+        assert service.flush(NOW + 5) == 0
+        assert service.flush(NOW + 10) == 1
+
+    def test_newest_message_per_container_and_key_wins(self, service):
+        _queue(service, message="old", container="a", key="quota.gpu_usage_high", queued=NOW)
+        _queue(service, message="new", container="a", key="quota.gpu_usage_high", queued=NOW + 1)
+        service.flush(NOW + 30)
+        assert service.written[0][1] == "new\n"
+
+    def test_cooldown_from_shared_index(self, service, tmp_path):
+        _queue(service, key="idle.notice", container="a", cooldown=3600)
+        service.flush(NOW + 30)
+        _queue(service, key="idle.notice", container="a", cooldown=3600, queued=NOW + 60)
+        assert service.flush(NOW + 100) == 0
+        assert len(service.written) == 2  # first delivery only, to both terminals
+
+        index = (tmp_path / "index.tsv").read_text()
+        assert index == f"alice|a|idle.notice\t{int(NOW) + 30}\t\n"
+
+        _queue(service, key="idle.notice", container="a", cooldown=3600, queued=NOW + 3700)
+        assert service.flush(NOW + 3730) == 1
+
+    def test_once_per_episode(self, service):
+        _queue(service, key="idle.warning", container="a", episode="1799990000")
+        assert service.flush(NOW + 30) == 1
+        # Later ticks of the same idle period re-enqueue; the index drops them
+        _queue(service, key="idle.warning", container="a", episode="1799990000", queued=NOW + 600)
+        assert service.flush(NOW + 630) == 0
+        # Activity started a new idle period
+        _queue(service, key="idle.warning", container="a", episode="1800001000", queued=NOW + 900)
+        assert service.flush(NOW + 930) == 1
+
+    def test_index_shared_across_service_restarts(self, service, tmp_path):
+        _queue(service, key="runtime.final", container="a", episode="1799000000")
+        service.flush(NOW + 30)
+
+        restarted = NotificationService(service.queue_dir, NotifyIndex(tmp_path / "index.tsv"))
+        _queue(service, key="runtime.final", container="a", episode="1799000000", queued=NOW + 60)
+        assert restarted.flush(NOW + 100) == 0
+
+
+class TestContainerFallback:
+    def test_no_terminal_appends_via_workspace_mount(self, service, tmp_path, monkeypatch):
+        workspace = tmp_path / "workspace"
+        workspace.mkdir()
+        calls = []
+
+        def resolve(containers):
+            calls.append(sorted(containers))
+            return {"proj._.1002": workspace}
+
+        monkeypatch.setattr(ds01_notify_queue, "resolve_workspaces", resolve)
+        _queue(service, user="bob", message="first", container="proj._.1002", key="idle.warning")
+        _queue(service, user="bob", message="second", container="proj._.1002", key="idle.final")
+        _queue(service, user="bob", message="gone", container="removed._.1002", key="x")
+
+        assert service.flush(NOW + 30) == 2
+        assert calls == [["proj._.1002", "removed._.1002"]]  # one inspect for all
+        text = (workspace / ".ds01-alerts").read_text()
+        assert text.count("--- Alert: ") == 2 and "first\n\n" in text and "second" in text
+
+    def test_symlinked_alert_file_is_not_followed(self, tmp_path):
+        target = tmp_path / "target"
+        target.write_text("")
+        workspace = tmp_path / "ws"
+        workspace.mkdir()
+        (workspace / ".ds01-alerts").symlink_to(target)
+
+        assert not ds01_notify_queue.append_alert_file(workspace, "x")
+        assert target.read_text() == ""
+
+
+def test_read_utmp_user_processes_only(tmp_path):
+    def record(kind, line, user):
+        return ds01_notify_queue._UTMP_RECORD.pack(
+            kind, 1, line.encode(), b"", user.encode(), b"", 0, 0, 0, 0, 0, 0, 0, 0, 0, b""
+        )
+
+    utmp = tmp_path / "utmp"
+    utmp.write_bytes(
+        record(7, "pts/1", "alice")
+        + record(8, "pts/2", "alice")  # DEAD_PROCESS
+        + record(7, "pts/3", "bob")
+        + record(7, "../etc", "eve")
+    )
+    assert ds01_notify_queue.read_utmp(utmp) == {"alice": ["pts/1"], "bob": ["pts/3"]}
+
+
+def test_bash_producer_matches_python_parser(tmp_path):
+    queue = tmp_path / "queue"
+    (queue / "tmp").mkdir(parents=True)
+    (queue / "new").mkdir()
+    script = (
+        f"source {lib_path}/ds01_notify.sh; "
+        "ds01_notify_queue alice proj._.1001 WARNING idle.warning $'line 1\\nline 2' 60 1799990000"
+    )
+    env = {**os.environ, "DS01_NOTIFY_QUEUE_DIR": str(queue)}
+    subprocess.run(["bash", "-c", script], check=True, env=env)
+
+    (spooled,) = (queue / "new").iterdir()
+    entry = ds01_notify_queue.parse_entry(spooled.read_text())
+    assert entry["user"] == "alice" and entry["container"] == "proj._.1001"
+    assert entry["key"] == "idle.warning" and entry["cooldown"] == 60
+    assert entry["episode"] == "1799990000"
+    assert entry["message"] == "line 1\nline 2"
+
+
+def test_send_honours_index_without_queue(tmp_path, monkeypatch):
+    written = []
+    monkeypatch.setattr(ds01_notify_queue, "read_utmp", lambda: {"alice": ["pts/1"]})
+    monkeypatch.setattr(
+        ds01_notify_queue, "write_tty", lambda line, text: written.append(text) or True
+    )
+    index_file = tmp_path / "index.tsv"
+
+    def send():
+        return ds01_notify_queue.send(
+            "alice",
+            "m",
+            container="a",
+            key="idle.final",
+            episode="e1",
+            index=NotifyIndex(index_file),
+        )
+
+    assert send() == 1
+    assert send() == 0
+    assert written == ["m\n"]
+
+
+def test_bash_due_check_reads_service_index(service, tmp_path):
+    # Bash compares against the real clock (read before _queue patches it)
+    an_hour_ago = time.time() - 3600
+    _queue(service, key="idle.warning", container="a", episode="1799990000")
+    service.flush(NOW + 30)
+    # A quota alert delivered an hour ago
+    index = NotifyIndex(tmp_path / "index.tsv")
+    index.record({"user": "alice", "container": "", "key": "quota.x", "episode": ""}, an_hour_ago)
+    index.save(an_hour_ago)
+
+    def due(*args):
+        script = f"source {lib_path}/ds01_notify.sh; ds01_notify_due {' '.join(args)}"
+        env = {**os.environ, "DS01_NOTIFY_INDEX": str(tmp_path / "index.tsv")}
+        return subprocess.run(["bash", "-c", script], env=env).returncode == 0
+
+    assert not due("alice", "a", "idle.warning", "0", "1799990000")
+    assert due("alice", "a", "idle.warning", "0", "1800001000")  # new idle period
+    assert due("alice", "b", "idle.warning", "0", "1799990000")
+    assert not due("alice", "''", "quota.x", "14400")
+    assert due("alice", "''", "quota.x", "1800")
+    assert due("bob", "''", "quota.x", "14400")
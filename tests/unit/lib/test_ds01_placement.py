@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_placement.py (slot placement policies and replay simulator)
+/opt/ds01-infra/tests/unit/lib/test_ds01_placement.py
+
+Run: pytest tests/unit/lib/test_ds01_placement.py -v
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+from ds01_placement import (  # noqa: E402
+    SimulatedCluster,
+    infer_layout,
+    load_history,
+    parse_layout,
+    parse_topology,
+    rank_slots,
+    select_slot_set,
+    set_cost,
+    simulate,
+    whole_gpus_free,
+)
+
+
+def _free(*slots):
+    return {s: {"physical_gpu": s.split(".")[0]} for s in slots}
+
+
+# GPU 1: 4 MIG slots, all free. GPU 2: 4 MIG slots, 2 free. GPU 3: 2 slots, all free.
+SIZES = {"1": 4, "2": 4, "3": 2}
+FREE = _free("1.0", "1.1", "1.2", "1.3", "2.2", "2.3", "3.0", "3.1")
+
+
+class TestRankSlots:
+    def test_pack_fills_partly_used_gpu_first(self):
+        assert rank_slots(FREE, SIZES, "pack")[0] == "2.2"
+
+    def test_pack_breaks_smallest_whole_gpu_last_resort(self):
+        free = _free("1.0", "1.1", "1.2", "1.3", "3.0", "3.1")
+        # Both GPUs whole: prefer the one with fewer free slots (best fit)
+        assert rank_slots(free, SIZES, "pack")[0] == "3.0"
+
+    def test_spread_picks_emptiest_gpu(self):
+        assert rank_slots(FREE, SIZES, "spread")[0] == "1.0"
+
+    def test_lexicographic_is_slot_order(self):
+        assert rank_slots(FREE, SIZES, "lexicographic")[0] == "1.0"
+
+    def test_anti_affinity_breaks_ties(self):
+        free = _free("2.2", "4.2")
+        sizes = {"2": 4, "4": 4}
+        assert rank_slots(free, sizes, "pack", user_gpus={"2"})[0] == "4.2"
+
+    def test_reserved_slot_wins(self):
+        assert rank_slots(FREE, SIZES, "pack", preferred={"3.1"})[0] == "3.1"
+
+    def test_full_gpu_preference_kept(self):
+        free = dict(FREE, **_free("0"))
+        sizes = dict(SIZES, **{"0": 0})
+        assert rank_slots(free, sizes, "pack", prefer_full=True)[0] == "0"
+        assert rank_slots(free, sizes, "pack", prefer_full=False)[-1] == "0"
+
+    def test_unknown_policy_falls_back(self):
+        assert rank_slots(FREE, SIZES, "bogus") == rank_slots(FREE, SIZES, "pack")
+
+    def test_numeric_slot_order(self):
+        free = _free("10.0", "2.0")
+        assert rank_slots(free, {"10": 1, "2": 1}, "lexicographic") == ["10.0", "2.0"]
+        assert rank_slots(free, {"10": 7, "2": 7}, "pack") == ["2.0", "10.0"]
+
+
+class TestWholeGpus:
+    def test_counts_gpus_with_all_slots_free(self):
+        assert whole_gpus_free(FREE, SIZES) == 2
+
+    def test_unpartitioned_gpu(self):
+        assert whole_gpus_free(["0"], {"0": 0, "1": 0}) == 1
+
+
+# DGX-style: NVLink pairs 0-1 and 2-3, GPU1 on the same switch as 2-3, cross-socket otherwise
+TOPO_M = """\x1b[4m\tGPU0\tGPU1\tGPU2\tGPU3\tNIC0\tCPU Affinity\tNUMA Affinity\x1b[0m
+GPU0\t X \tNV12\tSYS\tSYS\tPIX\t0-31\t0
+GPU1\tNV12\t X \tPXB\tPXB\tSYS\t0-31\t0
+GPU2\tSYS\tPXB\t X \tNV12\tSYS\t32-63\t1
+GPU3\tSYS\tPXB\tNV12\t X \tSYS\t32-63\t1
+NIC0\tPIX\tSYS\tSYS\tSYS\t X
+
+Legend:
+
+  X    = Self
+  NV#  = Connection traversing a bonded set of # NVLinks
+"""
+
+
+class TestTopology:
+    def test_parse_keeps_gpu_columns_only(self):
+        topology = parse_topology(TOPO_M)
+        assert sorted(topology) == ["0", "1", "2", "3"]
+        assert topology["0"] == {"0": "X", "1": "NV12", "2": "SYS", "3": "SYS"}
+
+    def test_parse_garbage_is_empty(self):
+        assert parse_topology("No devices were found") == {}
+
+    def test_set_cost_mig_slots_on_same_gpu_are_free(self):
+        topology = parse_topology(TOPO_M)
+        assert set_cost(["1.0", "1.1"], topology) == (0, 0)
+        assert set_cost(["1", "2"], topology) == (2, 2)
+
+    def test_nvlink_pair_beats_placement_rank(self):
+        topology = parse_topology(TOPO_M)
+        assert select_slot_set(["0", "2", "1", "3"], 2, topology) == ["0", "1"]
+
+    def test_worst_link_decides_larger_sets(self):
+        topology = parse_topology(TOPO_M)
+        # {1,2,3}: worst PXB; any other set of three pairs GPU0 with 2 or 3 (SYS)
+        assert select_slot_set(["0", "1", "2", "3"], 3, topology) == ["1", "2", "3"]
+
+    def test_without_topology_takes_rank_order(self):
+        assert select_slot_set(["3", "0", "1"], 2, {}) == ["3", "0"]
+
+    def test_too_few_candidates(self):
+        assert select_slot_set(["0"], 2, parse_topology(TOPO_M)) is None
+
+    def test_greedy_search_for_large_pools(self, monkeypatch):
+        import ds01_placement
+
+        monkeypatch.setattr(ds01_placement, "MAX_SET_COMBINATIONS", 1)
+        topology = parse_topology(TOPO_M)
+        assert select_slot_set(["0", "2", "1", "3"], 2, topology) == ["0", "1"]
+
+
+class TestSimulator:
+    def _history(self):
+        # Four single-slot requests, then a full-GPU request while two remain.
+        history = []
+        for i in range(4):
+            history.append(
+                {
+                    "kind": "allocate",
+                    "ts": i,
+                    "user": f"u{i}",
+                    "container": f"c{i}",
+                    "gpu_uuid": f"{i % 2 + 1}.{i // 2}",
+                }
+            )
+        history.append({"kind": "release", "ts": 5, "container": "c0"})
+        history.append(
+            {"kind": "allocate", "ts": 6, "user": "big", "container": "full", "gpu_uuid": "1"}
+        )
+        return history
+
+    def test_pack_keeps_whole_gpu_for_full_request(self):
+        layout = {"1": 4, "2": 4}
+        packed = simulate(self._history(), layout, "pack")
+        spread = simulate(self._history(), layout, "spread")
+
+        assert packed["rejected_full"] == 0
+        assert spread["rejected_full"] == 1
+        assert packed["avg_whole_gpus_free"] > spread["avg_whole_gpus_free"]
+
+    def test_release_of_rejected_request_is_ignored(self):
+        cluster = SimulatedCluster({"1": 1})
+        assert cluster.allocate("a", "c1", False, "pack")
+        assert not cluster.allocate("b", "c2", False, "pack")
+        cluster.release("c2")
+        assert cluster.owner == {"1.0": "a"}
+
+    def test_infer_and_parse_layout(self):
+        history = [{"gpu_uuid": "1.3"}, {"gpu": "0"}, {"gpu_uuid": "1.0,2.1"}]
+        assert infer_layout(history) == {"1": 4, "0": 0, "2": 2}
+        assert parse_layout("0:0,1:7") == {"0": 0, "1": 7}
+
+    def test_load_history_from_event_log(self, tmp_path):
+        log = tmp_path / "events.jsonl"
+        events = [
+            ("2026-03-01T10:00:00Z", "gpu.allocate", {"container": "c", "gpu_uuid": "1.0"}),
+            ("2026-03-01T09:00:00Z", "gpu.release", {"container": "old", "gpu_uuid": "1.1"}),
+            ("2026-03-01T11:00:00Z", "container.create", {"container": "c"}),
+        ]
+        log.write_text(
+            "".join(
+                json.dumps({"timestamp": ts, "event_type": t, "user": "alice", "details": d}) + "\n"
+                for ts, t, d in events
+            )
+        )
+        history = load_history(0, 4e9, log)
+        assert [(e["kind"], e["container"]) for e in history] == [
+            ("release", "old"),
+            ("allocate", "c"),
+        ]
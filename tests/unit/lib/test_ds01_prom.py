@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_prom.py (Prometheus query planner)
+/opt/ds01-infra/tests/unit/lib/test_ds01_prom.py
+
+Runs the planner against a local stub Prometheus HTTP server that records
+every request it receives, so deduplication, concurrency and disk caching
+are observable without a real Prometheus.
+
+Run: pytest tests/unit/lib/test_ds01_prom.py -v
+"""
+
+import importlib.machinery
+import importlib.util
+import json
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+import pytest  # noqa: E402
+from ds01_prom import PromRequest, QueryPlanner  # noqa: E402
+
+MONTHLY_REPORT = lib_path.parent / "monitoring" / "ds01-monthly-report"
+
+
+# =============================================================================
+# Stub Prometheus server
+# =============================================================================
+
+
+class StubPrometheus:
+    """Threaded HTTP server answering /api/v1/query{,_range} with canned vectors."""
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.requests: list[tuple[str, dict]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urllib.parse.urlparse(self.path)
+                params = {k: v[0] for k, v in urllib.parse.parse_qs(parsed.query).items()}
+                with stub._lock:
+                    stub.requests.append((parsed.path, params))
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    if stub.fail:
+                        self.send_response(500)
+                        self.end_headers()
+                        return
+                    body = json.dumps(
+                        {
+                            "status": "success",
+                            "data": {
+                                "resultType": "vector",
+                                "result": [{"metric": {"user": "alice"}, "value": [0, "1"]}],
+                            },
+                        }
+                    ).encode()
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_prom():
+    with StubPrometheus() as stub:
+        yield stub
+
+
+PAST = "2026-03-31T23:59:59Z"
+
+
+# =============================================================================
+# PromRequest
+# =============================================================================
+
+
+class TestPromRequest:
+    """Tests for request identity, parameters and window detection."""
+
+    def test_identical_requests_are_equal(self):
+        a = PromRequest.range("up", "2026-03-01T00:00:00Z", PAST, "1h")
+        b = PromRequest.range("up", "2026-03-01T00:00:00Z", PAST, "1h")
+        assert a == b
+        assert a.cache_key() == b.cache_key()
+
+    def test_step_changes_cache_key(self):
+        a = PromRequest.range("up", "2026-03-01T00:00:00Z", PAST, "1h")
+        b = PromRequest.range("up", "2026-03-01T00:00:00Z", PAST, "15m")
+        assert a.cache_key() != b.cache_key()
+
+    def test_query_string_quotes_expr(self):
+        qs = PromRequest.instant('sum(x{mode="idle"})', PAST).query_string()
+        params = urllib.parse.parse_qs(qs)
+        assert params["query"] == ['sum(x{mode="idle"})']
+        assert params["time"] == [PAST]
+
+    def test_window_end(self):
+        assert PromRequest.instant("up").window_end() is None
+        assert PromRequest.instant("up", "1700000000").window_end() == 1700000000.0
+        end = PromRequest.range("up", "2026-03-01T00:00:00Z", PAST).window_end()
+        assert end == pytest.approx(1775001599.0)
+
+
+# =============================================================================
+# QueryPlanner
+# =============================================================================
+
+
+class TestQueryPlanner:
+    """Tests for deduplication, concurrency and caching against the stub server."""
+
+    def test_fetch_returns_result(self, stub_prom):
+        planner = QueryPlanner(stub_prom.url)
+        result = planner.query("up", PAST)
+        assert result == [{"metric": {"user": "alice"}, "value": [0, "1"]}]
+        assert stub_prom.requests[0][0] == "/api/v1/query"
+        assert stub_prom.requests[0][1] == {"query": "up", "time": PAST}
+
+    def test_repeated_fetch_hits_server_once(self, stub_prom):
+        planner = QueryPlanner(stub_prom.url)
+        planner.query("up", PAST)
+        planner.query("up", PAST)
+        assert len(stub_prom.requests) == 1
+
+    def test_recording_dedupes_and_returns_empty(self, stub_prom):
+        planner = QueryPlanner(stub_prom.url)
+        with planner.recording():
+            assert planner.query("up", PAST) == []
+            planner.query("up", PAST)
+            planner.query_range("up", "2026-03-01T00:00:00Z", PAST, "1h")
+        assert stub_prom.requests == []
+        assert planner.stats["deduped"] == 1
+
+        planner.execute()
+        assert len(stub_prom.requests) == 2
+        planner.query("up", PAST)
+        assert len(stub_prom.requests) == 2
+
+    def test_execute_runs_concurrently_within_bound(self):
+        with StubPrometheus(delay=0.2) as stub:
+            planner = QueryPlanner(stub.url, max_workers=3)
+            for i in range(9):
+                planner.submit(PromRequest.instant(f"metric_{i}", PAST))
+            started = time.monotonic()
+            planner.execute()
+            elapsed = time.monotonic() - started
+
+        assert len(stub.requests) == 9
+        assert 1 < stub.max_in_flight <= 3
+        assert elapsed < 9 * 0.2
+
+    def test_disk_cache_survives_new_planner(self, stub_prom, temp_dir):
+        QueryPlanner(stub_prom.url, cache_dir=temp_dir).query("up", PAST)
+        assert len(stub_prom.requests) == 1
+
+        result = QueryPlanner(stub_prom.url, cache_dir=temp_dir).query("up", PAST)
+        assert len(stub_prom.requests) == 1
+        assert result[0]["metric"]["user"] == "alice"
+
+    def test_live_query_cache_expires(self, stub_prom, temp_dir):
+        QueryPlanner(stub_prom.url, cache_dir=temp_dir).query("up")
+        QueryPlanner(stub_prom.url, cache_dir=temp_dir).query("up")
+        assert len(stub_prom.requests) == 1
+
+        QueryPlanner(stub_prom.url, cache_dir=temp_dir, live_ttl=0).query("up")
+        assert len(stub_prom.requests) == 2
+
+    def test_failures_are_not_cached(self, temp_dir):
+        with StubPrometheus(fail=True) as stub:
+            planner = QueryPlanner(stub.url, cache_dir=temp_dir)
+            assert planner.query("up", PAST) == []
+            assert planner.stats["failed"] == 1
+        assert list(temp_dir.iterdir()) == []
+
+    def test_unreachable_server_returns_empty(self):
+        planner = QueryPlanner("http://127.0.0.1:9")
+        assert planner.query("up", PAST) == []
+
+
+# =============================================================================
+# ds01-monthly-report integration
+# =============================================================================
+
+
+def load_monthly_report():
+    """Load ds01-monthly-report (extensionless script) as a module."""
+    loader = importlib.machinery.SourceFileLoader("ds01_monthly_report", str(MONTHLY_REPORT))
+    spec = importlib.util.spec_from_loader("ds01_monthly_report", loader)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestMonthlyReportPlanning:
+    """The report should send each distinct query once and reuse the disk cache."""
+
+    @pytest.fixture
+    def report(self, temp_dir, monkeypatch):
+        module = load_monthly_report()
+        monkeypatch.setattr(module, "GROUPS_DIR", temp_dir / "groups")
+        monkeypatch.setattr(module, "EVENTS_FILE", temp_dir / "events.jsonl")
+        monkeypatch.setattr(module, "REPORTS_DIR", temp_dir / "reports")
+        monkeypatch.setattr(module, "query_github_issues", lambda *a: None)
+        return module
+
+    def test_each_distinct_query_sent_once(self, report, stub_prom, temp_dir):
+        report.PLANNER = QueryPlanner(stub_prom.url, cache_dir=temp_dir / "cache")
+        report.generate_report(2026, 3)
+
+        sent = [(path, tuple(sorted(params.items()))) for path, params in stub_prom.requests]
+        assert len(sent) > 20
+        assert len(sent) == len(set(sent))
+
+    def test_rerun_served_from_cache(self, report, stub_prom, temp_dir):
+        report.PLANNER = QueryPlanner(stub_prom.url, cache_dir=temp_dir / "cache")
+        first, _, _ = report.generate_report(2026, 3)
+        sent = len(stub_prom.requests)
+
+        report.PLANNER = QueryPlanner(stub_prom.url, cache_dir=temp_dir / "cache")
+        second, _, _ = report.generate_report(2026, 3)
+
+        # Only queries evaluated at "now" (no explicit time) may be re-sent
+        resent = stub_prom.requests[sent:]
+        assert all("time" not in params and "end" not in params for _, params in resent)
+        strip = lambda md: [ln for ln in md.splitlines() if "Generated" not in ln]  # noqa: E731
+        assert strip(first) == strip(second)
+
+
+class TestMonthlyReportGpuSection:
+    """Ledger gpueq-hours are reported on their own; efficiency stays slot-based."""
+
+    def test_ledger_figure_kept_out_of_efficiency(self, monkeypatch):
+        module = load_monthly_report()
+
+        def scalar(expr, time=None):
+            if "ds01_gpu_allocated" in expr:
+                return 100.0  # slot-hours
+            if "user_gpu_seconds_weighted" in expr:
+                return 50.0
+            return None
+
+        monkeypatch.setattr(module, "prom_scalar", scalar)
+        monkeypatch.setattr(module, "prom_query", lambda expr, time=None: [])
+        monkeypatch.setattr(module, "prom_vector", lambda expr, time=None: {})
+        ledger = {
+            "days": ["2026-03-01"],
+            "users": {"alice": {"gpueq_s": 25 * 3600, "cpu_s": 0.0, "energy_j": 0.0}},
+            "containers": {},
+        }
+
+        lines, summary = module._section_gpu_usage("t", "31d", {}, ledger)
+        assert summary["Total GPU-hours (allocated)"] == "100.0"
+        assert summary["GPU-equivalent hours"] == "25.0"
+        assert summary["GPU efficiency"] == "50.0%"
+        assert "| User | Group | GPU-eq hours | Weighted | CPU-hours | Energy (kWh) |" in lines
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_selfmetrics.py / ds01_selfmetrics.sh (self-observability metrics)
+/opt/ds01-infra/tests/unit/lib/test_ds01_selfmetrics.py
+
+Writers (Python and bash) and the exporter-side reader share a file format,
+so the bash functions are exercised against the Python reader here.
+
+Run: pytest tests/unit/lib/test_ds01_selfmetrics.py -v
+"""
+
+import importlib.util
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+import ds01_selfmetrics  # noqa: E402
+import pytest  # noqa: E402
+from ds01_selfmetrics import SelfMetricsReader, observe, outcome_label, write_job  # noqa: E402
+
+ALLOC = "ds01_allocation_duration_seconds"
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ds01_selfmetrics, "SELF_METRICS_DIR", tmp_path)
+    return tmp_path
+
+
+def series(lines: list[str], prefix: str) -> dict[str, str]:
+    return dict(line.rsplit(" ", 1) for line in lines if line.startswith(prefix))
+
+
+class TestOutcomeLabel:
+    @pytest.mark.parametrize(
+        "reason,expected",
+        [
+            ("SUCCESS", "SUCCESS"),
+            ("QUOTA_EXCEEDED:2/1", "QUOTA_EXCEEDED"),
+            ("INTERNAL_ERROR: boom", "INTERNAL_ERROR"),
+            ("USER_AT_LIMIT (1/1)", "USER_AT_LIMIT"),
+            # Availability checker errors, passed through by the allocator
+            ("No GPUs available (all allocated)", "NO_GPU_AVAILABLE"),
+            ("No GPUs available (1 free, 2 requested)", "NO_GPU_AVAILABLE"),
+            ("No GPUs available matching criteria", "NO_GPU_AVAILABLE"),
+            ("No full GPUs available (all GPUs have allocated MIG instances)", "NO_GPU_AVAILABLE"),
+            (
+                "No MIG instances available (only full GPUs free, user not permitted)",
+                "NO_GPU_AVAILABLE",
+            ),
+            ("User already has 1/1 GPUs allocated", "USER_AT_LIMIT"),
+            ("Internal error: boom", "INTERNAL_ERROR"),
+            ("Something else", "OTHER"),
+            ("", "OTHER"),
+            (None, "OTHER"),
+        ],
+    )
+    def test_bounded(self, reason, expected):
+        assert outcome_label(reason) == expected
+
+    def test_real_checker_errors(self):
+        path = lib_path.parent / "docker" / "gpu-availability-checker.py"
+        spec = importlib.util.spec_from_file_location("gpu_availability_checker_labels", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        def checker(free, held=()):
+            c = module.GPUAvailabilityChecker.__new__(module.GPUAvailabilityChecker)
+            c._topology = {}
+            c.state_reader = SimpleNamespace(
+                get_user_allocations=lambda user: list(held), _load_config=lambda: {}
+            )
+            c.get_available_gpus = lambda: {
+                s: {"uuid": f"GPU-{s}", "profile": "full", "physical_gpu": s} for s in free
+            }
+            return c
+
+        def labels(c):
+            single = c.suggest_gpu_for_user("alice", 1, allow_full_gpu=True)["error"]
+            multi = c.suggest_gpu_set_for_user("alice", 2, 1, allow_full_gpu=True)["error"]
+            return outcome_label(single), outcome_label(multi)
+
+        assert labels(checker([])) == ("NO_GPU_AVAILABLE", "NO_GPU_AVAILABLE")
+        assert labels(checker(["0"], held=["1"])) == ("USER_AT_LIMIT", "USER_AT_LIMIT")
+        broken = checker([])
+        broken.state_reader = None
+        assert labels(broken) == ("INTERNAL_ERROR", "INTERNAL_ERROR")
+
+
+class TestHistograms:
+    def test_observations_fold_into_buckets(self, metrics_dir):
+        observe(ALLOC, 0.07, operation="allocate", outcome="SUCCESS")
+        observe(ALLOC, 3.0, operation="allocate", outcome="SUCCESS")
+        lines = SelfMetricsReader(metrics_dir).render()
+        s = series(lines, ALLOC)
+        base = 'operation="allocate",outcome="SUCCESS"'
+        assert s[f'{ALLOC}_bucket{{{base},le="0.05"}}'] == "0"
+        assert s[f'{ALLOC}_bucket{{{base},le="0.1"}}'] == "1"
+        assert s[f'{ALLOC}_bucket{{{base},le="5"}}'] == "2"
+        assert s[f'{ALLOC}_bucket{{{base},le="+Inf"}}'] == "2"
+        assert s[f"{ALLOC}_count{{{base}}}"] == "2"
+
+    def test_incremental_across_scrapes(self, metrics_dir):
+        reader = SelfMetricsReader(metrics_dir)
+        observe("ds01_allocator_lock_hold_seconds", 0.002)
+        reader.render()
+        observe("ds01_allocator_lock_hold_seconds", 0.002)
+        s = series(reader.render(), "ds01_allocator_lock_hold_seconds_count")
+        assert s["ds01_allocator_lock_hold_seconds_count"] == "2"
+
+    def test_rejects_unknown_metrics_and_labels(self, metrics_dir):
+        (metrics_dir / "observations.log").write_text(
+            "bogus_metric 1.0\n"
+            f"{ALLOC} 1.0 evil=1\n"
+            f"{ALLOC} -5 operation=allocate\n"
+            f'{ALLOC} 1.0 operation=a"b\n'
+            f"{ALLOC} 1.0 operation=allocate\n"
+        )
+        reader = SelfMetricsReader(metrics_dir)
+        lines = reader.render()
+        assert reader.rejected == 4
+        assert not any("bogus" in line or "evil" in line for line in lines)
+        assert series(lines, f"{ALLOC}_count")[f'{ALLOC}_count{{operation="allocate"}}'] == "1"
+
+    def test_partial_line_waits_for_newline(self, metrics_dir):
+        log = metrics_dir / "observations.log"
+        log.write_text(f"{ALLOC} 1.0 operation=allocate\n{ALLOC} 2.")
+        reader = SelfMetricsReader(metrics_dir)
+        reader.refresh()
+        with open(log, "a") as f:
+            f.write("0 operation=allocate\n")
+        reader.refresh()
+        hist = reader.histograms[(ALLOC, (("operation", "allocate"),))]
+        assert (hist.count, hist.sum) == (2, 3.0)
+
+    def test_rotation(self, metrics_dir, monkeypatch):
+        monkeypatch.setattr(ds01_selfmetrics, "ROTATE_BYTES", 10)
+        reader = SelfMetricsReader(metrics_dir)
+        observe(ALLOC, 1.0, operation="release")
+        reader.refresh()
+        assert (metrics_dir / "observations.log.1").exists()
+        observe(ALLOC, 1.0, operation="release")
+        reader.refresh()
+        assert reader.histograms[(ALLOC, (("operation", "release"),))].count == 2
+
+
+class TestJobs:
+    def test_job_gauges(self, metrics_dir):
+        write_job("check-idle-containers", 12.0, items=40)
+        write_job("enforce-max-runtime", 3.0, items=0, status="error")
+        lines = SelfMetricsReader(metrics_dir).render()
+        s = series(lines, "ds01_job_last_")
+        assert s['ds01_job_last_seconds_per_item{job="check-idle-containers"}'] == "0.3"
+        assert s['ds01_job_last_items{job="check-idle-containers"}'] == "40"
+        assert s['ds01_job_last_success{job="enforce-max-runtime"}'] == "0"
+
+    def test_invalid_job_name_rejected(self, metrics_dir):
+        assert write_job("../escape", 1.0) is False
+
+
+class TestBashWriters:
+    def run_bash(self, metrics_dir, script: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ["bash", "-c", f"source {lib_path / 'ds01_selfmetrics.sh'}\n{script}"],
+            env={"DS01_SELF_METRICS_DIR": str(metrics_dir), "PATH": "/usr/bin:/bin"},
+            capture_output=True,
+            text=True,
+            timeout=30,
+        )
+
+    def test_observe_is_readable(self, metrics_dir):
+        result = self.run_bash(
+            metrics_dir,
+            "ds01_timer_start T0\n"
+            "ds01_observe ds01_wrapper_preflight_duration_seconds $T0 subcommand=run,gpu=yes",
+        )
+        assert result.returncode == 0
+        reader = SelfMetricsReader(metrics_dir)
+        reader.refresh()
+        key = ("ds01_wrapper_preflight_duration_seconds", (("gpu", "yes"), ("subcommand", "run")))
+        assert reader.histograms[key].count == 1
+
+    def test_job_track_records_exit_status(self, metrics_dir):
+        ok = self.run_bash(metrics_dir, "ds01_job_track good\nDS01_JOB_ITEMS=5")
+        bad = self.run_bash(metrics_dir, "ds01_job_track bad\nexit 3")
+        assert (ok.returncode, bad.returncode) == (0, 3)
+        jobs = SelfMetricsReader(metrics_dir).read_jobs()
+        assert jobs["good"]["items"] == 5 and jobs["good"]["success"] == 1.0
+        assert jobs["bad"]["success"] == 0.0
+
+    def test_missing_directory_never_fails(self, tmp_path):
+        result = self.run_bash(
+            tmp_path / "absent",
+            "set -e\nds01_timer_start T0\nds01_observe x $T0\nds01_job_metrics j $T0 1\necho done",
+        )
+        assert result.returncode == 0
+        assert result.stdout.strip() == "done"
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_trace.py (opt-in DS01_TRACE tracing)
+/opt/ds01-infra/tests/unit/lib/test_ds01_trace.py
+
+install() patches subprocess.run and yaml.safe_load process-wide, so the
+enabled cases run in a child interpreter and inspect the trace file it writes.
+
+Run: pytest tests/unit/lib/test_ds01_trace.py -v
+"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+import ds01_trace  # noqa: E402
+import pytest  # noqa: E402
+
+CHILD = textwrap.dedent(
+    """
+    import subprocess, sys
+    sys.path.insert(0, {lib!r})
+    import yaml
+    from ds01_trace import install, record, span
+
+    assert install("test-tool")
+    subprocess.run(["true"])
+    subprocess.run(["true"])
+    child = [sys.executable, "-c", "import os; print(os.environ['DS01_TRACE_ID'])"]
+    record("child", 0, child_trace=subprocess.run(child, capture_output=True, text=True).stdout.strip())
+    with open({config!r}) as f:
+        yaml.safe_load(f)
+    with span("lock.wait", lock="x.lock"):
+        pass
+    record("lock.hold", 0.25, lock="x.lock")
+    """
+)
+
+
+def run_traced(tmp_path: Path, env_extra: dict) -> list[dict]:
+    config = tmp_path / "resource-limits.yaml"
+    config.write_text("defaults:\n  max_gpus: 1\n")
+    trace_file = tmp_path / "trace.jsonl"
+    env = {**os.environ, "DS01_TRACE_FILE": str(trace_file), **env_extra}
+    env.pop("DS01_TRACE_ID", None)
+    code = CHILD.format(lib=str(lib_path), config=str(config))
+    subprocess.run([sys.executable, "-c", code], env=env, check=True, timeout=30)
+    if not trace_file.exists():
+        return []
+    return [json.loads(line) for line in trace_file.read_text().splitlines()]
+
+
+class TestDisabled:
+    def test_install_is_noop_without_env(self, monkeypatch):
+        monkeypatch.delenv("DS01_TRACE", raising=False)
+        original = subprocess.run
+        assert ds01_trace.install("test") is False
+        assert subprocess.run is original
+        assert ds01_trace.summary() is None
+
+    def test_span_and_record_are_noops(self):
+        with ds01_trace.span("anything", x=1):
+            pass
+        ds01_trace.record("anything", 1.0)
+
+    def test_child_writes_nothing(self, tmp_path):
+        # CHILD asserts install() succeeds, so run a bare install instead
+        trace_file = tmp_path / "trace.jsonl"
+        env = {**os.environ, "DS01_TRACE": "0", "DS01_TRACE_FILE": str(trace_file)}
+        code = f"import sys; sys.path.insert(0, {str(lib_path)!r}); import ds01_trace; print(ds01_trace.install())"
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True)
+        assert out.stdout.strip() == "False"
+        assert not trace_file.exists()
+
+
+class TestEnabled:
+    @pytest.fixture
+    def entries(self, tmp_path):
+        return run_traced(tmp_path, {"DS01_TRACE": "1"})
+
+    def test_exec_spans(self, entries):
+        execs = [e for e in entries if e["kind"] == "exec"]
+        assert [e["name"] for e in execs[:2]] == ["true", "true"]
+        assert all(e["rc"] == 0 and e["source"] == "test-tool" for e in execs)
+
+    def test_yaml_and_caller_spans(self, entries):
+        yaml_spans = [e for e in entries if e["kind"] == "yaml"]
+        assert yaml_spans[0]["name"] == "resource-limits.yaml"
+        spans = {e["name"]: e for e in entries if e["kind"] == "span"}
+        assert spans["lock.hold"]["ms"] == 250.0
+        assert spans["lock.wait"]["lock"] == "x.lock"
+
+    def test_summary_totals(self, entries):
+        summary = entries[-1]
+        assert summary["kind"] == "summary"
+        assert summary["commands"]["true"]["count"] == 2
+        assert summary["spans"]["lock.hold"]["count"] == 1
+        assert summary["exec_ms"] >= summary["commands"]["true"]["ms"]
+
+    def test_trace_id_shared_with_children(self, entries):
+        assert len({e["trace"] for e in entries}) == 1
+        child = next(e for e in entries if e["name"] == "child")
+        assert child["child_trace"] == child["trace"]
+
+    def test_import_installs_named_after_script(self, tmp_path):
+        script = tmp_path / "my-tool.py"
+        script.write_text(
+            f"import subprocess, sys\nsys.path.insert(0, {str(lib_path)!r})\n"
+            "import ds01_trace\nsubprocess.run(['true'])\n"
+        )
+        trace_file = tmp_path / "trace.jsonl"
+        env = {**os.environ, "DS01_TRACE": "1", "DS01_TRACE_FILE": str(trace_file)}
+        env.pop("DS01_TRACE_ID", None)
+        subprocess.run([sys.executable, str(script)], env=env, check=True, timeout=30)
+        entries = [json.loads(line) for line in trace_file.read_text().splitlines()]
+        assert {e["source"] for e in entries} == {"my-tool"}
+
+
+class TestCommandName:
+    @pytest.mark.parametrize(
+        "args,expected",
+        [
+            (["/usr/bin/docker", "inspect", "x"], "docker inspect"),
+            (["nvidia-smi", "--query-gpu=uuid", "--format=csv"], "nvidia-smi --query-gpu"),
+            (
+                ["python3", "/opt/ds01-infra/scripts/docker/event-logger.py", "log"],
+                "python3 event-logger.py",
+            ),
+            ("docker ps -a", "docker ps"),
+            (["true"], "true"),
+            ([], "?"),
+        ],
+    )
+    def test_grouping(self, args, expected):
+        assert ds01_trace._command_name(args) == expected
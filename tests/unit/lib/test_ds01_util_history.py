@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ds01_util_history.py (columnar utilization history analysis)
+/opt/ds01-infra/tests/unit/lib/test_ds01_util_history.py
+
+Run: pytest tests/unit/lib/test_ds01_util_history.py -v
+"""
+
+import json
+import random
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+# Add lib to path
+lib_path = Path(__file__).resolve().parent.parent.parent.parent / "scripts" / "lib"
+sys.path.insert(0, str(lib_path))
+
+import ds01_util_history  # noqa: E402
+from ds01_util_history import analyze, load_window, percentile, wasted  # noqa: E402
+
+T0 = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc).timestamp()
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _write(path, entries):
+    path.write_text("".join(json.dumps(e) + "\n" for e in entries))
+    return path
+
+
+def _mig(ts, utils, allocs):
+    return {
+        "timestamp": _iso(ts),
+        "mig_instances": [
+            {"slot": slot, "profile": "1g.10gb", "gpu_util_percent": u} for slot, u in utils.items()
+        ],
+        "allocations": [{"container": c, "user": u, "mig_slot": s} for c, u, s in allocs],
+    }
+
+
+def _nested_scan(entries, since, threshold):
+    """The per-entry loop check_wasted_allocations used before (MIG variant)."""
+    usage = {}
+    for entry in entries:
+        if datetime.fromisoformat(entry["timestamp"].replace("Z", "+00:00")).timestamp() < since:
+            continue
+        for alloc in entry["allocations"]:
+            u = usage.setdefault(alloc["container"], [0, 0])
+            for mig in entry["mig_instances"]:
+                if mig["slot"] == alloc["mig_slot"]:
+                    u[0] += 1
+                    u[1] += mig["gpu_util_percent"] < threshold
+                    break
+    return {c: (n, low) for c, (n, low) in usage.items() if n}
+
+
+class TestLoadWindow:
+    def test_window_matches_full_scan(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ds01_util_history, "SEEK_SLACK", 256)  # Force the binary search
+        rng = random.Random(7)
+        slots = [f"{g}.{i}" for g in range(2) for i in range(3)]
+        entries = []
+        for n in range(400):
+            allocs = [(f"c{i}", f"u{i}", slots[i]) for i in range(4) if rng.random() < 0.9]
+            entries.append(
+                _mig(T0 + 300 * n, {s: rng.choice((0, 2, 40, 90)) for s in slots}, allocs)
+            )
+        log = _write(tmp_path / "mig.jsonl", entries)
+
+        since = T0 + 300 * 250
+        window = load_window(log, since, "mig")
+        assert len(window) == 150 and window.timestamps[0] == since
+
+        stats = analyze(window, threshold=5)
+        expected = _nested_scan(entries, since, 5)
+        assert {c: (s.samples, s.low_samples) for c, s in stats.items()} == expected
+
+    def test_gpu_slots_read_parent_column(self, tmp_path):
+        entries = [
+            {
+                "timestamp": _iso(T0 + 300 * n),
+                "gpus": [{"index": 0, "gpu_util_percent": 1}, {"index": 1, "gpu_util_percent": 80}],
+                "allocations": [
+                    {"container": "a", "user": "alice", "gpu_slot": "0"},
+                    {"container": "b", "user": "bob", "gpu_slot": "1.2"},
+                ],
+            }
+            for n in range(3)
+        ]
+        stats = analyze(load_window(_write(tmp_path / "gpu.jsonl", entries), T0, "gpu"))
+        assert [s.container for s in wasted(stats)] == ["a"]
+        assert stats["b"].p50 == 80 and stats["b"].slot == "1.2"
+
+    def test_missing_log_is_empty(self, tmp_path):
+        assert len(load_window(tmp_path / "absent.jsonl", T0)) == 0
+
+
+class TestAnalyze:
+    def test_idle_streaks_and_percentiles(self, tmp_path):
+        utils = [50, 0, 0, 60, 0, 0, 0, 1]
+        entries = [
+            _mig(T0 + 300 * n, {"0.0": u}, [("job", "alice", "0.0")]) for n, u in enumerate(utils)
+        ]
+        stats = analyze(load_window(_write(tmp_path / "m.jsonl", entries), T0, "mig"), 5)["job"]
+
+        assert stats.samples == 8 and stats.low_samples == 6
+        assert stats.waste_ratio == 0.75
+        assert stats.idle_streak_s == 3 * 300  # Rows 4..7
+        assert stats.longest_idle_s == 3 * 300
+        assert stats.max_util == 60 and stats.last_util == 1
+        assert stats.p50 == 0 and stats.p90 == pytest.approx(53)
+        assert wasted({"job": stats}) == []
+
+    def test_percentile_interpolates(self):
+        assert percentile([10, 20, 30, 40], 50) == 25
+        assert percentile([10, 20, 30, 40], 90) == pytest.approx(37)
+        assert percentile([7], 90) == 7
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: single-pass metrics collector (scripts/monitoring/collect-metrics.py)
+
+Covers the shared /proc scan, CPU deltas between passes, user-slice sampling
+with OOM events, GPU process attribution without ps, and scheduling of host
+groups. /proc and cgroup trees are synthetic; nvidia-smi is stubbed.
+"""
+
+import importlib.util
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+_SCRIPT = Path(__file__).resolve().parents[3] / "scripts" / "monitoring" / "collect-metrics.py"
+NOW = datetime(2026, 3, 2, 12, 0).timestamp()
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location("collect_metrics_test", str(_SCRIPT))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "PROC_ROOT", tmp_path / "proc")
+    monkeypatch.setattr(module, "CGROUP_FS", tmp_path / "cgroup")
+    monkeypatch.setattr(module, "OOM_STATE_FILE", tmp_path / "oom-counts.json")
+    return module
+
+
+def _proc(root, pid, uid, comm, ticks, rss_pages, cmdline=b"", cgroup=""):
+    hz = os.sysconf("SC_CLK_TCK")
+    d = root / str(pid)
+    d.mkdir(parents=True)
+    # Started at t=0 (uptime 100s): ticks/hz CPU seconds over 100s
+    fields = ["S"] + ["0"] * 10 + [str(ticks), "0"] + ["0"] * 6 + ["0", "0", str(rss_pages)]
+    (d / "stat").write_text(f"{pid} ({comm}) {' '.join(fields)}\n")
+    (d / "cmdline").write_bytes(cmdline)
+    (d / "cgroup").write_text(cgroup)
+    os.chown(d, uid, -1)
+    return hz
+
+
+class TestProcScan:
+    def test_one_scan_feeds_users_and_gpu_owners(self, collector, tmp_path, monkeypatch):
+        proc = tmp_path / "proc"
+        proc.mkdir()
+        (proc / "uptime").write_text("100.00 50.00\n")
+        hz = _proc(proc, 10, 1001, "python (train)", 50 * os.sysconf("SC_CLK_TCK"), 256)
+        _proc(proc, 11, 1001, "bash", 0, 256)
+        cid = "a" * 64
+        _proc(
+            proc,
+            12,
+            1002,
+            "python",
+            hz * 10,
+            512,
+            cmdline=b"python\0train.py\0",
+            cgroup=f"0::/ds01.slice/ds01-student.slice/docker-{cid}.scope\n",
+        )
+        _proc(proc, 1, 0, "init", 0, 10)
+
+        procs = collector.scan_processes()
+        assert {p.pid: p.comm for p in procs}[10] == "python (train)"
+        names = {1001: "alice", 1002: "bob"}.get
+        users = {d["user"]: d for _, d in collector.collect_users(procs, names)}
+        page = os.sysconf("SC_PAGE_SIZE")
+        assert users["alice"]["cpu_pct"] == 50.0 and users["alice"]["procs"] == 2
+        assert users["alice"]["rss"] == 512 * page
+        assert set(users) == {"alice", "bob"}  # uid 0 skipped
+
+        outputs = {
+            "--query-gpu": "0, GPU-1, NVIDIA A100, 93, 40960, 81920, 61, 250.5, 400.00\n",
+            "--query-compute-apps": "12, GPU-1, 4096, python\n999, GPU-1, 10, gone\n",
+        }
+        monkeypatch.setattr(collector, "_run", lambda cmd: outputs[cmd[1].split("=")[0]])
+        gpu, process = collector.collect_gpu(procs, names)
+        assert gpu[1]["util"] == 93.0 and gpu[1]["mem_total"] == 81920 * 1024**2
+        assert process[1] == {
+            "pid": 12,
+            "user": "bob",
+            "gpu_uuid": "GPU-1",
+            "mem_used": 4096 * 1024**2,
+            "process": "python",
+            "command": "python train.py",
+            "container": cid[:12],
+        }
+
+
+class TestCpu:
+    def test_utilisation_is_delta_since_last_pass(self, collector, tmp_path):
+        proc = tmp_path / "proc"
+        proc.mkdir()
+        (proc / "loadavg").write_text("1.00 2.00 3.00 1/100 123\n")
+        stat = proc / "stat"
+        state = {}
+
+        stat.write_text("cpu  100 0 100 800 0 0 0 0 0 0\ncpu0 100 0 100 800 0 0 0 0 0 0\n")
+        first = dict(collector.collect_cpu(state))
+        assert first["cpu"]["util"] == 20.0  # Since boot
+
+        stat.write_text("cpu  190 0 100 810 0 0 0 0 0 0\ncpu0 190 0 100 810 0 0 0 0 0 0\n")
+        records = collector.collect_cpu(state)
+        assert records[0][1]["util"] == 90.0
+        assert records[1] == ("cpu_core", {"core": 0, "util": 90.0})
+
+
+class TestSlices:
+    def _slice(self, root, user, oom_kill):
+        d = root / "ds01.slice" / "ds01-student.slice" / f"ds01-student-{user}.slice"
+        d.mkdir(parents=True)
+        (d / "memory.current").write_text("1073741824\n")
+        (d / "memory.max").write_text("max\n")
+        (d / "pids.current").write_text("12\n")
+        (d / "memory.pressure").write_text(
+            "some avg10=1.50 avg60=0 avg300=0 total=1\nfull avg10=0.25 avg60=0 avg300=0 total=1\n"
+        )
+        (d / "memory.events").write_text(f"low 0\nhigh 0\nmax 0\noom 2\noom_kill {oom_kill}\n")
+        return d
+
+    def test_slice_records_and_oom_event_once(self, collector, tmp_path, monkeypatch):
+        cgroup = tmp_path / "cgroup"
+        cgroup.mkdir()
+        (cgroup / "cgroup.controllers").write_text("cpu memory pids\n")
+        self._slice(cgroup, "alice", oom_kill=1)
+        events = []
+        monkeypatch.setattr(collector, "_log_event", lambda *a, **k: events.append((a, k)))
+
+        (record,) = collector.collect_slices()
+        assert record[1]["user"] == "alice" and record[1]["group"] == "student"
+        assert record[1]["mem_current"] == 1024**3 and record[1]["mem_max"] is None
+        assert record[1]["psi_mem_some"] == 1.5 and record[1]["psi_cpu_some"] is None
+
+        assert collector.check_oom_kills([record]) == 1
+        assert collector.check_oom_kills([record]) == 0
+        assert events[0][0] == ("resource.oom_kill",)
+        assert events[0][1]["user"] == "alice" and events[0][1]["total_oom_kills"] == 1
+
+
+class TestScheduling:
+    def test_host_groups_every_interval(self, collector):
+        assert collector.due_groups({}, NOW) == collector.ALL_GROUPS
+        assert collector.due_groups({"host_ts": NOW - 60}, NOW) == ("slices",)
+        assert collector.due_groups({"host_ts": NOW - 290}, NOW) == collector.ALL_GROUPS
+
+    def test_run_writes_one_batch(self, collector, tmp_path, monkeypatch):
+        sys.path.insert(0, str(_SCRIPT.parents[1] / "lib"))
+        from ds01_metrics_store import MetricsWriter, read_day
+
+        monkeypatch.setattr(collector, "collect", lambda groups, state, now: [])
+        state_file = tmp_path / "state.json"
+        collector.run(("slices",), NOW, MetricsWriter(tmp_path / "m"), state_file)
+
+        (sample,) = read_day("2026-03-02", metrics_dir=tmp_path / "m")
+        assert sample.kind == "sample" and sample.data["groups"] == "slices"
+        assert json.loads(state_file.read_text()) == {}
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: delta-only workload detection (scripts/monitoring/detect-workloads.py)
+
+Covers the per-entry digest, inspecting only new/changed containers, the
+image ID -> tag cache, and skipping the inventory rewrite when nothing
+changed. The Docker SDK is replaced by a fake low-level client; nvidia-smi
+is stubbed out.
+"""
+
+import importlib.util
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_SCRIPT = Path(__file__).resolve().parents[3] / "scripts" / "monitoring" / "detect-workloads.py"
+
+
+@pytest.fixture
+def dw(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location("detect_workloads_test", str(_SCRIPT))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(module, "INVENTORY_FILE", tmp_path / "workload-inventory.json")
+    monkeypatch.setattr(module, "DIGEST_FILE", tmp_path / "workload-inventory.digest.json")
+    monkeypatch.setattr(module, "scan_host_gpu_processes", lambda: {})
+    monkeypatch.setattr(module, "log_event", lambda *a, **k: True)
+    monkeypatch.setattr(module.sys, "argv", ["detect-workloads.py"])
+    return module
+
+
+class FakeAPI:
+    def __init__(self):
+        self.summaries = {}
+        self.calls = []
+
+    def add(self, cid, name, state="running", user="alice"):
+        self.summaries[cid] = {
+            "Id": cid,
+            "Names": [f"/{name}"],
+            "State": state,
+            "Labels": {"ds01.user": user, "ds01.managed": "true"},
+            "ImageID": "sha256:" + "1" * 64,
+        }
+
+    def containers(self, all=False):
+        self.calls.append("list")
+        return list(self.summaries.values())
+
+    def inspect_container(self, cid):
+        self.calls.append(f"inspect:{cid}")
+        summary = self.summaries[cid]
+        return {
+            "Id": cid,
+            "Name": summary["Names"][0],
+            "State": {"Status": summary["State"], "Pid": 0},
+            "Config": {"Labels": summary["Labels"]},
+            "HostConfig": {"DeviceRequests": [{"Capabilities": [["gpu"]], "DeviceIDs": ["0"]}]},
+        }
+
+    def images(self, all=False):
+        self.calls.append("images")
+        return [{"Id": "sha256:" + "1" * 64, "RepoTags": ["ds01-alice/proj:latest"]}]
+
+
+def _model(attrs):
+    return SimpleNamespace(
+        id=attrs["Id"],
+        name=attrs["Name"].lstrip("/"),
+        labels=attrs["Config"]["Labels"],
+        status=attrs["State"]["Status"],
+        attrs=attrs,
+    )
+
+
+@pytest.fixture
+def api(dw, monkeypatch):
+    fake = FakeAPI()
+    client = SimpleNamespace(api=fake, containers=SimpleNamespace(prepare_model=_model))
+    monkeypatch.setattr(dw, "get_docker_client", lambda: client)
+    return fake
+
+
+def _inventory(dw):
+    return json.loads(dw.INVENTORY_FILE.read_text())
+
+
+class TestDeltaScan:
+    def test_first_scan_builds_entries(self, dw, api):
+        api.add("a" * 64, "proj._.1001")
+        assert dw.main() == 0
+
+        entry = _inventory(dw)["containers"]["a" * 12]
+        assert entry["user"] == "alice"
+        assert entry["has_gpu"] and entry["gpu_devices"] == ["0"]
+        assert entry["image"] == "ds01-alice/proj:latest"
+        assert api.calls == ["list", "inspect:" + "a" * 64, "images"]
+
+    def test_unchanged_scan_skips_inspect_and_write(self, dw, api):
+        api.add("a" * 64, "proj._.1001")
+        dw.main()
+        mtime = dw.INVENTORY_FILE.stat().st_mtime_ns
+        api.calls.clear()
+
+        assert dw.main() == 0
+        assert api.calls == ["list"]
+        assert dw.INVENTORY_FILE.stat().st_mtime_ns == mtime
+
+    def test_only_changed_container_is_inspected(self, dw, api, monkeypatch):
+        api.add("a" * 64, "proj._.1001")
+        api.add("b" * 64, "other._.1002", user="bob")
+        dw.main()
+        api.calls.clear()
+        events = []
+        monkeypatch.setattr(dw, "log_event", lambda event, **k: events.append(event))
+
+        api.add("b" * 64, "other._.1002", state="exited", user="bob")
+        dw.main()
+
+        assert api.calls == ["list", "inspect:" + "b" * 64]  # image tag came from the cache
+        assert events == ["detection.container_status_changed"]
+        assert _inventory(dw)["containers"]["b" * 12]["status"] == "exited"
+
+    def test_stale_inventory_is_rewritten(self, dw, api, monkeypatch):
+        api.add("a" * 64, "proj._.1001")
+        dw.main()
+        monkeypatch.setattr(dw, "INVENTORY_MAX_AGE", 0)
+        api.calls.clear()
+
+        dw.main()
+        assert api.calls == ["list"]  # rewritten from reused entries, nothing inspected
+
+    def test_list_failure_skips_tick(self, dw, api, monkeypatch):
+        api.add("a" * 64, "proj._.1001")
+        dw.main()
+
+        def broken(all=False):
+            raise ConnectionError("daemon down")
+
+        monkeypatch.setattr(api, "containers", broken)
+        assert dw.main() == 1
+        assert "a" * 12 in _inventory(dw)["containers"]
+
+
+def test_process_digest_ignores_memory(dw):
+    process = {"pid": 1, "user": "alice", "cmdline": "python", "gpu_uuid": "GPU-0"}
+    assert dw.process_digest({**process, "gpu_memory_mb": 10}) == dw.process_digest(
+        {**process, "gpu_memory_mb": 900}
+    )
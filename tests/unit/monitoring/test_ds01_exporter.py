@@ -467,6 +467,172 @@ class TestCollectSystemMetrics:
         assert isinstance(lines, list)
 
 
+# =============================================================================
+# Test: collect_self_metrics()
+# =============================================================================
+
+
+class TestCollectSelfMetrics:
+    """Tests for collect_self_metrics() (DS01's own latency)."""
+
+    def test_reports_collector_durations(self, tmp_path):
+        exporter = load_exporter_module()
+        exporter.STATE_DIR = tmp_path
+
+        lines = exporter.collect_self_metrics({"allocation_metrics": 0.25})
+
+        assert (
+            'ds01_exporter_collector_duration_seconds{collector="allocation_metrics"} 0.250000'
+            in lines
+        )
+
+    def test_reads_recorded_measurements(self, tmp_path):
+        metrics_dir = tmp_path / "self-metrics"
+        metrics_dir.mkdir()
+        (metrics_dir / "observations.log").write_text(
+            "ds01_allocation_duration_seconds 0.4 operation=allocate,outcome=NO_GPU_AVAILABLE\n"
+        )
+        (metrics_dir / "job-check-idle-containers.state").write_text(
+            "duration=8.0\nitems=16\nstatus=ok\ntimestamp=1700000000\n"
+        )
+        exporter = load_exporter_module()
+        exporter.STATE_DIR = tmp_path
+
+        output = "\n".join(exporter.collect_self_metrics({}))
+
+        assert 'outcome="NO_GPU_AVAILABLE"' in output
+        assert 'ds01_job_last_seconds_per_item{job="check-idle-containers"} 0.5' in output
+
+
+# =============================================================================
+# Test: collect_state_validation_metrics()
+# =============================================================================
+
+
+class TestCollectStateValidationMetrics:
+    """Tests for collect_state_validation_metrics() (validate-state.py findings)."""
+
+    def test_reports_findings(self, tmp_path):
+        findings = tmp_path / "state-validation.json"
+        findings.write_text(
+            json.dumps(
+                {
+                    "valid": False,
+                    "issues": [
+                        {
+                            "check": "duplicate_allocation",
+                            "severity": "error",
+                            "gpu_slot": "1.0",
+                            "containers": ["a._.1001", "b._.1002"],
+                        }
+                    ],
+                }
+            )
+        )
+        exporter = load_exporter_module()
+        exporter.STATE_VALIDATION_FILE = findings
+
+        lines = exporter.collect_state_validation_metrics()
+
+        assert "ds01_state_validation_valid 0" in lines
+        assert 'ds01_state_validation_issues{severity="error"} 1' in lines
+        assert 'ds01_state_validation_issues{severity="info"} 0' in lines
+        assert (
+            'ds01_state_validation_issue{check="duplicate_allocation",severity="error",'
+            'container="a._.1001,b._.1002",gpu_slot="1.0"} 1'
+        ) in lines
+
+    def test_handles_missing_file(self, tmp_path):
+        exporter = load_exporter_module()
+        exporter.STATE_VALIDATION_FILE = tmp_path / "missing.json"
+
+        lines = exporter.collect_state_validation_metrics()
+
+        assert all(line.startswith("#") for line in lines)
+
+
+# =============================================================================
+# Test: collect_container_gpu_utilization()
+# =============================================================================
+
+DCGM_PAYLOAD = """\
+# HELP DCGM_FI_DEV_GPU_UTIL GPU utilization (in %).
+# TYPE DCGM_FI_DEV_GPU_UTIL gauge
+DCGM_FI_DEV_GPU_UTIL{gpu="0",UUID="GPU-a",modelName="NVIDIA A100",GPU_I_ID=""} 87
+DCGM_FI_DEV_GPU_UTIL{gpu="1",UUID="GPU-b",modelName="A100 \\"PCIe\\", 40GB"} 2
+DCGM_FI_DEV_SM_CLOCK{gpu="2",UUID="GPU-c",GPU_I_ID="3"} 210
+DCGM_FI_PROF_GR_ENGINE_ACTIVE{gpu="2",UUID="GPU-c",GPU_I_ID="3"} 0.42
+DCGM_FI_PROF_GR_ENGINE_ACTIVE{gpu="2",UUID="GPU-c",GPU_I_ID="5"} 0.01
+DCGM_FI_DEV_GPU_TEMP{gpu="0",UUID="GPU-a"} 61
+"""
+
+
+class TestCollectContainerGpuUtilization:
+    """DCGM payload parsed once and joined with allocations in-process."""
+
+    def test_parse_labels_handles_escapes(self):
+        exporter = load_exporter_module()
+        labels = exporter._parse_labels('gpu="1",modelName="A100 \\"PCIe\\", 40GB",GPU_I_ID=""')
+        assert labels == {"gpu": "1", "modelName": 'A100 "PCIe", 40GB', "GPU_I_ID": ""}
+
+    def test_parse_dcgm_snapshot(self):
+        exporter = load_exporter_module()
+        snapshot = exporter._parse_dcgm(line.encode() for line in DCGM_PAYLOAD.splitlines())
+        assert snapshot.util == {
+            ("0", ""): 87.0,
+            ("1", ""): 2.0,
+            ("2", "3"): 42.0,  # Profiling ratio scaled to percent
+            ("2", "5"): 1.0,
+        }
+        assert snapshot.gpu_i_ids == {2: [3, 5]}
+
+    def test_joins_allocations_and_counts_waste(self):
+        exporter = load_exporter_module()
+        snapshot = exporter._parse_dcgm(DCGM_PAYLOAD.splitlines())
+        exporter._dcgm_cache, exporter._dcgm_cache_timestamp = snapshot, float("inf")
+        exporter._mig_mapping_cache = {
+            "2.0": {"gpu": "2", "gpu_i_id": "3", "slot": "2.0"},
+            "2.1": {"gpu": "2", "gpu_i_id": "5", "slot": "2.1"},
+        }
+        allocations = {
+            "0": {"containers": ["train._.1001"], "users": {"alice": 1}},
+            "1": {"containers": ["idle._.1002"], "users": {"bob": 1}},
+            "2.0": {"containers": ["mig._.1003"], "users": {"carol": 1}},
+            "2.1": {"containers": ["nb._.1004"], "users": {"dave": 1}},
+            "3": {"containers": ["ghost._.1005"], "users": {"erin": 1}},  # No DCGM series
+        }
+        reader = MagicMock()
+        reader.get_all_allocations.return_value = allocations
+        exporter._module_cache["gpu_state_reader"] = MagicMock(get_reader=lambda: reader)
+
+        lines = exporter.collect_container_gpu_utilization()
+
+        assert (
+            'ds01_container_gpu_utilization{user="alice",container="train._.1001",slot="0"} 87'
+            in lines
+        )
+        assert (
+            'ds01_container_gpu_utilization{user="carol",container="mig._.1003",slot="2.0"} 42'
+            in lines
+        )
+        assert not any("ghost" in line for line in lines)
+        assert "ds01_gpu_waste_count 2" in lines  # bob (2%) and dave (1%)
+        assert "ds01_gpu_waste_percent 50" in lines
+
+        # Allocation snapshot shared with collect_allocation_metrics within a scrape
+        exporter.collect_allocation_metrics()
+        assert reader.get_all_allocations.call_count == 1
+
+    def test_no_series_when_dcgm_unreachable(self):
+        exporter = load_exporter_module()
+        exporter.DCGM_EXPORTER_URL = "http://127.0.0.1:1/metrics"
+
+        lines = exporter.collect_container_gpu_utilization()
+
+        assert not any(line.startswith("ds01_") for line in lines)
+        assert exporter._query_dcgm_gpu_i_ids() == {}
+
+
 # =============================================================================
 # Test: collect_all_metrics()
 # =============================================================================
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: single-pass report aggregator (scripts/monitoring/metrics-report.py)
+
+Covers one read per day feeding every section, exact merging of daily
+partials into rollups, reuse of final partials without touching raw metrics,
+and the rendered markdown.
+"""
+
+import importlib.util
+import sys
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+
+_SCRIPT = Path(__file__).resolve().parents[3] / "scripts" / "monitoring" / "metrics-report.py"
+sys.path.insert(0, str(_SCRIPT.parents[1] / "lib"))
+
+from ds01_metrics_store import MetricsWriter  # noqa: E402
+
+GB = 1024**3
+
+
+@pytest.fixture(scope="module")
+def report():
+    spec = importlib.util.spec_from_file_location("metrics_report_test", str(_SCRIPT))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    """Two days of samples: util 10..30 on 2026-03-02, 50..70 on 2026-03-03."""
+    writer = MetricsWriter(tmp_path / "metrics")
+    for day, base in ((2, 10), (3, 50)):
+        for i in range(3):
+            ts = datetime(2026, 3, day, 12, 5 * i).timestamp()
+            util = base + 10 * i
+            records = [
+                ("gpu", {"index": "0", "util": util, "mem_used": GB, "mem_total": 80 * GB}),
+                ("gpu_process", {"pid": 1, "user": "alice", "mem_used": GB}),
+                ("cpu", {"util": util, "load1": 1.0, "load5": 1.0, "load15": 1.0}),
+                ("user", {"user": "alice", "cpu_pct": util, "rss": 2 * GB}),
+                ("memory", {"total": 64 * GB, "used": 16 * GB, "swap_total": 0}),
+                ("disk", {"mount": "/", "device": "/dev/sda1", "size": 100 * GB, "used": day * GB}),
+                ("container", {"name": f"proj{day}._.1001", "state": "running"}),
+                ("sample", {"groups": "gpu,cpu,memory,disk,containers,slices"}),
+            ]
+            writer.append(records, ts=ts)
+        writer.append([("sample", {"groups": "slices"})], ts=ts + 60)
+    return tmp_path / "metrics"
+
+
+class TestSinglePass:
+    def test_each_day_read_once_for_all_sections(self, report, metrics, monkeypatch):
+        calls = []
+        read_day = report.ds01_metrics_store.read_day
+
+        def counting(day, kinds=None, metrics_dir=None):
+            calls.append(day)
+            return read_day(day, kinds, metrics_dir)
+
+        monkeypatch.setattr(report.ds01_metrics_store, "read_day", counting)
+        partial = report.build_day("2026-03-02", metrics)
+        assert calls == ["2026-03-02"]
+
+        assert partial.samples == 3  # slice-only passes are not host samples
+        assert partial.stats["gpu_util"]["0"].to_list() == [3, 60.0, 10.0, 30.0]
+        assert partial.stats["gpu_user_mem"]["alice"].total == 3 * 1024
+        assert partial.stats["user_rss"]["alice"].mean == 2048
+        assert partial.containers == {"proj2._.1001": 3}
+        assert len(partial.disks) == 1
+
+
+class TestRollups:
+    def test_merged_partials_equal_one_pass_over_both_days(self, report, metrics, tmp_path):
+        weekly = report.rollup(date(2026, 3, 2), date(2026, 3, 3), metrics, tmp_path / "p")
+
+        combined = report.ReportPartial("2026-03-02", "2026-03-03")
+        for day in ("2026-03-02", "2026-03-03"):
+            for rec in report.ds01_metrics_store.read_day(day, metrics_dir=metrics):
+                combined.add(rec)
+
+        assert weekly.samples == combined.samples == 6
+        for section, stats in combined.stats.items():
+            for key, stat in stats.items():
+                assert weekly.stats[section][key].to_list() == stat.to_list()
+        assert weekly.containers == combined.containers
+        assert weekly.disks[0]["used"] == 3 * GB  # Latest snapshot wins
+        assert weekly.days == {"2026-03-02", "2026-03-03"}
+
+    def test_final_partials_reused_without_raw_reads(self, report, metrics, tmp_path, monkeypatch):
+        partials = tmp_path / "p"
+        report.rollup(date(2026, 3, 2), date(2026, 3, 3), metrics, partials)
+        assert sorted(p.name for p in partials.iterdir()) == ["2026-03-02.json", "2026-03-03.json"]
+
+        def no_read(*args, **kwargs):
+            raise AssertionError("raw metrics re-read")
+
+        monkeypatch.setattr(report.ds01_metrics_store, "read_day", no_read)
+        again = report.rollup(date(2026, 3, 2), date(2026, 3, 3), metrics, partials)
+        assert again.samples == 6
+
+    def test_partial_built_before_midnight_is_rebuilt(self, report, metrics, tmp_path):
+        partials = tmp_path / "p"
+        early = report.build_day("2026-03-02", metrics)
+        early.built_at = datetime(2026, 3, 2, 23, 55).timestamp()
+        early.samples = 1  # as if built before the last passes
+        report.save_partial(early, partials)
+
+        assert report.day_partial("2026-03-02", metrics, partials).samples == 3
+        assert report.load_partial("2026-03-02", partials).final
+
+    def test_periods(self, report):
+        assert report.period("weekly", date(2026, 3, 4)) == (date(2026, 3, 2), date(2026, 3, 8))
+        assert report.period("monthly", date(2026, 2, 14)) == (date(2026, 2, 1), date(2026, 2, 28))
+
+
+def test_render_daily(report, metrics):
+    text = report.render(report.build_day("2026-03-02", metrics))
+    assert "**Date:** Monday, March 02, 2026" in text
+    assert "**Total Samples:** 3" in text
+    assert "| 0 | 20.0% | 30.0% | 1024 MB | 81920 MB |" in text
+    assert "| alice | 3072 MB | 1024 MB | 3 |" in text
+    assert "| /dev/sda1 | 100.0G | 2.0G |" in text
+    assert "- `proj2._.1001` (active in 3 samples)" in text
+    assert "*No GPU data available*" not in text
+
+
+def test_render_day_with_empty_fields(report, tmp_path):
+    ts = datetime(2026, 3, 2, 12, 0).timestamp()
+    MetricsWriter(tmp_path).append(
+        [
+            ("cpu", {"util": None, "load1": None, "load5": None, "load15": None}),
+            ("memory", {"total": 64 * GB, "used": None, "swap_total": GB, "swap_used": None}),
+            ("sample", {"groups": "cpu,memory"}),
+        ],
+        ts=ts,
+    )
+    text = report.render(report.build_day("2026-03-02", tmp_path))
+    assert "*No CPU data available*" in text
+    assert "*No memory data available*" in text
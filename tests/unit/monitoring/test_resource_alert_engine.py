@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: one-pass resource alert engine (scripts/monitoring/resource-alert-engine.py)
+
+Covers threshold evaluation from a single snapshot and limits table, the
+single state file holding alerts and cooldowns, and the per-user alert files
+kept as views (rewritten only on change, foreign entries preserved). Docker
+is replaced by a fake that records commands.
+"""
+
+import importlib.util
+import json
+import subprocess
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_SCRIPT = (
+    Path(__file__).resolve().parents[3] / "scripts" / "monitoring" / "resource-alert-engine.py"
+)
+NOW = datetime(2026, 3, 2, 12, 0, tzinfo=timezone.utc)
+
+LIMITS = {"group": "student", "max_gpus": 2.0, "max_containers": 3, "memory_max": 16 * 1024**3}
+
+
+@pytest.fixture(scope="module")
+def engine():
+    spec = importlib.util.spec_from_file_location("resource_alert_engine_test", str(_SCRIPT))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def state(engine, tmp_path):
+    return engine.AlertState(alerts_dir=tmp_path)
+
+
+def _container(cid, user, slots=(), managed=True):
+    labels = {"ds01.user": user}
+    if managed:
+        labels["ds01.managed"] = "true"
+    return {
+        "Id": cid,
+        "Name": f"/{cid}._.1001",
+        "Config": {"Labels": labels},
+        "HostConfig": {"CgroupParent": f"ds01-student-{user}.slice"},
+        "_slots": list(slots),
+    }
+
+
+class TestSnapshot:
+    def test_one_listing_and_batched_inspect(self, engine, monkeypatch):
+        containers = [_container(f"c{i}", "alice", slots=[str(i % 2)]) for i in range(5)]
+        containers.append(_container("b0", "bob", managed=False))
+        calls = []
+
+        def run(cmd, **kwargs):
+            calls.append(cmd[1])
+            if cmd[1] == "ps":
+                return SimpleNamespace(stdout="\n".join(c["Id"] for c in containers))
+            by_id = {c["Id"]: c for c in containers}
+            return SimpleNamespace(stdout=json.dumps([by_id[i] for i in cmd[2:]]))
+
+        monkeypatch.setattr(subprocess, "run", run)
+        monkeypatch.setattr(engine, "INSPECT_BATCH_SIZE", 4)
+        reader = SimpleNamespace(
+            _extract_gpu_from_container=lambda c: (
+                {"user": "alice", "gpu_slots": c["_slots"]} if c["_slots"] else None
+            )
+        )
+
+        snapshot = engine.take_snapshot(reader)
+        assert calls == ["ps", "inspect", "inspect"]
+        assert snapshot.users == {"alice"}  # bob's container is not ds01.managed
+        assert snapshot.container_counts == {"alice": 5, "bob": 1}
+        assert snapshot.gpu_slots["alice"] == {"0", "1"}
+
+    def test_listing_failure_raises(self, engine, monkeypatch):
+        def run(cmd, **kwargs):
+            raise subprocess.CalledProcessError(1, cmd)
+
+        monkeypatch.setattr(subprocess, "run", run)
+        with pytest.raises(RuntimeError):
+            engine.take_snapshot(None)
+
+
+class TestEvaluate:
+    def test_thresholds(self, engine):
+        verdicts = engine.evaluate_user(LIMITS, gpus=2, containers=1, memory=13 * 1024**3)
+        assert verdicts["gpu"][:2] == ("gpu_limit_reached", "GPU limit reached: 2/2 GPUs allocated")
+        assert verdicts["container"] is None
+        assert verdicts["memory"][0] == "memory_usage_high"
+        assert verdicts["memory"][1] == "Memory usage high: 13.0/16 GB (81%)"
+
+    def test_unlimited_and_unknown_are_not_evaluated(self, engine):
+        limits = {**LIMITS, "max_gpus": None, "max_containers": None}
+        assert engine.evaluate_user(limits, gpus=9, containers=9, memory=None) == {}
+
+    def test_parse_memory(self, engine):
+        assert engine.parse_memory("16G") == 16 * 1024**3
+        assert engine.parse_memory("512m") == 512 * 1024**2
+        assert engine.parse_memory(1024) == 1024
+        assert engine.parse_memory("unlimited") is None
+
+
+class TestAlertState:
+    def _raise(self, engine, state, now, gpus=2):
+        verdicts = engine.evaluate_user(LIMITS, gpus=gpus, containers=0, memory=None)
+        state.apply("alice", verdicts, now)
+        active = state.notifications()
+        state.save(now)
+        return active
+
+    def test_active_alerts_every_run_and_single_state_file(self, engine, state, tmp_path):
+        # The cooldown is applied by the notification index, not here
+        expected = [
+            ("alice", "gpu_limit_reached", "ALERT", "GPU limit reached: 2/2 GPUs allocated")
+        ]
+        assert self._raise(engine, state, NOW) == expected
+        assert self._raise(engine, state, NOW + timedelta(hours=1)) == expected
+
+        saved = json.loads((tmp_path / ".quota-state.json").read_text())
+        entry = saved["alerts"]["alice"]["gpu_limit_reached"]
+        assert entry["seen_at"] == "2026-03-02T13:00:00Z"
+        assert "last_notified_at" not in entry
+        assert sorted(p.name for p in tmp_path.iterdir()) == [".quota-state.json", "alice.json"]
+
+    def test_single_user_reports_only_that_user(self, engine, state):
+        verdicts = engine.evaluate_user(LIMITS, gpus=2, containers=0, memory=None)
+        state.apply("alice", verdicts, NOW)
+        state.apply("bob", verdicts, NOW)
+
+        assert [user for user, *_ in state.notifications(users=["bob"])] == ["bob"]
+        assert [user for user, *_ in state.notifications()] == ["alice", "bob"]
+
+    def test_view_rewritten_only_on_change(self, engine, state, tmp_path):
+        self._raise(engine, state, NOW)
+        view = tmp_path / "alice.json"
+        mtime = view.stat().st_mtime_ns
+        self._raise(engine, state, NOW + timedelta(hours=1))
+        assert view.stat().st_mtime_ns == mtime
+
+        # Dropping to 1/2 (50%) clears the alert and the now-empty view
+        self._raise(engine, state, NOW + timedelta(hours=2), gpus=1)
+        assert not view.exists()
+        assert state.alerts == {}
+
+    def test_level_change_replaces_alert(self, engine, state, tmp_path):
+        limits = {**LIMITS, "max_gpus": 5.0}
+        state.apply("alice", engine.evaluate_user(limits, 4, 0, None), NOW)
+        state.apply("alice", engine.evaluate_user(limits, 5, 0, None), NOW)
+        assert list(state.alerts["alice"]) == ["gpu_limit_reached"]
+
+    def test_foreign_entries_preserved(self, engine, state, tmp_path):
+        view = tmp_path / "alice.json"
+        queued = {"type": "gpu_available", "message": "GPU 0 reserved", "updated_at": "x"}
+        view.write_text(json.dumps([queued]))
+
+        self._raise(engine, state, NOW)
+        assert [a["type"] for a in json.loads(view.read_text())] == [
+            "gpu_available",
+            "gpu_limit_reached",
+        ]
+        self._raise(engine, state, NOW, gpus=0)
+        assert json.loads(view.read_text()) == [queued]
+
+    def test_first_run_adopts_existing_alerts(self, engine, tmp_path):
+        (tmp_path / "alice.json").write_text(
+            json.dumps(
+                [
+                    {
+                        "type": "gpu_limit_reached",
+                        "message": "GPU limit reached: 2/2 GPUs allocated",
+                        "created_at": "2026-03-02T10:00:00Z",
+                        "updated_at": "2026-03-02T11:00:00Z",
+                        "last_notified_at": "2026-03-02T11:00:00Z",
+                    }
+                ]
+            )
+        )
+        state = engine.AlertState(alerts_dir=tmp_path)
+        entry = state.alerts["alice"]["gpu_limit_reached"]
+        assert entry["created_at"] == "2026-03-02T10:00:00Z"
+        assert "last_notified_at" not in entry
+
+    def test_clean_drops_stale_alerts(self, engine, state, tmp_path):
+        self._raise(engine, state, NOW)
+        old = {"type": "gpu_available", "message": "m", "updated_at": "2026-03-01T00:00:00Z"}
+        (tmp_path / "bob.json").write_text(json.dumps([old]))
+
+        engine.run_clean(state, NOW + timedelta(hours=25))
+        assert state.alerts == {}
+        assert sorted(p.name for p in tmp_path.iterdir()) == [".quota-state.json"]
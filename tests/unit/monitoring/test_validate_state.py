@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: incremental state validation (scripts/monitoring/validate-state.py)
+
+Covers findings keyed by container/slot, event-driven re-validation of only
+the touched containers and slots, the cached user table, and the findings
+file the exporter reads. nvidia-smi and docker are never called: the model
+is seeded directly.
+"""
+
+import importlib.util
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+_SCRIPT = Path(__file__).resolve().parents[3] / "scripts" / "monitoring" / "validate-state.py"
+
+
+@pytest.fixture(scope="module")
+def vs():
+    spec = importlib.util.spec_from_file_location("validate_state_test", str(_SCRIPT))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def validator(vs, monkeypatch):
+    monkeypatch.setattr(vs.pwd, "getpwnam", lambda user: None)
+    v = vs.StateValidator()
+    v.nvidia_gpus = {"0": {}, "1": {}, "1.0": {}}
+    v.allocations = {
+        "a": {"name": "a._.1001", "gpu_slot": "0", "user": "alice", "running": True},
+        "b": {"name": "b._.1002", "gpu_slot": "1.0", "user": "bob", "running": True},
+    }
+    v.revalidate(v.allocations, {"0", "1.0"})
+    return v
+
+
+def _event(action, container_id, **attributes):
+    return {"Action": action, "Actor": {"ID": container_id, "Attributes": attributes}}
+
+
+class TestIncrementalChecks:
+    def test_clean_model_has_no_findings(self, validator):
+        assert validator.findings == {}
+        assert validator.result()["valid"]
+
+    def test_event_touches_only_its_container_and_slots(self, validator):
+        ids, slots = validator.apply_event(
+            _event("create", "c", name="c._.1003", **{"ds01.gpu_slot": "0", "ds01.user": "carol"})
+        )
+        assert ids == {"c"} and slots == {"0"}
+
+        assert validator.revalidate(ids, slots)
+        finding = validator.findings[("duplicate_allocation", "0")]
+        assert finding["containers"] == ["a._.1001", "c._.1003"]
+
+        # Destroying the duplicate clears the finding without a rescan
+        ids, slots = validator.apply_event(_event("destroy", "c"))
+        assert validator.revalidate(ids, slots)
+        assert validator.findings == {}
+
+    def test_slot_change_rechecks_old_and_new_slot(self, validator):
+        validator.apply_event(_event("create", "c", name="c", **{"ds01.gpu_slot": "0"}))
+        validator.revalidate({"c"}, {"0"})
+        ids, slots = validator.apply_event(
+            _event("rename", "c", name="c2", **{"ds01.gpu_slot": "1"})
+        )
+        assert slots == {"0", "1"}
+        validator.revalidate(ids, slots)
+        assert validator.findings == {}
+
+    def test_missing_gpu_and_bad_label(self, validator):
+        validator.apply_event(_event("create", "d", name="d", **{"ds01.gpu_slot": "7"}))
+        validator.apply_event(_event("create", "e", name="e", **{"ds01.gpu_slot": "gpu-1"}))
+        validator.revalidate({"d", "e"}, {"7", "gpu-1"})
+
+        assert set(validator.findings) == {
+            ("gpu_exists", "d"),
+            ("gpu_exists", "e"),
+            ("label_format", "e"),
+        }
+
+    def test_unlabelled_container_events_are_dropped(self, validator):
+        ids, slots = validator.apply_event(_event("start", "x", name="plain"))
+        assert "x" not in validator.allocations and slots == set()
+
+
+class TestUserTable:
+    def test_lookups_cached_including_misses(self, vs, monkeypatch):
+        calls = []
+
+        def getpwnam(user):
+            calls.append(user)
+            raise KeyError(user)
+
+        monkeypatch.setattr(vs.pwd, "getpwnam", getpwnam)
+        table = vs.UserTable()
+        assert not table.exists("ghost")
+        assert not table.exists("ghost")
+        assert calls == ["ghost"]
+
+
+def test_findings_file_is_written_atomically(validator, tmp_path):
+    path = tmp_path / "state-validation.json"
+    validator.write_findings(validator.result(), path)
+
+    assert json.loads(path.read_text())["summary"]["allocated"] == 2
+    assert list(tmp_path.iterdir()) == [path]
+
+
+class TestWatch:
+    def test_events_written_together_are_all_handled(self, vs, validator, monkeypatch):
+        lines = [
+            json.dumps(_event("create", "c", name="c", **{"ds01.gpu_slot": "0"})),
+            json.dumps(_event("start", "c", name="c", **{"ds01.gpu_slot": "0"})),
+        ]
+        popen = subprocess.Popen
+
+        def fake_events(cmd, **kwargs):
+            script = 'printf "%s\\n%s\\n" "$1" "$2"; sleep 30'
+            return popen(["sh", "-c", script, "sh", *lines], **kwargs)
+
+        class Done(Exception):
+            pass
+
+        seen = []
+        apply_event = validator.apply_event
+
+        def record(event):
+            seen.append(event["Action"])
+            if len(seen) == 2:
+                raise Done
+            return apply_event(event)
+
+        scans = []
+
+        def full_scan():
+            scans.append(1)
+            assert len(scans) == 1, "second event stayed buffered until the resync"
+            return False
+
+        monkeypatch.setattr(vs.subprocess, "Popen", fake_events)
+        monkeypatch.setattr(validator, "apply_event", record)
+        monkeypatch.setattr(validator, "full_scan", full_scan)
+        monkeypatch.setattr(validator, "write_findings", lambda result: None)
+        monkeypatch.setattr(validator, "refresh_gpus", lambda: False)
+
+        with pytest.raises(Done):
+            validator.watch(resync=2)
+        assert seen == ["create", "start"]
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the offline benchmark fake host (benchmarks/fakehost.py)
+/opt/ds01-infra/tests/unit/test_benchmark_fakehost.py
+
+The benchmarks are only meaningful if the fakes answer the way Docker and
+nvidia-smi do for the commands DS01 actually issues, so these tests drive the
+fake CLIs exactly like the scripts do and check the real parsers agree.
+
+Run: pytest tests/unit/test_benchmark_fakehost.py -v
+"""
+
+import importlib.util
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from fakehost import RESERVED_FREE_SLOTS, FakeHost, gpu_slots, parse_layout  # noqa: E402
+
+
+@pytest.fixture
+def host():
+    with FakeHost(layout="full,1g.10gb*7") as fake:
+        fake.populate(6)
+        yield fake
+
+
+def docker(*args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(["docker", *args], capture_output=True, text=True, timeout=30)
+
+
+class TestLayout:
+    def test_presets_and_specs(self):
+        assert len(gpu_slots(parse_layout("mig"))) == 28
+        gpus = parse_layout("full,3g.40gb*2")
+        assert [s for s, _ in gpu_slots(gpus)] == ["0", "1.0", "1.1"]
+
+    def test_bad_spec_rejected(self):
+        with pytest.raises(ValueError):
+            parse_layout("full,3g.40gb")
+
+
+class TestFakeDocker:
+    """The docker shim must honour the filters and templates the scripts use."""
+
+    def test_ps_filters(self, host):
+        running = docker("ps", "--format", "{{.Names}}").stdout.split()
+        everything = docker("ps", "-a", "--format", "{{.Names}}").stdout.split()
+        allocated = docker(
+            "ps", "-a", "--filter", "label=ds01.gpu.allocated", "--format", "{{.Names}}"
+        ).stdout.split()
+        assert len(everything) == 6
+        assert len(running) == 6  # The first stopped container is the tenth
+        assert len(allocated) == len(gpu_slots(host.gpus)) - RESERVED_FREE_SLOTS
+
+    def test_inspect_templates(self, host):
+        name = "proj0001._.20001"
+        out = docker(
+            "inspect",
+            name,
+            "--format",
+            '{{index .Config.Labels "ds01.user"}}|{{index .Config.Labels "nope"}}|'
+            "{{.State.Running}}|{{range .HostConfig.DeviceRequests}}"
+            "{{range .DeviceIDs}}{{.}}{{end}}{{end}}",
+        )
+        user, missing, running, device = out.stdout.strip().split("|")
+        assert (user, missing, running) == ("bench01", "", "true")
+        assert device.startswith("MIG-")
+
+    def test_inspect_unknown_container_fails(self, host):
+        assert docker("inspect", "ghost").returncode == 1
+
+    def test_run_and_rm(self, host):
+        out = docker("run", "-d", "--name", "x", "--gpus", '"device=GPU-1"', "img", "sleep", "1")
+        assert out.returncode == 0
+        assert "x" in host.container_names()
+        assert docker("rm", "-f", "x").returncode == 0
+        assert "x" not in host.container_names()
+
+    def test_calls_are_counted(self, host):
+        before = host.call_counts().get("docker", 0)
+        docker("ps")
+        subprocess.run(["nvidia-smi", "-L"], capture_output=True)
+        assert host.call_counts()["docker"] == before + 1
+        assert host.call_counts()["nvidia-smi"] == 1
+
+
+class TestStateReaderAgainstFakes:
+    """gpu-state-reader.py must see every allocation the fake host created."""
+
+    def test_get_all_allocations(self, host):
+        path = host.infra / "scripts/docker/gpu-state-reader.py"
+        spec = importlib.util.spec_from_file_location("bench_gpu_state_reader", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+
+        allocations = module.GPUStateReader().get_all_allocations()
+        holders = len(gpu_slots(host.gpus)) - RESERVED_FREE_SLOTS
+        assert len(allocations) == holders
+        assert set(allocations) <= {slot for slot, _ in gpu_slots(host.gpus)}
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: dashboard watch mode (scripts/admin/dashboard)
+
+Covers the live model kept current from docker events, container CPU/memory
+sampling from cgroup v2 files, and the incremental (changed rows only)
+terminal writer. Docker is never called: snapshots and events are fed in
+directly and cgroups live in a temp directory.
+"""
+
+import importlib.machinery
+import importlib.util
+import io
+from pathlib import Path
+
+import pytest
+
+_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "admin" / "dashboard"
+CID = "a" * 64
+
+
+@pytest.fixture(scope="module")
+def dashboard():
+    loader = importlib.machinery.SourceFileLoader("dashboard_live_test", str(_SCRIPT))
+    spec = importlib.util.spec_from_loader("dashboard_live_test", loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def _event(action, container_id=CID, **attributes):
+    return {
+        "Type": "container",
+        "Action": action,
+        "Actor": {"ID": container_id, "Attributes": attributes},
+    }
+
+
+def _cgroup(root, usage_usec, memory, limit="max"):
+    path = root / "ds01.slice" / "ds01-student.slice" / f"docker-{CID}.scope"
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "cpu.stat").write_text(f"usage_usec {usage_usec}\nuser_usec 0\n")
+    (path / "memory.current").write_text(f"{memory}\n")
+    (path / "memory.max").write_text(f"{limit}\n")
+    return path
+
+
+class TestEventModel:
+    def test_lifecycle_events_update_model(self, dashboard):
+        data = dashboard.LiveDashboardData()
+        data.apply_event(_event("create", name="proj._.1001", **{"ds01.user": "alice"}))
+        assert data.get_containers()[0]["user"] == "alice"
+        assert data.get_containers(include_stopped=False) == []
+
+        data.apply_event(_event("start", name="proj._.1001"))
+        assert [c["name"] for c in data.get_containers(include_stopped=False)] == ["proj._.1001"]
+        assert data.changed.is_set()
+
+        data.apply_event(_event("rename", name="renamed", oldName="/proj._.1001"))
+        assert data.get_containers()[0]["name"] == "renamed"
+        assert data.get_containers()[0]["status"] == "Up"
+
+        data.apply_event(_event("die", name="renamed"))
+        assert data.get_containers()[0]["status"] == "Exited"
+        data.apply_event(_event("destroy", name="renamed"))
+        assert data.get_containers() == []
+
+    def test_events_mark_gpu_allocations_stale(self, dashboard):
+        data = dashboard.LiveDashboardData()
+        data._allocations_stale = False
+        data.apply_event(_event("start", name="x"))
+        assert data._allocations_stale
+
+
+class TestCgroupSampling:
+    def test_finds_scopes_under_user_slices(self, dashboard, tmp_path):
+        path = _cgroup(tmp_path, 0, 0)
+        (tmp_path / "user.slice" / "session-1.scope").mkdir(parents=True)
+        assert dashboard.find_container_cgroups(tmp_path) == {CID: path}
+
+    def test_cpu_percent_from_usage_delta(self, dashboard, tmp_path, monkeypatch):
+        data = dashboard.LiveDashboardData(cgroup_root=tmp_path)
+        running = [{"id": CID, "name": "c", "status": "Up", "user": "alice"}]
+        clock = iter([100.0, 102.0])
+        monkeypatch.setattr(dashboard.time, "monotonic", lambda: next(clock))
+
+        _cgroup(tmp_path, 1_000_000, 512 * 1024**2, limit=str(1024**3))
+        stats, cpu = data.sample_containers(running, mem_total=0)
+        assert stats == {} and cpu == {}  # first sample has no delta yet
+
+        # 3 CPU-seconds over 2 wall seconds = 150% (docker scale, 100% = 1 core)
+        _cgroup(tmp_path, 4_000_000, 512 * 1024**2, limit=str(1024**3))
+        stats, cpu = data.sample_containers(running, mem_total=0)
+        assert cpu == {"c": pytest.approx(150.0)}
+        assert stats["c"]["mem_used"] == "512.0MiB"
+        assert stats["c"]["mem_percent"] == "50.00"
+
+    def test_missing_cgroup_falls_back_to_one_docker_stats(self, dashboard, tmp_path, monkeypatch):
+        data = dashboard.LiveDashboardData(cgroup_root=tmp_path)
+        calls = []
+
+        def fake_cpu(self):
+            calls.append(1)
+            return {"c": 12.5}
+
+        monkeypatch.setattr(dashboard.DashboardData, "get_container_cpu", fake_cpu)
+        running = [{"id": CID, "name": "c", "status": "Up", "user": "alice"}]
+        stats, cpu = data.sample_containers(running, mem_total=0)
+        assert cpu == {"c": 12.5} and len(calls) == 1
+        assert stats["c"]["cpu_percent"] == "12.50"
+
+
+class TestIncrementalScreen:
+    def test_only_changed_rows_are_redrawn(self, dashboard):
+        out = io.StringIO()
+        screen = dashboard.IncrementalScreen(out)
+        assert screen.draw("a\nb\nc") == 3
+        assert screen.draw("a\nB\nc") == 1
+        assert "\033[2;1HB" in out.getvalue()
+
+    def test_shorter_frame_clears_tail_and_invalidate_redraws_all(self, dashboard):
+        out = io.StringIO()
+        screen = dashboard.IncrementalScreen(out)
+        screen.draw("a\nb\nc")
+        screen.draw("a")
+        assert out.getvalue().endswith("\033[2;1H\033[J")
+        screen.invalidate()
+        assert screen.draw("a") == 1
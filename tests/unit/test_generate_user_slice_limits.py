@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: Generate User Slice Limits
+
+Tests for the slice reconciler in generate-user-slice-limits.py: desired
+state, diff against a systemd directory, stale drop-in removal, and the
+generation state file read by docker-wrapper.sh.
+"""
+
+import importlib.util
+import os
+from pathlib import Path
+
+import pytest
+
+# =============================================================================
+# Module Loading (handles hyphenated filenames)
+# =============================================================================
+
+
+def load_generator_module():
+    script_path = Path("/opt/ds01-infra/scripts/system/generate-user-slice-limits.py")
+    spec = importlib.util.spec_from_file_location("generate_user_slice_limits", script_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def gen():
+    return load_generator_module()
+
+
+@pytest.fixture
+def systemd_dir(tmp_path):
+    path = tmp_path / "systemd"
+    path.mkdir()
+    for group in ("student", "admin"):
+        (path / f"ds01-{group}.slice").write_text("[Slice]\n")
+    return path
+
+
+CONFIG = {
+    "groups": {
+        "student": {
+            "aggregate": {
+                "cpu_quota": "800%",
+                "memory_max": "64G",
+                "memory_high": "60G",
+                "tasks_max": 4096,
+            }
+        },
+        "admin": {},
+    },
+    "user_overrides": {
+        "carol": {
+            "aggregate": {
+                "cpu_quota": "1600%",
+                "memory_max": "128G",
+                "memory_high": "120G",
+                "tasks_max": 8192,
+            }
+        }
+    },
+}
+USERS = {"alice": "student", "h.baker@hertie-school.lan": "student", "dave": "admin"}
+
+
+# =============================================================================
+# Test: Desired State and Diff
+# =============================================================================
+
+
+class TestReconcile:
+    @pytest.mark.unit
+    def test_desired_slices_keyed_by_sanitized_name(self, gen):
+        desired = gen.desired_slices(CONFIG, {**USERS, "carol": "student"})
+
+        assert set(desired) == {
+            "ds01-student-alice.slice",
+            "ds01-student-h_baker.slice",
+            "ds01-admin-dave.slice",
+            "ds01-student-carol.slice",
+        }
+        assert desired["ds01-admin-dave.slice"].drop_in is None
+        assert "CPUQuota=1600%" in desired["ds01-student-carol.slice"].drop_in
+        assert "Slice=ds01-student.slice" in desired["ds01-student-alice.slice"].unit
+
+    @pytest.mark.unit
+    def test_apply_then_converges(self, gen, systemd_dir):
+        desired = gen.desired_slices(CONFIG, USERS)
+        changes = gen.diff_slices(desired, systemd_dir, full=True)
+        # Three units, two student drop-ins
+        assert len(changes) == 5
+        assert gen.apply_changes(changes, dry_run=False, verbose=False) == 5
+
+        assert (systemd_dir / "ds01-student-alice.slice.d" / gen.DROP_IN_NAME).exists()
+        assert not (systemd_dir / "ds01-admin-dave.slice.d").exists()
+        assert gen.diff_slices(desired, systemd_dir, full=True) == []
+
+    @pytest.mark.unit
+    def test_stale_drop_ins_removed_in_full_run_only(self, gen, systemd_dir):
+        stale = systemd_dir / "ds01-student-bob.slice.d"
+        stale.mkdir()
+        (stale / gen.DROP_IN_NAME).write_text("[Slice]\n")
+        (stale / "20-admin.conf").write_text("[Slice]\n")
+        desired = gen.desired_slices(CONFIG, USERS)
+
+        single = gen.diff_slices(desired, systemd_dir, full=False)
+        assert all(path.parent != stale for _, path, _ in single)
+
+        gen.apply_changes(gen.diff_slices(desired, systemd_dir, full=True), False, False)
+        # Only our drop-in goes; the admin's own file keeps the directory
+        assert sorted(p.name for p in stale.iterdir()) == ["20-admin.conf"]
+
+    @pytest.mark.unit
+    def test_missing_parent_slice_skipped(self, gen, systemd_dir):
+        desired = gen.desired_slices(CONFIG, {"dana": "researcher"})
+        assert gen.diff_slices(desired, systemd_dir, full=False) == []
+
+
+# =============================================================================
+# Test: Generation State
+# =============================================================================
+
+
+class TestState:
+    @pytest.mark.unit
+    def test_round_trip(self, gen, tmp_path):
+        state = tmp_path / "slice-state"
+        slices = {"ds01-student-alice.slice": ("alice", "student")}
+        gen.write_state(state, 7, slices)
+
+        assert state.read_text().splitlines() == [
+            "# ds01-slices 7",
+            "ds01-student-alice.slice\talice\tstudent",
+        ]
+        assert gen.read_state(state) == (7, slices)
+        assert gen.read_state(tmp_path / "absent") == (0, {})
+
+    @pytest.mark.unit
+    def test_fresh_only_when_newer_than_config_and_members(self, gen, tmp_path):
+        config = tmp_path / "resource-limits.yaml"
+        config.write_text("groups: {}\n")
+        (tmp_path / "groups").mkdir()
+        members = tmp_path / "groups" / "student.members"
+        members.write_text("alice\n")
+        state = tmp_path / "slice-state"
+        gen.write_state(state, 1, {})
+
+        os.utime(config, (1000, 1000))
+        os.utime(members, (1000, 1000))
+        os.utime(state, (2000, 2000))
+        assert gen.state_is_fresh(state, config)
+
+        os.utime(members, (3000, 3000))
+        assert not gen.state_is_fresh(state, config)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: GPU queue scheduler (gpu-queue-manager.py)
+
+Covers priority + aging order, reservation of free slots for the head of the
+queue, settling of fulfilled/lapsed reservations, and the allocator honouring
+reservations. Docker is never touched: the availability checker's view of free
+slots is stubbed.
+"""
+
+import importlib.util
+import json
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_DOCKER_DIR = Path(__file__).resolve().parents[2] / "scripts" / "docker"
+
+
+def _load(name, filename):
+    spec = importlib.util.spec_from_file_location(name, str(_DOCKER_DIR / filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def qm(tmp_path, monkeypatch):
+    module = _load("gpu_queue_manager_test", "gpu-queue-manager.py")
+    monkeypatch.setattr(module, "STATE_DIR", tmp_path)
+    monkeypatch.setattr(module, "QUEUE_FILE", tmp_path / "gpu-queue.json")
+    monkeypatch.setattr(module, "QUEUE_LOCK", tmp_path / "gpu-queue.lock")
+    monkeypatch.setattr(module, "ALERTS_DIR", tmp_path / "alerts")
+    monkeypatch.setattr(module, "CONFIG_FILE", tmp_path / "missing.yaml")
+    monkeypatch.setattr(module, "_log_event", lambda *a, **k: False)
+    # The queue files here belong to the test user; keep the mode half of the check
+    trusted = module._trusted
+    monkeypatch.setattr(
+        module, "_trusted", lambda st: trusted(SimpleNamespace(st_uid=0, st_mode=st.st_mode))
+    )
+    return module
+
+
+def _entry(user, minutes_ago=0, priority=10, max_gpus=1, reservation=None, now=None):
+    now = now or datetime.now()
+    return {
+        "user": user,
+        "container": f"{user}-proj",
+        "max_gpus": max_gpus,
+        "priority": priority,
+        "requested_at": (now - timedelta(minutes=minutes_ago)).isoformat() + "Z",
+        "notified": bool(reservation),
+        "notification_sent_at": None,
+        "reservation": reservation,
+        "missed": 0,
+    }
+
+
+def _fake_allocator(free_slots, at_quota=(), allocations=None, priorities=None):
+    """Allocator stand-in backed by the real GPUAvailabilityChecker.suggest logic."""
+    checker_module = _load("gpu_availability_checker_test", "gpu-availability-checker.py")
+    checker = checker_module.GPUAvailabilityChecker()
+
+    def available(username, max_gpus=None):
+        return {
+            "available_gpus": {
+                s: {"uuid": f"GPU-{s}", "profile": "full", "physical_gpu": s} for s in free_slots
+            },
+            "user_current_count": 0,
+            "user_max_gpus": max_gpus,
+            "can_allocate": username not in at_quota,
+            "reason": "OK",
+            "user_allocations": [],
+        }
+
+    checker.get_user_available_gpus = available
+    return SimpleNamespace(
+        availability_checker=checker,
+        state_reader=SimpleNamespace(get_all_allocations=lambda: allocations or {}),
+        _get_user_max_gpu_equivalents=lambda user: 4.0,
+        _can_use_full_gpu=lambda user: True,
+        _get_user_priority=lambda user: (priorities or {}).get(user, 10),
+    )
+
+
+class TestOrdering:
+    def test_priority_beats_wait_time(self, qm):
+        now = datetime.now()
+        queue = [
+            _entry("student", minutes_ago=60, now=now),
+            _entry("faculty", priority=20, now=now),
+        ]
+        ordered = qm.order_queue(queue, now, aging_per_hour=5)
+        assert [e["user"] for e in ordered] == ["faculty", "student"]
+
+    def test_aging_lets_long_waiters_overtake(self, qm):
+        now = datetime.now()
+        queue = [
+            _entry("faculty", priority=20, now=now),
+            _entry("student", minutes_ago=180, now=now),  # 10 + 3h * 5 = 25
+        ]
+        ordered = qm.order_queue(queue, now, aging_per_hour=5)
+        assert [e["user"] for e in ordered] == ["student", "faculty"]
+
+    def test_equal_priority_is_fifo(self, qm):
+        now = datetime.now()
+        queue = [_entry("b", minutes_ago=5, now=now), _entry("a", minutes_ago=10, now=now)]
+        assert [e["user"] for e in qm.order_queue(queue, now, 5)] == ["a", "b"]
+
+
+class TestProcessQueue:
+    def test_reserves_free_slot_for_head(self, qm):
+        qm.save_queue([_entry("alice", minutes_ago=10), _entry("bob", priority=30)])
+
+        assert qm.process_queue(_fake_allocator(["0"], priorities={"bob": 30})) == 1
+
+        queue = qm.load_queue()
+        assert queue[0]["user"] == "bob"
+        assert queue[0]["reservation"]["slots"] == ["0"]
+        assert queue[1]["reservation"] is None
+        alerts = json.loads((qm.ALERTS_DIR / "bob.json").read_text())
+        assert "reserved for you" in alerts[0]["message"]
+
+    def test_reserved_slots_not_handed_out_twice(self, qm):
+        qm.save_queue([_entry("alice", minutes_ago=10), _entry("bob", minutes_ago=5)])
+        allocator = _fake_allocator(["0", "1"])
+
+        assert qm.process_queue(allocator) == 2
+        assert qm.process_queue(allocator) == 0
+        slots = [e["reservation"]["slots"] for e in qm.load_queue()]
+        assert slots == [["0"], ["1"]]
+
+    def test_head_blocks_smaller_requests_behind_it(self, qm):
+        qm.save_queue([_entry("alice", minutes_ago=10, max_gpus=2), _entry("bob")])
+
+        assert qm.process_queue(_fake_allocator(["0"])) == 0
+        assert all(e["reservation"] is None for e in qm.load_queue())
+
+    def test_multi_gpu_reservation_uses_topology_aware_set(self, qm):
+        qm.save_queue([_entry("alice", max_gpus=2)])
+        allocator = _fake_allocator(["0", "1", "2", "3"])
+        gpus = ["0", "1", "2", "3"]
+        allocator.availability_checker._topology = {
+            a: {b: "X" if a == b else "NV12" if {a, b} == {"2", "3"} else "SYS" for b in gpus}
+            for a in gpus
+        }
+
+        assert qm.process_queue(allocator) == 1
+        assert qm.load_queue()[0]["reservation"]["slots"] == ["2", "3"]
+
+    def test_waiter_at_quota_is_skipped(self, qm):
+        qm.save_queue([_entry("alice", minutes_ago=10), _entry("bob")])
+
+        assert qm.process_queue(_fake_allocator(["0"], at_quota={"alice"})) == 1
+        reserved = [e["user"] for e in qm.load_queue() if e["reservation"]]
+        assert reserved == ["bob"]
+
+    def test_priority_comes_from_config_not_the_entry(self, qm):
+        qm.save_queue([_entry("alice", minutes_ago=10), _entry("mallory", priority=1000)])
+
+        assert qm.process_queue(_fake_allocator(["0"])) == 1
+        queue = qm.load_queue()
+        assert [e["user"] for e in queue if e["reservation"]] == ["alice"]
+        assert queue[1]["priority"] == 10
+
+    def test_gives_up_when_another_pass_holds_lock_too_long(self, qm, monkeypatch):
+        monkeypatch.setattr(qm, "PASS_LOCK_TIMEOUT", 0.2)
+        qm.save_queue([_entry("alice")])
+        with qm.queue_lock():
+            assert qm.process_queue(_fake_allocator(["0"])) == 0
+
+    def test_waits_for_running_pass(self, qm):
+        qm.save_queue([_entry("alice")])
+        acquired, released = threading.Event(), threading.Event()
+
+        def hold():
+            with qm.queue_lock():
+                acquired.set()
+                released.wait(5)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        acquired.wait(5)
+        threading.Timer(0.3, released.set).start()
+        try:
+            assert qm.process_queue(_fake_allocator(["0"])) == 1
+        finally:
+            released.set()
+            holder.join()
+
+
+class TestSettleReservations:
+    def _reserved(self, user, expires_in_minutes, now):
+        expires = (now + timedelta(minutes=expires_in_minutes)).isoformat() + "Z"
+        return _entry(user, now=now, reservation={"slots": ["0"], "expires_at": expires})
+
+    def test_fulfilled_entry_removed(self, qm):
+        now = datetime.now()
+        queue = [self._reserved("alice", 5, now)]
+        allocations = {"0": {"users": {"alice": 1}}}
+        assert qm.settle_reservations(queue, allocations, now) == []
+
+    def test_lapsed_entry_requeued_then_dropped(self, qm):
+        now = datetime.now()
+        queue = qm.settle_reservations([self._reserved("alice", -1, now)], {}, now, max_missed=2)
+        assert queue[0]["reservation"] is None
+        assert queue[0]["missed"] == 1
+
+        queue[0]["reservation"] = {"slots": ["0"], "expires_at": now.isoformat() + "Z"}
+        assert qm.settle_reservations(queue, {}, now, max_missed=2) == []
+
+    def test_slot_taken_by_someone_else_clears_without_penalty(self, qm):
+        now = datetime.now()
+        queue = [self._reserved("alice", 5, now)]
+        queue = qm.settle_reservations(queue, {"0": {"users": {"bob": 1}}}, now)
+        assert queue[0]["reservation"] is None
+        assert queue[0]["missed"] == 0
+
+    def test_active_reservations_ignores_expired(self, qm):
+        now = datetime.now()
+        queue = [self._reserved("alice", 5, now), self._reserved("bob", -5, now)]
+        queue[1]["reservation"]["slots"] = ["1"]
+        assert qm.active_reservations(queue, now) == {"0": "alice"}
+
+    def test_active_reservations_ignores_longer_than_ttl(self, qm):
+        now = datetime.now()
+        queue = [self._reserved("alice", 5, now), self._reserved("mallory", 60 * 24 * 365, now)]
+        queue[1]["reservation"]["slots"] = ["1"]
+        assert qm.active_reservations(queue, now, ttl_minutes=10) == {"0": "alice"}
+
+
+class TestAllocatorHonoursReservations:
+    def test_other_users_reservation_excluded_own_preferred(self, qm, monkeypatch):
+        allocator_module = _load("gpu_allocator_v2_test", "gpu_allocator_v2.py")
+        monkeypatch.setattr(allocator_module, "gpu_queue_module", qm)
+        expires = (datetime.now() + timedelta(minutes=5)).isoformat() + "Z"
+        qm.save_queue(
+            [
+                _entry("alice", reservation={"slots": ["1"], "expires_at": expires}),
+                _entry("bob", reservation={"slots": ["2"], "expires_at": expires}),
+            ]
+        )
+        allocator = allocator_module.GPUAllocatorSmart.__new__(allocator_module.GPUAllocatorSmart)
+        allocator.config = {}
+
+        assert allocator._get_queue_reservations("alice") == (["2"], ["1"])
+        assert allocator._get_queue_reservations("carol") == (["1", "2"], [])
+
+    def test_untrusted_queue_file_ignored(self, qm, monkeypatch):
+        allocator_module = _load("gpu_allocator_v2_test", "gpu_allocator_v2.py")
+        monkeypatch.setattr(allocator_module, "gpu_queue_module", qm)
+        expires = (datetime.now() + timedelta(minutes=5)).isoformat() + "Z"
+        qm.save_queue([_entry("mallory", reservation={"slots": ["0"], "expires_at": expires})])
+        allocator = allocator_module.GPUAllocatorSmart.__new__(allocator_module.GPUAllocatorSmart)
+        allocator.config = {}
+
+        assert allocator._get_queue_reservations("alice") == (["0"], [])
+        qm.QUEUE_FILE.chmod(0o664)  # Group-writable: anyone in docker could have written it
+        assert allocator._get_queue_reservations("alice") == ([], [])
+
+    def test_trusted_requires_root_owner(self):
+        trusted = _load("gpu_queue_manager_trust_test", "gpu-queue-manager.py")._trusted
+        assert trusted(SimpleNamespace(st_uid=0, st_mode=0o100644))
+        assert not trusted(SimpleNamespace(st_uid=1000, st_mode=0o100644))
+        assert not trusted(SimpleNamespace(st_uid=0, st_mode=0o100646))
+
+    def test_suggest_prefers_reserved_slot(self):
+        checker = _fake_allocator(["0", "1", "2"]).availability_checker
+        suggestion = checker.suggest_gpu_for_user(
+            "alice", 4, allow_full_gpu=True, exclude_slots=["0"], prefer_slots=["2"]
+        )
+        assert suggestion["gpu_slot"] == "2"
+
+    def test_gpu_set_skips_reserved_and_is_all_or_nothing(self):
+        checker = _fake_allocator(["0", "1", "2"]).availability_checker
+        checker._topology = {}
+        suggestion = checker.suggest_gpu_set_for_user(
+            "alice", 2, 4, allow_full_gpu=True, exclude_slots=["0"]
+        )
+        assert suggestion["gpu_slots"] == ["1", "2"]
+
+        suggestion = checker.suggest_gpu_set_for_user(
+            "alice", 3, 4, allow_full_gpu=True, exclude_slots=["0"]
+        )
+        assert not suggestion["success"]
+
+
+class TestPrivilegedCommands:
+    def test_sudo_caller_cannot_manage_other_users(self, qm, monkeypatch, capsys):
+        monkeypatch.setattr(qm.os, "geteuid", lambda: 0)
+        monkeypatch.setenv("SUDO_USER", "mallory")
+        monkeypatch.setattr(qm.sys, "argv", ["gpu-queue", "remove", "alice"])
+        qm.save_queue([_entry("alice")])
+
+        with pytest.raises(SystemExit):
+            qm.main()
+        assert "own queue entries" in capsys.readouterr().err
+        assert [e["user"] for e in qm.load_queue()] == ["alice"]
+
+    def test_non_root_reexecs_through_sudo(self, qm, monkeypatch):
+        calls = []
+        monkeypatch.setattr(qm.os, "geteuid", lambda: 1000)
+        monkeypatch.setattr(qm.os, "execvp", lambda prog, args: calls.append(args))
+        qm._as_root(["gpu-queue", "add", "alice", "proj", "1"])
+        assert calls == [["sudo", "-n", str(qm.SELF_PATH), "add", "alice", "proj", "1"]]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: mlc-patched.py startup caches
+
+Covers the precompiled ml_images.repo index (same results as the original
+CSV scan, reused until the file changes) and the host architecture cache
+keyed on the dpkg status file. `apt` is never run: detection is stubbed.
+"""
+
+import importlib.util
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_SCRIPT = Path(__file__).resolve().parents[2] / "scripts" / "docker" / "mlc-patched.py"
+
+REPO = """\
+Pytorch, 2.5.1, [CUDA_ADA;CUDA_AMPERE], aimehub/pytorch-2.5.1-aime-cuda12.1.1
+Pytorch, 2.4.0, [CUDA_ADA], aimehub/pytorch-2.4.0-cuda12.1
+Tensorflow, 2.16.1, [CUDA_ADA], aimehub/tensorflow-2.16.1-cuda12.3
+Pytorch, 2.3.0, [ROCM6], aimehub/pytorch-2.3.0-rocm6.0
+"""
+
+
+@pytest.fixture
+def mlc(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location("mlc_patched_test", str(_SCRIPT))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.setattr(
+        module, "MLC_CACHE_FILES", (tmp_path / "missing" / "system.json", tmp_path / "user.json")
+    )
+    status = tmp_path / "dpkg-status"
+    status.write_text("Package: cuda-toolkit-12-3\n")
+    monkeypatch.setattr(module, "DPKG_STATUS_FILE", status)
+    return module
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "ml_images.repo"
+    path.write_text(REPO)
+    return path
+
+
+class TestCatalogIndex:
+    def test_lookup_matches_file_order(self, mlc, repo):
+        assert mlc.extract_from_ml_images(repo, "CUDA_ADA") == {
+            "Pytorch": [
+                ("2.5.1", "aimehub/pytorch-2.5.1-aime-cuda12.1.1"),
+                ("2.4.0", "aimehub/pytorch-2.4.0-cuda12.1"),
+            ],
+            "Tensorflow": [("2.16.1", "aimehub/tensorflow-2.16.1-cuda12.3")],
+        }
+        assert sorted(mlc.get_gpu_architectures(repo)) == ["CUDA_ADA", "CUDA_AMPERE", "ROCM6"]
+
+    def test_index_reused_from_disk_until_repo_changes(self, mlc, repo, monkeypatch):
+        mlc.load_ml_images_catalog(repo)
+        mlc._mlc_caches = None  # new process
+
+        def no_parse(*args, **kwargs):
+            raise AssertionError("catalog re-parsed")
+
+        monkeypatch.setattr(mlc.csv, "DictReader", no_parse)
+        assert mlc.extract_from_ml_images(repo, "ROCM6") == {
+            "Pytorch": [("2.3.0", "aimehub/pytorch-2.3.0-rocm6.0")]
+        }
+
+        monkeypatch.undo()
+        repo.write_text(REPO + "Jax, 0.4.30, [CUDA_ADA], aimehub/jax-0.4.30\n")
+        assert "Jax" in mlc.extract_from_ml_images(repo, "CUDA_ADA")
+
+
+class TestHostArchitecture:
+    def test_detection_cached_until_dpkg_status_changes(self, mlc, monkeypatch):
+        calls = []
+
+        def detect():
+            calls.append(1)
+            return "CUDA", "CUDA_ADA", 12.3
+
+        monkeypatch.setattr(mlc, "detect_host_gpu_architecture", detect)
+        assert mlc.get_host_gpu_architecture() == ("CUDA", "CUDA_ADA", 12.3)
+        mlc._mlc_caches = None
+        assert mlc.get_host_gpu_architecture() == ("CUDA", "CUDA_ADA", 12.3)
+        assert len(calls) == 1
+
+        stat = mlc.DPKG_STATUS_FILE.stat()
+        os.utime(mlc.DPKG_STATUS_FILE, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        mlc.get_host_gpu_architecture()
+        assert len(calls) == 2
+
+    def test_cache_owned_by_another_user_ignored(self, mlc, monkeypatch):
+        mlc._save_mlc_cache("catalog", {"key": ["x"]})
+        mlc._mlc_caches = None
+        monkeypatch.setattr(mlc.pathlib.Path, "stat", lambda self: SimpleNamespace(st_uid=4242))
+        assert mlc._load_mlc_caches() == {}
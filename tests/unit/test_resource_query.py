@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Unit Tests: DS01 resource query layer (ds01-resource-query.py)
+
+Covers user/status filter pushdown into `docker ps`, batched `docker inspect`
+of the survivors, and the streaming iterator behind --json-stream. Docker is
+never called: subprocess.run is replaced by a fake that records commands.
+"""
+
+import importlib.util
+import json
+import subprocess
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+_DOCKER_DIR = Path(__file__).resolve().parents[2] / "scripts" / "docker"
+
+
+@pytest.fixture
+def rq():
+    spec = importlib.util.spec_from_file_location(
+        "ds01_resource_query_test", str(_DOCKER_DIR / "ds01-resource-query.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _inspect(cid, name, user=None, legacy_user=None, gpu=None):
+    labels = {}
+    if user:
+        labels["ds01.user"] = user
+    if legacy_user:
+        labels["aime.mlc.USER"] = legacy_user
+    if gpu:
+        labels["ds01.gpu.allocated"] = gpu
+    return {
+        "Id": cid,
+        "Name": f"/{name}",
+        "Config": {"Labels": labels},
+        "State": {"Status": "running", "Running": True},
+        "HostConfig": {},
+    }
+
+
+class FakeDocker:
+    """subprocess.run stand-in: `docker ps` honours label filters, inspect reads a table."""
+
+    def __init__(self, containers):
+        self.containers = containers  # list of inspect dicts
+        self.calls = []
+
+    def __call__(self, cmd, **kwargs):
+        self.calls.append(cmd)
+        if cmd[1] == "ps":
+            wanted = [c.split("=", 1)[1] for c in cmd if c.startswith("label=")]
+            lines = []
+            for info in self.containers:
+                labels = info["Config"]["Labels"]
+                if all(labels.get(w.split("=")[0]) == w.split("=")[1] for w in wanted):
+                    lines.append(f"{info['Id']}\t{info['Name'][1:]}\tUp 1 hour\t2026-01-01")
+            return SimpleNamespace(returncode=0, stdout="\n".join(lines) + "\n", stderr="")
+        if cmd[1] == "inspect":
+            by_id = {info["Id"]: info for info in self.containers}
+            found = [by_id[c] for c in cmd[2:] if c in by_id]
+            code = 0 if len(found) == len(cmd) - 2 else 1
+            return SimpleNamespace(returncode=code, stdout=json.dumps(found), stderr="")
+        raise AssertionError(f"unexpected command {cmd}")
+
+
+@pytest.fixture
+def docker(monkeypatch):
+    containers = [
+        _inspect("a1", "proj._.1001", user="alice"),
+        _inspect("a2", "train._.1001", user="alice", gpu="0"),
+        _inspect("b1", "proj._.1002", user="bob"),
+        _inspect("l1", "old._.1001", legacy_user="alice"),
+        # ds01.user wins over the legacy label
+        _inspect("x1", "mixed._.1003", user="carol", legacy_user="alice"),
+    ]
+    fake = FakeDocker(containers)
+    monkeypatch.setattr(subprocess, "run", fake)
+    return fake
+
+
+def _query(rq):
+    query = rq.DS01ResourceQuery.__new__(rq.DS01ResourceQuery)
+    query.state_reader = SimpleNamespace(
+        _extract_gpu_from_container=lambda info: (
+            {"gpu_slot": gpu, "gpu_uuid": f"GPU-{gpu}", "user": "alice"}
+            if (gpu := info["Config"]["Labels"].get("ds01.gpu.allocated"))
+            else None
+        ),
+        _allocation_entry=lambda name, info, gpu_info: {"container": name, **gpu_info},
+    )
+    return query
+
+
+class TestFilterPushdown:
+    def test_user_filter_goes_to_docker_ps(self, rq, docker):
+        names = [c["name"] for c in _query(rq).query_containers(user="alice")]
+
+        assert sorted(names) == ["old._.1001", "proj._.1001", "train._.1001"]
+        ps_calls = [c for c in docker.calls if c[1] == "ps"]
+        assert [c[-1] for c in ps_calls] == ["label=ds01.user=alice", "label=aime.mlc.USER=alice"]
+
+    def test_survivors_inspected_in_one_call(self, rq, docker):
+        _query(rq).query_containers(user="alice")
+        inspects = [c for c in docker.calls if c[1] == "inspect"]
+        assert len(inspects) == 1
+        assert "b1" not in inspects[0]
+
+    def test_batches_and_streams(self, rq, docker, monkeypatch):
+        monkeypatch.setattr(rq, "INSPECT_BATCH_SIZE", 2)
+        stream = _query(rq).iter_containers()
+        first = next(stream)
+        assert first["name"] == "proj._.1001"
+        assert len([c for c in docker.calls if c[1] == "inspect"]) == 1
+        assert len(list(stream)) == 4
+        assert len([c for c in docker.calls if c[1] == "inspect"]) == 3
+
+    def test_container_removed_between_ps_and_inspect(self, rq, docker):
+        query = _query(rq)
+        listed = query._list_containers(None, "all")
+        docker.containers = docker.containers[1:]
+        assert [c for c in listed if c[0] not in query._inspect_batch([c[0] for c in listed])] == [
+            listed[0]
+        ]
+
+    def test_status_filter(self, rq, docker):
+        _query(rq).query_containers(status="stopped")
+        assert docker.calls[0][:6] == [
+            "docker",
+            "ps",
+            "--no-trunc",
+            "-a",
+            "--filter",
+            "status=exited",
+        ]
+
+
+def test_user_summary_reuses_one_listing(rq, docker):
+    summary = _query(rq).query_user_summary("alice")
+
+    assert summary["total_containers"] == 3
+    assert summary["gpu_count"] == 1
+    assert summary["gpu_allocations"][0]["container"] == "train._.1001"
+    assert len([c for c in docker.calls if c[1] == "inspect"]) == 1
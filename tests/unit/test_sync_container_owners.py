@@ -9,6 +9,7 @@ container ownership data while preserving tracker-detected owners.
 import importlib.util
 import json
 import os
+import sys
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -31,6 +32,11 @@ def load_sync_module(temp_output_file=None, temp_lock_file=None, temp_output_dir
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
 
+    # Group lookups are cached per process; start each test from an empty cache
+    identity = sys.modules.get("ds01_identity")
+    if identity is not None:
+        identity.clear_cache()
+
     # Override paths after loading
     if temp_output_file:
         module.OUTPUT_FILE = temp_output_file